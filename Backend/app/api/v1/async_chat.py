@@ -5,16 +5,21 @@ Async Chat API endpoints with task queue and SSE support
 import logging
 from datetime import datetime
 from typing import Optional, AsyncGenerator
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 
 from app.utils.deps import get_current_user
+from app.core.config import settings
 from app.core.database import get_database_session
 from app.models.user import User
 from app.models.chat_task import ChatTask, TaskStatus
 from app.services.task_queue_service import task_queue_service
+from app.services.task_state_registry import task_state_registry
+from app.services.task_event_buffer import format_event_id, parse_event_id, parse_sse_event
+from app.utils.request_fingerprint import IdempotencyKeyReused
+from app.utils.sse_client_queue import SSEClientQueue
 from app.services.deity_service import deity_service
 
 
@@ -50,6 +55,8 @@ class TaskStatusResponse(BaseModel):
     error: Optional[str] = None
     created_at: str
     processing_time_ms: Optional[int] = None
+    queue_position: Optional[int] = None  # While queued: 1 = next to be processed
+    estimated_wait_seconds: Optional[float] = None
 
 
 # Database dependency
@@ -64,17 +71,35 @@ async def get_db_session():
 async def ask_fortune_question(
     request: FortuneQuestionRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_db_session),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128)
 ):
     """
     Submit a fortune question for async processing
     Returns task_id and SSE URL for progress tracking
+
+    A repeated Idempotency-Key, or the same question resubmitted within the
+    dedupe window, returns the existing task instead of creating a new one.
+    Reusing a key for a different question is rejected with 422.
     """
     try:
         # Validate deity
         if not deity_service.get_temple_name(request.deity_id):
             raise HTTPException(status_code=400, detail="Invalid deity ID")
 
+        # Retries and double submits attach to the existing task (before the spam check rejects them)
+        existing_task = await task_queue_service.find_duplicate_task(
+            user_id=current_user.user_id,
+            deity_id=request.deity_id,
+            fortune_number=request.fortune_number,
+            question=request.question,
+            context=request.context,
+            idempotency_key=idempotency_key,
+            db=db
+        )
+        if existing_task:
+            return _existing_task_response(existing_task)
+
         # Check if user already has an active task created in last 10 minutes (prevent spam)
         from app.models.chat_task import TaskStatus
         from sqlalchemy import select, or_
@@ -104,6 +129,15 @@ async def ask_fortune_question(
                 detail="You already have a report being generated. Please wait for it to complete before requesting another."
             )
 
+        # Refuse early with a realistic Retry-After instead of queueing into provider 429s
+        admission = await task_queue_service.check_admission(db)
+        if not admission.admitted:
+            raise HTTPException(
+                status_code=429,
+                detail="The oracle is busy right now. Please try again shortly.",
+                headers={"Retry-After": str(admission.retry_after)}
+            )
+
         # Check if user has enough balance (no deduction yet, just validation)
         from app.models.wallet import Wallet
         wallet_result = await db.execute(
@@ -121,14 +155,17 @@ async def ask_fortune_question(
             )
 
         # Create task (coins will be deducted when processing actually starts)
-        task = await task_queue_service.create_task(
+        task, deduplicated = await task_queue_service.submit_task(
             user_id=current_user.user_id,
             deity_id=request.deity_id,
             fortune_number=request.fortune_number,
             question=request.question,
             context=request.context,
-            db=db
+            db=db,
+            idempotency_key=idempotency_key
         )
+        if deduplicated:
+            return _existing_task_response(task)
 
         logger.info(f"Created task {task.task_id} for user {current_user.user_id} (coins will be deducted when processing starts)")
 
@@ -141,11 +178,24 @@ async def ask_fortune_question(
 
     except HTTPException:
         raise
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error creating task: {e}")
         raise HTTPException(status_code=500, detail="Failed to process request")
 
 
+def _existing_task_response(task: ChatTask) -> TaskResponse:
+    """Point a duplicate request at the task (and SSE stream) already serving it"""
+    return TaskResponse(
+        task_id=task.task_id,
+        sse_url=f"/api/v1/async-chat/sse/{task.task_id}",
+        status=task.status.value,
+        message="This question is already being processed" if task.status != TaskStatus.COMPLETED
+        else "This question has already been answered"
+    )
+
+
 @router.get("/sse/{task_id}")
 async def stream_task_progress(
     task_id: str,
@@ -218,35 +268,26 @@ async def stream_task_progress(
         logger.error(f"Authentication failed for SSE endpoint: {e}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Authentication failed: {str(e)}")
 
-    # Verify task exists and belongs to user
-    task = await task_queue_service.get_task(task_id, db)
-    if not task:
+    # Verify task exists and belongs to user (owner only; the full row is read later if needed)
+    owner_result = await db.execute(select(ChatTask.user_id).where(ChatTask.task_id == task_id))
+    task_owner = owner_result.first()
+    if not task_owner:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    if task.user_id != current_user.user_id:
+    if task_owner.user_id != current_user.user_id:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    # Browsers send Last-Event-ID automatically when an EventSource reconnects
+    last_event_id = parse_event_id(request.headers.get("last-event-id"))
+
     async def event_generator():
         import asyncio
         import json
         from app.core.database import get_async_session
 
-        # Create a response object for SSE
-        class SSEResponse:
-            def __init__(self, generator_ref):
-                self.closed = False
-                self.generator_ref = generator_ref
-
-            async def send(self, data):
-                if not self.closed and self.generator_ref:
-                    await self.generator_ref.put(data)
-
-            def close(self):
-                self.closed = True
-
-        # Create an async queue for SSE events
-        event_queue = asyncio.Queue()
-        response_obj = SSEResponse(event_queue)
+        # Bounded per-client queue; stale partial LLM frames are coalesced for slow readers
+        event_queue = SSEClientQueue(maxsize=settings.SSE_CLIENT_QUEUE_SIZE)
+        response_obj = event_queue
 
         try:
             # Add connection to task queue service
@@ -255,26 +296,38 @@ async def stream_task_progress(
             # Initial prelude to defeat proxy/browser buffering
             yield ":" + (" " * 2048) + "\n\n"
 
-            # Send initial status
-            current_task = await task_queue_service.get_task(task_id, db)
             # Advise client on reconnection delay if needed
-            yield f"retry setting: 2000\n\n"
+            yield f"retry: 2000\n\n"
+
+            # Resume from the replay buffer when reconnecting (no DB read)
+            replayed = None
+            if last_event_id is not None:
+                replayed = task_queue_service.event_buffer.replay(task_id, last_event_id)
+            replayed_ids = set()
+            if replayed is not None:
+                logger.info(f"SSE resume for task {task_id} from event {format_event_id(last_event_id)}: replaying {len(replayed)} events")
+                for event_id, event_data in replayed:
+                    replayed_ids.add(event_id)
+                    yield event_data
+                    _, event_json = parse_sse_event(event_data)
+                    if event_json and event_json.get("type") in ["complete", "error"]:
+                        return
 
-            if current_task:
-                # Extract status_code from status_message (format: "status_code:20")
-                status_code = None
-                if current_task.status_message and current_task.status_message.startswith("status_code:"):
-                    try:
-                        status_code = int(current_task.status_message.split(":")[1])
-                    except (IndexError, ValueError):
-                        pass
+            # Send initial status
+            current_task = await task_queue_service.get_task(task_id, db) if replayed is None else None
 
+            if current_task:
+                # Progress of a running task comes from its events (the row is checkpointed lazily)
+                live = task_queue_service.get_live_progress(current_task)
                 initial_data = {
                     "type": "status",
-                    "status": current_task.status.value,
-                    "progress": current_task.progress,
-                    "status_code": status_code
+                    "status": live["status"],
+                    "progress": live["progress"],
+                    "status_code": live["status_code"]
                 }
+                if "queue_position" in live:
+                    initial_data["queue_position"] = live["queue_position"]
+                    initial_data["estimated_wait_seconds"] = live["estimated_wait_seconds"]
                 yield f"data: {json.dumps(initial_data)}\n\n"
 
                 # If task is already completed, send result immediately
@@ -305,6 +358,7 @@ async def stream_task_progress(
             timeout_counter = 0
             max_timeout = 300  # 5 minutes
             ping_interval = 30  # Send ping every 30 seconds
+            db_check_interval = 10  # Idle seconds between DB checks for a missed terminal event
 
             while not response_obj.closed and timeout_counter < max_timeout:
                 # Check if client disconnected
@@ -314,18 +368,17 @@ async def stream_task_progress(
                 try:
                     # Wait for events from the queue with timeout
                     event_data = await asyncio.wait_for(event_queue.get(), timeout=1.0)
+                    event_id, event_json = parse_sse_event(event_data)
+                    if event_id in replayed_ids:
+                        continue  # Already sent from the replay buffer
                     yield event_data
                     timeout_counter = 0  # Reset timeout on activity
 
                     # Check if this is a completion event
-                    try:
-                        event_json = json.loads(event_data.replace("data: ", "").strip())
-                        if event_json.get("type") in ["complete", "error"]:
-                            # Add delay to ensure client receives the completion event before connection closes
-                            await asyncio.sleep(0.5)
-                            break
-                    except (json.JSONDecodeError, AttributeError):
-                        pass
+                    if event_json and event_json.get("type") in ["complete", "error"]:
+                        # Add delay to ensure client receives the completion event before connection closes
+                        await asyncio.sleep(0.5)
+                        break
 
                 except asyncio.TimeoutError:
                     # No events received, increment timeout and send ping if needed
@@ -334,28 +387,33 @@ async def stream_task_progress(
                     if timeout_counter % ping_interval == 0:  # Every 30 seconds
                         yield f"data: {json.dumps({'type': 'ping'})}\n\n"
 
-                    # Check if task is completed (fallback) with short-lived DB session
-                    async with get_async_session() as _db:
-                        current_task = await task_queue_service.get_task(task_id, _db)
-                    if current_task and current_task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
-                        # Send final event if not already sent
-                        if current_task.status == TaskStatus.COMPLETED:
+                    # Terminal state from the in-memory registry (no DB round trip)
+                    state = task_state_registry.get(task_id)
+                    if (state is None or not state.is_terminal) and timeout_counter % db_check_interval == 0:
+                        # Occasional DB safety check: no event seen on this node yet (e.g. still
+                        # queued), or the terminal event was lost on the way (publish failures
+                        # are only logged)
+                        async with get_async_session() as _db:
+                            current_task = await task_queue_service.get_task(task_id, _db)
+                        if current_task:
+                            db_state = task_state_registry.state_from_task(current_task)
+                            # Running progress in the row lags behind the events; only trust it when final
+                            if state is None or db_state.is_terminal:
+                                state = db_state
+
+                    if state and state.is_terminal:
+                        # Send final event in case the client missed it
+                        if state.status == TaskStatus.COMPLETED.value:
                             final_data = {
                                 "type": "complete",
-                                "result": {
-                                    "response": current_task.response_text,
-                                    "confidence": current_task.confidence,
-                                    "sources_used": current_task.sources_used,
-                                    "processing_time_ms": current_task.processing_time_ms,
-                                    "can_generate_report": current_task.can_generate_report == "true"
-                                }
+                                "result": state.result
                             }
                             yield f"data: {json.dumps(final_data)}\n\n"
                         else:  # FAILED
                             error_data = {
                                 "type": "error",
-                                "error": current_task.error_message,
-                                "retry_allowed": True
+                                "error": state.error,
+                                "retry_allowed": state.retry_allowed
                             }
                             yield f"data: {json.dumps(error_data)}\n\n"
                         break
@@ -416,15 +474,18 @@ async def get_task_status(
                 "can_generate_report": task.can_generate_report == "true"
             }
 
+        live = task_queue_service.get_live_progress(task)
         return TaskStatusResponse(
             task_id=task.task_id,
-            status=task.status.value,
-            progress=task.progress,
-            message=task.status_message,
+            status=live["status"],
+            progress=live["progress"],
+            message=live["message"],
             result=result,
             error=task.error_message,
             created_at=task.created_at.isoformat(),
-            processing_time_ms=task.processing_time_ms
+            processing_time_ms=task.processing_time_ms,
+            queue_position=live.get("queue_position"),
+            estimated_wait_seconds=live.get("estimated_wait_seconds")
         )
 
     except HTTPException:
@@ -543,7 +604,7 @@ async def service_health_check():
         # Get basic worker pool status
         pool_metrics = task_queue_service.worker_pool.get_metrics()
         active_workers = pool_metrics['pool_status']['active_workers']
-        total_workers = pool_metrics['pool_status']['max_workers']
+        total_workers = pool_metrics['pool_status']['target_workers']
 
         # Check circuit breaker states
         from app.utils.timeout_utils import (
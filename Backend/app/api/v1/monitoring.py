@@ -285,9 +285,10 @@ async def get_worker_pool_details(
         pool_status = metrics['pool_status']
         performance = metrics['performance']
 
-        # Check if workers are overloaded
-        if pool_status['active_workers'] >= pool_status['max_workers'] * 0.8:
-            recommendations.append("Consider increasing max_workers - pool is near capacity")
+        # Check if workers are overloaded (the autoscaler cannot grow past max_workers)
+        if (pool_status['target_workers'] >= pool_status['max_workers']
+                and pool_status['active_workers'] >= pool_status['max_workers'] * 0.8):
+            recommendations.append("Consider increasing TASK_WORKER_MAX - pool is at its upper bound and near capacity")
 
         # Check success rate
         if performance['success_rate'] < 90:
@@ -365,6 +366,22 @@ async def get_system_alerts(
                 "component": "task_queue"
             })
 
+        # Backlog the autoscaler cannot absorb
+        autoscaler = pool_metrics.get('autoscaler') or {}
+        last_decision = autoscaler.get('last_decision') or {}
+        if last_decision.get('reason') in ("at_max", "llm_saturated"):
+            warnings.append({
+                "type": "worker_pool_saturated",
+                "severity": "medium",
+                "message": (
+                    f"{last_decision['signals'].get('queue_depth', 0)} tasks queued with "
+                    f"{last_decision['current']} workers "
+                    + ("(pool at TASK_WORKER_MAX)" if last_decision['reason'] == "at_max"
+                       else "(LLM backend has no free capacity)")
+                ),
+                "component": "worker_pool"
+            })
+
         # Check poem service health
         poem_health = await poem_service.health_check()
         if poem_health.chroma_db_status != "healthy":
@@ -7,16 +7,21 @@ import json
 import asyncio
 from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 
 from app.utils.deps import get_current_user
+from app.core.config import settings
 from app.core.database import get_database_session
 from app.models.user import User
 from app.models.chat_task import ChatTask, TaskStatus
 from app.services.task_queue_service import task_queue_service
+from app.services.task_state_registry import task_state_registry
+from app.services.task_event_buffer import format_event_id, parse_event_id, parse_sse_event
+from app.utils.request_fingerprint import IdempotencyKeyReused
+from app.utils.sse_client_queue import SSEClientQueue
 from app.services.deity_service import deity_service
 from app.utils.progress_tracker import progress_manager, ProgressUpdate
 
@@ -57,10 +62,15 @@ async def get_db_session():
 async def ask_fortune_question_streaming(
     request: EnhancedFortuneRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db_session)
+    db: AsyncSession = Depends(get_db_session),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=128)
 ):
     """
     Submit a fortune question with enhanced streaming capabilities
+
+    Duplicate submissions (same Idempotency-Key, or the same question within the
+    dedupe window) attach to the existing task and its stream.
+    Reusing a key for a different question is rejected with 422.
     """
     try:
         # Validate deity
@@ -75,28 +85,54 @@ async def ask_fortune_question_streaming(
             "streaming_version": "v2"
         })
 
-        task = await task_queue_service.create_task(
+        # Duplicates attach to their existing task; only new work is subject to admission control
+        existing_task = await task_queue_service.find_duplicate_task(
             user_id=current_user.user_id,
             deity_id=request.deity_id,
             fortune_number=request.fortune_number,
             question=request.question,
             context=enhanced_context,
+            idempotency_key=idempotency_key,
             db=db
         )
+        if existing_task is None:
+            admission = await task_queue_service.check_admission(db)
+            if not admission.admitted:
+                raise HTTPException(
+                    status_code=429,
+                    detail="The oracle is busy right now. Please try again shortly.",
+                    headers={"Retry-After": str(admission.retry_after)}
+                )
+
+        task, deduplicated = await task_queue_service.submit_task(
+            user_id=current_user.user_id,
+            deity_id=request.deity_id,
+            fortune_number=request.fortune_number,
+            question=request.question,
+            context=enhanced_context,
+            db=db,
+            idempotency_key=idempotency_key
+        )
 
-        logger.info(f"Created enhanced streaming task {task.task_id} for user {current_user.user_id}")
+        if deduplicated:
+            logger.info(f"Attached streaming request from user {current_user.user_id} to existing task {task.task_id}")
+        else:
+            logger.info(f"Created enhanced streaming task {task.task_id} for user {current_user.user_id}")
 
         return StreamingTaskResponse(
             task_id=task.task_id,
             sse_url=f"/api/v1/async-chat/sse/{task.task_id}",
             enhanced_sse_url=f"/api/v1/streaming-chat/sse/{task.task_id}",
-            status="queued",
-            message="Your question has been queued for enhanced streaming processing",
+            status=task.status.value if deduplicated else "queued",
+            message="This question is already being processed" if deduplicated
+            else "Your question has been queued for enhanced streaming processing",
             streaming_enabled=request.enable_streaming
         )
 
     except HTTPException:
         raise
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Error creating streaming task: {e}")
         raise HTTPException(status_code=500, detail="Failed to process streaming request")
@@ -173,37 +209,29 @@ async def enhanced_streaming_endpoint(
         logger.error(f"Authentication failed for enhanced SSE endpoint: {e}")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Authentication failed: {str(e)}")
 
-    # Verify task exists and belongs to user
-    task = await task_queue_service.get_task(task_id, db)
-    if not task:
+    # Verify task exists and belongs to user (owner only; the full row is read later if needed)
+    owner_result = await db.execute(select(ChatTask.user_id).where(ChatTask.task_id == task_id))
+    task_owner = owner_result.first()
+    if not task_owner:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    if task.user_id != current_user.user_id:
+    if task_owner.user_id != current_user.user_id:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    # Browsers send Last-Event-ID automatically when an EventSource reconnects
+    last_event_id = parse_event_id(request.headers.get("last-event-id"))
+
     async def enhanced_event_generator():
         """Enhanced event generator with detailed progress tracking"""
         import asyncio
         import json
         from app.core.database import get_async_session
 
-        # Create event queue for enhanced SSE
-        event_queue = asyncio.Queue()
+        # Bounded event queue for enhanced SSE; stale partial LLM frames are coalesced for slow readers
+        event_queue = SSEClientQueue(maxsize=settings.SSE_CLIENT_QUEUE_SIZE)
         progress_updates_received = 0
 
-        class EnhancedSSEResponse:
-            def __init__(self, queue_ref):
-                self.closed = False
-                self.queue_ref = queue_ref
-
-            async def send(self, data):
-                if not self.closed and self.queue_ref:
-                    await self.queue_ref.put(data)
-
-            def close(self):
-                self.closed = True
-
-        response_obj = EnhancedSSEResponse(event_queue)
+        response_obj = event_queue
 
         try:
             # Add connection to task queue service
@@ -240,13 +268,28 @@ async def enhanced_streaming_endpoint(
             # Suggest client reconnection backoff and send initial status
             yield f"retry: 2000\n\n"
 
-            current_task = await task_queue_service.get_task(task_id, db)
+            # Resume from the replay buffer when reconnecting (no DB read)
+            replayed = None
+            if last_event_id is not None:
+                replayed = task_queue_service.event_buffer.replay(task_id, last_event_id)
+            replayed_ids = set()
+            if replayed is not None:
+                logger.info(f"Enhanced SSE resume for task {task_id} from event {format_event_id(last_event_id)}: replaying {len(replayed)} events")
+                for event_id, event_data in replayed:
+                    replayed_ids.add(event_id)
+                    yield event_data
+                    _, event_json = parse_sse_event(event_data)
+                    if event_json and event_json.get("type") in ["enhanced_complete", "enhanced_error", "complete", "error"]:
+                        return
+
+            current_task = await task_queue_service.get_task(task_id, db) if replayed is None else None
             if current_task:
+                live = task_queue_service.get_live_progress(current_task)
                 initial_data = {
                     "type": "enhanced_status",
-                    "status": current_task.status.value,
-                    "progress": current_task.progress,
-                    "message": current_task.status_message,
+                    "status": live["status"],
+                    "progress": live["progress"],
+                    "message": live["message"],
                     "task_info": {
                         "deity_id": current_task.deity_id,
                         "fortune_number": current_task.fortune_number,
@@ -255,6 +298,9 @@ async def enhanced_streaming_endpoint(
                         "streaming_enabled": current_task.context.get("streaming_enabled", False) if current_task.context else False
                     }
                 }
+                if "queue_position" in live:
+                    initial_data["queue_position"] = live["queue_position"]
+                    initial_data["estimated_wait_seconds"] = live["estimated_wait_seconds"]
                 yield f"data: {json.dumps(initial_data)}\\n\\n"
 
                 # If task is already completed, send result immediately
@@ -295,6 +341,7 @@ async def enhanced_streaming_endpoint(
             timeout_counter = 0
             max_timeout = 300  # 5 minutes
             ping_interval = 15   # Send ping every 15 seconds
+            db_check_interval = 10  # Idle seconds between DB checks for a missed terminal event
             last_progress_update = datetime.now()
 
             while not response_obj.closed and timeout_counter < max_timeout:
@@ -305,26 +352,25 @@ async def enhanced_streaming_endpoint(
                 try:
                     # Wait for events from the queue with timeout
                     event_data = await asyncio.wait_for(event_queue.get(), timeout=1.0)
+                    event_id, event_json = parse_sse_event(event_data)
+                    if event_id in replayed_ids:
+                        continue  # Already sent from the replay buffer
                     yield event_data
                     timeout_counter = 0  # Reset timeout on activity
                     last_progress_update = datetime.now()
 
                     # Check if this is a completion event
-                    try:
-                        event_json = json.loads(event_data.replace("data: ", "").strip())
-                        if event_json.get("type") in ["enhanced_complete", "enhanced_error", "complete", "error"]:
-                            # Send final summary
-                            summary_data = {
-                                "type": "session_summary",
-                                "total_updates": progress_updates_received,
-                                "session_duration_ms": int((datetime.now() - last_progress_update).total_seconds() * 1000),
-                                "final_status": event_json.get("type"),
-                                "timestamp": datetime.now().isoformat()
-                            }
-                            yield f"data: {json.dumps(summary_data)}\\n\\n"
-                            break
-                    except (json.JSONDecodeError, AttributeError):
-                        pass
+                    if event_json and event_json.get("type") in ["enhanced_complete", "enhanced_error", "complete", "error"]:
+                        # Send final summary
+                        summary_data = {
+                            "type": "session_summary",
+                            "total_updates": progress_updates_received,
+                            "session_duration_ms": int((datetime.now() - last_progress_update).total_seconds() * 1000),
+                            "final_status": event_json.get("type"),
+                            "timestamp": datetime.now().isoformat()
+                        }
+                        yield f"data: {json.dumps(summary_data)}\\n\\n"
+                        break
 
                 except asyncio.TimeoutError:
                     # No events received, increment timeout and send enhanced ping
@@ -339,20 +385,27 @@ async def enhanced_streaming_endpoint(
                         }
                         yield f"data: {json.dumps(ping_data)}\\n\\n"
 
-                    # Check if task is completed (fallback with enhanced info) using short-lived DB session
-                    async with get_async_session() as _db:
-                        current_task = await task_queue_service.get_task(task_id, _db)
-                    if current_task and current_task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
+                    # Terminal state from the in-memory registry (no DB round trip)
+                    state = task_state_registry.get(task_id)
+                    if (state is None or not state.is_terminal) and timeout_counter % db_check_interval == 0:
+                        # Occasional DB safety check: no event seen on this node yet (e.g. still
+                        # queued), or the terminal event was lost on the way (publish failures
+                        # are only logged)
+                        async with get_async_session() as _db:
+                            current_task = await task_queue_service.get_task(task_id, _db)
+                        if current_task:
+                            db_state = task_state_registry.state_from_task(current_task)
+                            # Running progress in the row lags behind the events; only trust it when final
+                            if state is None or db_state.is_terminal:
+                                state = db_state
+
+                    if state and state.is_terminal:
                         # Send enhanced final event
-                        if current_task.status == TaskStatus.COMPLETED:
+                        if state.status == TaskStatus.COMPLETED.value:
                             final_data = {
                                 "type": "enhanced_complete",
                                 "result": {
-                                    "response": current_task.response_text,
-                                    "confidence": current_task.confidence,
-                                    "sources_used": current_task.sources_used,
-                                    "processing_time_ms": current_task.processing_time_ms,
-                                    "can_generate_report": current_task.can_generate_report == "true",
+                                    **state.result,
                                     "progress_updates_count": progress_updates_received
                                 },
                                 "fallback_detection": True
@@ -361,8 +414,8 @@ async def enhanced_streaming_endpoint(
                         else:  # FAILED
                             error_data = {
                                 "type": "enhanced_error",
-                                "error": current_task.error_message,
-                                "retry_allowed": True,
+                                "error": state.error,
+                                "retry_allowed": state.retry_allowed,
                                 "fallback_detection": True,
                                 "debug_info": {
                                     "progress_updates_received": progress_updates_received
@@ -426,13 +479,16 @@ async def get_detailed_progress(
         # Get progress tracker if exists
         progress_tracker = progress_manager.get_tracker(task_id)
 
+        live = task_queue_service.get_live_progress(task)
         progress_info = {
             "task_id": task_id,
-            "current_status": task.status.value,
-            "current_progress": task.progress,
-            "status_message": task.status_message,
+            "current_status": live["status"],
+            "current_progress": live["progress"],
+            "status_message": live["message"],
             "created_at": task.created_at.isoformat(),
-            "tracker_active": progress_tracker is not None
+            "tracker_active": progress_tracker is not None,
+            "queue_position": live.get("queue_position"),
+            "estimated_wait_seconds": live.get("estimated_wait_seconds")
         }
 
         if progress_tracker:
@@ -3,7 +3,7 @@ Application configuration using Pydantic settings - Simplified Version
 """
 
 from functools import lru_cache
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
 import os
@@ -63,8 +63,18 @@ class Settings(BaseSettings):
     # LLM settings
     OPENAI_API_KEY: Optional[str] = None
     LLM_PROVIDER: str = "ollama"  # openai, ollama, mock
+    # Simulated provider (LLM_PROVIDER=mock): latency profile (instant, fast, openai, ollama, slow) and failures
+    LLM_MOCK_PROFILE: str = "fast"
+    LLM_MOCK_FAILURE_RATES: Dict[str, float] = {}  # e.g. {"malformed_json": 0.05, "short_fields": 0.1, "timeout": 0.01}
+    LLM_MOCK_SEED: Optional[int] = None
     LLM_MODEL: str = "gpt-oss:20b"  # Default Ollama model
     OLLAMA_BASE_URL: Optional[str] = "http://localhost:11434"
+    # Ordered fallback providers as provider:model, e.g. "openai:gpt-4o-mini" or "mock:slow" (empty = single provider)
+    LLM_FALLBACK_PROVIDERS: str = ""
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 15.0  # Hedge delay until a provider has enough latency samples
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 2.0  # Lower bound for the rolling-p95 hedge delay
+    LLM_PROVIDER_FAILURE_THRESHOLD: int = 3  # Consecutive failures that open a provider's circuit
+    LLM_PROVIDER_RECOVERY_SECONDS: float = 30.0
     
     # ChromaDB settings - use environment variables
     CHROMA_DB_PATH: str = os.getenv("CHROMA_DB_PATH", "./chroma_db")
@@ -75,6 +85,59 @@ class Settings(BaseSettings):
     FORTUNE_JOB_TIMEOUT_SECONDS: int = 300
     FORTUNE_MAX_SEARCH_RESULTS: int = 10
 
+    # LLM retry budget shared by interpreter attempts and service-level JSON retries
+    LLM_RETRY_MAX_ATTEMPTS: int = 4  # Total LLM generations per interpretation request
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 1.0
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    LLM_RETRY_JITTER: float = 0.5  # Fraction of each backoff delay that is randomized
+    LLM_INTERPRETATION_DEADLINE_SECONDS: float = 40.0  # Bounds all attempts and backoff together
+
+    # LLM gateway: per-provider admission control in front of every LLM client
+    LLM_GATEWAY_MAX_CONCURRENCY: int = 3  # Generations in flight per provider
+    LLM_GATEWAY_REQUESTS_PER_MINUTE: int = 0  # 0 = no request rate limit
+    LLM_GATEWAY_TOKENS_PER_MINUTE: int = 0  # Prompt + max output tokens; 0 = no token rate limit
+    LLM_GATEWAY_MAX_QUEUE: int = 30  # Backlog (queued tasks + waiting calls) before /ask-question answers 429
+    LLM_GATEWAY_MAX_QUEUE_WAIT_SECONDS: float = 120.0  # Estimated wait beyond which new questions are refused
+
+    # Semantic interpretation cache (opt-in): reuse reports for near-identical questions on the same poem
+    INTERPRETATION_CACHE_ENABLED: bool = False
+    INTERPRETATION_CACHE_SIMILARITY: float = 0.92  # Minimum cosine similarity between questions for a hit
+    INTERPRETATION_CACHE_TTL_SECONDS: int = 86400
+    INTERPRETATION_CACHE_MAX_ENTRIES: int = 5000
+
+    # Task queue settings (durable queue over chat_tasks)
+    RUN_TASK_WORKERS: bool = True  # False = API-only node; run `python -m app.worker` separately
+    TASK_WORKER_COUNT: int = 3  # Workers started at boot
+    TASK_WORKER_MIN: int = 1  # Autoscaling bounds of the worker pool
+    TASK_WORKER_MAX: int = 8
+    TASK_AUTOSCALE_ENABLED: bool = True  # False = fixed pool of TASK_WORKER_COUNT workers
+    TASK_AUTOSCALE_INTERVAL_SECONDS: float = 5.0
+    TASK_AUTOSCALE_COOLDOWN_SECONDS: float = 30.0  # Minimum time between two pool resizes
+    TASK_AUTOSCALE_TARGET_WAIT_SECONDS: float = 15.0  # Queue wait the pool is sized to keep under
+    TASK_AUTOSCALE_SCALE_DOWN_UTILIZATION: float = 0.5  # Shrink only while fewer workers than this share are busy
+    TASK_LEASE_SECONDS: int = 60  # Lease granted to a worker on claim, extended by heartbeats
+    TASK_HEARTBEAT_SECONDS: int = 15
+    TASK_MAX_ATTEMPTS: int = 2  # Claims allowed before an expired task is failed and refunded
+    TASK_RECOVERY_INTERVAL_SECONDS: int = 10  # Reaper cadence (one indexed query per pass)
+    TASK_STALE_SECONDS: int = 600  # Never-claimed tasks still unfinished after this are failed and refunded
+    TASK_PROGRESS_CHECKPOINT_SECONDS: float = 10.0  # Batched write-behind of intermediate progress (0 = commit every step)
+    TASK_FAIR_SCHEDULING: bool = True  # False = claim queued tasks in plain FIFO order
+    TASK_MAX_IN_FLIGHT_PER_USER: int = 2  # Tasks one user may have processing at once (0 = no cap)
+    TASK_PAID_PRIORITY: bool = True  # Users with a successful coin deposit are dispatched in the paid lane
+    TASK_LANE_MAX_WAIT_SECONDS: float = 120.0  # Waiting longer than this promotes a task to the first lane
+    TASK_SCHEDULER_WINDOW: int = 200  # Oldest queued tasks considered per dispatch round
+    TASK_DEDUPE_WINDOW_SECONDS: int = 300  # Identical questions within this window attach to the existing task
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400  # How long an Idempotency-Key keeps mapping to its task
+
+    # Task event bus (SSE fan-out across processes): inprocess, local or redis
+    EVENT_BUS_BACKEND: str = "inprocess"
+    EVENT_BUS_REDIS_URL: Optional[str] = None
+    SSE_REPLAY_BUFFER_SIZE: int = 512  # Events kept per task for Last-Event-ID resume
+    SSE_CLIENT_QUEUE_SIZE: int = 100  # Frames buffered per SSE client before partials are dropped
+    SSE_DISCONNECT_GRACE_SECONDS: float = 30.0  # A running task with no SSE client for this long is cancelled and refunded (0 = never)
+    SSE_PRESENCE_HEARTBEAT_SECONDS: float = 5.0  # How often API nodes announce their SSE clients to workers
+    LLM_STREAM_FLUSH_MS: int = 75  # Cadence of batched llm_streaming frames
+
     # Logging settings
     LOG_LEVEL: str = "INFO"
     LOG_DIR: str = "logs"
@@ -48,31 +48,33 @@ async def lifespan(app: FastAPI):
         else:
             logger.warning("Poem service initialization failed - some features may be unavailable")
 
-        # Start job processor
-        await job_processor.start_processing()
-        logger.info("Job processor started")
-
-        # Start task queue service
-        asyncio.create_task(task_queue_service.start_processing())
-        logger.info("Task queue service started")
-
-        # Start cleanup task
-        cleanup_task = asyncio.create_task(cleanup_jobs())
-        logger.info("Job cleanup task started")
-
-        # Start streaming processor cleanup task
-        async def cleanup_streaming_processors():
-            while True:
-                try:
-                    from app.utils.streaming_processor import cleanup_old_processors
-                    cleanup_old_processors(max_age_seconds=600)  # Clean processors older than 10 minutes
-                    await asyncio.sleep(300)  # Run every 5 minutes
-                except Exception as e:
-                    logger.error(f"Error in streaming processor cleanup: {e}")
-                    await asyncio.sleep(60)  # Wait 1 minute on error
-
-        streaming_cleanup_task = asyncio.create_task(cleanup_streaming_processors())
-        logger.info("Streaming processor cleanup task started")
+        # Every node forwards task events from the bus to its SSE clients
+        try:
+            await task_queue_service.start_event_bus()
+        except Exception as bus_error:
+            logger.error(f"Task event bus unavailable, SSE will rely on DB fallback: {bus_error}")
+
+        if settings.RUN_TASK_WORKERS:
+            # Start job processor
+            await job_processor.start_processing()
+            logger.info("Job processor started")
+
+            # Start task queue service
+            asyncio.create_task(task_queue_service.start_processing())
+            logger.info("Task queue service started")
+
+            # Start cleanup task
+            cleanup_task = asyncio.create_task(cleanup_jobs())
+            logger.info("Job cleanup task started")
+
+            # Start streaming processor cleanup task
+            from app.utils.streaming_processor import cleanup_processors_periodically
+            streaming_cleanup_task = asyncio.create_task(
+                cleanup_processors_periodically(max_age_seconds=600)  # Clean processors older than 10 minutes
+            )
+            logger.info("Streaming processor cleanup task started")
+        else:
+            logger.info("API-only mode: task workers disabled (run `python -m app.worker` to process tasks)")
 
     except Exception as e:
         logger.error(f"Error initializing services: {e}")
@@ -88,11 +90,13 @@ async def lifespan(app: FastAPI):
         from app.services.task_queue_service import task_queue_service
         from app.services.poem_service import poem_service
 
-        await job_processor.stop_processing()
-        await task_queue_service.stop_processing()
+        if settings.RUN_TASK_WORKERS:
+            await job_processor.stop_processing()
+            await task_queue_service.stop_processing()
+        await task_queue_service.stop_event_bus()
 
         # Clean up poem service resources
-        poem_service.cleanup()
+        await poem_service.aclose()
 
         # Clean up ChromaDB connection pool
         try:
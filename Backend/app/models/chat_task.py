@@ -2,7 +2,7 @@
 Chat Task Model for async fortune question processing
 """
 
-from sqlalchemy import String, Integer, Text, Enum, JSON
+from sqlalchemy import String, Integer, Text, Enum, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -39,6 +39,10 @@ class ChatTask(BaseModel):
     question: Mapped[str] = mapped_column(Text, nullable=False)
     context = mapped_column(JSON, default=None)
 
+    # Deduplication: content hash of the request and the client's Idempotency-Key
+    request_fingerprint: Mapped[Optional[str]] = mapped_column(String(64), default=None, index=True)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(128), default=None, index=True)
+
     # Task status
     status: Mapped[TaskStatus] = mapped_column(
         Enum(TaskStatus),
@@ -59,10 +63,25 @@ class ChatTask(BaseModel):
     started_at: Mapped[Optional[datetime]] = mapped_column(default=None)
     completed_at: Mapped[Optional[datetime]] = mapped_column(default=None)
 
+    # Durable queue lease (claimed_by is NULL while the task waits in the queue)
+    claimed_by: Mapped[Optional[str]] = mapped_column(String(100), default=None)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(default=None)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(default=None)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Fair scheduling lane ("standard" or "paid"; lease-expired retries are promoted by attempts)
+    priority_lane: Mapped[str] = mapped_column(String(20), default="standard")
+
     # Report generation
     can_generate_report: Mapped[str] = mapped_column(String(10), default="true")  # "true"/"false" as string
     report_generated: Mapped[str] = mapped_column(String(10), default="false")
 
+    # Indexes for the queue: claiming (status, created_at) and the lease reaper (status, lease_expires_at)
+    __table_args__ = (
+        Index('idx_chat_tasks_status_created_at', 'status', 'created_at'),
+        Index('idx_chat_tasks_status_lease_expires_at', 'status', 'lease_expires_at'),
+    )
+
     def to_dict(self):
         """Convert to dictionary for JSON serialization"""
         return {
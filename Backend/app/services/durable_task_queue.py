@@ -0,0 +1,401 @@
+"""
+Durable task queue over the chat_tasks table
+
+Tasks are claimed atomically with a lease, kept alive by heartbeats and
+re-dispatched when the lease expires (e.g. the worker process crashed). The
+database row is the source of truth; in-memory queues only wake the
+dispatcher up early.
+
+Claiming uses SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL so several
+processes can claim concurrently without blocking each other. SQLite has a
+single writer, so a plain UPDATE ... RETURNING is already atomic there.
+"""
+
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.chat_task import ChatTask, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean a task is finished and must never be claimed again
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+# Waiting in the queue, not claimed by any worker
+CLAIMABLE = and_(ChatTask.status == TaskStatus.QUEUED, ChatTask.claimed_by.is_(None))
+
+
+@dataclass
+class ReapResult:
+    """Outcome of one reaper pass"""
+    requeued: List[str] = field(default_factory=list)
+    failed: List[ChatTask] = field(default_factory=list)  # set_error() applied, not committed
+
+
+def default_worker_id() -> str:
+    """Unique identifier for this process, stored in chat_tasks.claimed_by"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class DurableTaskQueue:
+    """
+    Lease-based queue engine for ChatTask rows
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 2
+    ):
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        # Metrics
+        self.total_claimed = 0
+        self.total_requeued = 0
+        self.total_expired = 0
+        self.total_stale = 0
+        self.reaper_passes = 0
+
+    def _lease_deadline(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=self.lease_seconds)
+
+    @staticmethod
+    def _dialect(db: AsyncSession) -> str:
+        return db.bind.dialect.name if db.bind is not None else ""
+
+    async def claim(self, db: AsyncSession, limit: int = 1) -> List[str]:
+        """
+        Atomically claim up to `limit` queued tasks in FIFO order
+
+        Args:
+            db: Database session (committed by this method)
+            limit: Maximum number of tasks to claim
+
+        Returns:
+            List of claimed task IDs
+        """
+        if limit <= 0:
+            return []
+
+        candidates = (
+            select(ChatTask.task_id)
+            .where(CLAIMABLE)
+            .order_by(ChatTask.created_at)
+            .limit(limit)
+        )
+        if self._dialect(db) == "postgresql":
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        return await self._claim_where(db, ChatTask.task_id.in_(candidates.scalar_subquery()))
+
+    async def claim_ids(self, db: AsyncSession, task_ids: List[str]) -> List[str]:
+        """
+        Atomically claim specific queued tasks (picked by the fair scheduler)
+
+        Tasks another worker claimed in the meantime are skipped.
+
+        Args:
+            db: Database session (committed by this method)
+            task_ids: Tasks to claim, in dispatch order
+
+        Returns:
+            Claimed task IDs, in the given order
+        """
+        if not task_ids:
+            return []
+        claimed = set(await self._claim_where(db, ChatTask.task_id.in_(task_ids)))
+        return [task_id for task_id in task_ids if task_id in claimed]
+
+    async def _claim_where(self, db: AsyncSession, which) -> List[str]:
+        """Lease the claimable tasks matching `which` to this worker and commit"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(ChatTask)
+            .where(which, CLAIMABLE)
+            .values(
+                claimed_by=self.worker_id,
+                lease_expires_at=self._lease_deadline(now),
+                heartbeat_at=now,
+                attempts=ChatTask.attempts + 1
+            )
+            .returning(ChatTask.task_id)
+            .execution_options(synchronize_session=False)
+        )
+        task_ids = [row[0] for row in result.all()]
+        await db.commit()
+
+        if task_ids:
+            self.total_claimed += len(task_ids)
+            logger.info(f"[QUEUE] {self.worker_id} claimed {len(task_ids)} task(s): {task_ids}")
+        return task_ids
+
+    async def heartbeat(self, db: AsyncSession, task_ids: Iterable[str]) -> int:
+        """
+        Extend the lease of tasks still owned by this worker
+
+        Returns:
+            Number of leases extended
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return 0
+
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(ChatTask)
+            .where(
+                ChatTask.task_id.in_(task_ids),
+                ChatTask.claimed_by == self.worker_id,
+                ChatTask.status.notin_(TERMINAL_STATUSES)
+            )
+            .values(lease_expires_at=self._lease_deadline(now), heartbeat_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        if result.rowcount != len(task_ids):
+            logger.warning(
+                f"[QUEUE] Heartbeat extended {result.rowcount}/{len(task_ids)} leases "
+                f"(some tasks finished or were reclaimed)"
+            )
+        return result.rowcount
+
+    async def release(self, db: AsyncSession, task_id: str):
+        """Drop this worker's lease once a task reached a terminal state"""
+        await db.execute(
+            update(ChatTask)
+            .where(
+                ChatTask.task_id == task_id,
+                ChatTask.claimed_by == self.worker_id,
+                ChatTask.status.in_(TERMINAL_STATUSES)
+            )
+            .values(lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    async def requeue_expired(self, db: AsyncSession) -> List[str]:
+        """
+        Put tasks whose lease expired back in the queue
+
+        Only tasks that still have attempts left are requeued; see
+        find_exhausted() for the rest.
+
+        Returns:
+            List of requeued task IDs
+        """
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(ChatTask)
+            .where(
+                ChatTask.status.notin_(TERMINAL_STATUSES),
+                ChatTask.lease_expires_at < now,
+                ChatTask.attempts < self.max_attempts
+            )
+            .values(
+                status=TaskStatus.QUEUED,
+                claimed_by=None,
+                lease_expires_at=None,
+                progress=0,
+                status_message="Task requeued after worker lease expired"
+            )
+            .returning(ChatTask.task_id)
+            .execution_options(synchronize_session=False)
+        )
+        task_ids = [row[0] for row in result.all()]
+        await db.commit()
+
+        if task_ids:
+            self.total_requeued += len(task_ids)
+            logger.warning(f"[QUEUE] Requeued {len(task_ids)} task(s) with expired leases: {task_ids}")
+        return task_ids
+
+    async def find_exhausted(self, db: AsyncSession) -> List[ChatTask]:
+        """Tasks whose lease expired and that have no attempts left"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(ChatTask).where(
+                ChatTask.status.notin_(TERMINAL_STATUSES),
+                ChatTask.lease_expires_at < now,
+                ChatTask.attempts >= self.max_attempts
+            )
+        )
+        tasks = result.scalars().all()
+        self.total_expired += len(tasks)
+        return tasks
+
+    async def reap(self, db: AsyncSession, stale_before: Optional[datetime] = None) -> ReapResult:
+        """
+        Recover tasks whose lease expired, in one indexed query
+
+        Tasks with attempts left go back to the queue; the others are failed.
+        With stale_before, unleased tasks created before it (queued for too
+        long, or started outside the lease protocol) are failed as well. Tasks
+        requeued after a lease expiry keep their creation time, so they are
+        exempt: their retries are bounded by max_attempts instead.
+
+        Nothing is committed: the caller refunds the failed tasks and commits
+        requeues, failures and refunds in one transaction.
+
+        Args:
+            db: Database session
+            stale_before: Creation time before which unleased, unfinished tasks are failed
+
+        Returns:
+            ReapResult with the requeued task IDs and the failed tasks
+        """
+        now = datetime.utcnow()
+        unfinished = ChatTask.status.notin_(TERMINAL_STATUSES)
+        expired = and_(unfinished, ChatTask.lease_expires_at < now)
+        candidates = expired
+        if stale_before is not None:
+            stale = and_(
+                unfinished,
+                ChatTask.lease_expires_at.is_(None),
+                ChatTask.attempts == 0,
+                ChatTask.created_at < stale_before
+            )
+            candidates = or_(expired, stale)
+
+        query = select(ChatTask).where(candidates)
+        if self._dialect(db) == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        tasks = (await db.execute(query)).scalars().all()
+        self.reaper_passes += 1
+
+        result = ReapResult()
+        for task in tasks:
+            if task.lease_expires_at is None:
+                task.set_error("Task timeout - exceeded the maximum queue time")
+                result.failed.append(task)
+                self.total_stale += 1
+            elif task.attempts < self.max_attempts:
+                result.requeued.append(task.task_id)
+            else:
+                task.set_error("Task abandoned - worker stopped responding")
+                task.lease_expires_at = None
+                result.failed.append(task)
+                self.total_expired += 1
+
+        if result.requeued:
+            for task in tasks:
+                if task.task_id in result.requeued:
+                    task.status = TaskStatus.QUEUED
+                    task.claimed_by = None
+                    task.lease_expires_at = None
+                    task.progress = 0
+                    task.status_message = "Task requeued after worker lease expired"
+            await db.flush()
+            self.total_requeued += len(result.requeued)
+            logger.warning(f"[QUEUE] Requeued {len(result.requeued)} task(s) with expired leases: {result.requeued}")
+        if result.failed:
+            logger.warning(f"[QUEUE] Failing {len(result.failed)} expired or stale task(s)")
+        return result
+
+    async def list_claimable(self, db: AsyncSession, limit: int = 200) -> List[Tuple]:
+        """
+        Oldest queued tasks not yet claimed by any worker
+
+        Returns:
+            Rows of (task_id, user_id, created_at, priority_lane, attempts)
+        """
+        result = await db.execute(
+            select(
+                ChatTask.task_id, ChatTask.user_id, ChatTask.created_at,
+                ChatTask.priority_lane, ChatTask.attempts
+            )
+            .where(CLAIMABLE)
+            .order_by(ChatTask.created_at)
+            .limit(limit)
+        )
+        return result.all()
+
+    async def in_flight_by_user(self, db: AsyncSession) -> Dict[int, int]:
+        """Tasks currently claimed by any worker, per user"""
+        result = await db.execute(
+            select(ChatTask.user_id, func.count())
+            .where(ChatTask.claimed_by.isnot(None), ChatTask.status.notin_(TERMINAL_STATUSES))
+            .group_by(ChatTask.user_id)
+        )
+        return {user_id: count for user_id, count in result.all()}
+
+    async def count_pending(self, db: AsyncSession) -> int:
+        """Number of queued tasks not yet claimed by any worker"""
+        result = await db.execute(
+            select(func.count()).select_from(ChatTask).where(
+                ChatTask.status == TaskStatus.QUEUED,
+                ChatTask.claimed_by.is_(None)
+            )
+        )
+        return result.scalar_one()
+
+    async def count_claimable(self, db: AsyncSession, max_in_flight_per_user: int = 0) -> int:
+        """
+        Queued tasks that a worker could claim right now
+
+        Args:
+            max_in_flight_per_user: Per-user cap on claimed tasks (0 = no cap);
+                tasks of a user at the cap wait for one of theirs to finish
+
+        Returns:
+            Pending tasks, minus those held back by the per-user cap
+        """
+        if not max_in_flight_per_user:
+            return await self.count_pending(db)
+
+        result = await db.execute(
+            select(ChatTask.user_id, func.count()).where(CLAIMABLE).group_by(ChatTask.user_id)
+        )
+        pending = result.all()
+        if not pending:
+            return 0
+        in_flight = await self.in_flight_by_user(db)
+        return sum(
+            min(count, max(0, max_in_flight_per_user - in_flight.get(user_id, 0)))
+            for user_id, count in pending
+        )
+
+    async def lease_holders(self, db: AsyncSession) -> Set[str]:
+        """Worker IDs currently holding an unexpired lease on an unfinished task"""
+        result = await db.execute(
+            select(ChatTask.claimed_by)
+            .where(
+                ChatTask.claimed_by.isnot(None),
+                ChatTask.lease_expires_at > datetime.utcnow(),
+                ChatTask.status.notin_(TERMINAL_STATUSES)
+            )
+            .distinct()
+        )
+        return set(result.scalars().all())
+
+    async def count_live_workers(self, db: AsyncSession) -> int:
+        """
+        Worker processes currently holding a lease, this one included
+
+        Idle processes hold no lease and are not counted, so the number is a
+        lower bound while the backlog is only starting to be claimed.
+        """
+        return len(await self.lease_holders(db) | {self.worker_id})
+
+    def get_metrics(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "lease_seconds": self.lease_seconds,
+            "max_attempts": self.max_attempts,
+            "total_claimed": self.total_claimed,
+            "total_requeued": self.total_requeued,
+            "total_expired": self.total_expired,
+            "total_stale": self.total_stale,
+            "reaper_passes": self.reaper_passes
+        }
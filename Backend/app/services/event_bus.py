@@ -0,0 +1,271 @@
+"""
+Pub/sub event bus for task events
+
+Workers publish task events (progress, tokens, completion) to the bus and every
+API node subscribes and forwards them to its own SSE clients. That lets
+streaming work when the task runs in another uvicorn worker, another node or a
+standalone `python -m app.worker` process. In the other direction, API
+nodes publish a task_queued event so workers claim new tasks right away.
+
+Backends:
+    inprocess - direct delivery inside this process (single-process deployments)
+    local     - shared in-memory broker connecting several buses (tests, benchmarks)
+    redis     - Redis PUBLISH/SUBSCRIBE (requires the optional `redis` package)
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Handler invoked for every delivered event: handler(task_id, data)
+EventHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class EventBus:
+    """
+    Base class for task event buses
+
+    Subclasses implement _publish() plus start()/stop() when they hold
+    connections; _dispatch() fans an incoming event out to local handlers.
+    """
+
+    backend = "base"
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex[:8]
+        self._handlers: List[EventHandler] = []
+        self.running = False
+
+        # Metrics
+        self.published = 0
+        self.delivered = 0
+        self.handler_errors = 0
+
+    def subscribe(self, handler: EventHandler):
+        """Register a handler for all task events delivered to this node"""
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+
+    def unsubscribe(self, handler: EventHandler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+
+    async def start(self):
+        self.running = True
+
+    async def stop(self):
+        self.running = False
+
+    async def publish(self, task_id: str, data: Dict[str, Any]):
+        """
+        Publish a task event to every subscribed node
+
+        Args:
+            task_id: Task the event belongs to
+            data: JSON-serializable event payload
+        """
+        self.published += 1
+        await self._publish(task_id, data)
+
+    async def _publish(self, task_id: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def _dispatch(self, task_id: str, data: Dict[str, Any]):
+        for handler in self._handlers[:]:
+            try:
+                await handler(task_id, data)
+                self.delivered += 1
+            except Exception as e:
+                self.handler_errors += 1
+                logger.warning(f"[EVENT_BUS] Handler failed for task {task_id}: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "node_id": self.node_id,
+            "running": self.running,
+            "subscribers": len(self._handlers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "handler_errors": self.handler_errors
+        }
+
+
+class InProcessEventBus(EventBus):
+    """Delivers events directly to handlers in the publishing process"""
+
+    backend = "inprocess"
+
+    async def _publish(self, task_id: str, data: Dict[str, Any]):
+        await self._dispatch(task_id, data)
+
+
+class LocalBroker:
+    """
+    In-memory message broker shared by several LocalBrokerEventBus instances
+
+    Stands in for Redis in tests: each connected bus behaves like a separate
+    node with its own handlers and delivery loop.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+
+    def connect(self, node_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._queues[node_id] = queue
+        return queue
+
+    def disconnect(self, node_id: str):
+        self._queues.pop(node_id, None)
+
+    def publish(self, message: Dict[str, Any]):
+        for queue in list(self._queues.values()):
+            queue.put_nowait(message)
+
+    @property
+    def node_count(self) -> int:
+        return len(self._queues)
+
+
+class LocalBrokerEventBus(EventBus):
+    """Event bus node connected to a shared LocalBroker"""
+
+    backend = "local"
+
+    def __init__(self, broker: LocalBroker):
+        super().__init__()
+        self.broker = broker
+        self._queue: Optional[asyncio.Queue] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = self.broker.connect(self.node_id)
+        self._listener = asyncio.create_task(self._listen())
+        self.running = True
+
+    async def stop(self):
+        self.running = False
+        self.broker.disconnect(self.node_id)
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def _publish(self, task_id: str, data: Dict[str, Any]):
+        self.broker.publish({"task_id": task_id, "data": data})
+
+    async def _listen(self):
+        while True:
+            message = await self._queue.get()
+            await self._dispatch(message["task_id"], message["data"])
+
+    async def drain(self):
+        """Wait until every message already queued for this node was dispatched"""
+        while self._queue is not None and not self._queue.empty():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+
+class RedisEventBus(EventBus):
+    """Event bus over Redis PUBLISH/SUBSCRIBE on a single channel"""
+
+    backend = "redis"
+
+    def __init__(self, url: str, channel: str = "divine_whispers:task_events"):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    async def start(self):
+        if self.running:
+            return
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise ImportError("Redis library not installed. Run: pip install redis")
+
+        self._redis = aioredis.from_url(self.url, decode_responses=True)
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+        self.running = True
+        logger.info(f"[EVENT_BUS] Subscribed to Redis channel {self.channel} as node {self.node_id}")
+
+    async def stop(self):
+        self.running = False
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._pubsub:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.close()
+            self._pubsub = None
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+    async def _publish(self, task_id: str, data: Dict[str, Any]):
+        if self._redis is None:
+            raise RuntimeError("Redis event bus is not started")
+        await self._redis.publish(self.channel, json.dumps({"task_id": task_id, "data": data}))
+
+    async def _listen(self):
+        while self.running:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                payload = json.loads(message["data"])
+                await self._dispatch(payload["task_id"], payload["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.reconnects += 1
+                logger.error(f"[EVENT_BUS] Redis listener error: {e}")
+                await asyncio.sleep(1.0)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = super().get_metrics()
+        metrics["channel"] = self.channel
+        metrics["listener_errors"] = self.reconnects
+        return metrics
+
+
+def create_event_bus(
+    backend: str = "inprocess",
+    redis_url: Optional[str] = None,
+    broker: Optional[LocalBroker] = None
+) -> EventBus:
+    """
+    Create an event bus for the configured backend
+
+    Args:
+        backend: "inprocess", "local" or "redis"
+        redis_url: Redis connection URL (redis backend)
+        broker: Shared broker (local backend; a private one is created if omitted)
+
+    Returns:
+        Unstarted EventBus instance
+    """
+    backend = (backend or "inprocess").lower()
+    if backend == "inprocess":
+        return InProcessEventBus()
+    if backend == "local":
+        return LocalBrokerEventBus(broker or LocalBroker())
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("EVENT_BUS_REDIS_URL is required for the redis event bus")
+        return RedisEventBus(redis_url)
+    raise ValueError(f"Unsupported event bus backend: {backend}")
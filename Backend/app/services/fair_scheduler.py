@@ -0,0 +1,229 @@
+"""
+Fair scheduling of queued tasks across users
+
+Decides which queued tasks the dispatcher claims next, instead of plain FIFO:
+
+- Priority lanes: lease-expired retries first, then paid users, then everyone
+  else. A task that waited longer than max_lane_wait_seconds is promoted to
+  the first lane so lower lanes cannot starve.
+- Deficit round-robin across users inside a lane: each user with waiting work
+  earns `quantum` per round and spends one per dispatched task, so a user
+  with 20 queued questions gets the same share as a user with one.
+- A per-user cap on tasks in flight (claimed by any worker).
+
+The same ordering gives every waiting task its queue position and an
+estimated wait, which the dispatcher publishes to SSE clients.
+"""
+
+import logging
+import math
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LANE_RETRY = "retry"
+LANE_PAID = "paid"
+LANE_STANDARD = "standard"
+
+# Lanes in dispatch priority order
+LANES = (LANE_RETRY, LANE_PAID, LANE_STANDARD)
+
+
+@dataclass
+class QueuedTask:
+    """A claimable task as seen by the scheduler"""
+    task_id: str
+    user_id: int
+    created_at: datetime
+    lane: str = LANE_STANDARD
+    attempts: int = 0
+
+
+@dataclass
+class QueuePosition:
+    """Where a waiting task stands"""
+    position: int  # 1 = next to be dispatched
+    lane: str
+    estimated_wait_seconds: Optional[float] = None
+
+
+class FairScheduler:
+    """
+    Deficit round-robin over users within strict-priority lanes
+
+    Args:
+        max_in_flight_per_user: Tasks a user may have claimed at once (0 = no cap)
+        quantum: Credit each user with waiting work earns per round
+        max_lane_wait_seconds: Wait after which a task is promoted to the first lane (0 = never)
+    """
+
+    def __init__(
+        self,
+        max_in_flight_per_user: int = 2,
+        quantum: float = 1.0,
+        max_lane_wait_seconds: float = 120.0
+    ):
+        self.max_in_flight_per_user = max_in_flight_per_user
+        self.quantum = quantum
+        self.max_lane_wait_seconds = max_lane_wait_seconds
+
+        # DRR state survives between dispatch rounds: user -> deficit, and the
+        # order in which users are visited (the head is served next)
+        self._deficits: Dict[Tuple[str, int], float] = {}
+        self._rotation: Dict[str, Deque[int]] = {lane: deque() for lane in LANES}
+
+        # Metrics
+        self.rounds = 0
+        self.dispatched = 0
+        self.dispatched_by_lane: Dict[str, int] = {lane: 0 for lane in LANES}
+        self.capped_skips = 0
+        self.promoted = 0
+
+    def effective_lane(self, task: QueuedTask, now: datetime) -> str:
+        lane = LANE_RETRY if task.attempts > 0 else task.lane
+        if lane not in LANES:
+            lane = LANE_STANDARD
+        if (self.max_lane_wait_seconds > 0 and lane != LANES[0]
+                and (now - task.created_at).total_seconds() > self.max_lane_wait_seconds):
+            return LANES[0]
+        return lane
+
+    def _group(self, tasks: Iterable[QueuedTask], now: datetime) -> Dict[str, "OrderedDict[int, Deque[QueuedTask]]"]:
+        """Lane -> user -> that user's tasks, oldest first"""
+        lanes: Dict[str, "OrderedDict[int, Deque[QueuedTask]]"] = {lane: OrderedDict() for lane in LANES}
+        for task in sorted(tasks, key=lambda t: t.created_at):
+            lanes[self.effective_lane(task, now)].setdefault(task.user_id, deque()).append(task)
+        return lanes
+
+    def _order(
+        self,
+        tasks: Iterable[QueuedTask],
+        in_flight: Dict[int, int],
+        limit: Optional[int],
+        deficits: Dict[Tuple[str, int], float],
+        rotation: Dict[str, Deque[int]],
+        apply_caps: bool
+    ) -> List[QueuedTask]:
+        """Run DRR over the given state (mutated in place) and return the dispatch order"""
+        now = datetime.utcnow()
+        in_flight = dict(in_flight)
+        picked: List[QueuedTask] = []
+
+        for lane, by_user in self._group(tasks, now).items():
+            # Keep the rotation in sync with the users that have work in this lane
+            turn = rotation[lane]
+            for user_id in list(turn):
+                if user_id not in by_user:
+                    turn.remove(user_id)
+                    deficits.pop((lane, user_id), None)
+            for user_id in by_user:
+                if user_id not in turn:
+                    turn.append(user_id)
+
+            while turn and (limit is None or len(picked) < limit):
+                progressed = False
+                for _ in range(len(turn)):
+                    if limit is not None and len(picked) >= limit:
+                        break
+                    user_id = turn[0]
+                    turn.rotate(-1)
+                    queue = by_user[user_id]
+                    if apply_caps and self.max_in_flight_per_user and in_flight.get(user_id, 0) >= self.max_in_flight_per_user:
+                        self.capped_skips += 1
+                        continue
+
+                    key = (lane, user_id)
+                    deficits[key] = deficits.get(key, 0.0) + self.quantum
+                    while queue and deficits[key] >= 1.0:
+                        if limit is not None and len(picked) >= limit:
+                            break
+                        if apply_caps and self.max_in_flight_per_user and in_flight.get(user_id, 0) >= self.max_in_flight_per_user:
+                            break
+                        picked.append(queue.popleft())
+                        deficits[key] -= 1.0
+                        in_flight[user_id] = in_flight.get(user_id, 0) + 1
+                        progressed = True
+                    if not queue:
+                        # Standard DRR: an emptied queue does not keep its credit
+                        turn.remove(user_id)
+                        deficits.pop(key, None)
+                if not progressed:
+                    break
+        return picked
+
+    def select(self, tasks: Iterable[QueuedTask], in_flight: Dict[int, int], limit: int) -> List[QueuedTask]:
+        """
+        Pick the next tasks to dispatch
+
+        Args:
+            tasks: Claimable tasks (any order)
+            in_flight: User ID -> tasks currently claimed by any worker
+            limit: Free worker slots
+
+        Returns:
+            Tasks to claim, in dispatch order
+        """
+        if limit <= 0:
+            return []
+        self.rounds += 1
+        picked = self._order(tasks, in_flight, limit, self._deficits, self._rotation, apply_caps=True)
+        now = datetime.utcnow()
+        for task in picked:
+            lane = self.effective_lane(task, now)
+            self.dispatched_by_lane[lane] += 1
+            if lane != (LANE_RETRY if task.attempts > 0 else task.lane):
+                self.promoted += 1
+        self.dispatched += len(picked)
+        return picked
+
+    def positions(
+        self,
+        tasks: Iterable[QueuedTask],
+        workers: int,
+        service_seconds: Optional[float] = None
+    ) -> Dict[str, QueuePosition]:
+        """
+        Queue position and estimated wait of every waiting task
+
+        Simulates the dispatch order from the current DRR state without
+        changing it. Per-user caps are left out: a user's later tasks already
+        come one per round, behind everyone else's.
+
+        Args:
+            tasks: Tasks still waiting
+            workers: Worker slots serving the queue
+            service_seconds: Average time to process one task, if known
+        """
+        order = self._order(
+            tasks, {}, None,
+            deficits=dict(self._deficits),
+            rotation={lane: deque(users) for lane, users in self._rotation.items()},
+            apply_caps=False
+        )
+        now = datetime.utcnow()
+        result = {}
+        for index, task in enumerate(order):
+            wait = None
+            if service_seconds is not None:
+                wait = round(math.ceil((index + 1) / max(1, workers)) * service_seconds, 1)
+            result[task.task_id] = QueuePosition(
+                position=index + 1,
+                lane=self.effective_lane(task, now),
+                estimated_wait_seconds=wait
+            )
+        return result
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight_per_user": self.max_in_flight_per_user,
+            "max_lane_wait_seconds": self.max_lane_wait_seconds,
+            "rounds": self.rounds,
+            "dispatched": self.dispatched,
+            "dispatched_by_lane": dict(self.dispatched_by_lane),
+            "capped_skips": self.capped_skips,
+            "promoted": self.promoted,
+            "users_waiting": {lane: len(users) for lane, users in self._rotation.items()}
+        }
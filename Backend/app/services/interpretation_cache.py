@@ -0,0 +1,213 @@
+"""
+Semantic cache of validated interpretation reports
+
+Entries are scoped by (temple, poem_id, language) and keyed by the embedding
+of the question. A new question is served from the cache when its cosine
+similarity to a stored question on the same poem reaches the threshold, so
+near-identical questions ("will my career improve" / "will my career get
+better") skip the RAG and LLM run entirely. Entries expire after ttl_seconds
+and the least recently used ones are evicted beyond max_entries.
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Scope = Tuple[str, int, str]
+
+
+def normalize_vector(vector: Sequence[float]) -> Tuple[float, ...]:
+    """Unit-length copy of an embedding, so cosine similarity is a dot product"""
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0:
+        return tuple(vector)
+    return tuple(value / norm for value in vector)
+
+
+@dataclass
+class CachedInterpretation:
+    """A validated report and the question it answered"""
+    question: str
+    embedding: Tuple[float, ...]
+    report: Dict[str, str]
+    confidence: float
+    additional_sources: List[str] = field(default_factory=list)
+    temple_sources: List[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.monotonic)
+    hits: int = 0
+
+
+@dataclass
+class CacheHit:
+    entry: CachedInterpretation
+    similarity: float
+
+
+class SemanticInterpretationCache:
+    """
+    LRU + TTL cache of interpretation reports matched by question similarity
+
+    Args:
+        similarity_threshold: Minimum cosine similarity for a hit
+        ttl_seconds: Lifetime of an entry
+        max_entries: Total entries kept across all poems (LRU eviction)
+        max_entries_per_scope: Entries kept per (temple, poem_id, language)
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.92,
+        ttl_seconds: float = 86400,
+        max_entries: int = 5000,
+        max_entries_per_scope: int = 50
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_entries_per_scope = max_entries_per_scope
+
+        # Global LRU order over (scope, entry_id); scopes index their entry ids
+        self._entries: "OrderedDict[Tuple[Scope, int], CachedInterpretation]" = OrderedDict()
+        self._scopes: Dict[Scope, List[int]] = {}
+        self._ids = count(1)
+
+        # Metrics
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._hit_similarity_total = 0.0
+
+    @staticmethod
+    def scope(temple: str, poem_id: int, language: str) -> Scope:
+        return (temple, int(poem_id), language)
+
+    def lookup(self, temple: str, poem_id: int, language: str,
+               embedding: Sequence[float]) -> Optional[CacheHit]:
+        """
+        Best stored report for a question on this poem
+
+        Args:
+            temple: Temple name
+            poem_id: Poem number
+            language: Report language
+            embedding: Question embedding
+
+        Returns:
+            CacheHit when the most similar fresh entry reaches the threshold
+        """
+        self.lookups += 1
+        scope = self.scope(temple, poem_id, language)
+        query = normalize_vector(embedding)
+        now = time.monotonic()
+
+        best_key = None
+        best_similarity = -1.0
+        for entry_id in list(self._scopes.get(scope, ())):
+            key = (scope, entry_id)
+            entry = self._entries[key]
+            if now - entry.created_at > self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                continue
+            similarity = sum(a * b for a, b in zip(query, entry.embedding))
+            if similarity > best_similarity:
+                best_key, best_similarity = key, similarity
+
+        if best_key is None or best_similarity < self.similarity_threshold:
+            return None
+
+        entry = self._entries[best_key]
+        self._entries.move_to_end(best_key)
+        entry.hits += 1
+        self.hits += 1
+        self._hit_similarity_total += best_similarity
+        return CacheHit(entry=entry, similarity=best_similarity)
+
+    def store(self, temple: str, poem_id: int, language: str, question: str,
+              embedding: Sequence[float], report: Dict[str, str], confidence: float,
+              additional_sources: Optional[List[str]] = None,
+              temple_sources: Optional[List[str]] = None):
+        """Cache a validated report for this poem and question"""
+        scope = self.scope(temple, poem_id, language)
+        entry_ids = self._scopes.setdefault(scope, [])
+        if len(entry_ids) >= self.max_entries_per_scope:
+            self._remove((scope, entry_ids[0]))
+            self.evictions += 1
+
+        entry_id = next(self._ids)
+        self._entries[(scope, entry_id)] = CachedInterpretation(
+            question=question,
+            embedding=normalize_vector(embedding),
+            report=dict(report),
+            confidence=confidence,
+            additional_sources=list(additional_sources or []),
+            temple_sources=list(temple_sources or [])
+        )
+        self._scopes[scope].append(entry_id)
+        self.stores += 1
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, temple: Optional[str] = None, poem_id: Optional[int] = None) -> int:
+        """
+        Drop cached reports, e.g. after a poem was edited
+
+        Args:
+            temple: Limit to one temple (None for all)
+            poem_id: Limit to one poem of that temple (None for all)
+
+        Returns:
+            Number of entries removed
+        """
+        keys = [
+            key for key in self._entries
+            if (temple is None or key[0][0] == temple)
+            and (poem_id is None or key[0][1] == int(poem_id))
+        ]
+        for key in keys:
+            self._remove(key)
+        if keys:
+            logger.info(f"[INTERPRET_CACHE] Invalidated {len(keys)} entries (temple={temple}, poem_id={poem_id})")
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        self._scopes.clear()
+
+    def _remove(self, key: Tuple[Scope, int]):
+        scope, entry_id = key
+        self._entries.pop(key, None)
+        entry_ids = self._scopes.get(scope)
+        if entry_ids is not None:
+            entry_ids.remove(entry_id)
+            if not entry_ids:
+                del self._scopes[scope]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        misses = self.lookups - self.hits
+        return {
+            "entries": len(self._entries),
+            "scopes": len(self._scopes),
+            "max_entries": self.max_entries,
+            "similarity_threshold": self.similarity_threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": misses,
+            "hit_rate_percent": round(self.hits / self.lookups * 100, 2) if self.lookups else 0,
+            "avg_hit_similarity": round(self._hit_similarity_total / self.hits, 4) if self.hits else 0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
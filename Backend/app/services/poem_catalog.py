@@ -0,0 +1,272 @@
+"""
+In-memory poem catalog for fast listing and lookups
+
+The catalog mirrors the poem metadata stored in ChromaDB so that listing,
+category and temple queries become dictionary operations instead of vector
+database round trips. It is loaded once when the poem service initializes and
+is kept in sync incrementally by the admin write paths.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.poem_utils import parse_fortune_type
+
+logger = logging.getLogger(__name__)
+
+CatalogKey = Tuple[str, int]
+
+
+@dataclass
+class CatalogEntry:
+    """Compact catalog record for a single poem"""
+    temple: str
+    poem_id: int
+    title: str = ""
+    fortune: str = ""
+    category: str = ""
+    languages: Set[str] = field(default_factory=set)
+    # Known to the catalog but not written to ChromaDB yet, so it cannot be served
+    pending: bool = False
+
+    @property
+    def key(self) -> CatalogKey:
+        return (self.temple, self.poem_id)
+
+    def to_dict(self) -> Dict:
+        """Return the same shape as UnifiedRAGHandler.list_available_poems()"""
+        return {
+            "temple": self.temple,
+            "poem_id": self.poem_id,
+            "title": self.title,
+            "fortune": self.fortune,
+            "language": sorted(self.languages)[0] if self.languages else ""
+        }
+
+
+class PoemCatalog:
+    """
+    Poem index keyed by (temple, poem_id) with secondary indexes by temple,
+    by fortune category and by poem number
+    """
+
+    def __init__(self):
+        self._entries: Dict[CatalogKey, CatalogEntry] = {}
+        self._by_temple: Dict[str, Set[CatalogKey]] = {}
+        self._by_category: Dict[str, Set[CatalogKey]] = {}
+        self._by_poem_id: Dict[int, Set[str]] = {}  # poem number -> temples that have it
+        self._lock = threading.RLock()
+        self.is_loaded = False
+        # Incremented on every change so dependants can detect stale derived data
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: CatalogKey) -> bool:
+        return key in self._entries
+
+    @staticmethod
+    def parse_key(poem_id: str) -> Optional[CatalogKey]:
+        """
+        Parse an external poem identifier into a catalog key
+
+        Args:
+            poem_id: Identifier in "temple_id" or "temple#id" format
+
+        Returns:
+            (temple, numeric_id) tuple or None if the format is invalid
+        """
+        for separator in ("#", "_"):
+            if separator in poem_id:
+                temple, _, numeric = poem_id.rpartition(separator)
+                try:
+                    return temple, int(numeric)
+                except ValueError:
+                    return None
+        return None
+
+    def load(self, metadata_rows: Iterable[Dict]):
+        """
+        Rebuild the catalog from chunk metadata rows
+
+        Args:
+            metadata_rows: Dicts with temple, poem_id, title, fortune and language keys
+                           (one per chunk; chunks of the same poem are merged)
+        """
+        entries: Dict[CatalogKey, CatalogEntry] = {}
+        for row in metadata_rows:
+            temple = row.get("temple")
+            poem_id = row.get("poem_id")
+            if not temple or poem_id is None:
+                continue
+
+            key = (temple, int(poem_id))
+            entry = entries.get(key)
+            if entry is None:
+                fortune = row.get("fortune") or ""
+                entry = CatalogEntry(
+                    temple=temple,
+                    poem_id=int(poem_id),
+                    title=row.get("title") or "",
+                    fortune=fortune,
+                    category=parse_fortune_type(fortune)
+                )
+                entries[key] = entry
+            if row.get("language"):
+                entry.languages.add(row["language"])
+
+        with self._lock:
+            self._entries = {}
+            self._by_temple = {}
+            self._by_category = {}
+            self._by_poem_id = {}
+            for entry in entries.values():
+                self._index(entry)
+            self.is_loaded = True
+            self.version += 1
+
+        logger.info(f"[CATALOG] Loaded {len(entries)} poems across {len(self._by_temple)} temples")
+
+    def _index(self, entry: CatalogEntry):
+        self._entries[entry.key] = entry
+        self._by_temple.setdefault(entry.temple, set()).add(entry.key)
+        self._by_category.setdefault(entry.category, set()).add(entry.key)
+        self._by_poem_id.setdefault(entry.poem_id, set()).add(entry.temple)
+
+    def _unindex(self, entry: CatalogEntry):
+        self._entries.pop(entry.key, None)
+        for index, value in ((self._by_temple, entry.temple), (self._by_category, entry.category)):
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del index[value]
+        temples = self._by_poem_id.get(entry.poem_id)
+        if temples is not None:
+            temples.discard(entry.temple)
+            if not temples:
+                del self._by_poem_id[entry.poem_id]
+
+    def upsert(self, temple: str, poem_id: int, title: Optional[str] = None,
+               fortune: Optional[str] = None, languages: Optional[Iterable[str]] = None,
+               pending: Optional[bool] = None) -> CatalogEntry:
+        """
+        Insert a poem or update the given fields of an existing one
+
+        Args:
+            pending: Whether the poem is missing from ChromaDB (None keeps the current state)
+
+        Returns:
+            The stored catalog entry
+        """
+        key = (temple, int(poem_id))
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._unindex(existing)
+                entry = CatalogEntry(
+                    temple=temple,
+                    poem_id=int(poem_id),
+                    title=existing.title if title is None else title,
+                    fortune=existing.fortune if fortune is None else fortune,
+                    languages=set(existing.languages),
+                    pending=existing.pending if pending is None else pending
+                )
+            else:
+                entry = CatalogEntry(temple=temple, poem_id=int(poem_id),
+                                     title=title or "", fortune=fortune or "",
+                                     pending=bool(pending))
+            if languages:
+                entry.languages.update(languages)
+            entry.category = parse_fortune_type(entry.fortune)
+
+            self._index(entry)
+            self.version += 1
+            return entry
+
+    def add(self, temple: str, title: str = "", fortune: str = "",
+            languages: Optional[Iterable[str]] = None, pending: bool = False) -> CatalogEntry:
+        """
+        Insert a new poem under the next free poem number of its temple
+
+        The number is allocated under the catalog lock, so concurrent adds
+        never share an id.
+
+        Returns:
+            The stored catalog entry
+        """
+        with self._lock:
+            poem_ids = [poem_id for _, poem_id in self._by_temple.get(temple, ())]
+            poem_id = max(poem_ids, default=0) + 1
+            return self.upsert(temple, poem_id, title=title, fortune=fortune,
+                               languages=languages, pending=pending)
+
+    def remove(self, temple: str, poem_id: int) -> bool:
+        """Remove a poem, returning True if it was present"""
+        with self._lock:
+            entry = self._entries.get((temple, int(poem_id)))
+            if entry is None:
+                return False
+            self._unindex(entry)
+            self.version += 1
+            return True
+
+    def get(self, temple: str, poem_id: int) -> Optional[CatalogEntry]:
+        return self._entries.get((temple, int(poem_id)))
+
+    def find_temple(self, poem_id: int) -> Optional[str]:
+        """Return the first temple (alphabetically) that has the given poem number"""
+        with self._lock:
+            temples = self._by_poem_id.get(poem_id)
+            return min(temples) if temples else None
+
+    def entries(self, temple: Optional[str] = None) -> List[CatalogEntry]:
+        """List entries, optionally restricted to one temple, in (temple, poem_id) order"""
+        with self._lock:
+            if temple:
+                keys = self._by_temple.get(temple, ())
+            else:
+                keys = self._entries.keys()
+            return [self._entries[key] for key in sorted(keys)]
+
+    def list_poems(self, temple: Optional[str] = None) -> List[Dict]:
+        """List poems in the list_available_poems() dict format"""
+        return [entry.to_dict() for entry in self.entries(temple)]
+
+    def by_category(self, category: str) -> List[CatalogEntry]:
+        with self._lock:
+            return [self._entries[key] for key in sorted(self._by_category.get(category, ()))]
+
+    def category_counts(self, temple: Optional[str] = None) -> Dict[str, int]:
+        """Count poems per fortune category, optionally for a single temple"""
+        with self._lock:
+            if temple is None:
+                return {category: len(keys) for category, keys in self._by_category.items()}
+            counts: Dict[str, int] = {}
+            for key in self._by_temple.get(temple, ()):
+                category = self._entries[key].category
+                counts[category] = counts.get(category, 0) + 1
+            return counts
+
+    def temples(self) -> List[str]:
+        with self._lock:
+            return sorted(self._by_temple.keys())
+
+    def languages(self, temple: Optional[str] = None) -> Set[str]:
+        """Union of languages available for a temple (or the whole catalog)"""
+        languages: Set[str] = set()
+        for entry in self.entries(temple):
+            languages.update(entry.languages)
+        return languages
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._by_temple = {}
+            self._by_category = {}
+            self._by_poem_id = {}
+            self.is_loaded = False
+            self.version += 1
@@ -34,6 +34,10 @@ from app.utils.poem_utils import (
     normalize_temple_name, get_random_poem_selection,
     validate_poem_data
 )
+from app.services.poem_catalog import PoemCatalog
+from app.utils.poem_sampler import PoemSampler
+from app.utils.single_flight import SingleFlight
+from app.services.interpretation_cache import SemanticInterpretationCache
 
 # Add fortune_module to Python path
 fortune_module_path = Path(__file__).parent.parent.parent / "fortune_module"
@@ -43,8 +47,11 @@ try:
     from fortune_module.unified_rag import UnifiedRAGHandler
     from fortune_module.models import ChunkType, PoemChunk
     from fortune_module.config import SystemConfig
-    from fortune_module import FortuneSystem, create_openai_system, create_ollama_system
+    from fortune_module import FortuneSystem, create_openai_system, create_ollama_system, create_mock_system
     from fortune_module.llm_client import LLMClientFactory
+    from fortune_module.retry_policy import RetryPolicy, RetryBudget, RetryMetrics, GenerationCancelled
+    from fortune_module.llm_gateway import llm_gateway, AdmissionDecision
+    from fortune_module.hedged_client import HedgedLLMClient, AsyncHedgedLLMClient
 except ImportError as e:
     logging.error(f"Failed to import fortune module: {e}")
     raise
@@ -65,9 +72,47 @@ class PoemService:
         self._initialized = False
         self._lock = asyncio.Lock()
 
+        # In-memory poem index mirrored from ChromaDB metadata
+        self.catalog = PoemCatalog()
+        # Alias-table sampler over the catalog for O(1) weighted random draws
+        self.sampler = PoemSampler(self.catalog)
+
         # Cache metrics
         self._cache_hits = 0
         self._cache_misses = 0
+
+        # Coalesces concurrent cache misses for the same key into one load
+        self._single_flight = SingleFlight("poem_cache")
+
+        # One retry budget per interpretation, shared by interpreter attempts and JSON re-asks
+        self.retry_policy = RetryPolicy(
+            max_attempts=settings.LLM_RETRY_MAX_ATTEMPTS,
+            base_delay=settings.LLM_RETRY_BASE_DELAY_SECONDS,
+            max_delay=settings.LLM_RETRY_MAX_DELAY_SECONDS,
+            jitter=settings.LLM_RETRY_JITTER,
+            deadline_seconds=settings.LLM_INTERPRETATION_DEADLINE_SECONDS
+        )
+        self.retry_metrics = RetryMetrics()
+        self._using_mock_llm = False
+
+        # Per-provider concurrency and rate limits applied to every LLM client
+        self.llm_gateway = llm_gateway
+        for provider in ("openai", "ollama", "mock"):
+            self.llm_gateway.configure(
+                provider,
+                max_concurrency=settings.LLM_GATEWAY_MAX_CONCURRENCY,
+                requests_per_minute=settings.LLM_GATEWAY_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.LLM_GATEWAY_TOKENS_PER_MINUTE,
+                max_queue=settings.LLM_GATEWAY_MAX_QUEUE,
+                max_queue_wait=settings.LLM_GATEWAY_MAX_QUEUE_WAIT_SECONDS
+            )
+
+        # Opt-in semantic cache of validated reports (INTERPRETATION_CACHE_ENABLED)
+        self.interpretation_cache = SemanticInterpretationCache(
+            similarity_threshold=settings.INTERPRETATION_CACHE_SIMILARITY,
+            ttl_seconds=settings.INTERPRETATION_CACHE_TTL_SECONDS,
+            max_entries=settings.INTERPRETATION_CACHE_MAX_ENTRIES
+        )
         
     @with_circuit_breaker(chromadb_circuit_breaker, fallback_value=False)
     async def initialize_system(self) -> bool:
@@ -95,9 +140,16 @@ class PoemService:
                     # Initialize RAG handler with timeout
                     await self._initialize_rag_handler_async()
 
+                    # Build the in-memory poem catalog from ChromaDB metadata
+                    await self._load_catalog()
+
                     # Initialize Fortune System
                     await self._initialize_fortune_system()
 
+                    # Hedge and fail over to the configured secondary providers
+                    if settings.LLM_FALLBACK_PROVIDERS and not self._using_mock_llm:
+                        await asyncio.to_thread(self._enable_llm_failover)
+
                     # Validate initialization with timeout
                     health_check = await self.health_check()
                     if health_check.chroma_db_status != "healthy":
@@ -151,6 +203,29 @@ class PoemService:
             logger.error("RAG handler initialization timed out")
             raise TimeoutError("RAG handler initialization timed out")
     
+    async def _load_catalog(self):
+        """Load the poem catalog from ChromaDB metadata without blocking the event loop"""
+        loop = asyncio.get_event_loop()
+
+        def fetch_metadata():
+            return self.rag_handler.get_metadata(
+                fields=("temple", "poem_id", "title", "fortune", "language"),
+                chunk_type=ChunkType.POEM
+            )
+
+        try:
+            rows = await asyncio.wait_for(loop.run_in_executor(None, fetch_metadata), timeout=20.0)
+            self.catalog.load(rows)
+        except Exception as e:
+            # Callers fall back to ChromaDB listings while the catalog is not loaded
+            logger.warning(f"[CATALOG] Failed to load poem catalog: {e}")
+
+    def _list_poems(self, temple: Optional[str] = None) -> List[Dict]:
+        """List poems from the catalog, falling back to ChromaDB if it is not loaded"""
+        if self.catalog.is_loaded:
+            return self.catalog.list_poems(temple)
+        return self.rag_handler.list_available_poems(temple)
+
     async def _initialize_fortune_system(self):
         """Initialize the Fortune System according to configured LLM provider."""
         provider = (settings.LLM_PROVIDER or "ollama").lower()
@@ -177,7 +252,13 @@ class PoemService:
                 return
 
             if provider == "mock":
-                raise Exception("Force mock provider")
+                self.fortune_system = create_mock_system(
+                    profile=settings.LLM_MOCK_PROFILE,
+                    failure_rates=settings.LLM_MOCK_FAILURE_RATES,
+                    seed=settings.LLM_MOCK_SEED
+                )
+                logger.info(f"Fortune System initialized with simulated LLM (profile={settings.LLM_MOCK_PROFILE})")
+                return
         except Exception as e:
             logger.warning(f"Preferred LLM provider initialization failed ({provider}): {e}")
 
@@ -210,14 +291,88 @@ class PoemService:
             llm_provider=LLMProvider.OPENAI,
             llm_config={"api_key": "mock"}
         )
-        mock_client = LLMClientFactory.create_mock_client(
+        mock_response = (
             "Based on the selected fortune poem, I can offer you this interpretation: "
             "The poem suggests a time of transition and growth. Trust in your inner wisdom "
             "and remain patient as new opportunities unfold. The energy surrounding you "
             "is positive, indicating that your current path will lead to beneficial outcomes."
         )
-        self.fortune_system.llm = mock_client
+        self.fortune_system.set_llm_clients(
+            LLMClientFactory.create_mock_client(mock_response),
+            LLMClientFactory.create_async_mock_client(mock_response)
+        )
+        self._using_mock_llm = True
+
+    def _fallback_llm_configs(self) -> List[tuple]:
+        """Parse LLM_FALLBACK_PROVIDERS ("provider:model,...") into (LLMProvider, llm_config) pairs"""
+        from fortune_module import LLMProvider
+        fallbacks = []
+        for entry in settings.LLM_FALLBACK_PROVIDERS.split(","):
+            name, _, model = entry.strip().partition(":")
+            if not name:
+                continue
+            try:
+                provider = LLMProvider(name.lower())
+            except ValueError:
+                logger.warning(f"Ignoring unknown fallback LLM provider: {name}")
+                continue
+            if provider == LLMProvider.OPENAI:
+                if not settings.OPENAI_API_KEY:
+                    logger.warning("Ignoring OpenAI fallback: OPENAI_API_KEY not set")
+                    continue
+                fallbacks.append((provider, {"api_key": settings.OPENAI_API_KEY, "model": model or "gpt-3.5-turbo"}))
+            elif provider == LLMProvider.MOCK:
+                # "mock:<profile>" simulates a secondary provider
+                fallbacks.append((provider, {"profile": model or settings.LLM_MOCK_PROFILE}))
+            else:
+                fallbacks.append((provider, {
+                    "model": model or settings.LLM_MODEL,
+                    "base_url": settings.OLLAMA_BASE_URL or "http://localhost:11434"
+                }))
+        return fallbacks
+
+    def _enable_llm_failover(self):
+        """Wrap the fortune system's LLM clients in hedged composite clients"""
+        enabled = self.fortune_system.enable_failover(
+            self._fallback_llm_configs(),
+            default_hedge_delay=settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+            min_hedge_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+            failure_threshold=settings.LLM_PROVIDER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.LLM_PROVIDER_RECOVERY_SECONDS
+        )
+        if not enabled:
+            logger.warning("LLM_FALLBACK_PROVIDERS set but no fallback provider could be created")
+
+    def get_llm_failover_metrics(self) -> Dict[str, Any]:
+        """Hedging and failover counters of the active LLM client"""
+        if self.fortune_system is None:
+            return {"enabled": False}
+        for llm in (self.fortune_system.async_llm, self.fortune_system.llm):
+            if isinstance(llm, (AsyncHedgedLLMClient, HedgedLLMClient)):
+                return {"enabled": True, **llm.get_metrics()}
+        return {"enabled": False}
     
+    def check_llm_admission(self, pending: int = 0) -> AdmissionDecision:
+        """
+        Whether the active LLM provider can take one more interpretation
+
+        Args:
+            pending: Accepted requests that have not reached the LLM yet
+
+        Returns:
+            AdmissionDecision with a Retry-After estimate when refused
+        """
+        return self.llm_gateway.admission(self._active_llm_provider(), pending=pending)
+
+    def get_llm_capacity(self) -> Dict[str, Any]:
+        """Concurrency limit, calls in flight and calls waiting at the active provider's gateway"""
+        return self.llm_gateway.limiter(self._active_llm_provider()).get_metrics()
+
+    def _active_llm_provider(self) -> str:
+        if self.fortune_system is not None:
+            return self.fortune_system.llm_provider.value
+        return (settings.LLM_PROVIDER or "ollama").lower()
+
     async def ensure_initialized(self):
         """Ensure the service is initialized before use with timeout"""
         if not self._initialized:
@@ -239,9 +394,13 @@ class PoemService:
             "cache_misses": self._cache_misses,
             "total_requests": total_requests,
             "hit_rate_percent": round(hit_rate, 2),
+            "cache_coalesced": self._single_flight.coalesced,
+            "cache_loads": self._single_flight.executions,
+            "loads_in_flight": self._single_flight.in_flight,
             "cache_size": len(self.cache),
             "cache_maxsize": self.cache.maxsize,
-            "estimated_time_saved_seconds": self._cache_hits * 1.0  # 1s per cache hit
+            # 1s per cache hit or coalesced miss
+            "estimated_time_saved_seconds": (self._cache_hits + self._single_flight.coalesced) * 1.0
         }
 
     def cleanup(self):
@@ -270,6 +429,15 @@ class PoemService:
         except Exception as e:
             logger.warning(f"Error during poem service cleanup: {e}")
 
+    async def aclose(self):
+        """Close pooled LLM connections, then clean up service resources"""
+        try:
+            if self.fortune_system:
+                await self.fortune_system.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing LLM clients: {e}")
+        self.cleanup()
+
     def __del__(self):
         """Destructor to ensure cleanup"""
         try:
@@ -292,39 +460,28 @@ class PoemService:
         """
         await self.ensure_initialized()
         
-        cache_key = f"random_poem_{temple_preference or 'any'}"
-        
-        # Check cache first
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-        
         try:
-            # Get available poems
-            poems = self.rag_handler.list_available_poems(temple_preference)
+            if self.catalog.is_loaded:
+                # O(1) weighted draw from the precomputed alias table
+                drawn = self.sampler.draw(temple_preference, count=1)
+                selected = {"temple": drawn[0][0], "poem_id": drawn[0][1]} if drawn else None
+            else:
+                poems = self.rag_handler.list_available_poems(temple_preference)
+                selected = get_random_poem_selection(poems, count=1)[0] if poems else None
             
-            if not poems:
+            if not selected:
                 # Create mock poem data when real data is unavailable
                 logger.warning("No poems available in database, creating mock poem data")
                 return await self._create_mock_poem_data(temple_preference)
             
-            # Select random poem with weighted selection
-            selected_poems = get_random_poem_selection(poems, count=1)
-            selected = selected_poems[0]
+            # Get full poem data (individual poems are cached, the draw itself is not)
+            poem_data = await self.get_poem_by_id(f"{selected['temple']}_{selected['poem_id']}")
             
-            # Get full poem data
-            poem_chunks = self.rag_handler.get_poem_by_temple_and_id(
-                selected["temple"], 
-                selected["poem_id"]
-            )
-            
-            if not poem_chunks:
+            if not poem_data:
                 # Fallback to basic data
-                poem_data = await self._create_poem_data_from_basic(selected)
-            else:
-                poem_data = await self._create_poem_data_from_chunks(poem_chunks)
+                entry = self.catalog.get(selected["temple"], selected["poem_id"])
+                poem_data = await self._create_poem_data_from_basic(entry.to_dict() if entry else selected)
             
-            # Cache result
-            self.cache[cache_key] = poem_data
             logger.info(f"Selected random poem: {poem_data.temple}#{poem_data.poem_id}")
             
             return poem_data
@@ -358,6 +515,11 @@ class PoemService:
 
         self._cache_misses += 1
 
+        # Concurrent misses for the same poem share a single lookup
+        return await self._single_flight.do(cache_key, lambda: self._load_poem_by_id(poem_id, cache_key))
+
+    async def _load_poem_by_id(self, poem_id: str, cache_key: str) -> Optional[PoemData]:
+        """Load a poem on cache miss and cache it if found"""
         try:
             async with timeout_context(15.0, f"get_poem_by_id_{poem_id}"):
                 # Parse poem ID
@@ -457,17 +619,35 @@ class PoemService:
         
         cache_key = f"search_{query}_{top_k}_{temple_filter}"
         if cache_key in self.cache:
+            self._cache_hits += 1
             return self.cache[cache_key]
         
+        self._cache_misses += 1
+        return await self._single_flight.do(
+            cache_key, lambda: self._load_search_results(query, top_k, temple_filter, cache_key)
+        )
+
+    async def _load_search_results(
+        self,
+        query: str,
+        top_k: int,
+        temple_filter: Optional[str],
+        cache_key: str
+    ) -> List[PoemSearchResult]:
+        """Run a similarity search on cache miss and cache the results"""
         try:
             start_time = time.time()
+            loop = asyncio.get_event_loop()
             
-            # Query RAG system
-            rag_result = self.rag_handler.query(
-                question=query,
-                top_k=min(top_k, settings.FORTUNE_MAX_SEARCH_RESULTS),
-                temple_filter=temple_filter,
-                chunk_types=[ChunkType.POEM]
+            # Query RAG system in thread pool to avoid blocking
+            rag_result = await loop.run_in_executor(
+                None,
+                lambda: self.rag_handler.query(
+                    question=query,
+                    top_k=min(top_k, settings.FORTUNE_MAX_SEARCH_RESULTS),
+                    temple_filter=temple_filter,
+                    chunk_types=[ChunkType.POEM]
+                )
             )
             
             search_results = []
@@ -507,15 +687,25 @@ class PoemService:
             Dictionary mapping category names to counts
         """
         await self.ensure_initialized()
-        
+
+        # The catalog keeps per-category counts current; only the fallback scan is cached
+        if self.catalog.is_loaded:
+            return self.catalog.category_counts()
+
         cache_key = "fortune_categories"
         if cache_key in self.cache:
+            self._cache_hits += 1
             return self.cache[cache_key]
         
+        self._cache_misses += 1
+        return await self._single_flight.do(cache_key, lambda: self._load_poem_categories(cache_key))
+
+    async def _load_poem_categories(self, cache_key: str) -> Dict[str, int]:
+        """Count poems per fortune category on cache miss and cache the result"""
         try:
-            poems = self.rag_handler.list_available_poems()
+            loop = asyncio.get_event_loop()
+            poems = await loop.run_in_executor(None, self.rag_handler.list_available_poems)
             categories = {}
-            
             for poem in poems:
                 fortune_type = parse_fortune_type(poem.get("fortune", ""))
                 categories[fortune_type] = categories.get(fortune_type, 0) + 1
@@ -552,15 +742,19 @@ class PoemService:
             return self.cache[cache_key]
         
         try:
-            all_poems = self.rag_handler.list_available_poems()
+            if self.catalog.is_loaded:
+                matching = [entry.to_dict() for entry in self.catalog.by_category(category)]
+            else:
+                matching = [
+                    poem for poem in self.rag_handler.list_available_poems()
+                    if parse_fortune_type(poem.get("fortune", "")) == category
+                ]
+
             filtered_poems = []
-            
-            for poem in all_poems:
-                fortune_type = parse_fortune_type(poem.get("fortune", ""))
-                if fortune_type == category:
-                    # Convert to PoemData
-                    poem_data = await self._create_poem_data_from_basic(poem)
-                    filtered_poems.append(poem_data)
+            for poem in matching:
+                # Convert to PoemData
+                poem_data = await self._create_poem_data_from_basic(poem)
+                filtered_poems.append(poem_data)
             
             # Cache result
             self.cache[cache_key] = filtered_poems
@@ -595,14 +789,14 @@ class PoemService:
         try:
             logger.info(f"[ADMIN_POEMS] Getting poems for admin - page: {page}, limit: {limit}, deity: {deity_filter}, search: {search}")
 
-            # Get all available poems from ChromaDB
+            # Get all available poems from the catalog
             if deity_filter:
                 # Filter by specific temple/deity
-                all_poems = self.rag_handler.list_available_poems(deity_filter)
+                all_poems = self._list_poems(deity_filter)
                 logger.debug(f"[ADMIN_POEMS] Retrieved {len(all_poems)} poems for deity: {deity_filter}")
             else:
                 # Get all poems
-                all_poems = self.rag_handler.list_available_poems()
+                all_poems = self._list_poems()
                 logger.debug(f"[ADMIN_POEMS] Retrieved {len(all_poems)} total poems")
 
             # Apply search filter if provided
@@ -720,7 +914,8 @@ class PoemService:
         question: str,
         language: str = "zh",
         user_context: Optional[str] = None,
-        streaming_callback: Optional[Callable[[str], None]] = None
+        streaming_callback: Optional[Callable[[str], None]] = None,
+        retry_budget: Optional[RetryBudget] = None
     ) -> FortuneResult:
         """
         Generate personalized fortune interpretation with timeout protection
@@ -731,6 +926,8 @@ class PoemService:
             language: Target language
             user_context: Additional user context
             streaming_callback: Optional callback for LLM streaming (for better UX)
+            retry_budget: Budget shared with the caller, e.g. to cancel generation
+                (a new one from the retry policy by default)
 
         Returns:
             FortuneResult with interpretation
@@ -741,6 +938,29 @@ class PoemService:
 
         await self.ensure_initialized()
 
+        # Near-identical question on the same poem: serve the stored report without RAG or LLM
+        question_embedding = None
+        if settings.INTERPRETATION_CACHE_ENABLED and self.fortune_system and self.rag_handler:
+            question_embedding = await self._embed_question(question)
+            if question_embedding is not None:
+                hit = self.interpretation_cache.lookup(
+                    poem_data.temple, poem_data.poem_id, language, question_embedding
+                )
+                if hit is not None:
+                    logger.info(f"[INTERPRET_CACHE] Hit for {poem_data.temple}#{poem_data.poem_id} (similarity={hit.similarity:.3f})")
+                    return FortuneResult(
+                        poem=poem_data,
+                        interpretation=json.dumps(hit.entry.report, ensure_ascii=False),
+                        confidence=hit.entry.confidence,
+                        additional_sources=list(hit.entry.additional_sources),
+                        temple_sources=list(hit.entry.temple_sources),
+                        generated_at=datetime.now(),
+                        language=language,
+                        job_id=""
+                    )
+
+        retry_budget = retry_budget or self.retry_policy.new_budget()
+
         try:
             async with timeout_context(45.0, f"fortune_interpretation_{poem_data.temple}_{poem_data.poem_id}"):
                 # Log system availability
@@ -751,32 +971,24 @@ class PoemService:
                     logger.info(f"[INTERPRET] Using Fortune System for {poem_data.temple}#{poem_data.poem_id}")
 
                     try:
-                        # Run LLM call in thread pool to avoid blocking
-                        loop = asyncio.get_event_loop()
-
-                        def call_fortune_system():
-                            # Use streaming version if callback provided
-                            if streaming_callback:
-                                return self.fortune_system.ask_fortune_streaming(
+                        if self.fortune_system.async_llm is not None:
+                            # Native async LLM client: the whole pipeline runs on the event loop
+                            logger.debug(f"[INTERPRET] Calling fortune_system.ask_fortune_async with temple='{poem_data.temple}', poem_id={poem_data.poem_id}")
+                            result = await asyncio.wait_for(
+                                self.fortune_system.ask_fortune_async(
                                     question=question,
                                     temple=poem_data.temple,
                                     poem_id=poem_data.poem_id,
                                     streaming_callback=streaming_callback,
-                                    additional_context=bool(user_context)
-                                )
-                            else:
-                                return self.fortune_system.ask_fortune(
-                                    question=question,
-                                    temple=poem_data.temple,
-                                    poem_id=poem_data.poem_id,
-                                    additional_context=bool(user_context)
-                                )
-
-                        logger.debug(f"[INTERPRET] Calling fortune_system.ask_fortune{'_streaming' if streaming_callback else ''} with temple='{poem_data.temple}', poem_id={poem_data.poem_id}")
-                        result = await asyncio.wait_for(
-                            loop.run_in_executor(None, call_fortune_system),
-                            timeout=40.0
-                        )
+                                    additional_context=bool(user_context),
+                                    retry_budget=retry_budget
+                                ),
+                                timeout=retry_budget.remaining()
+                            )
+                        else:
+                            result = await self._call_fortune_system_threaded(
+                                poem_data, question, user_context, streaming_callback, retry_budget
+                            )
                         logger.info(f"[INTERPRET] Fortune system returned result with confidence: {result.confidence}")
 
                         # Log result details
@@ -807,13 +1019,14 @@ class PoemService:
 
                         # Normalize interpretation to guaranteed six-key JSON
                         logger.debug(f"[INTERPRET] Normalizing interpretation to JSON")
-                        normalized_json = self._ensure_json_report(
+                        normalized_json = await self._ensure_json_report(
                             result.interpretation,
                             question=question,
                             temple=poem_data.temple,
                             poem_id=poem_data.poem_id,
                             language=language,
-                            max_retries=4
+                            max_retries=4,
+                            retry_budget=retry_budget
                         )
 
                         logger.debug(f"[INTERPRET] Creating FortuneResult object (normalized)")
@@ -828,11 +1041,22 @@ class PoemService:
                             job_id=""  # Will be set by job system
                         )
                         logger.info(f"[INTERPRET] Successfully created FortuneResult for {poem_data.temple}#{poem_data.poem_id}")
+
+                        # Only reports the LLM produced and validation accepted are reused
+                        if question_embedding is not None and retry_budget.accepted:
+                            self.interpretation_cache.store(
+                                poem_data.temple, poem_data.poem_id, language, question, question_embedding,
+                                normalized_json, result.confidence,
+                                additional_sources=additional_sources,
+                                temple_sources=result.temple_sources
+                            )
                         return fortune_result
 
                     except asyncio.TimeoutError:
                         logger.warning(f"[INTERPRET] Fortune system call timed out, falling back")
                         # Continue to fallback
+                    except GenerationCancelled:
+                        raise
                     except Exception as fortune_error:
                         logger.error(f"[INTERPRET] Fortune system error: {fortune_error}", exc_info=True)
                         logger.info(f"[INTERPRET] Falling back to simple interpretation due to fortune system error")
@@ -848,13 +1072,14 @@ class PoemService:
                 logger.debug(f"[INTERPRET] Fallback interpretation length: {len(interpretation)} characters")
 
                 logger.debug(f"[INTERPRET] Normalizing fallback interpretation to JSON")
-                normalized_json = self._ensure_json_report(
+                normalized_json = await self._ensure_json_report(
                     interpretation,
                     question=question,
                     temple=poem_data.temple,
                     poem_id=poem_data.poem_id,
                     language=language,
-                    max_retries=3  # CRITICAL FIX: Allow retries even in fallback path
+                    max_retries=3,  # CRITICAL FIX: Allow retries even in fallback path
+                    retry_budget=retry_budget
                 )
 
                 logger.debug(f"[INTERPRET] Creating fallback FortuneResult object")
@@ -890,14 +1115,85 @@ class PoemService:
                 language=language,
                 job_id=""
             )
+        except GenerationCancelled:
+            # The caller cancelled the budget (e.g. its client went away): no fallback report
+            raise
         except Exception as e:
             logger.error(f"[INTERPRET] Critical error in generate_fortune_interpretation: {e}", exc_info=True)
             logger.error(f"[INTERPRET] Failed parameters - temple: {poem_data.temple}, poem_id: {poem_data.poem_id}, question: '{question[:100]}...'")
             raise RuntimeError(f"Failed to generate interpretation: {str(e)}")
+        finally:
+            self.retry_metrics.observe(retry_budget)
+            logger.debug(f"[RETRY] {poem_data.temple}#{poem_data.poem_id}: {retry_budget.summary()}")
+
+    async def _embed_question(self, question: str) -> Optional[List[float]]:
+        """Embed a question for the interpretation cache (None bypasses the cache)"""
+        try:
+            vectors = await asyncio.wait_for(
+                asyncio.to_thread(self.rag_handler.embed_texts, [question]),
+                timeout=5.0
+            )
+            return vectors[0]
+        except Exception as e:
+            logger.warning(f"[INTERPRET_CACHE] Question embedding failed, bypassing cache: {e!r}")
+            return None
+
+    async def _call_fortune_system_threaded(
+        self,
+        poem_data: PoemData,
+        question: str,
+        user_context: Optional[str],
+        streaming_callback: Optional[Callable[[str], None]],
+        retry_budget: RetryBudget
+    ):
+        """Run the synchronous Fortune System in the default executor (no async LLM client)"""
+        loop = asyncio.get_event_loop()
+
+        def call_fortune_system():
+            # Use streaming version if callback provided
+            if streaming_callback:
+                return self.fortune_system.ask_fortune_streaming(
+                    question=question,
+                    temple=poem_data.temple,
+                    poem_id=poem_data.poem_id,
+                    streaming_callback=streaming_callback,
+                    additional_context=bool(user_context),
+                    retry_budget=retry_budget
+                )
+            else:
+                return self.fortune_system.ask_fortune(
+                    question=question,
+                    temple=poem_data.temple,
+                    poem_id=poem_data.poem_id,
+                    additional_context=bool(user_context),
+                    retry_budget=retry_budget
+                )
+
+        logger.debug(f"[INTERPRET] Calling fortune_system.ask_fortune{'_streaming' if streaming_callback else ''} with temple='{poem_data.temple}', poem_id={poem_data.poem_id}")
+        return await asyncio.wait_for(
+            loop.run_in_executor(None, call_fortune_system),
+            timeout=retry_budget.remaining()
+        )
 
     # ---------------- Structured JSON Enforcement Utilities ---------------- #
-    def _ensure_json_report(self, text: str, question: str, temple: str, poem_id: int, language: str, max_retries: int = 3) -> Dict[str, str]:
-        """Ensure interpretation is a complete, validated JSON. Enhanced with validation and quality checks."""
+    async def _ensure_json_report(
+        self,
+        text: str,
+        question: str,
+        temple: str,
+        poem_id: int,
+        language: str,
+        max_retries: int = 3,
+        retry_budget: Optional[RetryBudget] = None
+    ) -> Dict[str, str]:
+        """
+        Ensure interpretation is a complete, validated JSON. Enhanced with validation and quality checks.
+
+        Re-asking the fortune system draws from `retry_budget`, the same attempt
+        budget and deadline the interpreter used, so service retries never extend
+        the request past its deadline.
+        """
+        budget = retry_budget or self.retry_policy.new_budget()
         parsed = self._try_parse_json_object(text)
         mapped = self._map_keys_fuzzy(parsed) if isinstance(parsed, dict) else None
 
@@ -905,17 +1201,40 @@ class PoemService:
         validation_result = self._validate_mapped_response(mapped, 0)
 
         attempts = 0
+        used_fallback_content = False
         while not validation_result['is_valid'] and attempts < max_retries:
             # Try to use fortune system if available, otherwise improve fallback content
             if self.fortune_system:
+                # A few bad sections: regenerate only those before paying for a full re-ask
+                repaired = await self._repair_report(mapped, validation_result, question, temple, poem_id, budget)
+                if repaired is not None:
+                    mapped = repaired
+                    validation_result = self._validate_mapped_response(mapped, attempts + 1)
+                    if validation_result['is_valid']:
+                        logger.info(f"[SERVICE_REPAIR] Repaired sections accepted for {temple}#{poem_id}")
+                        break
+                    budget.reject_last(validation_result['error'])
+
+                # Backoff awaits on the event loop; stop once the shared budget is spent
+                if not await budget.wait_before_retry():
+                    logger.warning(
+                        f"[SERVICE_RETRY] Retry budget exhausted ({budget.exhausted_reason}) "
+                        f"for {temple}#{poem_id} after {len(budget.attempts)} LLM attempts"
+                    )
+                    break
                 try:
                     logger.warning(f"[SERVICE_RETRY] Attempt {attempts + 1}/{max_retries} for {temple}#{poem_id}: {validation_result['error']}")
 
-                    result = self.fortune_system.ask_fortune(
-                        question=question,
-                        temple=temple,
-                        poem_id=poem_id,
-                        additional_context=True
+                    budget.stage = "service_retry"
+                    result = await asyncio.wait_for(
+                        self.fortune_system.ask_fortune_async(
+                            question=question,
+                            temple=temple,
+                            poem_id=poem_id,
+                            additional_context=True,
+                            retry_budget=budget
+                        ),
+                        timeout=budget.remaining()
                     )
 
                     parsed = self._try_parse_json_object(result.interpretation)
@@ -934,26 +1253,34 @@ class PoemService:
                             }
                         )
                         break
+                    budget.reject_last(validation_result['error'])
 
+                except GenerationCancelled:
+                    raise
                 except Exception as e:
-                    logger.warning(f"[SERVICE_RETRY] Attempt {attempts + 1} failed with exception: {e}")
+                    logger.warning(f"[SERVICE_RETRY] Attempt {attempts + 1} failed with exception: {e!r}")
                     # If fortune system fails, try to improve fallback content
+                    used_fallback_content = True
                     mapped = self._improve_fallback_content(mapped, question, temple, poem_id, language, attempts)
                     validation_result = self._validate_mapped_response(mapped, attempts + 1)
             else:
                 # If fortune system not available, try to improve fallback content
                 logger.warning(f"[SERVICE_RETRY] No fortune system available, improving fallback content for attempt {attempts + 1}")
+                used_fallback_content = True
                 mapped = self._improve_fallback_content(mapped, question, temple, poem_id, language, attempts)
                 validation_result = self._validate_mapped_response(mapped, attempts + 1)
 
             attempts += 1
 
+        budget.raise_if_cancelled()
+        budget.accepted = validation_result['is_valid'] and not used_fallback_content
+
         # Log final result
         if validation_result['is_valid']:
             logger.info(f"[SERVICE_VALIDATION] Successfully validated response after {attempts} retries")
         else:
             logger.error(
-                f"SERVICE_RETRY_EXHAUSTED: All {max_retries} service-level retries failed",
+                f"SERVICE_RETRY_EXHAUSTED: Service-level retries failed after {attempts} attempts",
                 extra={
                     "temple": temple,
                     "poem_id": poem_id,
@@ -970,6 +1297,32 @@ class PoemService:
             return self._build_from_partial_or_fallback(mapped if isinstance(mapped, dict) else {}, question, temple, poem_id, language)
         return self._fill_defaults(mapped)
 
+    async def _repair_report(
+        self,
+        mapped: Optional[Dict[str, str]],
+        validation_result: Dict[str, Any],
+        question: str,
+        temple: str,
+        poem_id: int,
+        retry_budget: RetryBudget
+    ) -> Optional[Dict[str, str]]:
+        """Ask the fortune system to regenerate only the sections that failed validation"""
+        failing_fields = validation_result.get('failing_fields')
+        if not isinstance(mapped, dict) or not failing_fields:
+            return None
+        try:
+            return await self.fortune_system.repair_interpretation_async(
+                question=question,
+                temple=temple,
+                poem_id=poem_id,
+                report=mapped,
+                failing_fields=failing_fields,
+                retry_budget=retry_budget
+            )
+        except Exception as e:
+            logger.warning(f"[SERVICE_REPAIR] Field repair failed for {temple}#{poem_id}: {e!r}")
+            return None
+
     def _try_parse_json_object(self, text: str):
         if not text:
             return None
@@ -1078,7 +1431,8 @@ class PoemService:
             return {
                 'is_valid': False,
                 'error': f'Missing required keys: {missing_keys} (attempt {attempt + 1})',
-                'validation_type': 'missing_keys'
+                'validation_type': 'missing_keys',
+                'failing_fields': {key: f'{key}: missing' for key in missing_keys}
             }
 
         # Check for empty or insufficient content
@@ -1092,28 +1446,31 @@ class PoemService:
             'Conclusion': 25
         }
 
-        validation_errors = []
+        failing_fields = {}
         for key in required_keys:
             value = mapped.get(key, '').strip()
             if not value:
-                validation_errors.append(f'{key}: empty')
+                failing_fields[key] = f'{key}: empty'
             elif len(value) < min_lengths.get(key, 25):
-                validation_errors.append(f'{key}: too short ({len(value)}/{min_lengths[key]})')
+                failing_fields[key] = f'{key}: too short ({len(value)}/{min_lengths[key]})'
 
-        if validation_errors:
+        if failing_fields:
+            validation_errors = list(failing_fields.values())
             return {
                 'is_valid': False,
                 'error': f'Content validation errors: {validation_errors} (attempt {attempt + 1})',
-                'validation_type': 'content_validation'
+                'validation_type': 'content_validation',
+                'failing_fields': failing_fields
             }
 
-        # Enhanced quality validation
+        # Enhanced quality validation (all current checks are on LineByLineInterpretation)
         quality_issues = self._check_service_content_quality(mapped, attempt)
         if quality_issues:
             return {
                 'is_valid': False,
                 'error': f'Content quality issues: {quality_issues} (attempt {attempt + 1})',
-                'validation_type': 'quality_validation'
+                'validation_type': 'quality_validation',
+                'failing_fields': {'LineByLineInterpretation': '; '.join(quality_issues)}
             }
 
         return {
@@ -1418,28 +1775,37 @@ class PoemService:
         await self.ensure_initialized()
         
         try:
-            poems = self.rag_handler.list_available_poems(temple_name)
-            
-            if not poems:
-                return None
-            
-            fortune_categories = {}
-            languages_available = set()
-            
-            for poem in poems:
-                fortune_type = parse_fortune_type(poem.get("fortune", ""))
-                fortune_categories[fortune_type] = fortune_categories.get(fortune_type, 0) + 1
-                
-                # Get available languages from poem chunks if possible
-                chunks = self.rag_handler.get_poem_by_temple_and_id(
-                    poem["temple"], poem["poem_id"]
-                )
-                for chunk in chunks:
-                    languages_available.add(chunk.get("language", "zh"))
+            if self.catalog.is_loaded:
+                total_poems = len(self.catalog.entries(temple_name))
+                if not total_poems:
+                    return None
+
+                fortune_categories = self.catalog.category_counts(temple_name)
+                languages_available = self.catalog.languages(temple_name)
+            else:
+                poems = self.rag_handler.list_available_poems(temple_name)
+
+                if not poems:
+                    return None
+
+                total_poems = len(poems)
+                fortune_categories = {}
+                languages_available = set()
+
+                for poem in poems:
+                    fortune_type = parse_fortune_type(poem.get("fortune", ""))
+                    fortune_categories[fortune_type] = fortune_categories.get(fortune_type, 0) + 1
+
+                    # Get available languages from poem chunks if possible
+                    chunks = self.rag_handler.get_poem_by_temple_and_id(
+                        poem["temple"], poem["poem_id"]
+                    )
+                    for chunk in chunks:
+                        languages_available.add(chunk.get("language", "zh"))
             
             return TempleStatsResponse(
                 temple_name=temple_name,
-                total_poems=len(poems),
+                total_poems=total_poems,
                 fortune_categories=fortune_categories,
                 languages_available=list(languages_available)
             )
@@ -1457,7 +1823,12 @@ class PoemService:
         """
         try:
             self.cache.clear()
+            self.interpretation_cache.clear()
             logger.info("Poem service cache cleared")
+
+            # Re-sync the catalog with ChromaDB as well
+            if self.rag_handler:
+                await self._load_catalog()
             return True
         except Exception as e:
             logger.error(f"Error clearing cache: {e}")
@@ -1478,6 +1849,9 @@ class PoemService:
             else:
                 # Just numeric ID - need to search all temples
                 numeric_id = int(poem_id)
+                if self.catalog.is_loaded:
+                    temple = self.catalog.find_temple(numeric_id)
+                    return (temple, numeric_id) if temple else (None, None)
                 poems = self.rag_handler.list_available_poems()
                 for poem in poems:
                     if poem["poem_id"] == numeric_id:
@@ -1861,8 +2235,17 @@ May this ancient wisdom bring clarity to your journey.
             # 4. Update the vector embeddings
 
             # For now, return a mock success response
-            # This would need actual ChromaDB insertion logic
-            new_poem_id = f"{poem_data['temple']}_{int(time.time())}"
+            # This would need actual ChromaDB insertion logic. Until then the
+            # entry stays pending so the sampler never draws a poem with no text
+            entry = self.catalog.add(
+                poem_data["temple"],
+                title=poem_data.get("title", ""),
+                fortune=poem_data.get("fortune", ""),
+                languages=(poem_data.get("analysis") or {}).keys(),
+                pending=True
+            )
+            new_poem_id = f"{entry.temple}_{entry.poem_id}"
+            self.cache.pop("fortune_categories", None)
 
             logger.info(f"New poem added with ID: {new_poem_id}")
 
@@ -1898,6 +2281,21 @@ May this ancient wisdom bring clarity to your journey.
             # 3. Re-generate embeddings if content changed
             # 4. Update the collection
 
+            # Keep the catalog in sync with the update
+            key = PoemCatalog.parse_key(poem_id)
+            if key and key in self.catalog:
+                self.catalog.upsert(
+                    key[0],
+                    key[1],
+                    title=updated_data.get("title"),
+                    fortune=updated_data.get("fortune"),
+                    languages=(updated_data.get("analysis") or {}).keys()
+                )
+            if key:
+                self.interpretation_cache.invalidate(*key)
+            self.cache.pop(f"poem_{poem_id}", None)
+            self.cache.pop("fortune_categories", None)
+
             # For now, return a mock success response
             logger.info(f"Poem updated: {poem_id}")
 
@@ -1931,6 +2329,14 @@ May this ancient wisdom bring clarity to your journey.
             # 2. Remove it from the collection
             # 3. Update the vector index
 
+            # Keep the catalog in sync with the deletion
+            key = PoemCatalog.parse_key(poem_id)
+            if key:
+                self.catalog.remove(*key)
+                self.interpretation_cache.invalidate(*key)
+            self.cache.pop(f"poem_{poem_id}", None)
+            self.cache.pop("fortune_categories", None)
+
             # For now, return a mock success response
             logger.info(f"Poem deleted: {poem_id}")
 
@@ -1997,7 +2403,10 @@ May this ancient wisdom bring clarity to your journey.
                     failed_imports += 1
                     errors.append(f"Failed to import {poem_data.get('title', 'Unknown')}: {str(e)}")
 
-            logger.info(f"Bulk import completed: {successful_imports} successful, {failed_imports} failed")
+            logger.info(
+                f"Bulk import completed: {successful_imports} successful, {failed_imports} failed "
+                f"(catalog size: {len(self.catalog)})"
+            )
 
             return {
                 "success": True,
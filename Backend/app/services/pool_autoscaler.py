@@ -0,0 +1,291 @@
+"""
+Autoscaling controller for the task worker pool
+
+Decides how many workers the pool should run from the queue backlog, the
+rolling service time of each processing stage (RAG vs LLM) and the free
+capacity of the LLM gateway. Workers only help while the LLM backend has room:
+past that point extra workers just wait for a provider slot, so growth is
+capped by how many LLM slots the stage mix can actually use.
+
+Scale-up reacts immediately to a backlog; scale-down needs several consecutive
+low-utilization evaluations and removes one worker at a time. Every change is
+followed by a cooldown.
+
+Each worker process runs its own autoscaler against the shared queue. The
+backlog it sees only counts claimable tasks (not those held back by the
+per-user in-flight cap) and is split evenly between the worker processes
+currently holding leases, so N processes do not each size for the whole queue.
+An idle process holds no lease and is not counted, so at a cold start each
+process may size for the full backlog until the first claims land. The LLM
+gateway limits are per process as well: the cap applies to this process's
+share of the provider.
+"""
+
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from app.models.chat_task import TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# Stages timed per task, keyed by the status that starts them
+STAGE_BY_STATUS = {
+    TaskStatus.ANALYZING_RAG: "rag",
+    TaskStatus.GENERATING_LLM: "llm",
+}
+
+
+class StageTimings:
+    """
+    Rolling service time of each processing stage
+
+    Args:
+        window: Number of recent samples kept per stage
+        clock: Monotonic clock (injectable for tests)
+    """
+
+    def __init__(self, window: int = 50, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._samples: Dict[str, Deque[float]] = {stage: deque(maxlen=window) for stage in STAGE_BY_STATUS.values()}
+        self._open: Dict[str, Tuple[str, float]] = {}  # task_id -> (stage, started)
+
+    def observe(self, task_id: str, status: TaskStatus):
+        """Close the task's running stage and open the one this status starts"""
+        self.finish(task_id)
+        stage = STAGE_BY_STATUS.get(status)
+        if stage:
+            self._open[task_id] = (stage, self._clock())
+
+    def finish(self, task_id: str):
+        """Close the task's running stage (task completed, failed or released)"""
+        opened = self._open.pop(task_id, None)
+        if opened:
+            stage, started = opened
+            self._samples[stage].append(self._clock() - started)
+
+    def record(self, stage: str, seconds: float):
+        self._samples[stage].append(seconds)
+
+    def average(self, stage: str) -> Optional[float]:
+        samples = self._samples[stage]
+        return sum(samples) / len(samples) if samples else None
+
+    def service_seconds(self) -> Optional[float]:
+        """Average time one task spends in all timed stages (None before any sample)"""
+        averages = [self.average(stage) for stage in self._samples]
+        if all(average is None for average in averages):
+            return None
+        return sum(average or 0.0 for average in averages)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            stage: {
+                "samples": len(samples),
+                "avg_seconds": round(sum(samples) / len(samples), 2) if samples else None
+            }
+            for stage, samples in self._samples.items()
+        }
+
+
+@dataclass
+class LoadSignals:
+    """Inputs of one scaling evaluation"""
+    queue_depth: int  # Tasks waiting to be claimed
+    busy_workers: int
+    worker_nodes: int = 1  # Worker processes sharing the queue
+    llm_max_concurrency: Optional[int] = None  # None = gateway capacity unknown
+    llm_in_flight: int = 0
+    llm_waiting: int = 0
+
+    @property
+    def llm_free_slots(self) -> Optional[int]:
+        if self.llm_max_concurrency is None:
+            return None
+        return self.llm_max_concurrency - self.llm_in_flight - self.llm_waiting
+
+
+@dataclass
+class ScalingDecision:
+    """Outcome of one evaluation (kept in the decision history when it changes the pool)"""
+    current: int
+    target: int
+    reason: str
+    signals: Dict[str, Any] = field(default_factory=dict)
+    at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+    @property
+    def changed(self) -> bool:
+        return self.target != self.current
+
+
+class PoolAutoscaler:
+    """
+    Worker count controller with hysteresis and cooldown
+
+    Args:
+        min_workers: Lower bound of the pool
+        max_workers: Upper bound of the pool
+        target_wait_seconds: Acceptable queue wait used to size the pool for a backlog
+        scale_down_utilization: Busy/total ratio below which the pool may shrink
+        scale_down_after: Consecutive low-utilization evaluations required to shrink
+        cooldown_seconds: Minimum time between two changes
+        stage_timings: Shared stage timings (a private instance by default)
+        clock: Monotonic clock (injectable for tests)
+    """
+
+    def __init__(
+        self,
+        min_workers: int = 1,
+        max_workers: int = 8,
+        target_wait_seconds: float = 15.0,
+        scale_down_utilization: float = 0.5,
+        scale_down_after: int = 3,
+        cooldown_seconds: float = 30.0,
+        stage_timings: Optional[StageTimings] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if min_workers < 1 or max_workers < min_workers:
+            raise ValueError(f"Invalid worker bounds: min={min_workers}, max={max_workers}")
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.target_wait_seconds = target_wait_seconds
+        self.scale_down_utilization = scale_down_utilization
+        self.scale_down_after = scale_down_after
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self.stage_timings = stage_timings or StageTimings(clock=clock)
+
+        self._last_change: Optional[float] = None
+        self._low_streak = 0
+        self.last_decision: Optional[ScalingDecision] = None
+        self.decisions: Deque[ScalingDecision] = deque(maxlen=20)
+
+        # Metrics
+        self.evaluations = 0
+        self.scale_ups = 0
+        self.scale_downs = 0
+        self.held_by_cooldown = 0
+        self.held_by_llm = 0
+
+    def clamp(self, workers: int) -> int:
+        return max(self.min_workers, min(self.max_workers, workers))
+
+    def _llm_worker_cap(self, signals: LoadSignals) -> Optional[int]:
+        """Workers the LLM gateway can keep busy given the share of time spent in the LLM stage"""
+        if signals.llm_max_concurrency is None:
+            return None
+        rag = self.stage_timings.average("rag")
+        llm = self.stage_timings.average("llm")
+        share = 1.0
+        if rag is not None and llm is not None and rag + llm > 0:
+            share = max(llm / (rag + llm), 0.1)
+        return math.ceil(signals.llm_max_concurrency / share)
+
+    def desired_workers(self, signals: LoadSignals) -> int:
+        """
+        Workers needed for the current load, before hysteresis and cooldown
+
+        This process's share of the backlog is drained within
+        target_wait_seconds at the observed service time; without timings every
+        queued task in the share gets a worker.
+        """
+        service = self.stage_timings.service_seconds()
+        backlog = math.ceil(signals.queue_depth / max(1, signals.worker_nodes))
+        backlog_workers = backlog
+        if service is not None and backlog:
+            backlog_workers = min(backlog, math.ceil(backlog * service / self.target_wait_seconds))
+        desired = signals.busy_workers + backlog_workers
+
+        cap = self._llm_worker_cap(signals)
+        if cap is not None:
+            desired = min(desired, cap)
+        return self.clamp(desired)
+
+    def evaluate(self, current: int, signals: LoadSignals) -> ScalingDecision:
+        """
+        Decide the pool size for the next interval
+
+        Args:
+            current: Workers running now
+            signals: Queue, worker and gateway state
+
+        Returns:
+            ScalingDecision; target == current when nothing should change
+        """
+        self.evaluations += 1
+        now = self._clock()
+        desired = self.desired_workers(signals)
+        utilization = signals.busy_workers / current if current else 1.0
+        service = self.stage_timings.service_seconds()
+        snapshot = {
+            **asdict(signals),
+            "desired": desired,
+            "utilization": round(utilization, 2),
+            "service_seconds": round(service, 2) if service is not None else None
+        }
+
+        def decide(target: int, reason: str) -> ScalingDecision:
+            decision = ScalingDecision(current=current, target=target, reason=reason, signals=snapshot)
+            self.last_decision = decision
+            if decision.changed:
+                self._last_change = now
+                self._low_streak = 0
+                self.decisions.append(decision)
+                if target > current:
+                    self.scale_ups += 1
+                else:
+                    self.scale_downs += 1
+                logger.info(f"[AUTOSCALE] {current} -> {target} workers ({reason}; {snapshot})")
+            return decision
+
+        if current < self.min_workers or current > self.max_workers:
+            return decide(self.clamp(current), "bounds")
+
+        cooling = self._last_change is not None and now - self._last_change < self.cooldown_seconds
+
+        if desired > current and signals.queue_depth > 0:
+            self._low_streak = 0
+            free = signals.llm_free_slots
+            if free is not None and free <= 0 and signals.llm_waiting > 0:
+                self.held_by_llm += 1
+                return decide(current, "llm_saturated")
+            if cooling:
+                self.held_by_cooldown += 1
+                return decide(current, "cooldown")
+            return decide(desired, "backlog")
+
+        # Shrink only after utilization stayed low for a while (hysteresis band)
+        if signals.queue_depth == 0 and utilization < self.scale_down_utilization and current > self.min_workers:
+            self._low_streak += 1
+            if self._low_streak < self.scale_down_after:
+                return decide(current, "low_utilization_pending")
+            if cooling:
+                self.held_by_cooldown += 1
+                return decide(current, "cooldown")
+            return decide(max(desired, current - 1), "low_utilization")
+
+        self._low_streak = 0
+        if signals.queue_depth > 0 and current == self.max_workers:
+            return decide(current, "at_max")
+        return decide(current, "steady")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "min_workers": self.min_workers,
+            "max_workers": self.max_workers,
+            "target_wait_seconds": self.target_wait_seconds,
+            "cooldown_seconds": self.cooldown_seconds,
+            "evaluations": self.evaluations,
+            "scale_ups": self.scale_ups,
+            "scale_downs": self.scale_downs,
+            "held_by_cooldown": self.held_by_cooldown,
+            "held_by_llm_saturation": self.held_by_llm,
+            "stage_timings": self.stage_timings.get_metrics(),
+            "last_decision": asdict(self.last_decision) if self.last_decision else None,
+            "recent_decisions": [asdict(decision) for decision in self.decisions]
+        }
@@ -0,0 +1,115 @@
+"""
+Cross-node tracking of SSE subscribers per task
+
+SSE clients attach to whichever API node served their request, while the task
+runs on some worker. Every node announces how many clients it holds for each
+task over the event bus (when the count changes and on a heartbeat), and the
+worker running the task uses the announcements to tell an abandoned task from
+a client that is only reconnecting.
+
+An announcement with subscribers counts until the node refreshes it or it
+expires after three heartbeats, so a crashed API node does not keep its tasks
+alive. A task that never had a subscriber (e.g. its client polls the status
+endpoint) is never reported as detached.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TaskPresence:
+    """Subscriber state of one task"""
+    nodes: Dict[str, float] = field(default_factory=dict)  # node_id -> last announcement with subscribers
+    detached_at: Optional[float] = None  # When the last subscriber went away
+
+
+class SubscriberPresence:
+    """
+    Which tasks still have an SSE subscriber on any node
+
+    Args:
+        heartbeat_seconds: Announcement cadence of each node
+        clock: Monotonic clock (injectable for tests)
+    """
+
+    def __init__(self, heartbeat_seconds: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.node_ttl = heartbeat_seconds * 3
+        self._clock = clock
+        self._tasks: Dict[str, TaskPresence] = {}
+
+        # Metrics
+        self.reports = 0
+        self.detachments = 0
+        self.reattachments = 0
+
+    def report(self, task_id: str, node_id: str, subscribers: int):
+        """
+        Apply one node's announcement
+
+        Args:
+            task_id: Task the clients follow
+            node_id: Announcing node
+            subscribers: SSE clients the node holds for the task
+        """
+        self.reports += 1
+        now = self._clock()
+        presence = self._tasks.get(task_id)
+        if subscribers > 0:
+            if presence is None:
+                presence = self._tasks[task_id] = TaskPresence()
+            elif presence.detached_at is not None:
+                self.reattachments += 1
+            presence.nodes[node_id] = now
+            presence.detached_at = None
+        elif presence is not None and presence.nodes.pop(node_id, None) is not None:
+            self._expire(presence, now)
+            if not presence.nodes and presence.detached_at is None:
+                presence.detached_at = now
+                self.detachments += 1
+
+    def _expire(self, presence: TaskPresence, now: float):
+        """Drop announcements that were not refreshed in time"""
+        expired = [seen for seen in presence.nodes.values() if now - seen > self.node_ttl]
+        if not expired:
+            return
+        presence.nodes = {node: seen for node, seen in presence.nodes.items() if now - seen <= self.node_ttl}
+        if not presence.nodes and presence.detached_at is None:
+            presence.detached_at = max(expired) + self.node_ttl
+            self.detachments += 1
+
+    def detached_seconds(self, task_id: str) -> Optional[float]:
+        """
+        How long the task has been without any subscriber
+
+        Returns:
+            Seconds since the last subscriber went away, or None while one is
+            attached or when the task never had one
+        """
+        presence = self._tasks.get(task_id)
+        if presence is None:
+            return None
+        now = self._clock()
+        self._expire(presence, now)
+        if presence.detached_at is None:
+            return None
+        return now - presence.detached_at
+
+    def forget(self, task_id: str):
+        """Stop tracking a task (it finished)"""
+        self._tasks.pop(task_id, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        detached = sum(1 for presence in self._tasks.values() if presence.detached_at is not None)
+        return {
+            "tracked_tasks": len(self._tasks),
+            "detached_tasks": detached,
+            "node_ttl_seconds": self.node_ttl,
+            "reports": self.reports,
+            "detachments": self.detachments,
+            "reattachments": self.reattachments
+        }
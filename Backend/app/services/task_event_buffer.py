@@ -0,0 +1,161 @@
+"""
+Per-task replay buffer of sequenced SSE events
+
+Each task event gets an id from the process running the task (sent as the SSE
+`id:` field). The id is "<run>-<seq>": the run is the task's attempt number,
+so a task re-run after its lease expired never reuses the ids of the earlier
+run. Every node keeps the most recent frames per task, so a client
+reconnecting with `Last-Event-ID` can be replayed from that point without a
+DB read, including the final `complete` frame.
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EventId = Tuple[int, int]  # (run, sequence number within the run)
+
+
+def format_event_id(event_id: EventId) -> str:
+    return f"{event_id[0]}-{event_id[1]}"
+
+
+def parse_event_id(value: Optional[str]) -> Optional[EventId]:
+    """Parse a "<run>-<seq>" event id (e.g. a Last-Event-ID header), None if malformed"""
+    run, separator, seq = (value or "").partition("-")
+    if not separator or not run.isdigit() or not seq.isdigit():
+        return None
+    return int(run), int(seq)
+
+
+def format_sse_event(data: Dict[str, Any], event_id: Optional[EventId] = None) -> str:
+    """Encode an event as an SSE frame, with an `id:` line when sequenced"""
+    frame = f"data: {json.dumps(data)}\n\n"
+    if event_id is not None:
+        frame = f"id: {format_event_id(event_id)}\n{frame}"
+    return frame
+
+
+def parse_sse_event(frame: str) -> Tuple[Optional[EventId], Optional[Dict[str, Any]]]:
+    """
+    Decode an SSE frame produced by format_sse_event
+
+    Returns:
+        (event_id, data); either is None when missing or malformed
+    """
+    event_id = None
+    data = None
+    for line in frame.splitlines():
+        if line.startswith("id: "):
+            event_id = parse_event_id(line[4:])
+        elif line.startswith("data: "):
+            try:
+                data = json.loads(line[6:])
+            except json.JSONDecodeError:
+                pass
+    return event_id, data
+
+
+class _TaskFrames:
+    __slots__ = ("frames", "updated_at")
+
+    def __init__(self, max_events: int):
+        self.frames: Deque[Tuple[EventId, str]] = deque(maxlen=max_events)
+        self.updated_at = time.monotonic()
+
+
+class TaskEventBuffer:
+    """
+    Bounded ring buffers of (event_id, frame) keyed by task_id
+
+    An id from another run, or one not after the last id seen, means a new
+    publisher took the task over (lease expired and the task was requeued),
+    so the old frames are discarded.
+    """
+
+    def __init__(self, max_events_per_task: int = 512, ttl_seconds: float = 600):
+        self.max_events_per_task = max_events_per_task
+        self.ttl_seconds = ttl_seconds
+        self._tasks: Dict[str, _TaskFrames] = {}
+
+        # Metrics
+        self.appended = 0
+        self.replays = 0
+        self.replay_misses = 0
+        self.frames_replayed = 0
+
+    def append(self, task_id: str, event_id: EventId, frame: str):
+        entry = self._tasks.get(task_id)
+        if entry is None:
+            entry = self._tasks[task_id] = _TaskFrames(self.max_events_per_task)
+        elif entry.frames:
+            last_id = entry.frames[-1][0]
+            if event_id[0] != last_id[0] or event_id <= last_id:
+                entry.frames.clear()
+
+        entry.frames.append((event_id, frame))
+        entry.updated_at = time.monotonic()
+        self.appended += 1
+
+        if self.appended % 256 == 0:
+            self.prune()
+
+    def replay(self, task_id: str, last_event_id: EventId) -> Optional[List[Tuple[EventId, str]]]:
+        """
+        Frames published after `last_event_id`
+
+        Args:
+            task_id: Task to replay
+            last_event_id: Last id the client received (SSE Last-Event-ID)
+
+        Returns:
+            List of (event_id, frame), possibly empty, or None when the buffer
+            cannot cover the gap (evicted, unknown task or the client's id is
+            from another run of the task)
+        """
+        entry = self._tasks.get(task_id)
+        if entry is None or not entry.frames:
+            self.replay_misses += 1
+            return None
+
+        run, seq = last_event_id
+        first_run, first_seq = entry.frames[0][0]
+        last_id = entry.frames[-1][0]
+        if run != first_run or seq < first_seq - 1 or last_event_id > last_id:
+            self.replay_misses += 1
+            return None
+
+        frames = [(event_id, frame) for event_id, frame in entry.frames if event_id > last_event_id]
+        self.replays += 1
+        self.frames_replayed += len(frames)
+        return frames
+
+    def discard(self, task_id: str):
+        self._tasks.pop(task_id, None)
+
+    def prune(self):
+        """Drop buffers of tasks that have been quiet for ttl_seconds"""
+        now = time.monotonic()
+        expired = [
+            task_id for task_id, entry in self._tasks.items()
+            if now - entry.updated_at > self.ttl_seconds
+        ]
+        for task_id in expired:
+            del self._tasks[task_id]
+        if expired:
+            logger.debug(f"[SSE_REPLAY] Pruned {len(expired)} task event buffers")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "buffered_tasks": len(self._tasks),
+            "buffered_frames": sum(len(entry.frames) for entry in self._tasks.values()),
+            "max_events_per_task": self.max_events_per_task,
+            "appended": self.appended,
+            "replays": self.replays,
+            "replay_misses": self.replay_misses,
+            "frames_replayed": self.frames_replayed
+        }
@@ -0,0 +1,219 @@
+"""
+Write-behind checkpoints of intermediate task progress
+
+Progress steps (PROCESSING, ANALYZING_RAG, GENERATING_LLM, percentages and
+status codes) reach clients through the event bus and the in-memory task
+state registry as they happen. The database only needs them for crash
+recovery and for clients that poll, so they are coalesced per task here and
+written periodically, all tasks in one transaction. Claims and terminal
+states are still written immediately by their owners.
+
+A checkpoint never overwrites a terminal state or a task that another worker
+claimed in the meantime.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, bindparam, update
+
+from app.models.chat_task import ChatTask, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+
+@dataclass
+class ProgressCheckpoint:
+    """Latest unsaved progress of one task"""
+    task_id: str
+    status: TaskStatus
+    progress: int
+    status_message: Optional[str]
+    started_at: Optional[datetime]
+
+
+class TaskProgressWriter:
+    """
+    Coalesces progress updates in memory and persists them in batches
+
+    Args:
+        worker_id: Lease owner; checkpoints only touch tasks it still holds
+        session_factory: Callable returning an async session context manager
+        checkpoint_interval_seconds: Flush cadence (0 = write through on every step)
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        session_factory: Optional[Callable] = None,
+        checkpoint_interval_seconds: float = 10.0
+    ):
+        self.worker_id = worker_id
+        self.checkpoint_interval_seconds = checkpoint_interval_seconds
+        self._session_factory = session_factory
+        self._pending: Dict[str, ProgressCheckpoint] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._running = False
+
+        # Metrics
+        self.recorded = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.flush_errors = 0
+        self.largest_batch = 0
+
+    @property
+    def write_through(self) -> bool:
+        return self.checkpoint_interval_seconds <= 0
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.core.database import get_async_session
+            return get_async_session()
+        return self._session_factory()
+
+    async def start(self):
+        """Start the periodic checkpoint loop"""
+        if self._running or self.write_through:
+            return
+        self._running = True
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"[PROGRESS] Checkpointing task progress every {self.checkpoint_interval_seconds}s")
+
+    async def stop(self):
+        """Stop the loop and write what is still pending"""
+        self._running = False
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while self._running:
+            try:
+                await asyncio.sleep(self.checkpoint_interval_seconds)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[PROGRESS] Checkpoint loop error: {e}")
+
+    def record(self, task: ChatTask):
+        """
+        Remember the current progress of a task for the next checkpoint
+
+        Terminal states are ignored; their owner commits them together with
+        the result or error, which supersedes any pending checkpoint.
+        """
+        if task.status in TERMINAL_STATUSES:
+            self.discard(task.task_id)
+            return
+
+        if task.task_id in self._pending:
+            self.coalesced += 1
+        self._pending[task.task_id] = ProgressCheckpoint(
+            task_id=task.task_id,
+            status=task.status,
+            progress=task.progress,
+            status_message=task.status_message,
+            started_at=task.started_at
+        )
+        self.recorded += 1
+
+    def discard(self, task_id: str):
+        """Forget the pending checkpoint of a task (e.g. it reached a terminal state)"""
+        self._pending.pop(task_id, None)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """
+        Write all pending checkpoints in one transaction
+
+        Returns:
+            Number of rows updated
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch: List[ProgressCheckpoint] = list(self._pending.values())
+            self._pending.clear()
+
+            table = ChatTask.__table__
+            statement = (
+                update(table)
+                .where(and_(
+                    table.c.task_id == bindparam("b_task_id"),
+                    table.c.claimed_by == self.worker_id,
+                    # Plain comparisons: expanding NOT IN parameters do not work with executemany
+                    *[table.c.status != status for status in TERMINAL_STATUSES]
+                ))
+                .values(
+                    status=bindparam("b_status"),
+                    progress=bindparam("b_progress"),
+                    status_message=bindparam("b_status_message"),
+                    started_at=bindparam("b_started_at"),
+                    updated_at=bindparam("b_updated_at")
+                )
+            )
+            now = datetime.utcnow()
+            params = [
+                {
+                    "b_task_id": checkpoint.task_id,
+                    "b_status": checkpoint.status,
+                    "b_progress": checkpoint.progress,
+                    "b_status_message": checkpoint.status_message,
+                    "b_started_at": checkpoint.started_at,
+                    "b_updated_at": now
+                }
+                for checkpoint in batch
+            ]
+
+            try:
+                async with self._session() as db:
+                    result = await db.execute(statement, params)
+                    await db.commit()
+            except Exception as e:
+                # Keep the checkpoints for the next round unless newer progress arrived meanwhile
+                for checkpoint in batch:
+                    self._pending.setdefault(checkpoint.task_id, checkpoint)
+                self.flush_errors += 1
+                logger.error(f"[PROGRESS] Failed to checkpoint {len(batch)} task(s): {e}")
+                return 0
+
+            written = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(batch)
+            self.flushes += 1
+            self.rows_written += written
+            self.rows_skipped += len(batch) - written
+            self.largest_batch = max(self.largest_batch, len(batch))
+            logger.debug(f"[PROGRESS] Checkpointed {written}/{len(batch)} task(s)")
+            return written
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "checkpoint_interval_seconds": self.checkpoint_interval_seconds,
+            "write_through": self.write_through,
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "rows_skipped": self.rows_skipped,
+            "largest_batch": self.largest_batch,
+            "flush_errors": self.flush_errors,
+            # Progress commits that did not happen compared to one commit per step
+            "commits_saved": max(0, self.recorded - self.flushes)
+        }
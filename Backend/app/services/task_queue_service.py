@@ -5,24 +5,35 @@ Task Queue Service for async chat processing
 import asyncio
 import logging
 import time
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Set, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func
+from sqlalchemy import and_, or_, select, update, func
+from app.core.config import settings
 from app.models.chat_task import ChatTask, TaskStatus
 from app.services.poem_service import poem_service
+from app.services.durable_task_queue import DurableTaskQueue
+from app.services.event_bus import create_event_bus
+from app.services.task_state_registry import task_state_registry
+from app.services.task_progress_writer import TaskProgressWriter
+from app.services.task_event_buffer import EventId, TaskEventBuffer, format_sse_event
 from app.core.database import get_database_session, get_async_session
 from app.utils.timeout_utils import (
     with_timeout, run_with_timeout, timeout_context, TimeoutError,
     rag_circuit_breaker, llm_circuit_breaker, with_circuit_breaker
 )
 from app.services.task_worker_pool import TaskWorkerPool
+from app.services.pool_autoscaler import LoadSignals, PoolAutoscaler, StageTimings
+from app.services.fair_scheduler import FairScheduler, QueuedTask, LANE_PAID, LANE_STANDARD
+from app.services.subscriber_presence import SubscriberPresence
 from app.utils.progress_tracker import (
     create_progress_aware_task, progress_manager, StreamingProgressTracker
 )
 from app.utils.streaming_processor import (
-    create_streaming_processor, cleanup_streaming_processor
+    create_streaming_processor, cleanup_streaming_processor, get_streaming_processor, ProcessingCancelled
 )
+from app.utils.token_frame_aggregator import TokenFrameAggregator
+from app.utils.request_fingerprint import IdempotencyKeyReused, request_fingerprint
 from app.constants.task_status_codes import TaskStatusCode
 import uuid
 import json
@@ -42,15 +53,78 @@ class TaskQueueService:
         self.rag_timeout = 30.0  # 30 seconds for RAG operations
         self.llm_timeout = 60.0  # 1 minute for LLM operations
 
-        # Event-driven task queue (no polling delay!)
-        self.task_event_queue: asyncio.Queue = asyncio.Queue()
+        # Durable queue over chat_tasks (source of truth for pending work)
+        self.durable_queue = DurableTaskQueue(
+            lease_seconds=settings.TASK_LEASE_SECONDS,
+            max_attempts=settings.TASK_MAX_ATTEMPTS
+        )
+        self._leased_tasks: Set[str] = set()  # task_ids claimed by this process
+
+        # Intermediate progress is written behind in batched checkpoints
+        self.progress_writer = TaskProgressWriter(
+            worker_id=self.durable_queue.worker_id,
+            checkpoint_interval_seconds=settings.TASK_PROGRESS_CHECKPOINT_SECONDS
+        )
 
-        # Worker pool for concurrent processing
+        # Task events go through the bus so SSE clients on any node receive them
+        self.event_bus = create_event_bus(
+            backend=settings.EVENT_BUS_BACKEND,
+            redis_url=settings.EVENT_BUS_REDIS_URL
+        )
+        self.event_bus.subscribe(self._on_task_event)
+
+        # Sequenced events for Last-Event-ID replay
+        self.event_buffer = TaskEventBuffer(max_events_per_task=settings.SSE_REPLAY_BUFFER_SIZE)
+        self._event_seq: Dict[str, EventId] = {}  # task_id -> last event id published by this process
+
+        # Wake-up signal for the dispatcher (no polling delay!); carries no state
+        self.dispatch_wakeup = asyncio.Event()
+
+        # Worker pool for concurrent processing, resized from queue depth,
+        # per-stage service time and free LLM capacity
+        self.stage_timings = StageTimings()
+        autoscaler = None
+        if settings.TASK_AUTOSCALE_ENABLED:
+            autoscaler = PoolAutoscaler(
+                min_workers=settings.TASK_WORKER_MIN,
+                max_workers=settings.TASK_WORKER_MAX,
+                target_wait_seconds=settings.TASK_AUTOSCALE_TARGET_WAIT_SECONDS,
+                scale_down_utilization=settings.TASK_AUTOSCALE_SCALE_DOWN_UTILIZATION,
+                cooldown_seconds=settings.TASK_AUTOSCALE_COOLDOWN_SECONDS,
+                stage_timings=self.stage_timings
+            )
         self.worker_pool = TaskWorkerPool(
-            max_workers=3,
-            worker_timeout=self.task_timeout
+            max_workers=settings.TASK_WORKER_MAX if autoscaler else settings.TASK_WORKER_COUNT,
+            min_workers=settings.TASK_WORKER_MIN if autoscaler else None,
+            initial_workers=settings.TASK_WORKER_COUNT,
+            worker_timeout=self.task_timeout,
+            autoscaler=autoscaler,
+            load_probe=self._pool_load_signals,
+            autoscale_interval=settings.TASK_AUTOSCALE_INTERVAL_SECONDS
         )
 
+        # Picks which queued tasks to claim: priority lanes, DRR across users, per-user caps
+        self.fair_scheduler = FairScheduler(
+            max_in_flight_per_user=settings.TASK_MAX_IN_FLIGHT_PER_USER,
+            max_lane_wait_seconds=settings.TASK_LANE_MAX_WAIT_SECONDS
+        ) if settings.TASK_FAIR_SCHEDULING else None
+        self._queue_positions: Dict[str, int] = {}  # task_id -> last published position
+
+        # SSE subscribers of each task across nodes; a running task whose clients
+        # stayed away longer than the grace period is cancelled and refunded
+        self.presence = SubscriberPresence(heartbeat_seconds=settings.SSE_PRESENCE_HEARTBEAT_SECONDS)
+        self._presence_changed: Set[str] = set()  # task_ids whose local subscriber count changed
+        self._presence_wakeup = asyncio.Event()
+        self._presence_task: Optional[asyncio.Task] = None
+        self.disconnect_cancellations = 0
+        self.abandoned_before_start = 0
+
+        # Serializes lookup + insert per fingerprint so concurrent duplicates attach to one task
+        self._dedupe_locks: Dict[str, List] = {}  # lock key -> [lock, holders]
+        self.deduplicated_requests = 0
+        self.idempotent_replays = 0
+        self.batched_refunds = 0
+
     async def create_task(
         self,
         user_id: int,
@@ -58,15 +132,23 @@ class TaskQueueService:
         fortune_number: int,
         question: str,
         context: dict = None,
-        db: AsyncSession = None
+        db: AsyncSession = None,
+        idempotency_key: Optional[str] = None,
+        priority_lane: str = LANE_STANDARD
     ) -> ChatTask:
         """Create a new chat task"""
+        context = context or {}
         task = ChatTask(
+            priority_lane=priority_lane,
             user_id=user_id,
             deity_id=deity_id,
             fortune_number=fortune_number,
             question=question,
-            context=context or {}
+            context=context,
+            request_fingerprint=request_fingerprint(
+                user_id, deity_id, fortune_number, question, context.get("language")
+            ),
+            idempotency_key=idempotency_key
         )
 
         if db:
@@ -74,12 +156,177 @@ class TaskQueueService:
             await db.commit()
             await db.refresh(task)
 
-        # Immediately notify dispatcher (no polling delay!)
-        await self.task_event_queue.put(task.task_id)
+        # Wake the dispatchers immediately (here and on worker nodes); the row itself is the queue entry
+        self._wake_dispatcher()
+        try:
+            await self.event_bus.publish(task.task_id, {"type": "task_queued"})
+        except Exception as e:
+            # Workers still find the task on their next poll
+            logger.warning(f"Failed to announce task {task.task_id} to workers: {e}")
 
-        logger.info(f"Created task {task.task_id} for user {user_id} (event-driven queue)")
+        logger.info(f"Created task {task.task_id} for user {user_id} (durable queue)")
         return task
 
+    async def find_duplicate_task(
+        self,
+        user_id: int,
+        deity_id: str,
+        fortune_number: int,
+        question: str,
+        context: dict = None,
+        idempotency_key: Optional[str] = None,
+        db: AsyncSession = None
+    ) -> Optional[ChatTask]:
+        """
+        Find the task an identical request already created
+
+        Args:
+            user_id: Asking user
+            deity_id: Deity identifier
+            fortune_number: Poem number
+            question: User's question
+            context: Request context (its language is part of the fingerprint)
+            idempotency_key: Client-supplied Idempotency-Key, matched before the content hash
+            db: Database session
+
+        Returns:
+            The existing task (running or finished), or None
+
+        Raises:
+            IdempotencyKeyReused: The key belongs to a task for a different request
+        """
+        if db is None:
+            return None
+
+        now = datetime.utcnow()
+        fingerprint = request_fingerprint(
+            user_id, deity_id, fortune_number, question, (context or {}).get("language")
+        )
+        if idempotency_key:
+            # A replayed key returns its task whatever the outcome, like any idempotent API
+            result = await db.execute(
+                select(ChatTask)
+                .where(
+                    ChatTask.user_id == user_id,
+                    ChatTask.idempotency_key == idempotency_key,
+                    ChatTask.created_at >= now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+                )
+                .order_by(ChatTask.created_at.desc())
+                .limit(1)
+            )
+            task = result.scalars().first()
+            if task:
+                if task.request_fingerprint and task.request_fingerprint != fingerprint:
+                    raise IdempotencyKeyReused(
+                        "Idempotency-Key was already used for a different question"
+                    )
+                return task
+
+        # Same question again: share the in-flight run or its stored result, but retry failures
+        result = await db.execute(
+            select(ChatTask)
+            .where(
+                ChatTask.request_fingerprint == fingerprint,
+                ChatTask.status != TaskStatus.FAILED,
+                ChatTask.created_at >= now - timedelta(seconds=settings.TASK_DEDUPE_WINDOW_SECONDS)
+            )
+            .order_by(ChatTask.created_at.desc())
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def submit_task(
+        self,
+        user_id: int,
+        deity_id: str,
+        fortune_number: int,
+        question: str,
+        context: dict = None,
+        db: AsyncSession = None,
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[ChatTask, bool]:
+        """
+        Create a task unless an identical request already has one
+
+        Concurrent identical submissions in this process are serialized, so only
+        the first creates a task; the others attach to it and share its SSE stream,
+        its stored result and its single coin charge.
+
+        Returns:
+            (task, deduplicated) where deduplicated is True for an existing task
+        """
+        context = context or {}
+        lock_key = (
+            f"key:{user_id}:{idempotency_key}" if idempotency_key
+            else request_fingerprint(user_id, deity_id, fortune_number, question, context.get("language"))
+        )
+        entry = self._dedupe_locks.setdefault(lock_key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                existing = await self.find_duplicate_task(
+                    user_id, deity_id, fortune_number, question,
+                    context=context, idempotency_key=idempotency_key, db=db
+                )
+                if existing:
+                    if idempotency_key and existing.idempotency_key == idempotency_key:
+                        self.idempotent_replays += 1
+                    else:
+                        self.deduplicated_requests += 1
+                    logger.info(f"[DEDUPE] Request from user {user_id} attached to existing task {existing.task_id} ({existing.status.value})")
+                    return existing, True
+
+                task = await self.create_task(
+                    user_id, deity_id, fortune_number, question,
+                    context=context, db=db, idempotency_key=idempotency_key,
+                    priority_lane=await self._priority_lane(user_id, db)
+                )
+                return task, False
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._dedupe_locks.pop(lock_key, None)
+
+    async def _priority_lane(self, user_id: int, db: Optional[AsyncSession]) -> str:
+        """Scheduling lane of a new task: paid for users who have bought coins (signup bonus and transfers excluded)"""
+        if db is None or self.fair_scheduler is None or not settings.TASK_PAID_PRIORITY:
+            return LANE_STANDARD
+
+        from app.models.transaction import TransactionType, TransactionStatus, Transaction
+        from app.models.wallet import Wallet
+
+        result = await db.execute(
+            select(Transaction.txn_id)
+            .join(Wallet, Wallet.wallet_id == Transaction.wallet_id)
+            .where(
+                Wallet.user_id == user_id,
+                Transaction.type == TransactionType.DEPOSIT,
+                Transaction.status == TransactionStatus.SUCCESS,
+                or_(
+                    Transaction.reference_id.is_(None),  # Plain /wallet/deposit purchases
+                    and_(
+                        Transaction.reference_id.notlike("signup_%"),
+                        Transaction.reference_id.notlike("%_receive")
+                    )
+                )
+            )
+            .limit(1)
+        )
+        return LANE_PAID if result.first() is not None else LANE_STANDARD
+
+    async def check_admission(self, db: AsyncSession):
+        """
+        Admission control for new questions
+
+        Queued tasks count as backlog ahead of the LLM gateway, so the estimate
+        covers both the task queue and calls already waiting for a provider slot.
+
+        Returns:
+            AdmissionDecision (refused decisions carry retry_after seconds)
+        """
+        pending = await self.durable_queue.count_pending(db)
+        return poem_service.check_llm_admission(pending)
+
     async def get_task(self, task_id: str, db: AsyncSession) -> Optional[ChatTask]:
         """Get task by ID"""
         result = await db.execute(select(ChatTask).where(ChatTask.task_id == task_id))
@@ -112,107 +359,333 @@ class TaskQueueService:
 
         # Start the worker pool
         await self.worker_pool.start()
+        await self.progress_writer.start()
 
         # Start the task dispatcher
         asyncio.create_task(self._task_dispatcher())
 
-        # Start the cleanup job
-        asyncio.create_task(self._cleanup_stuck_tasks())
+        # Keep leases of running tasks alive and reap expired or stale ones
+        # (the first recovery pass runs immediately, picking up work left by a crash)
+        asyncio.create_task(self._lease_heartbeat_loop())
+        asyncio.create_task(self._lease_recovery_loop())
+
+        if settings.SSE_DISCONNECT_GRACE_SECONDS > 0:
+            asyncio.create_task(self._disconnect_watch_loop())
 
         logger.info("Task queue processor started successfully")
 
     async def _task_dispatcher(self):
-        """Dispatch tasks to the worker pool (event-driven, no polling!)"""
-        logger.info("Task dispatcher starting (event-driven mode)")
+        """Claim tasks from the durable queue and dispatch them to the worker pool"""
+        logger.info("Task dispatcher starting (durable queue with event wake-up)")
         while self.is_processing:
             try:
-                # Wait for task event (no polling delay!)
-                task_id = await asyncio.wait_for(
-                    self.task_event_queue.get(),
-                    timeout=5.0  # Heartbeat check every 5s
-                )
+                try:
+                    # Wait for a wake-up signal (no polling delay!)
+                    await asyncio.wait_for(
+                        self.dispatch_wakeup.wait(),
+                        timeout=5.0  # Safety poll in case a task_queued announcement was lost
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+                # Collapse pending wake-ups; one claim round serves them all
+                self.dispatch_wakeup.clear()
+
+                capacity = self.worker_pool.target_workers - len(self._leased_tasks)
+                if capacity <= 0 and self.fair_scheduler is None:
+                    continue
+
+                async with get_async_session() as db:
+                    task_ids = await self._claim_next_tasks(db, capacity)
+
+                for task_id in task_ids:
+                    self._leased_tasks.add(task_id)
+                    await self.worker_pool.submit_task(
+                        task_id,
+                        self._run_claimed_task,
+                        task_id
+                    )
+                    logger.info(f"[EVENT] Submitted claimed task {task_id} to worker pool")
 
-                logger.info(f"[EVENT] Task {task_id} received immediately")
-
-                # Process the task
-                async for db in get_database_session():
-                    try:
-                        task = await self.get_task(task_id, db)
-                        if task and task.status == TaskStatus.QUEUED:
-                            if (task_id not in self.active_tasks and
-                                not self.worker_pool.is_task_active(task_id)):
-
-                                # Submit to worker pool
-                                await self.worker_pool.submit_task(
-                                    task_id,
-                                    self.process_task,
-                                    task_id
-                                )
-
-                                self.active_tasks[task_id] = task
-                                logger.info(f"Submitted task {task_id} to worker pool (0s delay)")
-                        break
-                    except Exception as e:
-                        logger.error(f"Error dispatching task {task_id}: {e}")
-
-            except asyncio.TimeoutError:
-                # Just a heartbeat, continue
-                continue
             except Exception as e:
                 logger.error(f"Error in task dispatcher: {e}")
                 await asyncio.sleep(1)  # Brief pause on error
 
-    async def _cleanup_stuck_tasks(self):
-        """Background job to clean up stuck tasks and refund coins"""
-        logger.info("Cleanup job started - will check for stuck tasks every 5 minutes")
+    def _wake_dispatcher(self):
+        """Trigger a claim round now (API-only nodes have no dispatcher to wake)"""
+        if self.is_processing:
+            self.dispatch_wakeup.set()
 
-        while self.is_processing:
-            try:
-                await asyncio.sleep(300)  # Check every 5 minutes
+    async def _claim_next_tasks(self, db: AsyncSession, capacity: int) -> List[str]:
+        """
+        Claim tasks for the free worker slots
 
+        With fair scheduling the claim order comes from the FairScheduler and
+        the tasks left waiting get their updated queue positions. Only one
+        worker process publishes positions (the lease holder with the lowest
+        worker ID), so clients never see estimates from several schedulers.
+
+        Returns:
+            Claimed task IDs in dispatch order
+        """
+        if self.fair_scheduler is None:
+            return await self.durable_queue.claim(db, limit=capacity)
+
+        rows = await self.durable_queue.list_claimable(db, limit=settings.TASK_SCHEDULER_WINDOW)
+        waiting = [
+            QueuedTask(
+                task_id=task_id,
+                user_id=user_id,
+                created_at=created_at,
+                lane=lane or LANE_STANDARD,
+                attempts=attempts or 0
+            )
+            for task_id, user_id, created_at, lane, attempts in rows
+        ]
+
+        task_ids: List[str] = []
+        if capacity > 0 and waiting:
+            in_flight = await self.durable_queue.in_flight_by_user(db)
+            picked = self.fair_scheduler.select(waiting, in_flight, capacity)
+            task_ids = await self.durable_queue.claim_ids(db, [task.task_id for task in picked])
+
+        holders = await self.durable_queue.lease_holders(db) if waiting else set()
+        if min(holders, default=self.durable_queue.worker_id) == self.durable_queue.worker_id:
+            claimed = set(task_ids)
+            await self._publish_queue_positions([task for task in waiting if task.task_id not in claimed])
+        else:
+            # Another process owns the estimates; republish everything if ownership comes back
+            self._queue_positions.clear()
+        return task_ids
+
+    async def _publish_queue_positions(self, waiting: List[QueuedTask]):
+        """Send queue_position events (not replayed) to waiting tasks whose position changed"""
+        positions = self.fair_scheduler.positions(
+            waiting,
+            workers=self.worker_pool.target_workers,
+            service_seconds=self.stage_timings.service_seconds()
+        )
+        for task_id in list(self._queue_positions):
+            if task_id not in positions:
+                del self._queue_positions[task_id]
+
+        for task_id, estimate in positions.items():
+            if self._queue_positions.get(task_id) == estimate.position:
+                continue
+            self._queue_positions[task_id] = estimate.position
+            await self.send_transient_event(task_id, {
+                "type": "queue_position",
+                "position": estimate.position,
+                "lane": estimate.lane,
+                "estimated_wait_seconds": estimate.estimated_wait_seconds
+            })
+
+    async def _run_claimed_task(self, task_id: str):
+        """Process a claimed task, then release its lease and wake the dispatcher"""
+        try:
+            await self.process_task(task_id)
+        finally:
+            self._leased_tasks.discard(task_id)
+            self.active_tasks.pop(task_id, None)
+            self.progress_writer.discard(task_id)
+            self.stage_timings.finish(task_id)
+            try:
                 async with get_async_session() as db:
-                    from datetime import datetime, timedelta
-                    from sqlalchemy import select, or_
-
-                    # Find tasks stuck for more than 10 minutes
-                    ten_minutes_ago = datetime.utcnow() - timedelta(minutes=10)
-
-                    stuck_tasks_result = await db.execute(
-                        select(ChatTask).where(
-                            ChatTask.created_at < ten_minutes_ago,
-                            or_(
-                                ChatTask.status == TaskStatus.QUEUED,
-                                ChatTask.status == TaskStatus.PROCESSING,
-                                ChatTask.status == TaskStatus.ANALYZING_RAG,
-                                ChatTask.status == TaskStatus.GENERATING_LLM
-                            )
-                        )
-                    )
-                    stuck_tasks = stuck_tasks_result.scalars().all()
+                    await self.durable_queue.release(db, task_id)
+            except Exception as e:
+                # A non-terminal task keeps its lease and is recovered once it expires
+                logger.warning(f"Failed to release lease for task {task_id}: {e}")
+
+            # A worker slot is free again
+            self._wake_dispatcher()
 
-                    if stuck_tasks:
-                        logger.warning(f"Found {len(stuck_tasks)} stuck tasks to clean up")
+    async def _pool_load_signals(self) -> LoadSignals:
+        """
+        Claimable backlog, busy workers and LLM gateway capacity for the pool autoscaler
 
-                        for task in stuck_tasks:
-                            try:
-                                # Mark task as failed
-                                task.set_error("Task timeout - exceeded 10 minutes")
-                                await db.commit()
+        Tasks held back by the per-user in-flight cap are not counted, and the
+        backlog is shared with the other worker processes holding leases.
+        """
+        max_in_flight = self.fair_scheduler.max_in_flight_per_user if self.fair_scheduler else 0
+        async with get_async_session() as db:
+            queue_depth = await self.durable_queue.count_claimable(db, max_in_flight)
+            worker_nodes = await self.durable_queue.count_live_workers(db) if queue_depth else 1
+        llm = poem_service.get_llm_capacity()
+        return LoadSignals(
+            queue_depth=queue_depth,
+            worker_nodes=worker_nodes,
+            busy_workers=len(self._leased_tasks),
+            llm_max_concurrency=llm.get("max_concurrency"),
+            llm_in_flight=llm.get("in_flight", 0),
+            llm_waiting=llm.get("queued", 0)
+        )
 
-                                # Refund coins if they were deducted
-                                await self._refund_coins(task.task_id, "Task cleanup - exceeded 10 minutes")
+    async def _lease_heartbeat_loop(self):
+        """Periodically extend leases of tasks running in this process"""
+        while self.is_processing:
+            try:
+                await asyncio.sleep(settings.TASK_HEARTBEAT_SECONDS)
+                if self._leased_tasks:
+                    async with get_async_session() as db:
+                        await self.durable_queue.heartbeat(db, list(self._leased_tasks))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in lease heartbeat: {e}")
 
-                                logger.info(f"Cleaned up stuck task {task.task_id}")
-                            except Exception as e:
-                                logger.error(f"Error cleaning up task {task.task_id}: {e}")
-                                await db.rollback()
+    async def _lease_recovery_loop(self):
+        """Re-dispatch tasks whose worker lease expired, failing those out of attempts"""
+        while self.is_processing:
+            try:
+                await self._recover_expired_leases()
+                await asyncio.sleep(settings.TASK_RECOVERY_INTERVAL_SECONDS)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in lease recovery: {e}")
+                await asyncio.sleep(settings.TASK_RECOVERY_INTERVAL_SECONDS)
 
+    async def _disconnect_watch_loop(self):
+        """Cancel running tasks whose SSE clients stayed away past the grace period"""
+        while self.is_processing:
+            try:
+                await asyncio.sleep(1.0)
+                for task_id in list(self._leased_tasks):
+                    if self._is_abandoned(task_id):
+                        self._cancel_abandoned_task(task_id)
             except asyncio.CancelledError:
-                logger.info("Cleanup job cancelled")
                 break
             except Exception as e:
-                logger.error(f"Error in cleanup job: {e}")
-                await asyncio.sleep(60)  # Wait 1 minute before retrying on error
+                logger.error(f"Error in disconnect watch: {e}")
+
+    def _is_abandoned(self, task_id: str) -> bool:
+        """Whether the task had SSE clients and none came back within the grace period"""
+        grace = settings.SSE_DISCONNECT_GRACE_SECONDS
+        if grace <= 0:
+            return False
+        detached = self.presence.detached_seconds(task_id)
+        return detached is not None and detached >= grace
+
+    def _cancel_abandoned_task(self, task_id: str):
+        """
+        Cancel a running task through its streaming processor
+
+        The running stage (RAG or LLM) is cancelled, the processor's cancel
+        hooks cancel the retry budget so a threaded LLM call stops streaming,
+        and process_task fails and refunds the task. Tasks not started yet are
+        failed uncharged by process_task itself.
+        """
+        processor = get_streaming_processor(task_id)
+        if processor is None or processor.is_cancelled:
+            return
+        reason = f"no client connected for {settings.SSE_DISCONNECT_GRACE_SECONDS:g}s"
+        logger.info(f"[DISCONNECT] Cancelling task {task_id}: {reason}")
+        processor.cancel(reason)
+
+    async def _recover_expired_leases(self):
+        """
+        Run one reaper pass
+
+        Expired leases are requeued or failed, never-claimed unleased tasks older
+        than TASK_STALE_SECONDS are failed, and every failed task is refunded, all
+        in one transaction.
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.TASK_STALE_SECONDS)
+        async with get_async_session() as db:
+            reaped = await self.durable_queue.reap(db, stale_before=stale_before)
+            refunded = await self._refund_tasks(db, reaped.failed) if reaped.failed else set()
+            await db.commit()
+
+        for task in reaped.failed:
+            self.progress_writer.discard(task.task_id)
+            # Not sequenced: this process did not run the task and has no ids for it
+            await self.send_transient_event(task.task_id, {
+                "type": "error",
+                "error": "Processing was interrupted. Your coins have been refunded."
+                if task.task_id in refunded else "Processing was interrupted. Please try again.",
+                "retry_allowed": True
+            })
+
+        if reaped.requeued:
+            self._wake_dispatcher()
+
+    async def _refund_tasks(self, db: AsyncSession, tasks: List[ChatTask]) -> Set[str]:
+        """
+        Refund several failed tasks in the caller's transaction
+
+        Same safety checks as _refund_coins (charged, not yet refunded, not
+        completed), but with one query each for charges, refunds and wallets
+        instead of a session and three lookups per task. Does not commit.
+
+        Returns:
+            IDs of the refunded tasks
+        """
+        from app.models.transaction import TransactionType, TransactionStatus, Transaction
+        from app.models.wallet import Wallet
+
+        tasks = [task for task in tasks if task.status != TaskStatus.COMPLETED]
+        if not tasks:
+            return set()
+
+        charge_refs = {f"chat_task_{task.task_id}": task for task in tasks}
+        refund_refs = {f"refund_task_{task.task_id}": task for task in tasks}
+
+        charged = await db.execute(
+            select(Transaction.reference_id).where(
+                Transaction.reference_id.in_(list(charge_refs)),
+                Transaction.type == TransactionType.SPEND
+            )
+        )
+        charged_ids = {charge_refs[ref].task_id for ref in charged.scalars()}
+        refunded = await db.execute(
+            select(Transaction.reference_id).where(
+                Transaction.reference_id.in_(list(refund_refs)),
+                Transaction.type == TransactionType.REFUND
+            )
+        )
+        already_refunded = {refund_refs[ref].task_id for ref in refunded.scalars()}
+
+        to_refund = [
+            task for task in tasks
+            if task.task_id in charged_ids and task.task_id not in already_refunded
+        ]
+        if not to_refund:
+            return set()
+
+        wallets = await db.execute(
+            select(Wallet)
+            .where(Wallet.user_id.in_({task.user_id for task in to_refund}))
+            .with_for_update()
+        )
+        wallet_by_user = {wallet.user_id: wallet for wallet in wallets.scalars()}
+
+        # Pre-assign primary keys like TransactionService does (SQLite does not
+        # autoincrement the BigInteger txn_id)
+        next_txn_id = (await db.scalar(select(func.max(Transaction.txn_id))) or 0) + 1
+
+        refunded_ids = set()
+        for task in to_refund:
+            wallet = wallet_by_user.get(task.user_id)
+            if not wallet:
+                logger.error(f"Cannot refund: Wallet not found for user {task.user_id}")
+                continue
+            reason = task.error_message or "Task failed"
+            db.add(Transaction(
+                txn_id=next_txn_id,
+                wallet_id=wallet.wallet_id,
+                type=TransactionType.REFUND,
+                amount=5,
+                reference_id=f"refund_task_{task.task_id}",
+                status=TransactionStatus.SUCCESS,
+                description=f"Refund for failed task: {reason[:100]}"
+            ))
+            wallet.balance += 5
+            next_txn_id += 1
+            refunded_ids.add(task.task_id)
+
+        self.batched_refunds += len(refunded_ids)
+        logger.info(f"[REAPER] Refunded {len(refunded_ids)}/{len(tasks)} failed task(s) in one transaction")
+        return refunded_ids
 
     async def stop_processing(self):
         """Stop the background task processor and worker pool"""
@@ -222,6 +695,9 @@ class TaskQueueService:
         # Stop the worker pool
         await self.worker_pool.stop()
 
+        # Persist the last progress of tasks that were still running
+        await self.progress_writer.stop()
+
         logger.info("Task queue processor stopped")
 
     async def process_queued_tasks(self):
@@ -408,6 +884,9 @@ class TaskQueueService:
                     logger.error(f"Task {task_id} not found")
                     return
 
+                # Event ids of this run start over under its attempt number
+                self._event_seq[task_id] = (task.attempts or 0, 0)
+
                 # Create streaming processor
                 streaming_processor = create_streaming_processor(
                     task_id,
@@ -423,20 +902,44 @@ class TaskQueueService:
                     logger.warning(f"Task {task_id} is not queued (status: {task.status})")
                     return
 
+                # Its clients left while it waited in the queue: fail it before charging
+                if self._is_abandoned(task_id):
+                    logger.info(f"[DISCONNECT] Task {task_id} abandoned before processing, not charging")
+                    task.set_error("Cancelled: the client disconnected before processing started")
+                    await db.commit()
+                    self.abandoned_before_start += 1
+                    await self.send_sse_event(task_id, {
+                        "type": "error",
+                        "error": "Cancelled because the connection was lost. No coins were charged.",
+                        "retry_allowed": True
+                    })
+                    return
+
                 # Deduct coins NOW (when processing actually starts)
                 try:
                     from app.services.transaction_service import TransactionService
-                    from app.models.transaction import TransactionType, TransactionStatus
+                    from app.models.transaction import TransactionType, TransactionStatus, Transaction
                     from app.models.wallet import Wallet
                     from sqlalchemy import select
 
+                    # A task re-dispatched after a lease expiry was already charged
+                    existing_charge = await db.execute(
+                        select(Transaction.txn_id).where(
+                            Transaction.reference_id == f"chat_task_{task_id}",
+                            Transaction.type == TransactionType.SPEND
+                        )
+                    )
+                    already_charged = existing_charge.first() is not None
+
                     # Get user's wallet with row lock
                     wallet_result = await db.execute(
                         select(Wallet).where(Wallet.user_id == task.user_id).with_for_update()
                     )
                     wallet = wallet_result.scalar_one_or_none()
 
-                    if not wallet or wallet.balance < 5:
+                    if already_charged:
+                        logger.info(f"Task {task_id} was already charged (attempt {task.attempts}), skipping deduction")
+                    elif not wallet or wallet.balance < 5:
                         error_msg = "Insufficient coins" if wallet else "Wallet not found"
                         task.set_error(error_msg)
                         await db.commit()
@@ -446,26 +949,26 @@ class TaskQueueService:
                             "retry_allowed": False
                         })
                         return
+                    else:
+                        # Create transaction for coin deduction
+                        transaction_service = TransactionService(db)
+                        transaction = await transaction_service.create_pending_transaction(
+                            wallet_id=wallet.wallet_id,
+                            transaction_type=TransactionType.SPEND,
+                            amount=-5,
+                            reference_id=f"chat_task_{task_id}",
+                            description=f"Fortune interpretation for {task.deity_id} #{task.fortune_number}"
+                        )
 
-                    # Create transaction for coin deduction
-                    transaction_service = TransactionService(db)
-                    transaction = await transaction_service.create_pending_transaction(
-                        wallet_id=wallet.wallet_id,
-                        transaction_type=TransactionType.SPEND,
-                        amount=-5,
-                        reference_id=f"chat_task_{task_id}",
-                        description=f"Fortune interpretation for {task.deity_id} #{task.fortune_number}"
-                    )
-
-                    # Update wallet balance
-                    wallet.balance -= 5
-                    db.add(wallet)
+                        # Update wallet balance
+                        wallet.balance -= 5
+                        db.add(wallet)
 
-                    # Complete the transaction
-                    await transaction_service.complete_transaction(transaction.txn_id, TransactionStatus.SUCCESS)
-                    await db.commit()
+                        # Complete the transaction
+                        await transaction_service.complete_transaction(transaction.txn_id, TransactionStatus.SUCCESS)
+                        await db.commit()
 
-                    logger.info(f"Deducted 5 coins from user {task.user_id} for task {task_id} (new balance: {wallet.balance})")
+                        logger.info(f"Deducted 5 coins from user {task.user_id} for task {task_id} (new balance: {wallet.balance})")
 
                 except Exception as coin_error:
                     logger.error(f"Failed to deduct coins for task {task_id}: {coin_error}", exc_info=True)
@@ -662,6 +1165,28 @@ class TaskQueueService:
             # Refund coins on timeout
             await self._refund_coins(task_id, "Task timeout")
             raise  # Re-raise to be handled by timeout wrapper
+        except ProcessingCancelled as e:
+            # No SSE client came back within the grace period (see _cancel_abandoned_task)
+            logger.info(f"[DISCONNECT] Task {task_id} cancelled during {e.stage_name}: {e.reason}")
+            self.disconnect_cancellations += 1
+            await self._refund_coins(task_id, f"Cancelled: {e.reason}")
+
+            try:
+                async with get_async_session() as db:
+                    if task_id in self.active_tasks:
+                        task = self.active_tasks[task_id]
+                        task.set_error(f"Cancelled: {e.reason}")
+                        await db.merge(task)
+                        await db.commit()
+
+                    # Ends the stream of a client that reconnects right now
+                    await self.send_sse_event(task_id, {
+                        "type": "error",
+                        "error": "Cancelled because the connection was lost. Your coins have been refunded.",
+                        "retry_allowed": True
+                    })
+            except Exception as commit_error:
+                logger.error(f"Failed to save cancelled state for task {task_id}: {commit_error}")
         except Exception as e:
             logger.error(f"Error processing task {task_id}: {e}")
             if streaming_processor:
@@ -737,10 +1262,20 @@ class TaskQueueService:
         status_code: int,
         db: AsyncSession
     ):
-        """Update task progress and notify SSE clients with status code"""
+        """
+        Update task progress and notify SSE clients with status code
+
+        Clients follow progress through the event; the row is only updated by
+        the next batched checkpoint. Terminal states are committed by the
+        caller together with the result or error.
+        """
         # Store status code as message for database compatibility
         task.update_progress(status, progress, f"status_code:{status_code}")
-        await db.commit()
+        self.stage_timings.observe(task.task_id, status)
+        if self.progress_writer.write_through:
+            await db.commit()
+        else:
+            self.progress_writer.record(task)
 
         # Send progress event to SSE clients with status code
         await self.send_sse_event(task.task_id, {
@@ -750,6 +1285,36 @@ class TaskQueueService:
             "status_code": status_code
         })
 
+    def get_live_progress(self, task: ChatTask) -> Dict[str, Any]:
+        """
+        Status, progress and status code of a task as clients should see them
+
+        Progress of a running task is checkpointed lazily, so the state built
+        from its events is fresher than the row.
+        """
+        status_code = None
+        if task.status_message and task.status_message.startswith("status_code:"):
+            try:
+                status_code = int(task.status_message.split(":")[1])
+            except (IndexError, ValueError):
+                pass
+        live = {
+            "status": task.status.value,
+            "progress": task.progress,
+            "status_code": status_code,
+            "message": task.status_message
+        }
+
+        state = task_state_registry.get(task.task_id)
+        if task.status == TaskStatus.QUEUED and state is not None and state.queue_position is not None:
+            live.update(queue_position=state.queue_position, estimated_wait_seconds=state.estimated_wait_seconds)
+        if (task.status not in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+                and state is not None and state.status and not state.is_terminal):
+            live.update(status=state.status, progress=state.progress, status_code=state.status_code)
+            if state.status_code is not None:
+                live["message"] = f"status_code:{state.status_code}"
+        return live
+
     async def generate_response(self, task: ChatTask, poem_data) -> str:
         """Generate AI response for the task using the poem service (RAG + LLM)."""
         try:
@@ -761,38 +1326,31 @@ class TaskQueueService:
             except Exception:
                 pass
 
-            # Create streaming callback to send LLM tokens via SSE for better UX
-            accumulated_tokens = []
-            token_count = [0]  # Use list to allow modification in nested function
-            loop = asyncio.get_event_loop()  # Get event loop for thread safety
-
-            def llm_token_callback(token: str):
-                """Callback for streaming LLM tokens to frontend"""
-                try:
-                    accumulated_tokens.append(token)
-                    token_count[0] += 1
-
-                    # Send every 5 tokens or if it's a complete sentence
-                    if token_count[0] % 5 == 0 or token.endswith(('.', '!', '?', '\n')):
-                        # Schedule SSE event in the event loop (thread-safe)
-                        asyncio.run_coroutine_threadsafe(
-                            self.send_sse_event(task.task_id, {
-                                "type": "llm_streaming",
-                                "token": token,
-                                "partial_text": ''.join(accumulated_tokens[-50:]),  # Last 50 tokens
-                                "total_tokens": token_count[0]
-                            }),
-                            loop
-                        )
-                except Exception as e:
-                    logger.error(f"Error in LLM streaming callback: {e}")
-
-            result = await poem_service.generate_fortune_interpretation(
-                poem_data=poem_data,
-                question=task.question,
-                language=language,
-                streaming_callback=llm_token_callback  # Enable streaming!
+            # Stream LLM tokens via SSE for better UX, batched into frames on a fixed cadence
+            token_frames = TokenFrameAggregator(
+                send_frame=lambda frame: self.send_sse_event(task.task_id, frame),
+                interval_seconds=settings.LLM_STREAM_FLUSH_MS / 1000
             )
+            token_frames.start()
+
+            # Cancelling the task's streaming processor also stops the LLM retries and stream
+            retry_budget = poem_service.retry_policy.new_budget()
+            processor = get_streaming_processor(task.task_id)
+            if processor is not None:
+                processor.on_cancel(retry_budget.cancel)
+            try:
+                result = await poem_service.generate_fortune_interpretation(
+                    poem_data=poem_data,
+                    question=task.question,
+                    language=language,
+                    streaming_callback=token_frames.add,  # Thread-safe; called from the LLM thread
+                    retry_budget=retry_budget
+                )
+            finally:
+                await token_frames.stop()
+                logger.debug(
+                    f"[STREAM] Task {task.task_id}: {token_frames.total_tokens} tokens in {token_frames.frames_sent} frames"
+                )
             return result.interpretation
         except Exception as e:
             logger.error(f"LLM generation failed, falling back to simple response: {e}")
@@ -807,6 +1365,7 @@ class TaskQueueService:
         if task_id not in self.sse_connections:
             self.sse_connections[task_id] = []
         self.sse_connections[task_id].append(response_obj)
+        self._announce_presence(task_id)
         logger.info(f"Added SSE connection for task {task_id}")
 
     def remove_sse_connection(self, task_id: str, response_obj):
@@ -816,21 +1375,130 @@ class TaskQueueService:
                 self.sse_connections[task_id].remove(response_obj)
                 if not self.sse_connections[task_id]:
                     del self.sse_connections[task_id]
+                self._announce_presence(task_id)
             except ValueError:
                 pass
 
+    def _announce_presence(self, task_id: str):
+        """Record this node's subscriber count for a task and queue it for the other nodes"""
+        self.presence.report(task_id, self.event_bus.node_id, len(self.sse_connections.get(task_id, [])))
+        self._presence_changed.add(task_id)
+        self._presence_wakeup.set()
+
+    async def _presence_loop(self):
+        """Publish this node's SSE subscriber counts: changes right away, all of them every heartbeat"""
+        heartbeat = settings.SSE_PRESENCE_HEARTBEAT_SECONDS
+        next_heartbeat = time.monotonic() + heartbeat
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(
+                        self._presence_wakeup.wait(),
+                        timeout=max(0.0, next_heartbeat - time.monotonic())
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._presence_wakeup.clear()
+                task_ids = self._presence_changed
+                self._presence_changed = set()
+                if time.monotonic() >= next_heartbeat:
+                    task_ids.update(self.sse_connections)
+                    next_heartbeat = time.monotonic() + heartbeat
+
+                for task_id in task_ids:
+                    await self.event_bus.publish(task_id, {
+                        "type": "presence",
+                        "node_id": self.event_bus.node_id,
+                        "subscribers": len(self.sse_connections.get(task_id, []))
+                    })
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"[PRESENCE] Failed to announce SSE subscribers: {e}")
+                await asyncio.sleep(heartbeat)
+
+    async def start_event_bus(self):
+        """Connect to the task event bus (API nodes and workers)"""
+        await self.event_bus.start()
+        logger.info(f"Task event bus started ({self.event_bus.backend})")
+
+        # Workers on other nodes need to know whether anyone still follows their tasks
+        if settings.SSE_DISCONNECT_GRACE_SECONDS > 0 and self._presence_task is None:
+            self._presence_task = asyncio.create_task(self._presence_loop())
+
+    async def stop_event_bus(self):
+        if self._presence_task:
+            self._presence_task.cancel()
+            await asyncio.gather(self._presence_task, return_exceptions=True)
+            self._presence_task = None
+        await self.event_bus.stop()
+
     async def send_sse_event(self, task_id: str, data: dict):
-        """Send SSE event to all connected clients for a task"""
+        """Publish a task event; every node forwards it to its own SSE clients"""
+        run, seq = self._event_seq.get(task_id, (0, 0))
+        event_id = (run, seq + 1)
+        if data.get("type") in ("complete", "error"):
+            self._event_seq.pop(task_id, None)
+        else:
+            self._event_seq[task_id] = event_id
+
+        try:
+            await self.event_bus.publish(task_id, {**data, "event_id": event_id})
+        except Exception as e:
+            # Clients still get the final state from the DB when they reconnect
+            logger.warning(f"Failed to publish event for task {task_id}: {e}")
+
+    async def send_transient_event(self, task_id: str, data: dict):
+        """
+        Publish a task event that is not replayed
+
+        The event carries no event id: it does not consume the task's sequence
+        numbers and never enters the replay buffer, so it can come from a
+        process other than the one running the task (e.g. queue positions).
+        Reconnecting clients get the latest value from the state registry.
+        """
+        try:
+            await self.event_bus.publish(task_id, data)
+        except Exception as e:
+            logger.warning(f"Failed to publish event for task {task_id}: {e}")
+
+    async def _on_task_event(self, task_id: str, data: dict):
+        """Handle a task event from the bus: record state and replay frame, then forward to local clients"""
+        if data.get("type") == "presence":
+            # Subscriber announcements are for workers, not for clients or the replay buffer
+            self.presence.report(task_id, data.get("node_id"), data.get("subscribers", 0))
+            return
+        if data.get("type") == "task_queued":
+            self._wake_dispatcher()
+            return
+        if data.get("type") in ("complete", "error"):
+            self.presence.forget(task_id)
+            # The task may have run on another process; drop any sequence kept for it here
+            self._event_seq.pop(task_id, None)
+
+        data = dict(data)
+        event_id = data.pop("event_id", None)
+        if event_id is not None:
+            event_id = tuple(event_id)  # JSON buses deliver it as a list
+        task_state_registry.apply_event(task_id, data)
+
+        event_data = format_sse_event(data, event_id)
+        if event_id is not None:
+            self.event_buffer.append(task_id, event_id, event_data)
+        elif data.get("type") in ("complete", "error"):
+            # Ended outside the run that filled the buffer; reconnects read the DB instead
+            self.event_buffer.discard(task_id)
+        await self._deliver_sse_event(task_id, event_data, data.get("type"))
+
+    async def _deliver_sse_event(self, task_id: str, event_data: str, event_type: Optional[str] = None):
+        """Send an encoded SSE frame to all clients connected to this node for the task"""
         if task_id not in self.sse_connections:
             return
 
-        import json
-        event_data = f"data: {json.dumps(data)}\n\n"
-
         try:
             # Lightweight debug log to trace timing of outbound SSE
             logger.debug(
-                f"SSE send -> task={task_id} type={data.get('type')} at {datetime.now().isoformat()} to {len(self.sse_connections.get(task_id, []))} clients"
+                f"SSE send -> task={task_id} type={event_type} at {datetime.now().isoformat()} to {len(self.sse_connections.get(task_id, []))} clients"
             )
         except Exception:
             pass
@@ -838,7 +1506,7 @@ class TaskQueueService:
         # Send to all connected clients
         for response_obj in self.sse_connections[task_id][:]:  # Copy list to avoid modification during iteration
             try:
-                await response_obj.send(event_data)
+                await response_obj.send(event_data, event_type)
             except Exception as e:
                 logger.warning(f"Failed to send SSE event to client: {e}")
                 self.remove_sse_connection(task_id, response_obj)
@@ -1024,6 +1692,37 @@ class TaskQueueService:
                 }
             },
             "worker_pool": pool_metrics,
+            "durable_queue": {
+                **self.durable_queue.get_metrics(),
+                "leased_tasks": len(self._leased_tasks),
+                "reaper_refunds": self.batched_refunds
+            },
+            "event_bus": {
+                **self.event_bus.get_metrics(),
+                "local_sse_tasks": len(self.sse_connections)
+            },
+            "task_states": task_state_registry.get_metrics(),
+            "sse_replay": self.event_buffer.get_metrics(),
+            "llm_retries": poem_service.retry_metrics.get_metrics(),
+            "llm_gateway": poem_service.llm_gateway.get_metrics(),
+            "llm_failover": poem_service.get_llm_failover_metrics(),
+            "progress_checkpoints": self.progress_writer.get_metrics(),
+            "fair_scheduling": self.fair_scheduler.get_metrics() if self.fair_scheduler else {"enabled": False},
+            "disconnect_cancellation": {
+                "grace_seconds": settings.SSE_DISCONNECT_GRACE_SECONDS,
+                "cancelled_in_flight": self.disconnect_cancellations,
+                "abandoned_before_start": self.abandoned_before_start,
+                **self.presence.get_metrics()
+            },
+            "deduplication": {
+                "deduplicated_requests": self.deduplicated_requests,
+                "idempotent_replays": self.idempotent_replays,
+                "window_seconds": settings.TASK_DEDUPE_WINDOW_SECONDS
+            },
+            "interpretation_cache": {
+                "enabled": settings.INTERPRETATION_CACHE_ENABLED,
+                **poem_service.interpretation_cache.get_metrics()
+            },
             "timestamp": datetime.now().isoformat()
         }
 
@@ -0,0 +1,155 @@
+"""
+In-memory registry of chat task states
+
+Every node applies the task events it receives from the event bus, so SSE
+generators can detect status transitions and terminal states from memory
+instead of re-reading chat_tasks every second. The database stays the
+source of truth and is read once when a client connects.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+@dataclass
+class TaskState:
+    """Latest known state of a task on this node"""
+
+    task_id: str
+    status: Optional[str] = None
+    progress: int = 0
+    status_code: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    retry_allowed: bool = True
+    queue_position: Optional[int] = None  # While waiting for a worker (fair scheduler estimate)
+    estimated_wait_seconds: Optional[float] = None
+    updated_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def is_terminal(self) -> bool:
+        """True once the final result or error is known"""
+        return (self.status == COMPLETED and self.result is not None) or self.status == FAILED
+
+
+class TaskStateRegistry:
+    """
+    Task states keyed by task_id, updated from task events
+
+    Terminal states are kept for terminal_ttl_seconds so late SSE clients still
+    see them; states that stop changing are dropped after stale_ttl_seconds.
+    """
+
+    def __init__(self, terminal_ttl_seconds: float = 600, stale_ttl_seconds: float = 1800):
+        self.terminal_ttl_seconds = terminal_ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self._states: Dict[str, TaskState] = {}
+
+        # Metrics
+        self.updates = 0
+        self.pruned = 0
+
+    def get(self, task_id: str) -> Optional[TaskState]:
+        return self._states.get(task_id)
+
+    def apply_event(self, task_id: str, data: Dict[str, Any]) -> Optional[TaskState]:
+        """
+        Update the state of a task from an SSE event payload
+
+        Args:
+            task_id: Task the event belongs to
+            data: Event payload ("status", "queue_position", "complete" or "error"; others are ignored)
+
+        Returns:
+            The updated state, or None if the event carries no state
+        """
+        event_type = data.get("type")
+        if event_type not in ("status", "queue_position", "complete", "error"):
+            return None
+
+        state = self._states.get(task_id)
+        if state is None:
+            state = self._states[task_id] = TaskState(task_id=task_id)
+        elif state.is_terminal:
+            # Terminal states are final; late progress events must not revive them
+            return state
+
+        if event_type == "queue_position":
+            state.queue_position = data.get("position")
+            state.estimated_wait_seconds = data.get("estimated_wait_seconds")
+        elif event_type == "status":
+            state.status = data.get("status", state.status)
+            state.progress = data.get("progress", state.progress)
+            state.status_code = data.get("status_code", state.status_code)
+            # A worker picked the task up
+            state.queue_position = None
+            state.estimated_wait_seconds = None
+        elif event_type == "complete":
+            state.status = COMPLETED
+            state.progress = 100
+            state.result = data.get("result") or {}
+        else:
+            state.status = FAILED
+            state.error = data.get("error")
+            state.retry_allowed = data.get("retry_allowed", True)
+
+        self._touch(state)
+        return state
+
+    @staticmethod
+    def state_from_task(task) -> TaskState:
+        """Build a state from a ChatTask row (used by the DB fallback)"""
+        status = task.status.value
+        state = TaskState(task_id=task.task_id, status=status, progress=task.progress or 0)
+        if status == COMPLETED:
+            state.result = {
+                "response": task.response_text,
+                "confidence": task.confidence,
+                "sources_used": task.sources_used,
+                "processing_time_ms": task.processing_time_ms,
+                "can_generate_report": task.can_generate_report == "true"
+            }
+        elif status == FAILED:
+            state.error = task.error_message
+        return state
+
+    def _touch(self, state: TaskState):
+        state.updated_at = time.monotonic()
+        self.updates += 1
+
+        if self.updates % 256 == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired terminal and stale states"""
+        now = time.monotonic()
+        expired = [
+            task_id for task_id, state in self._states.items()
+            if now - state.updated_at > (
+                self.terminal_ttl_seconds if state.is_terminal else self.stale_ttl_seconds
+            )
+        ]
+        for task_id in expired:
+            del self._states[task_id]
+        if expired:
+            self.pruned += len(expired)
+            logger.debug(f"[TASK_STATE] Pruned {len(expired)} task states")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "tracked_tasks": len(self._states),
+            "terminal_tasks": sum(1 for state in self._states.values() if state.is_terminal),
+            "updates": self.updates,
+            "pruned": self.pruned
+        }
+
+
+# Global task state registry
+task_state_registry = TaskStateRegistry()
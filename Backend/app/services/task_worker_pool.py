@@ -6,11 +6,12 @@ import asyncio
 import logging
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set
+from typing import Awaitable, Callable, Dict, List, Optional, Set
 from dataclasses import dataclass
 from enum import Enum
 
 from app.models.chat_task import ChatTask, TaskStatus
+from app.services.pool_autoscaler import LoadSignals, PoolAutoscaler
 
 logger = logging.getLogger(__name__)
 
@@ -60,40 +61,76 @@ class WorkerMetrics:
 class TaskWorkerPool:
     """
     Manages a pool of workers for concurrent task processing
+
+    With an autoscaler and a load probe the pool resizes itself between
+    min_workers and max_workers; without them it runs a fixed size.
+
+    Args:
+        max_workers: Upper bound of the pool (the fixed size without an autoscaler)
+        worker_timeout: Seconds a single task may run
+        min_workers: Lower bound of the pool (defaults to max_workers)
+        initial_workers: Workers started at boot (defaults to max_workers)
+        autoscaler: Controller deciding the pool size
+        load_probe: Async callable returning the LoadSignals for each evaluation
+        autoscale_interval: Seconds between two evaluations
     """
 
-    def __init__(self, max_workers: int = 3, worker_timeout: float = 120.0):
+    def __init__(
+        self,
+        max_workers: int = 3,
+        worker_timeout: float = 120.0,
+        min_workers: Optional[int] = None,
+        initial_workers: Optional[int] = None,
+        autoscaler: Optional[PoolAutoscaler] = None,
+        load_probe: Optional[Callable[[], Awaitable[LoadSignals]]] = None,
+        autoscale_interval: float = 5.0
+    ):
         self.max_workers = max_workers
+        self.min_workers = min(min_workers or max_workers, max_workers)
+        self.target_workers = self._clamp(initial_workers or max_workers)
         self.worker_timeout = worker_timeout
+        self.autoscaler = autoscaler
+        self.load_probe = load_probe
+        self.autoscale_interval = autoscale_interval
+        self.idle_poll_seconds = 5.0  # Idle workers re-check shutdown and retirement this often
         self.workers: Dict[str, WorkerMetrics] = {}
         self.task_queue: asyncio.Queue = asyncio.Queue()
         self.active_tasks: Dict[str, str] = {}  # task_id -> worker_id
         self.worker_tasks: Dict[str, asyncio.Task] = {}  # worker_id -> asyncio.Task
+        self._background_tasks: List[asyncio.Task] = []  # monitoring and autoscaling loops
         self.is_running = False
         self._shutdown_event = asyncio.Event()
 
         # Pool metrics
         self.total_tasks_processed = 0
         self.total_tasks_failed = 0
+        self.retired_workers = 0
+        self._next_worker_number = 1
         self.pool_started_at = datetime.now()
 
+    def _clamp(self, workers: int) -> int:
+        return max(self.min_workers, min(self.max_workers, workers))
+
     async def start(self):
         """Start the worker pool"""
         if self.is_running:
             logger.warning("Worker pool is already running")
             return
 
-        logger.info(f"Starting worker pool with {self.max_workers} workers")
+        logger.info(
+            f"Starting worker pool with {self.target_workers} workers "
+            f"(bounds {self.min_workers}-{self.max_workers}, autoscaling {'on' if self.autoscaler else 'off'})"
+        )
         self.is_running = True
         self._shutdown_event.clear()
 
         # Start workers
-        for i in range(self.max_workers):
-            worker_id = f"worker-{i+1}"
-            await self._start_worker(worker_id)
+        await self.scale_to(self.target_workers)
 
         # Start monitoring task
-        asyncio.create_task(self._monitor_workers())
+        self._background_tasks.append(asyncio.create_task(self._monitor_workers()))
+        if self.autoscaler and self.load_probe:
+            self._background_tasks.append(asyncio.create_task(self._autoscale_loop()))
 
         logger.info(f"Worker pool started successfully with {len(self.workers)} workers")
 
@@ -106,8 +143,12 @@ class TaskWorkerPool:
         self.is_running = False
         self._shutdown_event.set()
 
+        for background_task in self._background_tasks:
+            background_task.cancel()
+        self._background_tasks.clear()
+
         # Cancel all worker tasks
-        for worker_id, worker_task in self.worker_tasks.items():
+        for worker_id, worker_task in list(self.worker_tasks.items()):
             if not worker_task.done():
                 worker_task.cancel()
                 try:
@@ -158,6 +199,50 @@ class TaskWorkerPool:
         await self.task_queue.put(task_item)
         logger.info(f"Task {task_id} submitted to worker pool (queue size: {self.task_queue.qsize()})")
 
+    async def scale_to(self, workers: int):
+        """
+        Resize the pool
+
+        New workers start right away; surplus workers finish their current
+        task and exit the next time they are idle.
+        """
+        previous = self.target_workers
+        self.target_workers = self._clamp(workers)
+        while len(self.worker_tasks) < self.target_workers:
+            worker_id = f"worker-{self._next_worker_number}"
+            self._next_worker_number += 1
+            await self._start_worker(worker_id)
+        if self.target_workers != previous:
+            logger.info(f"Worker pool resized: {previous} -> {self.target_workers} workers")
+
+    def _retire_if_surplus(self, worker_id: str) -> bool:
+        """Remove an idle worker while the pool is above its target size"""
+        if not self.is_running or len(self.worker_tasks) <= self.target_workers:
+            return False
+        self.worker_tasks.pop(worker_id, None)
+        self.workers.pop(worker_id, None)
+        self.retired_workers += 1
+        logger.info(f"Retired idle worker {worker_id} ({len(self.worker_tasks)} remaining)")
+        return True
+
+    async def _autoscale_loop(self):
+        """Periodically let the autoscaler resize the pool"""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.autoscale_interval)
+                if not self.is_running:
+                    break
+
+                signals = await self.load_probe()
+                decision = self.autoscaler.evaluate(self.target_workers, signals)
+                if decision.changed:
+                    await self.scale_to(decision.target)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in worker pool autoscaling: {e}")
+
     async def _start_worker(self, worker_id: str):
         """Start a single worker"""
         worker_metrics = WorkerMetrics(
@@ -181,11 +266,13 @@ class TaskWorkerPool:
 
         try:
             while self.is_running and not self._shutdown_event.is_set():
+                if self._retire_if_surplus(worker_id):
+                    break
                 try:
                     # Wait for a task with timeout
                     task_item = await asyncio.wait_for(
                         self.task_queue.get(),
-                        timeout=5.0  # Check shutdown every 5 seconds
+                        timeout=self.idle_poll_seconds
                     )
 
                     await self._process_task_item(worker_id, task_item)
@@ -323,7 +410,11 @@ class TaskWorkerPool:
         return {
             'pool_status': {
                 'is_running': self.is_running,
+                'min_workers': self.min_workers,
                 'max_workers': self.max_workers,
+                'target_workers': self.target_workers,
+                'live_workers': len(self.worker_tasks),
+                'retired_workers': self.retired_workers,
                 'active_workers': len([w for w in self.workers.values() if w.status == WorkerStatus.BUSY]),
                 'idle_workers': len([w for w in self.workers.values() if w.status == WorkerStatus.IDLE]),
                 'error_workers': len([w for w in self.workers.values() if w.status == WorkerStatus.ERROR]),
@@ -338,7 +429,8 @@ class TaskWorkerPool:
                 'total_tasks_failed': self.total_tasks_failed,
                 'success_rate': (self.total_tasks_processed / max(1, self.total_tasks_processed + self.total_tasks_failed)) * 100
             },
-            'workers': worker_metrics
+            'workers': worker_metrics,
+            'autoscaler': self.autoscaler.get_metrics() if self.autoscaler else None
         }
 
     def is_task_active(self, task_id: str) -> bool:
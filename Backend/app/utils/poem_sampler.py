@@ -0,0 +1,192 @@
+"""
+Weighted random poem sampling with precomputed alias tables
+
+Builds Vose alias tables from the fortune-type weights so every draw is O(1)
+instead of the linear cumulative-weight scan in get_random_poem_selection().
+"""
+
+import logging
+import random
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from app.utils.poem_utils import FORTUNE_WEIGHTS, parse_fortune_type
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Rejection attempts per requested item before falling back to an exact
+# weighted draw over the remaining items (only hit when count ~ population)
+MAX_REJECTIONS_PER_DRAW = 16
+
+
+class AliasTable:
+    """
+    Vose alias method table for O(1) sampling from a discrete distribution
+    """
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float], rng: Optional[random.Random] = None):
+        if len(items) != len(weights):
+            raise ValueError("items and weights must have the same length")
+
+        self.items: List[T] = list(items)
+        self.weights: List[float] = [max(0.0, float(w)) for w in weights]
+        self.rng = rng or random.Random()
+
+        n = len(self.items)
+        self._prob: List[float] = [0.0] * n
+        self._alias: List[int] = [0] * n
+
+        total = sum(self.weights)
+        if n == 0 or total <= 0:
+            # Degenerate table: fall back to uniform draws
+            self._prob = [1.0] * n
+            self._alias = list(range(n))
+            return
+
+        scaled = [w * n / total for w in self.weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        # Remaining entries are 1.0 up to floating point error
+        for i in large + small:
+            self._prob[i] = 1.0
+            self._alias[i] = i
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def draw_index(self) -> int:
+        """Draw one index in O(1)"""
+        column = self.rng.randrange(len(self.items))
+        return column if self.rng.random() < self._prob[column] else self._alias[column]
+
+    def draw(self) -> T:
+        """Draw one item with replacement"""
+        if not self.items:
+            raise IndexError("cannot draw from an empty alias table")
+        return self.items[self.draw_index()]
+
+    def sample(self, count: int) -> List[T]:
+        """
+        Draw up to `count` distinct items (without replacement)
+
+        Uses rejection of already-drawn indexes, which stays O(1) per draw while
+        count is small relative to the population, and switches to an exact
+        weighted draw over the remainder if rejections pile up.
+        """
+        n = len(self.items)
+        if count <= 0 or n == 0:
+            return []
+        if count >= n:
+            indexes = list(range(n))
+            self.rng.shuffle(indexes)
+            return [self.items[i] for i in indexes]
+
+        chosen: List[int] = []
+        seen = set()
+        rejections = 0
+        while len(chosen) < count:
+            if rejections > MAX_REJECTIONS_PER_DRAW * count:
+                chosen.extend(self._weighted_remainder(seen, count - len(chosen)))
+                break
+            index = self.draw_index()
+            if index in seen:
+                rejections += 1
+                continue
+            seen.add(index)
+            chosen.append(index)
+
+        return [self.items[i] for i in chosen]
+
+    def _weighted_remainder(self, seen: set, count: int) -> List[int]:
+        """Sequential weighted draw without replacement over unseen indexes"""
+        remaining = [(i, self.weights[i]) for i in range(len(self.items)) if i not in seen]
+        picked = []
+        for _ in range(count):
+            if not remaining:
+                break
+            total = sum(w for _, w in remaining)
+            if total <= 0:
+                position = self.rng.randrange(len(remaining))
+            else:
+                r = self.rng.uniform(0, total)
+                position = len(remaining) - 1
+                for pos, (_, w) in enumerate(remaining):
+                    r -= w
+                    if r <= 0:
+                        position = pos
+                        break
+            picked.append(remaining.pop(position)[0])
+        return picked
+
+
+def fortune_weight(fortune: str) -> float:
+    """Selection weight for a raw fortune string"""
+    return FORTUNE_WEIGHTS.get(parse_fortune_type(fortune or ""), 1.0)
+
+
+class PoemSampler:
+    """
+    Per-temple and global alias tables over the poem catalog
+
+    Tables are rebuilt lazily whenever the catalog version changes, so admin
+    writes are picked up on the next draw.
+    """
+
+    def __init__(self, catalog, rng: Optional[random.Random] = None):
+        self.catalog = catalog
+        self.rng = rng or random.Random()
+        self._tables: Dict[Optional[str], AliasTable] = {}
+        self._built_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _rebuild(self):
+        tables: Dict[Optional[str], AliasTable] = {}
+        all_keys: List[Tuple[str, int]] = []
+        all_weights: List[float] = []
+
+        for temple in self.catalog.temples():
+            # Pending poems have no ChromaDB data to serve yet
+            entries = [entry for entry in self.catalog.entries(temple) if not entry.pending]
+            keys = [entry.key for entry in entries]
+            weights = [FORTUNE_WEIGHTS.get(entry.category, 1.0) for entry in entries]
+            tables[temple] = AliasTable(keys, weights, self.rng)
+            all_keys.extend(keys)
+            all_weights.extend(weights)
+
+        tables[None] = AliasTable(all_keys, all_weights, self.rng)
+        self._tables = tables
+        logger.debug(f"[SAMPLER] Rebuilt alias tables for {len(tables) - 1} temples ({len(all_keys)} poems)")
+
+    def _table(self, temple: Optional[str]) -> Optional[AliasTable]:
+        with self._lock:
+            if self._built_version != self.catalog.version:
+                self._rebuild()
+                self._built_version = self.catalog.version
+            return self._tables.get(temple)
+
+    def draw(self, temple: Optional[str] = None, count: int = 1) -> List[Tuple[str, int]]:
+        """
+        Draw distinct (temple, poem_id) keys weighted by fortune type
+
+        Args:
+            temple: Restrict draws to one temple (None draws across all temples)
+            count: Number of distinct poems to draw
+
+        Returns:
+            List of catalog keys (empty if the temple has no poems)
+        """
+        table = self._table(temple)
+        if not table:
+            return []
+        return table.sample(count)
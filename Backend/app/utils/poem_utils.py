@@ -14,6 +14,17 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Random selection weights per normalized fortune type (favor positive fortunes)
+FORTUNE_WEIGHTS = {
+    "great_fortune": 3.0,
+    "good_fortune": 2.5,
+    "small_fortune": 2.0,
+    "fortune": 1.5,
+    "neutral": 1.0,
+    "bad_fortune": 0.7,
+    "great_misfortune": 0.3
+}
+
 
 def generate_poem_id(temple: str, poem_id: int, section: str = "main") -> str:
     """Generate a unique poem chunk ID"""
@@ -213,15 +224,7 @@ def get_random_poem_selection(poems: List[Dict], count: int = 1) -> List[Dict]:
         return poems.copy()
     
     # Implement weighted selection favoring positive fortunes
-    fortune_weights = {
-        "great_fortune": 3.0,
-        "good_fortune": 2.5,
-        "small_fortune": 2.0,
-        "fortune": 1.5,
-        "neutral": 1.0,
-        "bad_fortune": 0.7,
-        "great_misfortune": 0.3
-    }
+    fortune_weights = FORTUNE_WEIGHTS
     
     # Calculate weights for each poem
     weighted_poems = []
@@ -0,0 +1,50 @@
+"""
+Request fingerprinting for in-flight deduplication of fortune questions
+
+Two submissions with the same user, deity, poem, language and (normalized)
+question produce the same fingerprint, so a double click or a client retry
+maps to the task already created instead of running the pipeline again.
+"""
+
+import hashlib
+import re
+import unicodedata
+from typing import Optional
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = "?!.。？！…~～ "
+
+
+class IdempotencyKeyReused(ValueError):
+    """An Idempotency-Key was replayed with a different request"""
+
+
+def normalize_question(question: str) -> str:
+    """Fold width, case, whitespace and trailing punctuation out of a question"""
+    text = unicodedata.normalize("NFKC", question or "").casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION)
+
+
+def request_fingerprint(
+    user_id: int,
+    deity_id: str,
+    fortune_number: int,
+    question: str,
+    language: Optional[str] = None
+) -> str:
+    """
+    Content hash identifying a fortune question
+
+    Args:
+        user_id: Asking user (fingerprints never match across users)
+        deity_id: Deity identifier
+        fortune_number: Poem number
+        question: User's question
+        language: Requested response language, if any
+
+    Returns:
+        Hex sha256 digest (64 characters)
+    """
+    parts = [str(user_id), deity_id, str(int(fortune_number)), language or "", normalize_question(question)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,71 @@
+"""
+Async single-flight request coalescing
+
+Concurrent callers asking for the same key share one in-flight coroutine
+instead of each running the expensive load (e.g. a ChromaDB lookup after a
+cache clear).
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent async calls by key
+
+    The shared load runs as its own task, so a caller being cancelled does not
+    cancel the work other callers are waiting on.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        # Metrics
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func() once per key among concurrent callers
+
+        Args:
+            key: Deduplication key
+            func: Zero-argument coroutine function performing the load
+
+        Returns:
+            The shared result (exceptions are re-raised to every caller)
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            logger.debug(f"[{self.name.upper()}] Coalesced call for key {key!r}")
+            return await asyncio.shield(future)
+
+        self.executions += 1
+        future = asyncio.ensure_future(func())
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark exceptions as retrieved even if every caller went away
+        if not future.cancelled():
+            future.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight
+        }
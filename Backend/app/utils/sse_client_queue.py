@@ -0,0 +1,89 @@
+"""
+Bounded per-client SSE queue with partial-frame coalescing
+
+Each SSE connection registers one of these with TaskQueueService. Partial
+frames (streamed LLM text) are folded into newer ones, so a slow reader gets
+one frame instead of an ever-growing backlog. The `token` of a partial frame
+is the delta since the previous frame, so the folded frame carries the
+concatenated deltas: concatenating `token` stays lossless. Status, complete
+and error frames are never dropped.
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from app.services.task_event_buffer import format_sse_event, parse_sse_event
+
+# Event types whose newer frames make older queued ones redundant
+PARTIAL_EVENT_TYPES = frozenset({"llm_streaming"})
+
+
+def merge_partial_frames(older: str, newer: str) -> str:
+    """Fold an unread partial frame into the newer one, keeping its token delta"""
+    _, older_data = parse_sse_event(older)
+    event_id, newer_data = parse_sse_event(newer)
+    if not older_data or not newer_data:
+        return newer
+    merged = dict(newer_data, token=older_data.get("token", "") + newer_data.get("token", ""))
+    return format_sse_event(merged, event_id)
+
+
+class SSEClientQueue:
+    """
+    Response object for one SSE client, consumed by the endpoint generator
+
+    Args:
+        maxsize: Frames kept before queued partials are dropped (oldest first)
+    """
+
+    def __init__(self, maxsize: int = 100):
+        self.maxsize = maxsize
+        self.closed = False
+        self._frames: Deque[Tuple[Optional[str], str]] = deque()
+        self._ready = asyncio.Event()
+
+        # Metrics
+        self.coalesced = 0
+        self.dropped = 0
+
+    async def send(self, data: str, event_type: Optional[str] = None):
+        """Queue a frame without blocking the publisher"""
+        if self.closed:
+            return
+
+        if event_type in PARTIAL_EVENT_TYPES and self._frames and self._frames[-1][0] == event_type:
+            # Reader has not caught up: fold the unread partial into the newer one
+            self._frames[-1] = (event_type, merge_partial_frames(self._frames[-1][1], data))
+            self.coalesced += 1
+        else:
+            self._frames.append((event_type, data))
+            if len(self._frames) > self.maxsize:
+                self._drop_oldest_partial()
+
+        self._ready.set()
+
+    def _drop_oldest_partial(self):
+        """Fold the oldest partial into the next one; its text is delivered with that frame"""
+        partials = [index for index, (event_type, _) in enumerate(self._frames) if event_type in PARTIAL_EVENT_TYPES]
+        if len(partials) < 2:
+            # Dropping the only partial would lose its text; critical frames are few per task
+            return
+        oldest, following = partials[0], partials[1]
+        event_type, data = self._frames[following]
+        self._frames[following] = (event_type, merge_partial_frames(self._frames[oldest][1], data))
+        del self._frames[oldest]
+        self.dropped += 1
+
+    async def get(self) -> str:
+        """Wait for the next frame"""
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()[1]
+
+    def qsize(self) -> int:
+        return len(self._frames)
+
+    def close(self):
+        self.closed = True
@@ -12,6 +12,20 @@ from app.constants.task_status_codes import TaskStatusCode, get_status_name
 logger = logging.getLogger(__name__)
 
 
+class ProcessingCancelled(Exception):
+    """
+    Raised by adaptive_stream_processing when the processor was cancelled
+
+    A plain Exception rather than asyncio.CancelledError: the worker running
+    the task must survive, fail the task and refund it.
+    """
+
+    def __init__(self, stage_name: str, reason: str):
+        super().__init__(f"{stage_name} processing was cancelled: {reason}")
+        self.stage_name = stage_name
+        self.reason = reason
+
+
 class StreamingProcessor:
     """
     Processor that provides real-time updates during long-running operations
@@ -24,6 +38,8 @@ class StreamingProcessor:
         self.current_progress = 0
         self.start_time = time.time()
         self.is_cancelled = False
+        self.cancel_reason: Optional[str] = None
+        self._cancel_hooks: List[Callable[[str], None]] = []
 
     async def send_update(self, status_code: int, progress: int, data: Optional[Dict] = None):
         """
@@ -187,9 +203,25 @@ class StreamingProcessor:
             operation_task.cancel()
             raise asyncio.CancelledError(f"{stage_name} processing was cancelled")
 
-    def cancel(self):
-        """Cancel the streaming processor"""
+    def on_cancel(self, hook: Callable[[str], None]):
+        """Register a callback run with the reason when the processor is cancelled"""
+        if self.is_cancelled:
+            hook(self.cancel_reason)
+        else:
+            self._cancel_hooks.append(hook)
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel the streaming processor and whatever registered a cancel hook"""
+        if self.is_cancelled:
+            return
         self.is_cancelled = True
+        self.cancel_reason = reason
+        hooks, self._cancel_hooks = self._cancel_hooks, []
+        for hook in hooks:
+            try:
+                hook(reason)
+            except Exception as e:
+                logger.error(f"Cancel hook failed for task {self.task_id}: {e}")
 
 
 class SmartStreamingProcessor(StreamingProcessor):
@@ -206,7 +238,15 @@ class SmartStreamingProcessor(StreamingProcessor):
                                          operation_type: str, *args, **kwargs):
         """
         Adaptively stream processing based on operation type and historical data
+
+        Raises:
+            ProcessingCancelled: The processor was cancelled before or during the
+                operation, even if the operation returned after its cancel hook ran;
+                a still-running operation task is cancelled first
         """
+        if self.is_cancelled:
+            raise ProcessingCancelled(stage_name, self.cancel_reason)
+
         operation_start = time.time()
 
         # Estimate duration based on operation type
@@ -266,14 +306,20 @@ class SmartStreamingProcessor(StreamingProcessor):
             "timestamp": datetime.now()
         })
 
-        if operation_task.done():
-            await self.send_update(TaskStatusCode.LLM_COMPLETE, end_progress, {
-                "actual_duration": round(actual_duration, 1)
-            })
-            return await operation_task
-        else:
+        if self.is_cancelled:
+            # Even if the operation already returned (e.g. a fallback after honouring the
+            # cancel hook), its result is discarded. A running one is cancelled: that stops
+            # the LLM request (async client) or its awaiting wrapper (threaded client).
             operation_task.cancel()
-            raise asyncio.CancelledError(f"{stage_name} processing was cancelled")
+            await asyncio.wait({operation_task})
+            if not operation_task.cancelled():
+                operation_task.exception()  # Mark any error as retrieved
+            raise ProcessingCancelled(stage_name, self.cancel_reason)
+
+        await self.send_update(TaskStatusCode.LLM_COMPLETE, end_progress, {
+            "actual_duration": round(actual_duration, 1)
+        })
+        return await operation_task
 
     def _estimate_duration(self, operation_type: str) -> float:
         """Estimate operation duration based on historical data"""
@@ -345,4 +391,16 @@ def cleanup_old_processors(max_age_seconds: float = 600):
             to_remove.append(task_id)
 
     for task_id in to_remove:
-        cleanup_streaming_processor(task_id)
\ No newline at end of file
+        cleanup_streaming_processor(task_id)
+
+async def cleanup_processors_periodically(max_age_seconds: float = 600, interval_seconds: float = 300):
+    """Background loop cleaning up old processors (API and worker processes)"""
+    while True:
+        try:
+            cleanup_old_processors(max_age_seconds=max_age_seconds)
+            await asyncio.sleep(interval_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in streaming processor cleanup: {e}")
+            await asyncio.sleep(60)  # Wait 1 minute on error
@@ -0,0 +1,90 @@
+"""
+Time-sliced batching of LLM tokens into SSE frames
+
+The LLM client calls the token callback from a worker thread for every token.
+Instead of scheduling an event-loop coroutine per few tokens, tokens are
+appended to a lock-protected buffer and a single coroutine on the event loop
+flushes them as one `llm_streaming` frame on a fixed cadence.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FrameSender = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class TokenFrameAggregator:
+    """
+    Collects streamed tokens and flushes them as frames every interval
+
+    Frames keep the existing llm_streaming shape: `token` holds the text
+    received since the previous frame, `partial_text` the last
+    `window_tokens` tokens and `total_tokens` the running count.
+    """
+
+    def __init__(
+        self,
+        send_frame: FrameSender,
+        interval_seconds: float = 0.075,
+        window_tokens: int = 50
+    ):
+        self.send_frame = send_frame
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._window: Deque[str] = deque(maxlen=window_tokens)
+        self._flusher: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.total_tokens = 0
+        self.frames_sent = 0
+
+    def add(self, token: str):
+        """Record a token (safe to call from any thread)"""
+        with self._lock:
+            self._pending.append(token)
+            self._window.append(token)
+            self.total_tokens += 1
+
+    def start(self):
+        """Start the periodic flusher on the running event loop"""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and send whatever is still pending"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+    async def flush(self):
+        """Send pending tokens as one frame (no-op when nothing arrived)"""
+        with self._lock:
+            if not self._pending:
+                return
+            delta = "".join(self._pending)
+            self._pending.clear()
+            frame = {
+                "type": "llm_streaming",
+                "token": delta,
+                "partial_text": "".join(self._window),
+                "total_tokens": self.total_tokens
+            }
+
+        try:
+            await self.send_frame(frame)
+            self.frames_sent += 1
+        except Exception as e:
+            logger.error(f"Error sending LLM streaming frame: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.flush()
@@ -0,0 +1,102 @@
+"""
+Divine Whispers Backend - Standalone Task Worker
+
+Runs the chat task queue and fortune job processor without the HTTP API, so
+LLM work can be scaled independently of the web tier:
+
+    python -m app.worker
+
+API nodes started with RUN_TASK_WORKERS=false only enqueue tasks; workers
+claim them from the durable chat_tasks queue and publish progress on the
+task event bus (EVENT_BUS_BACKEND=redis when processes are separate).
+"""
+
+import asyncio
+import signal
+
+from app.core.config import settings
+from app.core.database import engine, create_tables
+from app.utils.logging_config import setup_logging, get_logger
+
+# Configure logging
+setup_logging(
+    log_level=settings.LOG_LEVEL,
+    log_dir=settings.LOG_DIR,
+    max_bytes=settings.LOG_MAX_BYTES,
+    backup_count=settings.LOG_BACKUP_COUNT
+)
+logger = get_logger(__name__)
+
+
+async def run_worker():
+    """Start background processing and run until SIGINT/SIGTERM"""
+    from app.services.poem_service import poem_service
+    from app.services.job_processor import job_processor, cleanup_jobs
+    from app.services.task_queue_service import task_queue_service
+    from app.utils.streaming_processor import cleanup_processors_periodically
+
+    logger.info("Starting Divine Whispers task worker...")
+    await create_tables()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt handling in main()
+            pass
+
+    # Interpretation needs the poem data, so initialize it before taking tasks
+    poem_init_success = await poem_service.initialize_system()
+    if poem_init_success:
+        logger.info("Poem service initialized successfully")
+    else:
+        logger.warning("Poem service initialization failed - tasks may fail until it recovers")
+
+    # Progress events reach API nodes through the event bus
+    await task_queue_service.start_event_bus()
+    await job_processor.start_processing()
+    await task_queue_service.start_processing()
+    background_tasks = [
+        asyncio.create_task(cleanup_jobs()),
+        asyncio.create_task(cleanup_processors_periodically(max_age_seconds=600)),
+    ]
+    logger.info(
+        f"Task worker {task_queue_service.durable_queue.worker_id} running "
+        f"with {task_queue_service.worker_pool.target_workers} workers "
+        f"(max {task_queue_service.worker_pool.max_workers})"
+    )
+
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("Shutting down task worker...")
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+
+        try:
+            await job_processor.stop_processing()
+            await task_queue_service.stop_processing()
+            await task_queue_service.stop_event_bus()
+            await poem_service.aclose()
+
+            from fortune_module.unified_rag import UnifiedRAGHandler
+            UnifiedRAGHandler.cleanup_connection_pool()
+        except Exception as e:
+            logger.error(f"Error stopping services: {e}")
+
+        await engine.dispose()
+        logger.info("Task worker stopped")
+
+
+def main():
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+"""
+End-to-end load test of the question pipeline, run in process
+
+Starts the FastAPI app (with its lifespan: poem service, task workers, event
+bus) behind an ASGI transport, against a temporary SQLite database, a fixture
+ChromaDB with a few synthetic poems per temple and the simulated LLM
+(LLM_PROVIDER=mock). No server, account or model is needed.
+
+For every concurrency level N, N fresh users register and log in, then submit
+/async-chat/ask-question at the same moment and read their SSE stream until
+the complete or error event. Per level the report has throughput, time to
+first SSE event, first LLM token and completion (p50/p95/p99, measured from
+submission), rejected submissions by status code and the number of DB queries.
+Results are written as JSON; pass --baseline to compare with an earlier run.
+
+Usage:
+    python -m benchmarks.load_test --levels 1,5,10,20 --profile fast
+    python -m benchmarks.load_test --levels 10 --set LLM_GATEWAY_MAX_CONCURRENCY=6 \\
+        --baseline benchmarks/results/before.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PASSWORD = "LoadTest@12345!"
+QUESTIONS = [
+    "Will my career improve this year?",
+    "Should I move to a new city for work?",
+    "Is this relationship right for me?",
+    "How can I improve my health?",
+    "Will my investment pay off?",
+]
+
+
+# ---------------------------------------------------------------------------
+# Environment and fixtures
+# ---------------------------------------------------------------------------
+
+def configure_environment(workdir: str, args) -> Dict[str, str]:
+    """
+    Point the app at throwaway storage and the simulated LLM
+
+    Must run before anything under app/ or fortune_module/ is imported, since
+    both read their settings at import time.
+    """
+    env = {
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma_db"),
+        "CHROMA_COLLECTION_NAME": "loadtest_fortunes",
+        "LLM_PROVIDER": "mock",
+        "LLM_MOCK_PROFILE": args.profile,
+        "LLM_MOCK_FAILURE_RATES": json.dumps(args.failure_rates),
+        "LLM_FALLBACK_PROVIDERS": "",
+        "RUN_TASK_WORKERS": "true",
+        "TASK_WORKER_COUNT": str(args.workers),
+        "EVENT_BUS_BACKEND": "inprocess",
+        "INTERPRETATION_CACHE_ENABLED": "false",
+        "DEBUG": "false",
+        "LOG_LEVEL": "WARNING",
+        "LOG_DIR": os.path.join(workdir, "logs"),
+        "SECRET_KEY": "loadtest-secret-key-not-for-production",
+    }
+    if args.seed is not None:
+        env["LLM_MOCK_SEED"] = str(args.seed)
+    env.update(args.overrides)
+    os.environ.update(env)
+    return env
+
+
+def build_fixture_chroma(poems_per_temple: int) -> int:
+    """Ingest synthetic poems for every deity's temple; returns the chunk count"""
+    from app.services.deity_service import deity_service
+    from fortune_module.data_ingestion import PoemChunkBuilder
+    from fortune_module.unified_rag import UnifiedRAGHandler
+
+    builder = PoemChunkBuilder()
+    chunks = []
+    for temple in sorted(set(deity_service.deity_to_temple_mapping.values())):
+        for poem_id in range(1, poems_per_temple + 1):
+            chunks.extend(
+                builder.reset()
+                .set_basic_info({
+                    "id": poem_id,
+                    "title": f"{temple} 第{poem_id}籤",
+                    "fortune": ["上籤", "中籤", "下籤"][poem_id % 3],
+                    "poem": "天開地闢結良緣、日吉時良萬事全、若得此籤非小可、人行中正帝王宣。",
+                    "analysis": {
+                        "zh": "此籤大意為時機將至，凡事宜順勢而為，不可急躁。",
+                        "en": "The time is ripening; move with the current and avoid haste.",
+                        "jp": "時機が熟しつつあり、焦らず流れに沿って進むべきです。"
+                    }
+                })
+                .set_temple_info(temple)
+                .build_poem_chunks()
+            )
+
+    rag_handler = UnifiedRAGHandler()
+    if not rag_handler.add_poem_chunks(chunks):
+        raise RuntimeError("Failed to ingest fixture poems into ChromaDB")
+    return len(chunks)
+
+
+# ---------------------------------------------------------------------------
+# Streaming ASGI transport
+# ---------------------------------------------------------------------------
+
+class _QueueByteStream(httpx.AsyncByteStream):
+    """Response body fed by the app's send() calls; closing it disconnects the client"""
+
+    def __init__(self, chunks: asyncio.Queue, disconnected: asyncio.Event, app_task: asyncio.Task):
+        self._chunks = chunks
+        self._disconnected = disconnected
+        self._app_task = app_task
+
+    async def __aiter__(self):
+        while True:
+            chunk = await self._chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def aclose(self):
+        self._disconnected.set()
+        try:
+            await asyncio.wait_for(self._app_task, timeout=5.0)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+
+
+class StreamingASGITransport(httpx.AsyncBaseTransport):
+    """
+    In-process ASGI transport that hands body chunks over as the app sends them
+
+    httpx.ASGITransport collects the whole response before returning it, which
+    turns an SSE stream into one late chunk and hides time to first event.
+    """
+
+    def __init__(self, app, client=("127.0.0.1", 50000)):
+        self.app = app
+        self.client = client
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = b"".join([chunk async for chunk in request.stream])
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "headers": [(key.lower(), value) for key, value in request.headers.raw],
+            "scheme": request.url.scheme,
+            "path": request.url.path,
+            "raw_path": request.url.raw_path.split(b"?")[0],
+            "query_string": request.url.query,
+            "server": (request.url.host, request.url.port or 80),
+            "client": self.client,
+            "root_path": "",
+        }
+
+        chunks: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response_start = asyncio.get_running_loop().create_future()
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response_start.set_result(message)
+            elif message["type"] == "http.response.body":
+                if message.get("body"):
+                    chunks.put_nowait(message["body"])
+                if not message.get("more_body", False):
+                    chunks.put_nowait(None)
+
+        async def run_app():
+            try:
+                await self.app(scope, receive, send)
+            except Exception as exc:
+                # The app already answered 500 if the response had started
+                if not response_start.done():
+                    response_start.set_exception(exc)
+            finally:
+                chunks.put_nowait(None)
+
+        app_task = asyncio.create_task(run_app())
+        await asyncio.wait({response_start, app_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not response_start.done():
+            raise RuntimeError(f"{request.method} {request.url.path} finished without a response")
+
+        start = response_start.result()
+        return httpx.Response(
+            status_code=start["status"],
+            headers=start.get("headers", []),
+            stream=_QueueByteStream(chunks, disconnected, app_task),
+            request=request
+        )
+
+
+# ---------------------------------------------------------------------------
+# Measurements
+# ---------------------------------------------------------------------------
+
+class QueryCounter:
+    """Counts SQL statements executed through an engine, by statement kind"""
+
+    def __init__(self):
+        self.by_kind: Counter = Counter()
+
+    def attach(self, async_engine):
+        from sqlalchemy import event
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        self.by_kind[kind] += 1
+
+    def snapshot(self) -> Counter:
+        return Counter(self.by_kind)
+
+    def since(self, snapshot: Counter) -> Dict[str, Any]:
+        delta = self.by_kind - snapshot
+        return {"total": sum(delta.values()), "by_kind": dict(delta.most_common())}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Virtual users
+# ---------------------------------------------------------------------------
+
+async def sign_in(client: httpx.AsyncClient, email: str) -> Dict[str, Any]:
+    """Register and log in one user; returns its access token and timings"""
+    start = time.perf_counter()
+    response = await client.post("/api/v1/auth/register", json={
+        "email": email, "password": PASSWORD, "confirm_password": PASSWORD
+    })
+    if response.status_code != 201:
+        raise RuntimeError(f"Register failed ({response.status_code}): {response.text[:200]}")
+    registered = time.perf_counter()
+
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError(f"Login failed ({response.status_code}): {response.text[:200]}")
+
+    return {
+        "token": response.json()["tokens"]["access_token"],
+        "register_seconds": registered - start,
+        "login_seconds": time.perf_counter() - registered
+    }
+
+
+async def ask_and_stream(client: httpx.AsyncClient, token: str, deity_id: str,
+                         fortune_number: int, question: str, timeout: float) -> Dict[str, Any]:
+    """Submit one question and follow its SSE stream to the terminal event"""
+    headers = {"Authorization": f"Bearer {token}"}
+    outcome: Dict[str, Any] = {"outcome": None}
+    start = time.perf_counter()
+
+    response = await client.post("/api/v1/async-chat/ask-question", headers=headers, json={
+        "deity_id": deity_id,
+        "fortune_number": fortune_number,
+        "question": question,
+        "context": {"language": "en"}
+    })
+    outcome["submit_seconds"] = time.perf_counter() - start
+    if response.status_code != 200:
+        outcome.update(outcome="rejected", status_code=response.status_code)
+        return outcome
+
+    sse_url = response.json()["sse_url"]
+    try:
+        async with asyncio.timeout(timeout):
+            async with client.stream("GET", sse_url, headers=headers) as stream:
+                async for line in stream.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    now = time.perf_counter() - start
+                    outcome.setdefault("first_event_seconds", now)
+                    event = json.loads(line[5:].strip())
+                    event_type = event.get("type")
+                    outcome["events"] = outcome.get("events", 0) + 1
+                    if event_type == "llm_streaming":
+                        outcome.setdefault("first_token_seconds", now)
+                    elif event_type in ("complete", "error"):
+                        outcome["complete_seconds"] = now
+                        outcome["outcome"] = "completed" if event_type == "complete" else "failed"
+                        break
+    except TimeoutError:
+        outcome["outcome"] = "timed_out"
+
+    if outcome["outcome"] is None:
+        outcome["outcome"] = "stream_closed"
+    return outcome
+
+
+async def run_level(client: httpx.AsyncClient, counter: QueryCounter, concurrency: int,
+                    run_id: str, args) -> Dict[str, Any]:
+    """One concurrency level: sign in N users, then submit N questions at once"""
+    from app.services.deity_service import deity_service
+    deity_ids = sorted(deity_service.deity_to_temple_mapping)
+
+    auth_queries = counter.snapshot()
+    auth_start = time.perf_counter()
+    users = await asyncio.gather(*[
+        sign_in(client, f"loadtest-{run_id}-c{concurrency}-u{index}@example.com")
+        for index in range(concurrency)
+    ])
+    auth_elapsed = time.perf_counter() - auth_start
+    auth_db = counter.since(auth_queries)
+
+    question_queries = counter.snapshot()
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        ask_and_stream(
+            client, user["token"],
+            deity_id=deity_ids[index % len(deity_ids)],
+            fortune_number=index % args.poems + 1,
+            question=QUESTIONS[index % len(QUESTIONS)],
+            timeout=args.timeout
+        )
+        for index, user in enumerate(users)
+    ])
+    elapsed = time.perf_counter() - start
+    question_db = counter.since(question_queries)
+
+    outcomes = Counter(result["outcome"] for result in results)
+    completed = [result for result in results if result["outcome"] == "completed"]
+    accepted = len(results) - outcomes["rejected"]
+
+    return {
+        "concurrency": concurrency,
+        "submitted": len(results),
+        "accepted": accepted,
+        "rejected_by_status": dict(Counter(
+            str(result["status_code"]) for result in results if result["outcome"] == "rejected"
+        )),
+        "outcomes": dict(outcomes),
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_per_second": round(len(completed) / elapsed, 4) if elapsed > 0 else None,
+        "auth": {
+            "elapsed_seconds": round(auth_elapsed, 4),
+            "register_seconds": summarize([user["register_seconds"] for user in users]),
+            "login_seconds": summarize([user["login_seconds"] for user in users]),
+            "db_queries": auth_db
+        },
+        "submit_seconds": summarize([result["submit_seconds"] for result in results]),
+        "first_event_seconds": summarize([r["first_event_seconds"] for r in results if "first_event_seconds" in r]),
+        "first_token_seconds": summarize([r["first_token_seconds"] for r in results if "first_token_seconds" in r]),
+        "complete_seconds": summarize([r["complete_seconds"] for r in completed]),
+        "db_queries": dict(question_db, per_question=round(question_db["total"] / accepted, 2) if accepted else None)
+    }
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+async def run_load_test(args, environment: Dict[str, str]) -> Dict[str, Any]:
+    fixture_chunks = build_fixture_chroma(args.poems)
+
+    from app.core.database import engine
+    from app.main import app
+    from app.services.task_queue_service import task_queue_service
+
+    counter = QueryCounter()
+    counter.attach(engine)
+    run_id = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    levels = []
+
+    async with app.router.lifespan_context(app):
+        transport = StreamingASGITransport(app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            for concurrency in args.levels:
+                print(f"[LOAD_TEST] concurrency={concurrency} ...", flush=True)
+                level = await run_level(client, counter, concurrency, run_id, args)
+                levels.append(level)
+                print(
+                    f"[LOAD_TEST] concurrency={concurrency} completed={level['outcomes'].get('completed', 0)}"
+                    f"/{level['submitted']} throughput={level['throughput_per_second']}/s "
+                    f"p95_complete={level['complete_seconds'].get('p95')}s "
+                    f"queries/question={level['db_queries']['per_question']}",
+                    flush=True
+                )
+                await asyncio.sleep(args.pause)
+        service_metrics = task_queue_service.get_service_metrics()
+
+    return {
+        "benchmark": "load_test",
+        "started_at": run_id,
+        "config": {
+            "levels": args.levels,
+            "profile": args.profile,
+            "failure_rates": args.failure_rates,
+            "seed": args.seed,
+            "workers": args.workers,
+            "poems_per_temple": args.poems,
+            "fixture_chunks": fixture_chunks,
+            "timeout_seconds": args.timeout,
+            "overrides": args.overrides,
+            "database": environment["DATABASE_URL"].split(":", 1)[0]
+        },
+        "levels": levels,
+        "service_metrics": service_metrics
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Per-level deltas of the headline numbers against an earlier result file"""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    lines = []
+    for level in current["levels"]:
+        before = previous.get(level["concurrency"])
+        if not before:
+            continue
+        parts = [f"concurrency={level['concurrency']}"]
+        for label, path in [("throughput/s", ("throughput_per_second",)),
+                            ("p95_first_event", ("first_event_seconds", "p95")),
+                            ("p95_complete", ("complete_seconds", "p95")),
+                            ("queries/question", ("db_queries", "per_question"))]:
+            old, new = before, level
+            for key in path:
+                old = old.get(key) if isinstance(old, dict) else None
+                new = new.get(key) if isinstance(new, dict) else None
+            if old is None or new is None:
+                continue
+            change = f" ({(new - old) / old * 100:+.1f}%)" if old else ""
+            parts.append(f"{label} {old} -> {new}{change}")
+        lines.append("  ".join(parts))
+    return lines
+
+
+def parse_overrides(values: List[str]) -> Dict[str, str]:
+    overrides = {}
+    for value in values:
+        key, separator, setting = value.partition("=")
+        if not separator:
+            raise argparse.ArgumentTypeError(f"--set expects KEY=VALUE, got {value!r}")
+        overrides[key.strip()] = setting
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,5,10", help="Comma-separated concurrency levels")
+    parser.add_argument("--profile", default="fast", help="Simulated LLM latency profile")
+    parser.add_argument("--failure-rates", default="{}",
+                        help='Simulated LLM failure rates as JSON, e.g. \'{"short_fields": 0.1}\'')
+    parser.add_argument("--seed", type=int, default=1, help="Seed for simulated latencies and failures")
+    parser.add_argument("--workers", type=int, default=3, help="TASK_WORKER_COUNT")
+    parser.add_argument("--poems", type=int, default=5, help="Fixture poems per temple")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Per-question limit for the SSE stream")
+    parser.add_argument("--pause", type=float, default=1.0, help="Seconds between levels")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra app setting, repeatable (e.g. LLM_GATEWAY_MAX_CONCURRENCY=6)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/load_test_<time>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--keep-workdir", action="store_true", help="Keep the temporary DB and ChromaDB")
+    args = parser.parse_args()
+
+    args.levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    args.failure_rates = json.loads(args.failure_rates)
+    args.overrides = parse_overrides(args.overrides)
+
+    workdir = tempfile.mkdtemp(prefix="divine_loadtest_")
+    try:
+        environment = configure_environment(workdir, args)
+        results = asyncio.run(run_load_test(args, environment))
+    finally:
+        if args.keep_workdir:
+            print(f"[LOAD_TEST] Work directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test_{results['started_at']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+    print(f"[LOAD_TEST] Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"[LOAD_TEST] Compared with {args.baseline}:")
+        for line in compare(baseline, results):
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
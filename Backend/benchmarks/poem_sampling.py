@@ -0,0 +1,86 @@
+"""
+Benchmark weighted random poem draws: alias tables vs linear selection
+
+Compares PoemSampler (Vose alias tables over the PoemCatalog) with the
+original get_random_poem_selection() on a synthetic catalog.
+
+Usage:
+    python -m benchmarks.poem_sampling --poems 500 --draws 20000 --count 1
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.services.poem_catalog import PoemCatalog
+from app.utils.poem_sampler import PoemSampler
+from app.utils.poem_utils import get_random_poem_selection
+
+FORTUNES = ["大吉", "中吉", "小吉", "吉", "平", "凶", "大凶"]
+TEMPLES = ["GuanYin", "Mazu", "GuanYu", "YueLao", "Asakusa"]
+
+
+def build_poems(total: int, seed: int = 42):
+    rng = random.Random(seed)
+    poems = []
+    for i in range(total):
+        temple = TEMPLES[i % len(TEMPLES)]
+        poems.append({
+            "temple": temple,
+            "poem_id": i // len(TEMPLES) + 1,
+            "title": f"{temple} #{i}",
+            "fortune": rng.choice(FORTUNES),
+            "language": "zh"
+        })
+    return poems
+
+
+def bench(label: str, func, draws: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(draws):
+        func()
+    elapsed = time.perf_counter() - start
+    return {
+        "implementation": label,
+        "draws": draws,
+        "elapsed_seconds": round(elapsed, 4),
+        "draws_per_second": round(draws / elapsed, 1) if elapsed > 0 else None,
+        "microseconds_per_draw": round(elapsed / draws * 1e6, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--poems", type=int, default=500, help="Synthetic catalog size")
+    parser.add_argument("--draws", type=int, default=20000, help="Draws per implementation")
+    parser.add_argument("--count", type=int, default=1, help="Poems per draw (without replacement)")
+    parser.add_argument("--temple", default=None, help="Restrict draws to one temple")
+    args = parser.parse_args()
+
+    poems = build_poems(args.poems)
+    catalog = PoemCatalog()
+    catalog.load(poems)
+    sampler = PoemSampler(catalog)
+    sampler.draw(args.temple, args.count)  # build tables outside the timed loop
+
+    temple_poems = [p for p in poems if not args.temple or p["temple"] == args.temple]
+
+    results = [
+        bench("get_random_poem_selection",
+              lambda: get_random_poem_selection(temple_poems, count=args.count), args.draws),
+        bench("PoemSampler (alias table)",
+              lambda: sampler.draw(args.temple, count=args.count), args.draws),
+    ]
+    speedup = results[0]["elapsed_seconds"] / max(results[1]["elapsed_seconds"], 1e-9)
+
+    print(json.dumps({
+        "poems": len(temple_poems),
+        "count": args.count,
+        "results": results,
+        "speedup": round(speedup, 1)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ Main Features:
 - Unified ChromaDB storing both fortune poems and approved FAQ entries
 - Temple-specific poem retrieval and interpretation
 - FAQ capture, approval workflow, and integration
-- Support for OpenAI and Ollama LLM providers
+- Support for OpenAI and Ollama LLM providers (plus a simulated provider for load tests)
 - Multilingual support (Chinese, English, Japanese)
 - Clean Facade API for easy integration
 
@@ -28,12 +28,15 @@ Example Usage:
 """
 
 from .unified_rag import UnifiedRAGHandler
-from .llm_client import LLMClientFactory, BaseLLMClient, create_llm_client
+from .llm_client import LLMClientFactory, BaseLLMClient, AsyncBaseLLMClient, create_llm_client
 from .interpreter import PoemInterpreter, InterpreterFactory
 from .faq_pipeline import FAQPipeline
 from .config import SystemConfig
+from .retry_policy import RetryPolicy, RetryBudget, RetryMetrics, GenerationCancelled
+from .llm_gateway import LLMGateway, AdmissionDecision, GatewayTimeout, llm_gateway
+from .hedged_client import HedgedLLMClient, AsyncHedgedLLMClient
 from .models import *
-from typing import List, Optional, Dict, Any, Callable
+from typing import List, Optional, Dict, Any, Callable, Tuple
 import logging
 import os
 
@@ -103,10 +106,17 @@ class FortuneSystem:
             
             # Initialize core components
             self.rag = UnifiedRAGHandler()
-            self.llm = LLMClientFactory.create_client(llm_provider, **llm_config)
+            # Both clients share the provider's concurrency and rate limits
+            self.llm_provider = llm_provider
+            self.llm = llm_gateway.wrap(
+                LLMClientFactory.create_client(llm_provider, **llm_config), llm_provider.value
+            )
+            self.async_llm = llm_gateway.wrap(
+                self._create_async_llm(llm_provider, llm_config), llm_provider.value
+            )
             self.faq_pipeline = FAQPipeline(rag_handler=self.rag)
             self.interpreter = InterpreterFactory.create_poem_interpreter(
-                self.rag, self.llm, self.faq_pipeline
+                self.rag, self.llm, self.faq_pipeline, self.async_llm
             )
             
             self.logger.info(f"Fortune System initialized with {llm_provider.value} provider")
@@ -115,9 +125,65 @@ class FortuneSystem:
             self.logger.error(f"Failed to initialize Fortune System: {e}")
             raise
     
+    def _create_async_llm(self, llm_provider: LLMProvider, llm_config: dict) -> Optional[AsyncBaseLLMClient]:
+        """Create the asyncio client for the provider; None keeps the thread-based path."""
+        try:
+            return LLMClientFactory.create_async_client(llm_provider, **llm_config)
+        except Exception as e:
+            self.logger.warning(f"Async {llm_provider.value} client unavailable, using threaded LLM calls: {e}")
+            return None
+
+    def set_llm_clients(self, llm: BaseLLMClient, async_llm: Optional[AsyncBaseLLMClient] = None):
+        """Swap the LLM clients used by the facade and the interpreter."""
+        self.llm = llm
+        self.async_llm = async_llm
+        self.interpreter.llm = llm
+        self.interpreter.async_llm = async_llm
+
+    def enable_failover(self, fallbacks: List[Tuple[LLMProvider, dict]], **hedge_options) -> bool:
+        """
+        Put further providers behind the current one for hedging and failover.
+
+        Args:
+            fallbacks: Ordered (provider, llm_config) pairs tried after the primary
+            **hedge_options: Options for HedgedLLMClient (hedge_percentile, default_hedge_delay, ...)
+
+        Returns:
+            True if at least one fallback provider could be created
+        """
+        sync_routes = [(self.llm_provider.value, self.llm)]
+        async_routes = [(self.llm_provider.value, self.async_llm)] if self.async_llm is not None else []
+        for provider, llm_config in fallbacks:
+            if provider == self.llm_provider:
+                continue
+            try:
+                client = LLMClientFactory.create_client(provider, **llm_config)
+            except Exception as e:
+                self.logger.warning(f"Fallback provider {provider.value} unavailable: {e}")
+                continue
+            sync_routes.append((provider.value, llm_gateway.wrap(client, provider.value)))
+            async_client = self._create_async_llm(provider, llm_config)
+            if async_client is not None and async_routes:
+                async_routes.append((provider.value, llm_gateway.wrap(async_client, provider.value)))
+
+        if len(sync_routes) < 2:
+            return False
+        self.set_llm_clients(
+            HedgedLLMClient(sync_routes, **hedge_options),
+            AsyncHedgedLLMClient(async_routes, **hedge_options) if len(async_routes) > 1 else self.async_llm
+        )
+        self.logger.info(f"LLM failover enabled: {[name for name, _ in sync_routes]}")
+        return True
+
+    async def aclose(self):
+        """Close pooled connections of the async LLM client."""
+        if self.async_llm is not None:
+            await self.async_llm.aclose()
+
     # Main Fortune Consultation Interface
     def ask_fortune(self, question: str, temple: str, poem_id: int, 
-                   additional_context: bool = True, capture_faq: bool = None) -> InterpretationResult:
+                   additional_context: bool = True, capture_faq: bool = None,
+                   retry_budget: Optional[RetryBudget] = None) -> InterpretationResult:
         """
         Main interface for fortune consultation with specific poem.
         
@@ -127,6 +193,7 @@ class FortuneSystem:
             poem_id: Specific poem ID number
             additional_context: Whether to include additional RAG context
             capture_faq: Whether to capture this interaction for FAQ (uses config default if None)
+            retry_budget: Attempt budget and deadline shared with the caller's retries
             
         Returns:
             InterpretationResult containing interpretation and metadata
@@ -140,7 +207,8 @@ class FortuneSystem:
                 temple=temple,
                 poem_id=poem_id,
                 additional_context_k=context_k,
-                capture_faq=capture
+                capture_faq=capture,
+                retry_budget=retry_budget
             )
             
             self.logger.info(f"Fortune consultation completed for {temple} poem #{poem_id}")
@@ -152,7 +220,8 @@ class FortuneSystem:
     
     def ask_fortune_streaming(self, question: str, temple: str, poem_id: int,
                              streaming_callback: Optional[Callable[[str], None]] = None,
-                             additional_context: bool = True, capture_faq: bool = None) -> InterpretationResult:
+                             additional_context: bool = True, capture_faq: bool = None,
+                             retry_budget: Optional[RetryBudget] = None) -> InterpretationResult:
         """
         Fortune consultation with LLM streaming support for better UX.
 
@@ -163,6 +232,7 @@ class FortuneSystem:
             streaming_callback: Optional callback function for LLM token streaming
             additional_context: Whether to include additional RAG context
             capture_faq: Whether to capture this interaction for FAQ (uses config default if None)
+            retry_budget: Attempt budget and deadline shared with the caller's retries
 
         Returns:
             InterpretationResult containing interpretation and metadata
@@ -177,7 +247,8 @@ class FortuneSystem:
                 poem_id=poem_id,
                 streaming_callback=streaming_callback,
                 additional_context_k=context_k,
-                capture_faq=capture
+                capture_faq=capture,
+                retry_budget=retry_budget
             )
 
             self.logger.info(f"Streaming fortune consultation completed for {temple} poem #{poem_id}")
@@ -187,6 +258,72 @@ class FortuneSystem:
             self.logger.error(f"Streaming fortune consultation failed: {e}")
             raise
 
+    async def ask_fortune_async(self, question: str, temple: str, poem_id: int,
+                                streaming_callback: Optional[Callable[[str], None]] = None,
+                                additional_context: bool = True, capture_faq: bool = None,
+                                retry_budget: Optional[RetryBudget] = None) -> InterpretationResult:
+        """
+        Fortune consultation running on the event loop with the async LLM client.
+
+        Args:
+            question: User's question for fortune interpretation
+            temple: Temple name (e.g., "GuanYin", "Mazu")
+            poem_id: Specific poem ID number
+            streaming_callback: Optional callback function for LLM token streaming
+            additional_context: Whether to include additional RAG context
+            capture_faq: Whether to capture this interaction for FAQ (uses config default if None)
+            retry_budget: Attempt budget and deadline shared with the caller's retries
+
+        Returns:
+            InterpretationResult containing interpretation and metadata
+        """
+        try:
+            context_k = self.config.max_poems_per_query if additional_context else 0
+            capture = capture_faq if capture_faq is not None else self.config.auto_capture_faq
+
+            result = await self.interpreter.interpret_async(
+                question=question,
+                temple=temple,
+                poem_id=poem_id,
+                streaming_callback=streaming_callback,
+                additional_context_k=context_k,
+                capture_faq=capture,
+                retry_budget=retry_budget
+            )
+
+            self.logger.info(f"Async fortune consultation completed for {temple} poem #{poem_id}")
+            return result
+
+        except Exception as e:
+            self.logger.error(f"Async fortune consultation failed: {e}")
+            raise
+
+    async def repair_interpretation_async(self, question: str, temple: str, poem_id: int,
+                                          report: Dict[str, str], failing_fields: Dict[str, str],
+                                          retry_budget: Optional[RetryBudget] = None) -> Optional[Dict[str, str]]:
+        """
+        Regenerate only the failing sections of an interpretation report.
+
+        Args:
+            question: User's question for fortune interpretation
+            temple: Temple name (e.g., "GuanYin", "Mazu")
+            poem_id: Specific poem ID number
+            report: Current report (section key to text)
+            failing_fields: Section key to failure reason for the sections to regenerate
+            retry_budget: Attempt budget and deadline shared with the caller's retries
+
+        Returns:
+            Merged report, or None when the sections could not be repaired
+        """
+        return await self.interpreter.repair_report_async(
+            question=question,
+            temple=temple,
+            poem_id=poem_id,
+            report=report,
+            failing_fields=failing_fields,
+            retry_budget=retry_budget
+        )
+
     def ask_fortune_with_poem(self, question: str, selected_poem: SelectedPoem,
                             additional_context: bool = True, capture_faq: bool = None) -> InterpretationResult:
         """
@@ -492,6 +629,20 @@ def create_ollama_system(model: str = "llama2", base_url: str = "http://localhos
     llm_config.update(kwargs)
     return FortuneSystem(LLMProvider.OLLAMA, llm_config)
 
+def create_mock_system(**mock_config) -> FortuneSystem:
+    """
+    Convenience function to create FortuneSystem with the simulated provider.
+    
+    Args:
+        **mock_config: Overrides for SystemConfig.mock_config (profile, failure_rates, seed, ...)
+        
+    Returns:
+        FortuneSystem instance
+    """
+    llm_config = dict(SystemConfig().get_llm_config("mock"))
+    llm_config.update(mock_config)
+    return FortuneSystem(LLMProvider.MOCK, llm_config)
+
 # Export all public APIs
 __all__ = [
     # Main classes
@@ -503,11 +654,13 @@ __all__ = [
     'RAGResult', 'SelectedPoem', 'InterpretationResult',
     
     # Core components (for advanced usage)
-    'UnifiedRAGHandler', 'BaseLLMClient', 'LLMClientFactory', 
-    'PoemInterpreter', 'FAQPipeline',
+    'UnifiedRAGHandler', 'BaseLLMClient', 'AsyncBaseLLMClient', 'LLMClientFactory', 
+    'PoemInterpreter', 'FAQPipeline', 'RetryPolicy', 'RetryBudget', 'RetryMetrics', 'GenerationCancelled',
+    'LLMGateway', 'AdmissionDecision', 'GatewayTimeout', 'llm_gateway',
+    'HedgedLLMClient', 'AsyncHedgedLLMClient',
     
     # Convenience functions
-    'create_fortune_system', 'create_openai_system', 'create_ollama_system',
+    'create_fortune_system', 'create_openai_system', 'create_ollama_system', 'create_mock_system',
     'create_llm_client'
 ]
 
@@ -30,6 +30,12 @@ class SystemConfig(metaclass=SingletonMeta):
         "base_url": "http://localhost:11434", 
         "model": "llama2"
     })
+    # Simulated provider (default_llm_provider="mock"): latency profile and injected failures
+    mock_config: Dict[str, Any] = field(default_factory=lambda: {
+        "profile": "fast",
+        "failure_rates": {},
+        "seed": None
+    })
     
     # RAG settings
     default_top_k: int = 5
@@ -68,6 +74,8 @@ class SystemConfig(metaclass=SingletonMeta):
             return self.openai_config
         elif provider == "ollama":
             return self.ollama_config
+        elif provider == "mock":
+            return self.mock_config
         else:
             raise ValueError(f"Unknown LLM provider: {provider}")
     
@@ -0,0 +1,65 @@
+# field_repair.py
+"""
+Helpers for field-level repair of an interpretation report.
+
+When only a few of the seven sections fail validation, the interpreter asks
+the LLM for just those sections (with the valid ones as context) and merges
+the answer into the report instead of regenerating the whole response.
+"""
+import json
+import re
+from typing import Dict, List, Optional
+
+_CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]')
+
+# Output budget per repaired section (LineByLineInterpretation is multi-paragraph)
+REPAIR_MAX_TOKENS = {
+    "LineByLineInterpretation": 1500,
+}
+DEFAULT_REPAIR_MAX_TOKENS = 500
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, one per four other characters."""
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def repair_max_tokens(keys: List[str]) -> int:
+    """Generation limit for a repair covering `keys`."""
+    return sum(REPAIR_MAX_TOKENS.get(key, DEFAULT_REPAIR_MAX_TOKENS) for key in keys)
+
+
+def extract_json_object(text: str) -> Optional[Dict]:
+    """Parse the outermost {...} in an LLM response, tolerating surrounding prose or fences."""
+    if not text:
+        return None
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def merge_repaired_fields(report: Dict[str, str], repaired: Optional[Dict],
+                          keys: List[str]) -> Optional[Dict[str, str]]:
+    """Overlay the repaired sections onto the report.
+
+    Returns:
+        The merged report, or None if any requested section is missing or not text
+    """
+    if not repaired:
+        return None
+    merged = dict(report)
+    for key in keys:
+        value = repaired.get(key)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        merged[key] = value
+    return merged
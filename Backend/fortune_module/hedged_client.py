@@ -0,0 +1,412 @@
+# hedged_client.py
+"""
+Composite LLM client with hedged requests and latency-based failover.
+
+The client wraps an ordered list of providers. A call goes to the first
+provider whose circuit is closed; if it has not answered (or, when streaming,
+produced its first token) within its rolling p95 latency, the same request is
+started on the next provider and whichever answers first wins. The async
+client cancels the loser; the sync client stops a losing stream at its next
+token and ignores a losing non-streaming call. A provider whose circuit opened
+after consecutive failures is skipped until its recovery timeout elapses.
+"""
+import asyncio
+import math
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from .llm_client import BaseLLMClient, AsyncBaseLLMClient
+
+# Threads running sync provider calls side by side (a hedge needs a second one)
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+class LatencyTracker:
+    """Rolling window of call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 10):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float = 0.95) -> Optional[float]:
+        """Latency at quantile q, or None until min_samples calls were observed."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = sorted(self._samples)
+        return samples[max(0, math.ceil(len(samples) * q) - 1)]
+
+
+class ProviderCircuit:
+    """Per-provider circuit breaker: opens after consecutive failures."""
+
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_count = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "CLOSED"
+        if time.monotonic() - self.opened_at >= self.recovery_timeout:
+            return "HALF_OPEN"
+        return "OPEN"
+
+    def allow(self) -> bool:
+        return self.state != "OPEN"
+
+    def record_success(self):
+        self.failure_count = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failure_count += 1
+        if self.failure_count >= self.failure_threshold:
+            # A failed half-open probe re-opens for another recovery period
+            self.opened_at = time.monotonic()
+
+
+class ProviderRoute:
+    """One provider behind the composite client, with its latency and health."""
+
+    def __init__(self, name: str, client, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.client = client
+        self.latency = LatencyTracker()  # Full non-streaming calls
+        self.ttft = LatencyTracker()  # Time to first streamed token
+        self.circuit = ProviderCircuit(failure_threshold, recovery_timeout)
+        self.calls = 0
+        self.failures = 0
+        self.wins = 0
+
+    @property
+    def supports_structured_output(self) -> bool:
+        return hasattr(self.client, 'client') and hasattr(self.client.client, 'chat')
+
+    def record_failure(self, error: BaseException, logger: logging.Logger):
+        self.failures += 1
+        self.circuit.record_failure()
+        logger.warning(f"[LLM_HEDGE] {self.name} failed ({self.circuit.state}): {error!r}")
+
+    def get_metrics(self, percentile: float) -> Dict[str, Any]:
+        latency = self.latency.percentile(percentile)
+        ttft = self.ttft.percentile(percentile)
+        return {
+            "circuit": self.circuit.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "wins": self.wins,
+            "p95_latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            "p95_ttft_ms": round(ttft * 1000, 1) if ttft is not None else None
+        }
+
+
+class _HedgeLost(Exception):
+    """Raised from a losing stream's callback to stop it."""
+
+
+class _CallbackError(Exception):
+    """Carries an exception raised by the caller's callback past the provider's circuit.
+
+    The caller stopping a stream (e.g. its validator rejecting the output, or the
+    request being cancelled) says nothing about the provider's health.
+    """
+
+    def __init__(self, error: Exception):
+        super().__init__(str(error))
+        self.error = error
+
+
+class _HedgedRouting:
+    """Provider selection, hedge delays and metrics shared by both clients.
+
+    Args:
+        providers: Ordered (name, client) pairs; the first is the primary
+        hedge_percentile: Latency quantile after which a hedge is started
+        default_hedge_delay: Hedge delay before a provider has enough latency samples
+        min_hedge_delay: Lower bound for the hedge delay
+        failure_threshold: Consecutive failures that open a provider's circuit
+        recovery_timeout: Seconds before an open circuit lets a probe through
+    """
+
+    def _init_routing(self, providers: List[Tuple[str, Any]], hedge_percentile: float = 0.95,
+                      default_hedge_delay: float = 15.0, min_hedge_delay: float = 1.0,
+                      failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        if not providers:
+            raise ValueError("At least one provider is required")
+        self.routes = [ProviderRoute(name, client, failure_threshold, recovery_timeout)
+                       for name, client in providers]
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+
+        # Metrics
+        self.hedges_started = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def __getattr__(self, name):
+        # Expose the primary client's attributes (e.g. .client for structured output detection)
+        if name == "routes":
+            raise AttributeError(name)
+        return getattr(self.routes[0].client, name)
+
+    def _candidates(self) -> List[ProviderRoute]:
+        """Providers with a closed (or probing) circuit; all of them if every circuit is open."""
+        routes = [route for route in self.routes if route.circuit.allow()]
+        return routes or list(self.routes)
+
+    def _hedge_delay(self, route: ProviderRoute, streaming: bool) -> float:
+        tracker = route.ttft if streaming else route.latency
+        observed = tracker.percentile(self.hedge_percentile)
+        if observed is None:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, observed)
+
+    @staticmethod
+    def _adapt_kwargs(route: ProviderRoute, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop OpenAI structured output for providers that cannot take it."""
+        if "response_format" in kwargs and not route.supports_structured_output:
+            return {key: value for key, value in kwargs.items() if key != "response_format"}
+        return kwargs
+
+    def _record_win(self, route: ProviderRoute, hedged: bool):
+        route.wins += 1
+        if hedged and route is not self.routes[0]:
+            self.hedge_wins += 1
+
+    def validate_config(self) -> bool:
+        return all(route.client.validate_config() for route in self.routes)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "providers": {route.name: route.get_metrics(self.hedge_percentile) for route in self.routes},
+            "hedges_started": self.hedges_started,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers
+        }
+
+
+class HedgedLLMClient(_HedgedRouting, BaseLLMClient):
+    """Sync composite client; provider calls run on a small thread pool."""
+
+    def __init__(self, providers: List[Tuple[str, BaseLLMClient]], **options):
+        self._init_routing(providers, **options)
+        super().__init__(self.routes[0].client.config)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        return self._run(
+            lambda route, on_token: route.client.generate(prompt, **self._adapt_kwargs(route, kwargs)),
+            streaming=False
+        )
+
+    def generate_stream(self, prompt: str, callback: Optional[Callable[[str], None]] = None, **kwargs) -> str:
+        return self._run(
+            lambda route, on_token: route.client.generate_stream(
+                prompt, callback=on_token, **self._adapt_kwargs(route, kwargs)
+            ),
+            streaming=True,
+            callback=callback
+        )
+
+    def _run(self, call: Callable[[ProviderRoute, Callable[[str], None]], str], streaming: bool,
+             callback: Optional[Callable[[str], None]] = None) -> str:
+        queue = self._candidates()
+        primary = queue[0]
+        lock = threading.Lock()
+        winner: List[ProviderRoute] = []  # Set once, by the first token (streaming) or first result
+        futures: Dict[Future, ProviderRoute] = {}
+
+        def attempt(route: ProviderRoute) -> str:
+            started = time.monotonic()
+
+            def on_token(token: str):
+                with lock:
+                    if not winner:
+                        winner.append(route)
+                        route.ttft.observe(time.monotonic() - started)
+                    elif winner[0] is not route:
+                        raise _HedgeLost()
+                if callback:
+                    try:
+                        callback(token)
+                    except Exception as e:
+                        raise _CallbackError(e) from e
+
+            try:
+                result = call(route, on_token)
+            except _HedgeLost:
+                raise
+            except _CallbackError as e:
+                raise e.error from None
+            except Exception as e:
+                route.record_failure(e, self.logger)
+                raise
+            if not streaming:
+                route.latency.observe(time.monotonic() - started)
+            route.circuit.record_success()
+            return result
+
+        def launch():
+            route = queue.pop(0)
+            route.calls += 1
+            futures[_hedge_executor.submit(attempt, route)] = route
+
+        launch()
+        hedged = False
+        last_error: Optional[BaseException] = None
+        while futures:
+            can_hedge = not hedged and queue and not winner
+            done, _ = wait(futures, timeout=self._hedge_delay(primary, streaming) if can_hedge else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                if not winner:
+                    hedged = True
+                    self.hedges_started += 1
+                    self.logger.info(f"[LLM_HEDGE] {primary.name} slower than p95, hedging to {queue[0].name}")
+                    launch()
+                else:
+                    hedged = True  # Primary already streaming; no hedge needed any more
+                continue
+
+            for future in done:
+                route = futures.pop(future)
+                error = future.exception()
+                if error is None:
+                    with lock:
+                        if not winner:
+                            winner.append(route)
+                    if winner[0] is route:
+                        self._record_win(route, hedged)
+                        return future.result()
+                elif isinstance(error, _HedgeLost):
+                    continue
+                elif winner and winner[0] is route:
+                    # Tokens were already forwarded; the response cannot switch providers now
+                    raise error
+                else:
+                    last_error = error
+
+            if not futures and queue and not winner:
+                self.failovers += 1
+                self.logger.warning(f"[LLM_HEDGE] Failing over to {queue[0].name}")
+                launch()
+
+        raise last_error or RuntimeError("No LLM provider produced a response")
+
+
+class AsyncHedgedLLMClient(_HedgedRouting, AsyncBaseLLMClient):
+    """Async composite client; losing requests are cancelled."""
+
+    def __init__(self, providers: List[Tuple[str, AsyncBaseLLMClient]], **options):
+        self._init_routing(providers, **options)
+        super().__init__(self.routes[0].client.config)
+
+    async def _attempt_generate(self, route: ProviderRoute, prompt: str, kwargs: Dict[str, Any]) -> str:
+        started = time.monotonic()
+        try:
+            result = await route.client.generate(prompt, **self._adapt_kwargs(route, kwargs))
+        except Exception as e:
+            route.record_failure(e, self.logger)
+            raise
+        route.latency.observe(time.monotonic() - started)
+        route.circuit.record_success()
+        return result
+
+    async def _open_stream(self, route: ProviderRoute, prompt: str, kwargs: Dict[str, Any]):
+        """Start a provider stream and wait for its first token: returns (stream, first_token)."""
+        started = time.monotonic()
+        token_stream = route.client.stream(prompt, **self._adapt_kwargs(route, kwargs))
+        try:
+            first = await token_stream.__anext__()
+        except StopAsyncIteration:
+            return token_stream, None
+        except Exception as e:
+            route.record_failure(e, self.logger)
+            raise
+        route.ttft.observe(time.monotonic() - started)
+        return token_stream, first
+
+    async def _race(self, start: Callable[[ProviderRoute], Any], streaming: bool):
+        """Run the hedged race: returns (winning route, result of start(route))."""
+        queue = self._candidates()
+        primary = queue[0]
+        pending: Dict[asyncio.Task, ProviderRoute] = {}
+
+        def launch():
+            route = queue.pop(0)
+            route.calls += 1
+            pending[asyncio.ensure_future(start(route))] = route
+
+        launch()
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                can_hedge = not hedged and queue and len(pending) == 1
+                done, _ = await asyncio.wait(
+                    pending, timeout=self._hedge_delay(primary, streaming) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    self.hedges_started += 1
+                    self.logger.info(f"[LLM_HEDGE] {primary.name} slower than p95, hedging to {queue[0].name}")
+                    launch()
+                    continue
+
+                for task in done:
+                    route = pending.pop(task)
+                    if task.exception() is None:
+                        self._record_win(route, hedged)
+                        return route, task.result()
+                    last_error = task.exception()
+
+                if not pending and queue:
+                    self.failovers += 1
+                    self.logger.warning(f"[LLM_HEDGE] Failing over to {queue[0].name}")
+                    launch()
+        finally:
+            # Cancel the losers (and close streams that finished opening at the same time)
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None and streaming:
+                    await task.result()[0].aclose()
+
+        raise last_error or RuntimeError("No LLM provider produced a response")
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        _, result = await self._race(lambda route: self._attempt_generate(route, prompt, kwargs), streaming=False)
+        return result
+
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        route, (token_stream, first) = await self._race(
+            lambda route: self._open_stream(route, prompt, kwargs), streaming=True
+        )
+        try:
+            if first is not None:
+                yield first
+            async for token in token_stream:
+                yield token
+        except Exception as e:
+            route.record_failure(e, self.logger)
+            raise
+        finally:
+            await token_stream.aclose()
+        route.circuit.record_success()
+
+    async def aclose(self):
+        for route in self.routes:
+            await route.client.aclose()
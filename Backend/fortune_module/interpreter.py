@@ -1,31 +1,39 @@
 # interpreter.py
 from abc import ABC, abstractmethod
 from typing import Optional, List, Dict, Any, Callable
+import asyncio
 import uuid
 import re
 import logging
 import json
-import time
 from .models import InterpretationResult, ChunkType, SelectedPoem
 from .unified_rag import UnifiedRAGHandler
-from .llm_client import BaseLLMClient
+from .llm_client import BaseLLMClient, AsyncBaseLLMClient
 from .faq_pipeline import FAQPipeline
 from .config import SystemConfig
+from .retry_policy import RetryPolicy, RetryBudget, GenerationCancelled
+from .stream_validator import StreamingJSONValidator, StreamAborted
+from .field_repair import estimate_tokens, repair_max_tokens, extract_json_object, merge_repaired_fields
 
 # Template Method Pattern - Base interpreter class
 class BaseInterpreter(ABC):
     """Base interpreter class using Template Method pattern."""
     
-    def __init__(self, rag_handler: UnifiedRAGHandler, llm_client: BaseLLMClient, faq_pipeline: FAQPipeline):
+    def __init__(self, rag_handler: UnifiedRAGHandler, llm_client: BaseLLMClient, faq_pipeline: FAQPipeline,
+                 async_llm_client: Optional[AsyncBaseLLMClient] = None):
         self.rag = rag_handler
         self.llm = llm_client
+        self.async_llm = async_llm_client
         self.faq_pipeline = faq_pipeline
         self.config = SystemConfig()
+        # Used when the caller does not pass a RetryBudget of its own
+        self.retry_policy = RetryPolicy()
         self.logger = logging.getLogger(self.__class__.__name__)
     
     # Template Method - defines the algorithm structure
     def interpret(self, question: str, temple: str, poem_id: int, 
-                 additional_context_k: int = None, capture_faq: bool = None) -> InterpretationResult:
+                 additional_context_k: int = None, capture_faq: bool = None,
+                 retry_budget: Optional[RetryBudget] = None) -> InterpretationResult:
         """Template method that defines the interpretation workflow."""
         
         additional_context_k = additional_context_k or self.config.max_poems_per_query
@@ -46,7 +54,12 @@ class BaseInterpreter(ABC):
         context = self._prepare_context(selected_poem_chunks, additional_chunks, temple, poem_id)
         
         # Step 5: Generate interpretation
-        interpretation = self._generate_interpretation(question, context, temple, poem_id)
+        if retry_budget is None:
+            interpretation = self._generate_interpretation(question, context, temple, poem_id)
+        else:
+            interpretation = self._generate_interpretation_with_streaming(
+                question, context, temple, poem_id, retry_budget=retry_budget
+            )
         
         # Step 6: Post-process interpretation
         interpretation = self._post_process_interpretation(interpretation, question)
@@ -63,7 +76,8 @@ class BaseInterpreter(ABC):
 
     def interpret_with_streaming(self, question: str, temple: str, poem_id: int,
                                  streaming_callback: Optional[Callable[[str], None]] = None,
-                                 additional_context_k: int = None, capture_faq: bool = None) -> InterpretationResult:
+                                 additional_context_k: int = None, capture_faq: bool = None,
+                                 retry_budget: Optional[RetryBudget] = None) -> InterpretationResult:
         """Template method with streaming support for better UX.
 
         Args:
@@ -73,6 +87,7 @@ class BaseInterpreter(ABC):
             streaming_callback: Optional callback for streaming LLM tokens
             additional_context_k: Number of additional context poems
             capture_faq: Whether to capture FAQ
+            retry_budget: Shared attempt budget and deadline (a default one is used if None)
 
         Returns:
             InterpretationResult
@@ -97,7 +112,7 @@ class BaseInterpreter(ABC):
 
         # Step 5: Generate interpretation with streaming
         interpretation = self._generate_interpretation_with_streaming(
-            question, context, temple, poem_id, streaming_callback
+            question, context, temple, poem_id, streaming_callback, retry_budget
         )
 
         # Step 6: Post-process interpretation
@@ -115,12 +130,16 @@ class BaseInterpreter(ABC):
 
     def _generate_interpretation_with_streaming(self, question: str, context: str,
                                                 temple: str, poem_id: int,
-                                                streaming_callback: Optional[Callable[[str], None]] = None) -> str:
+                                                streaming_callback: Optional[Callable[[str], None]] = None,
+                                                retry_budget: Optional[RetryBudget] = None) -> str:
         """Default implementation calls regular method. Subclasses can override for streaming."""
         # If subclass has streaming support, use it
         if hasattr(self, '_generate_interpretation') and callable(self._generate_interpretation):
             try:
-                # Try to call with streaming callback (PoemInterpreter supports this)
+                # Try to call with streaming callback and retry budget (PoemInterpreter supports this)
+                if retry_budget is not None:
+                    return self._generate_interpretation(question, context, temple, poem_id, streaming_callback,
+                                                         retry_budget=retry_budget)
                 return self._generate_interpretation(question, context, temple, poem_id, streaming_callback)
             except TypeError:
                 # Fallback if signature doesn't support streaming
@@ -128,6 +147,79 @@ class BaseInterpreter(ABC):
         else:
             raise NotImplementedError("Subclass must implement _generate_interpretation")
 
+    async def interpret_async(self, question: str, temple: str, poem_id: int,
+                              streaming_callback: Optional[Callable[[str], None]] = None,
+                              additional_context_k: int = None, capture_faq: bool = None,
+                              retry_budget: Optional[RetryBudget] = None) -> InterpretationResult:
+        """Template method running LLM generation natively on the event loop.
+
+        ChromaDB retrieval and FAQ capture are blocking and run in worker threads;
+        without an async LLM client the whole streaming workflow runs in a thread.
+
+        Args:
+            question: User's question
+            temple: Temple name
+            poem_id: Poem ID
+            streaming_callback: Optional callback for streaming LLM tokens
+            additional_context_k: Number of additional context poems
+            capture_faq: Whether to capture FAQ
+            retry_budget: Shared attempt budget and deadline (a default one is used if None)
+
+        Returns:
+            InterpretationResult
+        """
+        if self.async_llm is None:
+            return await asyncio.to_thread(
+                self.interpret_with_streaming, question, temple, poem_id,
+                streaming_callback, additional_context_k, capture_faq, retry_budget
+            )
+
+        additional_context_k = additional_context_k or self.config.max_poems_per_query
+        capture_faq = capture_faq if capture_faq is not None else self.config.auto_capture_faq
+
+        self.logger.info(f"Starting async interpretation for {temple} poem #{poem_id}")
+
+        # Steps 1-4: Validate, retrieve poem and RAG context, prepare context
+        selected_poem_chunks, additional_chunks, context = await asyncio.to_thread(
+            self._prepare_generation, question, temple, poem_id, additional_context_k
+        )
+
+        # Step 5: Generate interpretation on the event loop
+        interpretation = await self._generate_interpretation_async(
+            question, context, temple, poem_id, streaming_callback, retry_budget
+        )
+
+        # Step 6: Post-process interpretation
+        interpretation = self._post_process_interpretation(interpretation, question)
+
+        # Step 7: Build result
+        result = self._build_result(interpretation, temple, poem_id, selected_poem_chunks, additional_chunks, question)
+
+        # Step 8: Capture FAQ if enabled
+        if capture_faq:
+            await asyncio.to_thread(self._capture_faq_interaction, question, result)
+
+        self.logger.info(f"Async interpretation completed for {temple} poem #{poem_id}")
+        return result
+
+    def _prepare_generation(self, question: str, temple: str, poem_id: int,
+                            additional_context_k: int) -> tuple:
+        """Steps 1-4 of the workflow: returns (selected_chunks, additional_chunks, context)."""
+        self._validate_inputs(question, temple, poem_id)
+        selected_poem_chunks = self._retrieve_selected_poem(temple, poem_id)
+        additional_chunks = self._get_additional_context(question, temple, poem_id, additional_context_k)
+        context = self._prepare_context(selected_poem_chunks, additional_chunks, temple, poem_id)
+        return selected_poem_chunks, additional_chunks, context
+
+    async def _generate_interpretation_async(self, question: str, context: str, temple: str, poem_id: int,
+                                             streaming_callback: Optional[Callable[[str], None]] = None,
+                                             retry_budget: Optional[RetryBudget] = None) -> str:
+        """Default implementation runs the synchronous generation in a thread. Subclasses can override."""
+        return await asyncio.to_thread(
+            self._generate_interpretation_with_streaming, question, context, temple, poem_id,
+            streaming_callback, retry_budget
+        )
+
     # Abstract methods - subclasses must implement these
     @abstractmethod
     def _prepare_context(self, selected_chunks: List[Dict], additional_chunks: List[Dict],
@@ -329,6 +421,29 @@ class BaseInterpreter(ABC):
 # Concrete implementation for poem interpretation
 class PoemInterpreter(BaseInterpreter):
     """Concrete poem interpreter implementation using Template Method pattern."""
+
+    REQUIRED_KEYS = [
+        "LineByLineInterpretation",
+        "OverallDevelopment",
+        "PositiveFactors",
+        "Challenges",
+        "SuggestedActions",
+        "SupplementaryNotes",
+        "Conclusion"
+    ]
+
+    MIN_FIELD_LENGTHS = {
+        "LineByLineInterpretation": 100,  # Detailed line-by-line needs more content
+        "OverallDevelopment": 50,
+        "PositiveFactors": 50,
+        "Challenges": 50,
+        "SuggestedActions": 50,
+        "SupplementaryNotes": 30,
+        "Conclusion": 30
+    }
+
+    # More failing sections than this are regenerated as a whole instead of repaired
+    MAX_REPAIR_FIELDS = 3
     
     def _prepare_context(self, selected_chunks: List[Dict], additional_chunks: List[Dict], 
                         temple: str, poem_id: int) -> str:
@@ -377,25 +492,8 @@ class PoemInterpreter(BaseInterpreter):
         Returns:
             (is_valid, parsed_data, error_message)
         """
-        required_keys = [
-            "LineByLineInterpretation",
-            "OverallDevelopment",
-            "PositiveFactors",
-            "Challenges",
-            "SuggestedActions",
-            "SupplementaryNotes",
-            "Conclusion"
-        ]
-
-        min_lengths = {
-            "LineByLineInterpretation": 100,  # Detailed line-by-line needs more content
-            "OverallDevelopment": 50,
-            "PositiveFactors": 50,
-            "Challenges": 50,
-            "SuggestedActions": 50,
-            "SupplementaryNotes": 30,
-            "Conclusion": 30
-        }
+        required_keys = self.REQUIRED_KEYS
+        min_lengths = self.MIN_FIELD_LENGTHS
 
         try:
             # Step 1: Parse JSON
@@ -522,17 +620,284 @@ class PoemInterpreter(BaseInterpreter):
 
         return quality_issues
 
-    def _should_use_structured_output(self) -> bool:
+    def _create_stream_validator(self) -> StreamingJSONValidator:
+        """Incremental validator applying the structural part of _validate_interpretation_response."""
+        return StreamingJSONValidator(
+            self.REQUIRED_KEYS, self.MIN_FIELD_LENGTHS, self._check_streamed_field,
+            max_field_failures=self.MAX_REPAIR_FIELDS  # repaired after the stream completes
+        )
+
+    def _check_streamed_field(self, key: str, value: str) -> Optional[str]:
+        """Per-field quality check that can run as soon as the field has streamed."""
+        if key == "LineByLineInterpretation" and "Line" not in value and "第一句:" not in value:
+            return "LineByLineInterpretation: missing proper line-by-line structure"
+        return None
+
+    @staticmethod
+    def _validating_callback(validator: StreamingJSONValidator,
+                             streaming_callback: Callable[[str], None],
+                             budget: Optional[RetryBudget] = None) -> Callable[[str], None]:
+        """Feed each token to the validator before forwarding it; StreamAborted or
+        GenerationCancelled (the budget was cancelled) stops the stream."""
+        def callback(token: str):
+            if budget is not None:
+                budget.raise_if_cancelled()
+            validator.feed(token)
+            streaming_callback(token)
+        return callback
+
+    def _find_failing_fields(self, parsed: dict, question: str) -> Dict[str, str]:
+        """Per-section failures of a parsed report: maps key to reason."""
+        failing = {}
+        for key in self.REQUIRED_KEYS:
+            value = parsed.get(key)
+            if not isinstance(value, str) or not value.strip():
+                failing[key] = f"{key}: missing or empty"
+            elif len(value.strip()) < self.MIN_FIELD_LENGTHS[key]:
+                failing[key] = f"{key}: too short ({len(value.strip())} chars, min {self.MIN_FIELD_LENGTHS[key]})"
+        if not failing:
+            for issue in self._check_content_quality(parsed, question, 0):
+                key = issue.split(":", 1)[0]
+                # Language mismatch is detected on LineByLineInterpretation
+                failing.setdefault(key if key in self.REQUIRED_KEYS else "LineByLineInterpretation", issue)
+        return failing
+
+    def _plan_repair(self, response: str, question: str) -> Optional[tuple]:
+        """Decide whether a failed response can be repaired: returns (report, failing_fields) or None."""
+        try:
+            parsed = json.loads(response.strip())
+        except (json.JSONDecodeError, AttributeError):
+            return None
+        if not isinstance(parsed, dict):
+            return None
+        failing = self._find_failing_fields(parsed, question)
+        if not failing or len(failing) > self.MAX_REPAIR_FIELDS:
+            return None
+        report = {key: value for key, value in parsed.items() if key in self.REQUIRED_KEYS and key not in failing}
+        return report, failing
+
+    def _prepare_repair(self, question: str, context: str, temple: str, poem_id: int,
+                        language_instruction: str, report: Dict[str, str], failing: Dict[str, str]) -> tuple:
+        """Build the repair prompt and generation kwargs: returns (prompt, gen_kwargs)."""
+        prompt = self._create_repair_prompt(question, context, temple, poem_id, language_instruction, report, failing)
+        self.logger.info(f"FIELD_REPAIR: Regenerating {list(failing)} for {temple} poem #{poem_id}")
+        return prompt, {"temperature": 0.6, "max_tokens": repair_max_tokens(list(failing))}
+
+    def _apply_repair(self, record, budget: RetryBudget, report: Dict[str, str],
+                      failing: Dict[str, str], repair_text: str) -> Optional[Dict[str, str]]:
+        """Merge a repair response into the report and record the attempt."""
+        merged = merge_repaired_fields(report, extract_json_object(repair_text), list(failing))
+        if merged is None:
+            budget.end(record, False, f"Repair response missing sections: {list(failing)}")
+            return None
+        budget.end(record, True)
+        full_tokens = estimate_tokens(json.dumps(merged, ensure_ascii=False))
+        record.tokens_saved = max(0, full_tokens - estimate_tokens(repair_text))
+        return merged
+
+    def _accept_repair(self, merged: Optional[Dict[str, str]], budget: RetryBudget, question: str,
+                       temple: str, poem_id: int, user_language: str, attempt: int) -> Optional[str]:
+        """Run full validation on a merged report: returns the JSON text if it passes."""
+        if merged is None:
+            return None
+        merged_text = json.dumps(merged, ensure_ascii=False)
+        is_valid, error_msg = self._check_attempt(merged_text, question, temple, poem_id, user_language, attempt)
+        if not is_valid:
+            budget.reject_last(error_msg)
+            return None
+        self.logger.info(
+            f"FIELD_REPAIR_SUCCESS: Repaired report accepted, ~{budget.attempts[-1].tokens_saved} tokens saved",
+            extra={
+                "temple": temple,
+                "poem_id": poem_id,
+                "tokens_saved": budget.attempts[-1].tokens_saved,
+                "metric_type": "field_repair_success"
+            }
+        )
+        return merged_text
+
+    def _repair_response(self, response: str, question: str, context: str, temple: str, poem_id: int,
+                         language_instruction: str, user_language: str, attempt: int,
+                         budget: RetryBudget) -> Optional[str]:
+        """Regenerate only the failing sections of an otherwise usable response."""
+        plan = self._plan_repair(response, question)
+        if plan is None or not budget.allow_attempt():
+            return None
+        report, failing = plan
+        prompt, gen_kwargs = self._prepare_repair(question, context, temple, poem_id, language_instruction, report, failing)
+
+        record = budget.begin("repair")
+        try:
+            repair_text = self.llm.generate(prompt, **gen_kwargs)
+        except Exception as e:
+            budget.end(record, False, f"Field repair failed: {e}")
+            self.logger.error(f"Field repair failed: {e}")
+            return None
+        merged = self._apply_repair(record, budget, report, failing, repair_text)
+        return self._accept_repair(merged, budget, question, temple, poem_id, user_language, attempt)
+
+    async def _repair_response_async(self, response: str, question: str, context: str, temple: str, poem_id: int,
+                                     language_instruction: str, user_language: str, attempt: int,
+                                     budget: RetryBudget) -> Optional[str]:
+        """Async variant of _repair_response using the async LLM client."""
+        plan = self._plan_repair(response, question)
+        if plan is None or not budget.allow_attempt():
+            return None
+        report, failing = plan
+        prompt, gen_kwargs = self._prepare_repair(question, context, temple, poem_id, language_instruction, report, failing)
+
+        record = budget.begin("repair")
+        try:
+            repair_text = await asyncio.wait_for(
+                self.async_llm.generate(prompt, **gen_kwargs), timeout=budget.remaining()
+            )
+        except Exception as e:
+            budget.end(record, False, f"Field repair failed: {e!r}")
+            self.logger.error(f"Field repair failed: {e!r}")
+            return None
+        merged = self._apply_repair(record, budget, report, failing, repair_text)
+        return self._accept_repair(merged, budget, question, temple, poem_id, user_language, attempt)
+
+    async def repair_report_async(self, question: str, temple: str, poem_id: int, report: Dict[str, str],
+                                  failing_fields: Dict[str, str],
+                                  retry_budget: Optional[RetryBudget] = None) -> Optional[Dict[str, str]]:
+        """Regenerate only `failing_fields` of a report validated elsewhere (PoemService).
+
+        Args:
+            question: User's question
+            temple: Temple name
+            poem_id: Poem ID
+            report: Current report; sections not in failing_fields are passed as context
+            failing_fields: Key to failure reason for the sections to regenerate
+            retry_budget: Shared attempt budget and deadline (a default one is used if None)
+
+        Returns:
+            Merged report, or None when the repair was skipped or unusable
+        """
+        budget = retry_budget or RetryBudget(self.retry_policy)
+        if not failing_fields or len(failing_fields) > self.MAX_REPAIR_FIELDS or not budget.allow_attempt():
+            return None
+
+        _, _, context = await asyncio.to_thread(
+            self._prepare_generation, question, temple, poem_id, self.config.max_poems_per_query
+        )
+        language_instruction = self._get_language_instruction(self._detect_language(question))
+        valid_sections = {key: value for key, value in report.items() if key not in failing_fields}
+        prompt, gen_kwargs = self._prepare_repair(
+            question, context, temple, poem_id, language_instruction, valid_sections, failing_fields
+        )
+
+        record = budget.begin("repair")
+        try:
+            if self.async_llm is not None:
+                generation = self.async_llm.generate(prompt, **gen_kwargs)
+            else:
+                generation = asyncio.to_thread(self.llm.generate, prompt, **gen_kwargs)
+            repair_text = await asyncio.wait_for(generation, timeout=budget.remaining())
+        except Exception as e:
+            budget.end(record, False, f"Field repair failed: {e!r}")
+            self.logger.error(f"Field repair failed: {e!r}")
+            return None
+        merged = self._apply_repair(record, budget, valid_sections, failing_fields, repair_text)
+        if merged is None:
+            return None
+        return {**report, **merged}
+
+    def _should_use_structured_output(self, llm_client=None) -> bool:
         """Check if LLM client supports OpenAI structured output."""
-        from .models import LLMProvider
-        # Check if using OpenAI
-        if hasattr(self.llm, 'client') and hasattr(self.llm.client, 'chat'):
+        llm_client = llm_client or self.llm
+        # Check if using OpenAI (sync or async client)
+        if hasattr(llm_client, 'client') and hasattr(llm_client.client, 'chat'):
             # It's an OpenAI client
             return True
         return False
 
+    def _prepare_attempt(self, question: str, context: str, temple: str, poem_id: int,
+                         language_instruction: str, attempt: int, max_attempts: int,
+                         use_structured_output: bool) -> tuple:
+        """Build the prompt and generation kwargs for one attempt: returns (prompt, gen_kwargs)."""
+        # Generate prompt with increasing strictness for retries
+        prompt = self._create_interpretation_prompt(
+            question, context, temple, poem_id,
+            language_instruction, attempt, use_structured_output
+        )
+
+        self.logger.info(
+            f"LLM generation attempt {attempt + 1}/{max_attempts} "
+            f"(structured_output={use_structured_output})"
+        )
+
+        # Prepare generation kwargs
+        gen_kwargs = {
+            "temperature": 0.7 - (attempt * 0.1),
+            "max_tokens": 2500 + (attempt * 500)
+        }
+
+        # Add structured output for OpenAI
+        if use_structured_output:
+            from .schemas import FortuneInterpretation
+            gen_kwargs["response_format"] = FortuneInterpretation
+
+        return prompt, gen_kwargs
+
+    def _check_attempt(self, response: str, question: str, temple: str, poem_id: int,
+                       user_language: str, attempt: int) -> tuple:
+        """Validate one attempt's response and log metrics: returns (is_valid, error_msg)."""
+        is_valid, parsed_data, error_msg = self._validate_interpretation_response(response, question, attempt)
+
+        if is_valid:
+            # Log success metrics
+            self.logger.info(
+                f"SUCCESS: Valid interpretation generated",
+                extra={
+                    "attempt": attempt + 1,
+                    "temple": temple,
+                    "poem_id": poem_id,
+                    "question_length": len(question),
+                    "response_length": len(response),
+                    "user_language": user_language,
+                    "validation_success": True,
+                    "metric_type": "interpretation_success"
+                }
+            )
+        else:
+            # Log validation failure metrics
+            self.logger.warning(
+                f"VALIDATION_FAILURE: Attempt {attempt + 1} failed validation",
+                extra={
+                    "attempt": attempt + 1,
+                    "temple": temple,
+                    "poem_id": poem_id,
+                    "error_message": error_msg,
+                    "response_length": len(response) if response else 0,
+                    "user_language": user_language,
+                    "validation_success": False,
+                    "metric_type": "validation_failure"
+                }
+            )
+        return is_valid, error_msg
+
+    def _all_attempts_failed(self, question: str, temple: str, poem_id: int, user_language: str,
+                             max_attempts: int, last_error: str) -> str:
+        """Log the critical failure and return the structured fallback response."""
+        self.logger.error(
+            f"CRITICAL_FAILURE: All {max_attempts} interpretation attempts failed",
+            extra={
+                "temple": temple,
+                "poem_id": poem_id,
+                "question_length": len(question),
+                "total_attempts": max_attempts,
+                "final_error": last_error,
+                "user_language": user_language,
+                "fallback_used": True,
+                "metric_type": "interpretation_critical_failure"
+            }
+        )
+        return self._create_fallback_response(question, temple, poem_id, user_language)
+
     def _generate_interpretation(self, question: str, context: str, temple: str, poem_id: int,
-                                 streaming_callback: Optional[Callable[[str], None]] = None) -> str:
+                                 streaming_callback: Optional[Callable[[str], None]] = None,
+                                 retry_budget: Optional[RetryBudget] = None) -> str:
         """Generate interpretation using LLM with validation and auto-retry.
 
         Args:
@@ -541,6 +906,7 @@ class PoemInterpreter(BaseInterpreter):
             temple: Temple name
             poem_id: Poem ID
             streaming_callback: Optional callback for streaming tokens (for UX improvement)
+            retry_budget: Shared attempt budget and deadline (a default one is used if None)
 
         Returns:
             Complete generated interpretation
@@ -550,113 +916,162 @@ class PoemInterpreter(BaseInterpreter):
         user_language = self._detect_language(question)
         language_instruction = self._get_language_instruction(user_language)
 
-        max_attempts = 3
+        budget = retry_budget or RetryBudget(self.retry_policy)
+        attempt = 0
         last_error = ""
         use_structured_output = self._should_use_structured_output()
 
-        # Import schema if using structured output
-        if use_structured_output:
-            from .schemas import FortuneInterpretation
-
-        for attempt in range(max_attempts):
+        while budget.allow_attempt():
+            record = budget.begin()
             try:
-                # Generate prompt with increasing strictness for retries
-                prompt = self._create_interpretation_prompt(
-                    question, context, temple, poem_id,
-                    language_instruction, attempt, use_structured_output
+                prompt, gen_kwargs = self._prepare_attempt(
+                    question, context, temple, poem_id, language_instruction,
+                    attempt, budget.max_attempts, use_structured_output
                 )
 
-                self.logger.info(
-                    f"LLM generation attempt {attempt + 1}/{max_attempts} "
-                    f"(structured_output={use_structured_output})"
-                )
-
-                # Prepare generation kwargs
-                gen_kwargs = {
-                    "temperature": 0.7 - (attempt * 0.1),
-                    "max_tokens": 2500 + (attempt * 500)
-                }
-
-                # Add structured output for OpenAI
-                if use_structured_output:
-                    gen_kwargs["response_format"] = FortuneInterpretation
-
                 # Generate response (with streaming if callback provided)
                 if streaming_callback and not use_structured_output:
                     # Note: Structured output doesn't support streaming yet
                     response = self.llm.generate_stream(
                         prompt,
-                        callback=streaming_callback,
+                        callback=self._validating_callback(self._create_stream_validator(), streaming_callback, budget),
                         **gen_kwargs
                     )
                 else:
                     response = self.llm.generate(prompt, **gen_kwargs)
 
                 # Validate response
-                is_valid, parsed_data, error_msg = self._validate_interpretation_response(response, question, attempt)
+                is_valid, error_msg = self._check_attempt(response, question, temple, poem_id, user_language, attempt)
+                budget.end(record, is_valid, None if is_valid else error_msg)
 
                 if is_valid:
-                    # Log success metrics
-                    self.logger.info(
-                        f"SUCCESS: Valid interpretation generated",
-                        extra={
-                            "attempt": attempt + 1,
-                            "temple": temple,
-                            "poem_id": poem_id,
-                            "question_length": len(question),
-                            "response_length": len(response),
-                            "user_language": user_language,
-                            "validation_success": True,
-                            "metric_type": "interpretation_success"
-                        }
-                    )
                     return response
+                last_error = error_msg
+
+                # Few sections failed: regenerate just those instead of the whole report
+                repaired = self._repair_response(
+                    response, question, context, temple, poem_id,
+                    language_instruction, user_language, attempt, budget
+                )
+                if repaired is not None:
+                    return repaired
+
+            except GenerationCancelled as e:
+                # Nobody is waiting for a fallback report: let the caller see the cancellation
+                budget.end(record, False, f"Generation cancelled: {e.reason}")
+                self.logger.info(f"Attempt {attempt + 1} cancelled: {e.reason}")
+                raise
+
+            except StreamAborted as e:
+                last_error = f"Stream aborted: {e.reason}"
+                budget.abort(record, e.reason, e.chars_received)
+                self.logger.warning(
+                    f"EARLY_ABORT: Attempt {attempt + 1} cancelled after {e.chars_received} chars: {e.reason}",
+                    extra={
+                        "attempt": attempt + 1,
+                        "temple": temple,
+                        "poem_id": poem_id,
+                        "chars_received": e.chars_received,
+                        "metric_type": "stream_early_abort"
+                    }
+                )
+
+            except Exception as e:
+                last_error = f"LLM generation failed: {str(e)}"
+                budget.end(record, False, last_error)
+                self.logger.error(f"LLM generation failed on attempt {attempt + 1}: {e}")
+
+            attempt += 1
+            # Jittered exponential backoff, skipped when the deadline leaves no room for another attempt.
+            # This path already runs in a worker thread; the async path awaits instead.
+            if not budget.wait_before_retry_sync():
+                break
+
+        # All attempts failed - return structured fallback (unless the request was cancelled meanwhile)
+        budget.raise_if_cancelled()
+        return self._all_attempts_failed(question, temple, poem_id, user_language, attempt, last_error)
+
+    async def _generate_interpretation_async(self, question: str, context: str, temple: str, poem_id: int,
+                                             streaming_callback: Optional[Callable[[str], None]] = None,
+                                             retry_budget: Optional[RetryBudget] = None) -> str:
+        """Async variant of _generate_interpretation using the async LLM client.
+
+        Backoff between attempts awaits instead of sleeping in a thread.
+        """
+        user_language = self._detect_language(question)
+        language_instruction = self._get_language_instruction(user_language)
+
+        budget = retry_budget or RetryBudget(self.retry_policy)
+        attempt = 0
+        last_error = ""
+        use_structured_output = self._should_use_structured_output(self.async_llm)
+
+        while budget.allow_attempt():
+            record = budget.begin()
+            try:
+                prompt, gen_kwargs = self._prepare_attempt(
+                    question, context, temple, poem_id, language_instruction,
+                    attempt, budget.max_attempts, use_structured_output
+                )
+
+                if streaming_callback and not use_structured_output:
+                    callback = self._validating_callback(self._create_stream_validator(), streaming_callback, budget)
+                    generation = self.async_llm.generate_stream(prompt, callback=callback, **gen_kwargs)
                 else:
-                    last_error = error_msg
-                    # Log validation failure metrics
-                    self.logger.warning(
-                        f"VALIDATION_FAILURE: Attempt {attempt + 1} failed validation",
-                        extra={
-                            "attempt": attempt + 1,
-                            "temple": temple,
-                            "poem_id": poem_id,
-                            "error_message": error_msg,
-                            "response_length": len(response) if response else 0,
-                            "user_language": user_language,
-                            "validation_success": False,
-                            "metric_type": "validation_failure"
-                        }
-                    )
+                    generation = self.async_llm.generate(prompt, **gen_kwargs)
+                # A single slow generation must not run past the shared deadline
+                response = await asyncio.wait_for(generation, timeout=budget.remaining())
 
-                    # Exponential backoff between retries
-                    if attempt < max_attempts - 1:
-                        wait_time = 2 ** attempt  # 1s, 2s, 4s
-                        self.logger.info(f"Waiting {wait_time}s before retry...")
-                        time.sleep(wait_time)
+                is_valid, error_msg = self._check_attempt(response, question, temple, poem_id, user_language, attempt)
+                budget.end(record, is_valid, None if is_valid else error_msg)
+
+                if is_valid:
+                    return response
+                last_error = error_msg
+
+                repaired = await self._repair_response_async(
+                    response, question, context, temple, poem_id,
+                    language_instruction, user_language, attempt, budget
+                )
+                if repaired is not None:
+                    return repaired
+
+            except GenerationCancelled as e:
+                # Nobody is waiting for a fallback report: let the caller see the cancellation
+                budget.end(record, False, f"Generation cancelled: {e.reason}")
+                self.logger.info(f"Attempt {attempt + 1} cancelled: {e.reason}")
+                raise
+
+            except StreamAborted as e:
+                last_error = f"Stream aborted: {e.reason}"
+                budget.abort(record, e.reason, e.chars_received)
+                self.logger.warning(
+                    f"EARLY_ABORT: Attempt {attempt + 1} cancelled after {e.chars_received} chars: {e.reason}",
+                    extra={
+                        "attempt": attempt + 1,
+                        "temple": temple,
+                        "poem_id": poem_id,
+                        "chars_received": e.chars_received,
+                        "metric_type": "stream_early_abort"
+                    }
+                )
+
+            except asyncio.TimeoutError:
+                last_error = "LLM generation exceeded the retry deadline"
+                budget.end(record, False, last_error)
+                self.logger.error(f"LLM generation timed out on attempt {attempt + 1}")
 
             except Exception as e:
                 last_error = f"LLM generation failed: {str(e)}"
+                budget.end(record, False, last_error)
                 self.logger.error(f"LLM generation failed on attempt {attempt + 1}: {e}")
 
-                if attempt < max_attempts - 1:
-                    wait_time = 2 ** attempt
-                    time.sleep(wait_time)
+            attempt += 1
+            if not await budget.wait_before_retry():
+                break
 
-        # All attempts failed - return structured fallback
-        self.logger.error(
-            f"CRITICAL_FAILURE: All {max_attempts} interpretation attempts failed",
-            extra={
-                "temple": temple,
-                "poem_id": poem_id,
-                "question_length": len(question),
-                "total_attempts": max_attempts,
-                "final_error": last_error,
-                "user_language": user_language,
-                "fallback_used": True,
-                "metric_type": "interpretation_critical_failure"
-            }
-        )
-        return self._create_fallback_response(question, temple, poem_id, user_language)
+        budget.raise_if_cancelled()
+        return self._all_attempts_failed(question, temple, poem_id, user_language, attempt, last_error)
 
     def _create_interpretation_prompt(self, question: str, context: str, temple: str,
                                     poem_id: int, language_instruction: str, attempt: int,
@@ -803,6 +1218,39 @@ class PoemInterpreter(BaseInterpreter):
 
         return prompt
 
+    def _create_repair_prompt(self, question: str, context: str, temple: str, poem_id: int,
+                              language_instruction: str, report: Dict[str, str],
+                              failing: Dict[str, str]) -> str:
+        """Create a prompt that regenerates only the failing sections of a report."""
+        accepted_sections = json.dumps(report, ensure_ascii=False, indent=2)
+        problems = "\n".join(f"        - {key}: {reason}" for key, reason in failing.items())
+        requested_keys = ", ".join(f'"{key}"' for key in failing)
+
+        prompt = f"""
+        You are a wise fortune interpretation assistant specializing in Chinese temple divination and oracle reading.
+        You already wrote most of an interpretation of the SELECTED FORTUNE POEM from {temple} (Poem #{poem_id}).
+        Some sections did not meet the requirements and must be rewritten.
+
+        CONTEXT:
+        {context}
+
+        USER QUESTION: {question}
+
+        SECTIONS ALREADY ACCEPTED (keep consistent with these, do not repeat them):
+        {accepted_sections}
+
+        SECTIONS TO REWRITE AND WHY:
+{problems}
+
+        REQUIREMENTS:
+        - {language_instruction}
+        - "LineByLineInterpretation" must label each poem line ("Line 1:", "Line 2:", ...), connect its imagery to the question and mention {temple} poem #{poem_id}.
+        - Every other section must contain 4-5 substantial sentences grounded in the poem and the question.
+        - RETURN ONLY A SINGLE JSON OBJECT with exactly these keys: {requested_keys}. No text outside the JSON.
+        """
+
+        return prompt
+
     def _create_fallback_response(self, question: str, temple: str, poem_id: int, language: str) -> str:
         """Create a structured fallback response when all LLM attempts fail."""
 
@@ -858,9 +1306,10 @@ class InterpreterFactory:
     
     @staticmethod
     def create_poem_interpreter(rag_handler: UnifiedRAGHandler, llm_client: BaseLLMClient, 
-                              faq_pipeline: FAQPipeline) -> PoemInterpreter:
+                              faq_pipeline: FAQPipeline,
+                              async_llm_client: Optional[AsyncBaseLLMClient] = None) -> PoemInterpreter:
         """Create a poem interpreter instance."""
-        return PoemInterpreter(rag_handler, llm_client, faq_pipeline)
+        return PoemInterpreter(rag_handler, llm_client, faq_pipeline, async_llm_client)
     
     @staticmethod
     def create_custom_interpreter(interpreter_class: type, rag_handler: UnifiedRAGHandler, 
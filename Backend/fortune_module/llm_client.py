@@ -1,6 +1,6 @@
 # llm_client.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, Iterator, Callable
+from typing import Dict, Any, Optional, Iterator, AsyncIterator, Callable
 from .models import LLMProvider
 from .config import SystemConfig
 import logging
@@ -139,12 +139,16 @@ class OpenAIClient(BaseLLMClient):
             response_stream = self.client.chat.completions.create(**params)
 
             full_response = ""
-            for chunk in response_stream:
-                if chunk.choices[0].delta.content:
-                    token = chunk.choices[0].delta.content
-                    full_response += token
-                    if callback:
-                        callback(token)
+            try:
+                for chunk in response_stream:
+                    if chunk.choices[0].delta.content:
+                        token = chunk.choices[0].delta.content
+                        full_response += token
+                        if callback:
+                            callback(token)
+            finally:
+                # Release the connection when the callback stops the stream early
+                response_stream.close()
 
             self.logger.debug(f"Streamed response length: {len(full_response)}")
             return full_response
@@ -257,23 +261,27 @@ class OllamaClient(BaseLLMClient):
             response.raise_for_status()
 
             full_response = ""
-            # Process streaming response line by line
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        chunk_data = json.loads(line)
-                        token = chunk_data.get("response", "")
-                        if token:
-                            full_response += token
-                            if callback:
-                                callback(token)
-
-                        # Check if generation is complete
-                        if chunk_data.get("done", False):
-                            break
-                    except json.JSONDecodeError:
-                        # Skip malformed lines
-                        continue
+            try:
+                # Process streaming response line by line
+                for line in response.iter_lines():
+                    if line:
+                        try:
+                            chunk_data = json.loads(line)
+                            token = chunk_data.get("response", "")
+                            if token:
+                                full_response += token
+                                if callback:
+                                    callback(token)
+
+                            # Check if generation is complete
+                            if chunk_data.get("done", False):
+                                break
+                        except json.JSONDecodeError:
+                            # Skip malformed lines
+                            continue
+            finally:
+                # Release the connection when the callback stops the stream early
+                response.close()
 
             self.logger.debug(f"Streamed response length: {len(full_response)}")
             return full_response
@@ -301,6 +309,272 @@ class MockLLMClient(BaseLLMClient):
         self.logger.debug(f"Mock generation for prompt length: {len(prompt)}")
         return f"{self.mock_response}\n\nPrompt was: {prompt[:100]}..."
 
+# Async Strategy - native asyncio LLM clients with pooled keep-alive connections
+class AsyncBaseLLMClient(ABC):
+    """Abstract base class for asyncio LLM clients.
+
+    Calls run on the event loop instead of an executor thread, so the number of
+    in-flight generations is bounded by provider limits, not thread-pool size.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @abstractmethod
+    async def generate(self, prompt: str, **kwargs) -> str:
+        """Generate response from LLM."""
+        pass
+
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        Async iterator over generated tokens.
+        Default implementation yields the non-streaming result as one chunk.
+        """
+        yield await self.generate(prompt, **kwargs)
+
+    async def generate_stream(self, prompt: str, callback: Optional[Callable[[str], None]] = None, **kwargs) -> str:
+        """
+        Generate response with streaming, calling callback with each token.
+
+        Args:
+            prompt: The input prompt
+            callback: Optional callback function called with each token/chunk
+            **kwargs: Additional generation parameters
+
+        Returns:
+            Complete generated text
+        """
+        tokens = []
+        token_stream = self.stream(prompt, **kwargs)
+        try:
+            async for token in token_stream:
+                tokens.append(token)
+                if callback:
+                    callback(token)
+        finally:
+            # Close the HTTP stream now if the callback raised, instead of at garbage collection
+            await token_stream.aclose()
+        full_response = "".join(tokens)
+        self.logger.debug(f"Streamed response length: {len(full_response)}")
+        return full_response
+
+    @abstractmethod
+    def validate_config(self) -> bool:
+        """Validate the configuration for this client."""
+        pass
+
+    async def aclose(self):
+        """Close pooled connections."""
+        pass
+
+    @staticmethod
+    def _http_limits(config: Dict[str, Any]):
+        import httpx
+        return httpx.Limits(
+            max_connections=config.get("max_connections", 20),
+            max_keepalive_connections=config.get("max_keepalive_connections", 10),
+            keepalive_expiry=config.get("keepalive_expiry", 60.0)
+        )
+
+class AsyncOpenAIClient(AsyncBaseLLMClient):
+    """OpenAI client on openai.AsyncOpenAI with a shared httpx connection pool."""
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.api_key = config.get("api_key")
+        self.model = config.get("model", "gpt-3.5-turbo")
+        self.base_url = config.get("base_url")
+
+        if not self.validate_config():
+            raise ValueError("Invalid OpenAI configuration")
+
+        try:
+            import httpx
+            import openai
+            self.http_client = httpx.AsyncClient(
+                limits=self._http_limits(config),
+                timeout=httpx.Timeout(config.get("timeout", 180.0), connect=10.0)
+            )
+            client_params = {"api_key": self.api_key, "http_client": self.http_client}
+            if self.base_url:
+                client_params["base_url"] = self.base_url
+            self.client = openai.AsyncOpenAI(**client_params)
+            self.logger.info(f"Async OpenAI client initialized with model: {self.model}")
+        except ImportError:
+            raise ImportError("OpenAI library not installed. Run: pip install openai")
+        except Exception as e:
+            self.logger.error(f"Failed to initialize async OpenAI client: {e}")
+            raise
+
+    def validate_config(self) -> bool:
+        """Validate OpenAI configuration."""
+        if not self.api_key:
+            self.logger.error("OpenAI API key is required")
+            return False
+        return True
+
+    def _build_params(self, prompt: str, kwargs: Dict[str, Any], stream: bool = False) -> Dict[str, Any]:
+        params = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kwargs.get("temperature", 0.7),
+            "max_tokens": kwargs.get("max_tokens", 1000)
+        }
+        if stream:
+            params["stream"] = True
+        for key, value in kwargs.items():
+            if key not in ["temperature", "max_tokens", "stream"] and value is not None:
+                params[key] = value
+        return params
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        """Generate response using the OpenAI API (structured output supported)."""
+        try:
+            use_structured_output = kwargs.get("response_format") is not None
+            response = await self.client.chat.completions.create(**self._build_params(prompt, kwargs))
+
+            message = response.choices[0].message
+            if use_structured_output and hasattr(message, 'parsed'):
+                generated_text = message.parsed.model_dump_json(indent=2)
+            else:
+                generated_text = message.content
+            self.logger.debug(f"Generated response length: {len(generated_text)}")
+            return generated_text
+
+        except Exception as e:
+            self.logger.error(f"OpenAI generation failed: {e}")
+            raise
+
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream tokens using the OpenAI API."""
+        try:
+            response_stream = await self.client.chat.completions.create(
+                **self._build_params(prompt, kwargs, stream=True)
+            )
+            async for chunk in response_stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            self.logger.error(f"OpenAI streaming failed: {e}")
+            raise
+
+    async def aclose(self):
+        await self.client.close()
+
+class AsyncOllamaClient(AsyncBaseLLMClient):
+    """Ollama client on a keep-alive httpx.AsyncClient."""
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.base_url = config.get("base_url", "http://localhost:11434")
+        self.model = config.get("model", "llama2")
+
+        if not self.validate_config():
+            raise ValueError("Invalid Ollama configuration")
+
+        try:
+            import httpx
+            self.httpx = httpx
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self._http_limits(config),
+                timeout=httpx.Timeout(config.get("timeout", 180.0), connect=5.0)  # 3 minute timeout for generation
+            )
+            self.logger.info(f"Async Ollama client initialized with model: {self.model}")
+        except ImportError:
+            raise ImportError("httpx library not installed. Run: pip install httpx")
+
+    def validate_config(self) -> bool:
+        """Validate Ollama configuration."""
+        if not self.base_url or not self.model:
+            self.logger.error("Ollama base_url and model are required")
+            return False
+        return True
+
+    def _build_payload(self, prompt: str, kwargs: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": kwargs.get("temperature", 0.7),
+                "num_predict": kwargs.get("max_tokens", 1000)
+            }
+        }
+        for key, value in kwargs.items():
+            if key not in ["temperature", "max_tokens", "stream"] and value is not None:
+                payload["options"][key] = value
+        return payload
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        """Generate response using the Ollama API."""
+        try:
+            response = await self.client.post("/api/generate", json=self._build_payload(prompt, kwargs, stream=False))
+            response.raise_for_status()
+            generated_text = response.json().get("response", "")
+            self.logger.debug(f"Generated response length: {len(generated_text)}")
+            return generated_text
+
+        except self.httpx.HTTPError as e:
+            self.logger.error(f"Ollama request failed: {e}")
+            raise
+        except json.JSONDecodeError as e:
+            self.logger.error(f"Failed to parse Ollama response: {e}")
+            raise
+
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream tokens from the Ollama API (newline-delimited JSON)."""
+        try:
+            async with self.client.stream(
+                "POST", "/api/generate", json=self._build_payload(prompt, kwargs, stream=True)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        chunk_data = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Skip malformed lines
+                        continue
+                    token = chunk_data.get("response", "")
+                    if token:
+                        yield token
+                    if chunk_data.get("done", False):
+                        break
+        except self.httpx.HTTPError as e:
+            self.logger.error(f"Ollama streaming failed: {e}")
+            raise
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class AsyncMockLLMClient(AsyncBaseLLMClient):
+    """Async mock LLM client for testing purposes."""
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.mock_response = config.get("mock_response", "This is a mock response for testing.")
+
+    def validate_config(self) -> bool:
+        """Mock client always has valid config."""
+        return True
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        """Generate mock response."""
+        self.logger.debug(f"Mock generation for prompt length: {len(prompt)}")
+        return f"{self.mock_response}\n\nPrompt was: {prompt[:100]}..."
+
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Stream the mock response word by word."""
+        text = await self.generate(prompt, **kwargs)
+        for word in text.split(" "):
+            yield word + " "
+
+# Simulated provider lives in its own module; imported here so the factory can register it
+from .mock_llm import SimulatedLLMClient, AsyncSimulatedLLMClient
+
 # Factory Pattern - Create LLM clients
 class LLMClientFactory:
     """Factory for creating LLM clients using Factory pattern."""
@@ -308,6 +582,13 @@ class LLMClientFactory:
     _client_registry = {
         LLMProvider.OPENAI: OpenAIClient,
         LLMProvider.OLLAMA: OllamaClient,
+        LLMProvider.MOCK: SimulatedLLMClient,
+    }
+
+    _async_client_registry = {
+        LLMProvider.OPENAI: AsyncOpenAIClient,
+        LLMProvider.OLLAMA: AsyncOllamaClient,
+        LLMProvider.MOCK: AsyncSimulatedLLMClient,
     }
     
     @classmethod
@@ -344,6 +625,40 @@ class LLMClientFactory:
         config = {"mock_response": mock_response} if mock_response else {}
         return MockLLMClient(config)
     
+    @classmethod
+    def register_async_client(cls, provider: LLMProvider, client_class: type):
+        """Register a new async LLM client type."""
+        cls._async_client_registry[provider] = client_class
+
+    @classmethod
+    def create_async_client(cls, provider: LLMProvider, **config) -> AsyncBaseLLMClient:
+        """Create an asyncio LLM client based on provider type."""
+        if provider not in cls._async_client_registry:
+            raise ValueError(f"Unsupported async LLM provider: {provider}")
+
+        client_class = cls._async_client_registry[provider]
+
+        try:
+            return client_class(config)
+        except Exception as e:
+            logging.getLogger(cls.__name__).error(f"Failed to create async {provider.value} client: {e}")
+            raise
+
+    @classmethod
+    def create_async_from_config(cls, system_config: SystemConfig, provider: Optional[LLMProvider] = None) -> AsyncBaseLLMClient:
+        """Create async client using SystemConfig."""
+        if not provider:
+            provider = LLMProvider(system_config.default_llm_provider)
+
+        config = system_config.get_llm_config(provider.value)
+        return cls.create_async_client(provider, **config)
+
+    @classmethod
+    def create_async_mock_client(cls, mock_response: str = None) -> AsyncBaseLLMClient:
+        """Create an async mock client for testing."""
+        config = {"mock_response": mock_response} if mock_response else {}
+        return AsyncMockLLMClient(config)
+
     @classmethod
     def list_available_providers(cls) -> list:
         """List all registered LLM providers."""
@@ -0,0 +1,474 @@
+# llm_gateway.py
+"""
+Provider-level admission control for LLM calls.
+
+Every generation goes through the ProviderLimiter of its provider, which caps
+concurrent calls, enforces requests-per-minute and tokens-per-minute buckets
+and queues waiting callers strictly first-in first-out. Sync callers (worker
+threads) and async callers (the event loop) share the same queue. The limiter
+also estimates how long a new request would wait, so the API can refuse work
+with a realistic Retry-After instead of letting the provider answer 429.
+"""
+import asyncio
+import math
+import threading
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+from .field_repair import estimate_tokens
+from .llm_client import BaseLLMClient, AsyncBaseLLMClient
+
+# Output budget assumed for a call without max_tokens (a full report is 2500-3500 tokens)
+DEFAULT_OUTPUT_TOKENS = 3000
+
+
+class GatewayTimeout(Exception):
+    """Raised when a call waited longer than its timeout for a provider slot."""
+
+
+class TokenBucket:
+    """Continuous-refill bucket holding up to `per_minute` units."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 when they are now)."""
+        self.refill(now)
+        amount = min(amount, self.capacity)  # Larger requests would never fit
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass
+class AdmissionDecision:
+    """Whether a new request should be accepted, and when to retry if not."""
+    admitted: bool
+    retry_after: int = 0
+    estimated_wait: float = 0.0
+    backlog: int = 0
+
+
+@dataclass
+class GatewayPermit:
+    """A granted provider slot; pass it back to release()."""
+    provider: str
+    tokens: int
+    queued_seconds: float
+    granted_at: float
+
+
+class _Waiter:
+    """A queued caller, woken by an Event (threads) or a Future (event loop)."""
+
+    def __init__(self, tokens: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.tokens = tokens
+        self.enqueued_at = time.monotonic()
+        self.granted_at = 0.0
+        self.granted = False
+        self.rate_limited = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class ProviderLimiter:
+    """Concurrency cap, RPM/TPM buckets and FIFO wait queue for one provider.
+
+    Args:
+        name: Provider name (used in logs and metrics)
+        max_concurrency: Generations allowed in flight at once
+        requests_per_minute: Request bucket size (0 disables the limit)
+        tokens_per_minute: Token bucket size, prompt plus max output (0 disables the limit)
+        max_queue: Backlog beyond which admission() refuses new requests
+        max_queue_wait: Longest acceptable wait; also the acquire timeout of gated clients
+        expected_call_seconds: Initial estimate of one call's duration, refined as calls finish
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 4, requests_per_minute: int = 0,
+                 tokens_per_minute: int = 0, max_queue: int = 64, max_queue_wait: float = 60.0,
+                 expected_call_seconds: float = 20.0):
+        self.name = name
+        self.logger = logging.getLogger(f"{self.__class__.__name__}.{name}")
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+        self._in_flight = 0
+        self._avg_call_seconds = expected_call_seconds
+        self._avg_request_tokens = float(DEFAULT_OUTPUT_TOKENS)
+        self._queue_times: Deque[float] = deque(maxlen=1000)
+
+        # Metrics
+        self.acquired = 0
+        self.released = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.queue_seconds_total = 0.0
+        self.max_queue_seconds = 0.0
+
+        self.update(max_concurrency=max_concurrency, requests_per_minute=requests_per_minute,
+                    tokens_per_minute=tokens_per_minute, max_queue=max_queue,
+                    max_queue_wait=max_queue_wait)
+
+    def update(self, max_concurrency: Optional[int] = None, requests_per_minute: Optional[int] = None,
+               tokens_per_minute: Optional[int] = None, max_queue: Optional[int] = None,
+               max_queue_wait: Optional[float] = None):
+        """Change limits in place; calls already in flight keep their slots."""
+        with self._lock:
+            if max_concurrency is not None:
+                self.max_concurrency = max(1, max_concurrency)
+            if requests_per_minute is not None:
+                self.requests_per_minute = requests_per_minute
+                self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+            if tokens_per_minute is not None:
+                self.tokens_per_minute = tokens_per_minute
+                self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+            if max_queue is not None:
+                self.max_queue = max_queue
+            if max_queue_wait is not None:
+                self.max_queue_wait = max_queue_wait
+            self._dispatch()
+
+    @staticmethod
+    def estimate_request_tokens(prompt: str, kwargs: Dict[str, Any]) -> int:
+        """Tokens reserved for a call: the prompt plus its output limit."""
+        return estimate_tokens(prompt) + int(kwargs.get("max_tokens") or DEFAULT_OUTPUT_TOKENS)
+
+    # Internal, called with self._lock held
+    def _rate_delay(self, tokens: int, now: float) -> float:
+        delay = 0.0
+        if self._requests is not None:
+            delay = max(delay, self._requests.delay_for(1, now))
+        if self._tokens is not None:
+            delay = max(delay, self._tokens.delay_for(tokens, now))
+        return delay
+
+    def _dispatch(self) -> float:
+        """Grant free slots to the head of the queue. Returns the head's rate-limit delay."""
+        now = time.monotonic()
+        while self._waiters and self._in_flight < self.max_concurrency:
+            head = self._waiters[0]
+            delay = self._rate_delay(head.tokens, now)
+            if delay > 0:
+                # FIFO: later callers never overtake a rate-limited head
+                if not head.rate_limited:
+                    head.rate_limited = True
+                    self.rate_limited += 1
+                return delay
+            self._waiters.popleft()
+            self._grant(head, now)
+            head.wake()
+        return 0.0
+
+    def _grant(self, waiter: _Waiter, now: float):
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None:
+            self._tokens.take(waiter.tokens)
+        self._in_flight += 1
+        waiter.granted = True
+        waiter.granted_at = now
+        queued = now - waiter.enqueued_at
+        self._queue_times.append(queued)
+        self.queue_seconds_total += queued
+        self.max_queue_seconds = max(self.max_queue_seconds, queued)
+        self.acquired += 1
+        self._avg_request_tokens = 0.9 * self._avg_request_tokens + 0.1 * waiter.tokens
+
+    def _enqueue(self, waiter: _Waiter) -> float:
+        with self._lock:
+            self._waiters.append(waiter)
+            return self._dispatch()
+
+    def _abandon(self, waiter: _Waiter):
+        """Undo a wait that timed out or was cancelled, granted or not."""
+        with self._lock:
+            if waiter.granted:
+                self._in_flight -= 1
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            self._dispatch()
+
+    def _permit(self, waiter: _Waiter) -> GatewayPermit:
+        return GatewayPermit(
+            provider=self.name,
+            tokens=waiter.tokens,
+            queued_seconds=waiter.granted_at - waiter.enqueued_at,
+            granted_at=waiter.granted_at
+        )
+
+    @staticmethod
+    def _next_wait(delay: float, deadline: Optional[float]) -> Optional[float]:
+        """How long to block before re-checking: until the rate delay or the deadline."""
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise GatewayTimeout("Timed out waiting for an LLM provider slot")
+        if delay > 0:
+            return delay if remaining is None else min(delay, remaining)
+        return remaining
+
+    def acquire(self, tokens: int, timeout: Optional[float] = None) -> GatewayPermit:
+        """Block the calling thread until a slot is granted."""
+        waiter = _Waiter(tokens)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        delay = self._enqueue(waiter)
+        try:
+            while not waiter.granted:
+                waiter.event.wait(self._next_wait(delay, deadline))
+                with self._lock:
+                    delay = self._dispatch()
+        except GatewayTimeout:
+            self.timeouts += 1
+            self._abandon(waiter)
+            raise
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return self._permit(waiter)
+
+    async def acquire_async(self, tokens: int, timeout: Optional[float] = None) -> GatewayPermit:
+        """Await a slot without blocking the event loop."""
+        waiter = _Waiter(tokens, asyncio.get_running_loop())
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        delay = self._enqueue(waiter)
+        try:
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), self._next_wait(delay, deadline))
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    delay = self._dispatch()
+        except GatewayTimeout:
+            self.timeouts += 1
+            self._abandon(waiter)
+            raise
+        except BaseException:
+            # Includes cancellation by the caller's deadline
+            self._abandon(waiter)
+            raise
+        return self._permit(waiter)
+
+    def release(self, permit: GatewayPermit, used_tokens: Optional[int] = None):
+        """Free the slot and refund reserved tokens the call did not use."""
+        with self._lock:
+            self._in_flight -= 1
+            self.released += 1
+            duration = time.monotonic() - permit.granted_at
+            self._avg_call_seconds = 0.8 * self._avg_call_seconds + 0.2 * duration
+            if used_tokens is not None and self._tokens is not None and used_tokens < permit.tokens:
+                self._tokens.give_back(permit.tokens - used_tokens)
+            self._dispatch()
+
+    def _estimate_wait(self, pending: int) -> float:
+        """Expected queue time for a request behind `pending` not-yet-queued ones."""
+        now = time.monotonic()
+        ahead = len(self._waiters) + pending
+        free = self.max_concurrency - self._in_flight
+        wait = 0.0
+        if ahead >= free:
+            rounds = (ahead - max(free, 0)) // self.max_concurrency + 1
+            wait = rounds * self._avg_call_seconds
+        if self._requests is not None:
+            self._requests.refill(now)
+            wait = max(wait, (ahead + 1 - self._requests.level) / self._requests.rate)
+        if self._tokens is not None:
+            self._tokens.refill(now)
+            needed = (ahead + 1) * self._avg_request_tokens
+            wait = max(wait, (needed - self._tokens.level) / self._tokens.rate)
+        return max(0.0, wait)
+
+    def estimate_wait(self, pending: int = 0) -> float:
+        with self._lock:
+            return self._estimate_wait(pending)
+
+    def admission(self, pending: int = 0) -> AdmissionDecision:
+        """
+        Decide whether to accept one more request.
+
+        Args:
+            pending: Requests accepted upstream that have not reached the gateway yet
+
+        Returns:
+            AdmissionDecision; retry_after is the time until the backlog fits again
+        """
+        with self._lock:
+            wait = self._estimate_wait(pending)
+            backlog = len(self._waiters) + pending
+            overflow = backlog - self.max_queue + 1
+            if overflow <= 0 and wait <= self.max_queue_wait:
+                return AdmissionDecision(admitted=True, estimated_wait=wait, backlog=backlog)
+            drain = math.ceil(overflow / self.max_concurrency) * self._avg_call_seconds if overflow > 0 else 0.0
+            self.rejected += 1
+        retry_after = max(1, math.ceil(max(drain, wait - self.max_queue_wait)))
+        self.logger.info(f"[LLM_GATEWAY] Refusing request: backlog={backlog}, est_wait={wait:.1f}s, retry_after={retry_after}s")
+        return AdmissionDecision(admitted=False, retry_after=retry_after, estimated_wait=wait, backlog=backlog)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            queue_times = sorted(self._queue_times)
+            return {
+                "max_concurrency": self.max_concurrency,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "acquired": self.acquired,
+                "released": self.released,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "rate_limited": self.rate_limited,
+                "avg_queue_ms": round(self.queue_seconds_total / self.acquired * 1000, 1) if self.acquired else 0,
+                "p95_queue_ms": round(queue_times[max(0, math.ceil(len(queue_times) * 0.95) - 1)] * 1000, 1) if queue_times else 0,
+                "max_queue_ms": round(self.max_queue_seconds * 1000, 1),
+                "avg_call_seconds": round(self._avg_call_seconds, 2),
+                "estimated_wait_seconds": round(self._estimate_wait(0), 2)
+            }
+
+
+class GatedLLMClient(BaseLLMClient):
+    """Sync client wrapper that holds a provider slot for the duration of each call."""
+
+    def __init__(self, inner: BaseLLMClient, limiter: ProviderLimiter):
+        super().__init__(inner.config)
+        self.inner = inner
+        self.limiter = limiter
+
+    def __getattr__(self, name):
+        # Expose the wrapped client's attributes (e.g. .client for structured output detection)
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def validate_config(self) -> bool:
+        return self.inner.validate_config()
+
+    def _call(self, prompt: str, kwargs: Dict[str, Any], call: Callable[[], str]) -> str:
+        permit = self.limiter.acquire(self.limiter.estimate_request_tokens(prompt, kwargs),
+                                      timeout=self.limiter.max_queue_wait)
+        output = ""
+        try:
+            output = call()
+            return output
+        finally:
+            self.limiter.release(permit, used_tokens=estimate_tokens(prompt) + estimate_tokens(output))
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        return self._call(prompt, kwargs, lambda: self.inner.generate(prompt, **kwargs))
+
+    def generate_stream(self, prompt: str, callback: Optional[Callable[[str], None]] = None, **kwargs) -> str:
+        return self._call(prompt, kwargs, lambda: self.inner.generate_stream(prompt, callback=callback, **kwargs))
+
+
+class AsyncGatedLLMClient(AsyncBaseLLMClient):
+    """Async client wrapper that awaits a provider slot before each call."""
+
+    def __init__(self, inner: AsyncBaseLLMClient, limiter: ProviderLimiter):
+        super().__init__(inner.config)
+        self.inner = inner
+        self.limiter = limiter
+
+    def __getattr__(self, name):
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def validate_config(self) -> bool:
+        return self.inner.validate_config()
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        permit = await self.limiter.acquire_async(self.limiter.estimate_request_tokens(prompt, kwargs),
+                                                  timeout=self.limiter.max_queue_wait)
+        output = ""
+        try:
+            output = await self.inner.generate(prompt, **kwargs)
+            return output
+        finally:
+            self.limiter.release(permit, used_tokens=estimate_tokens(prompt) + estimate_tokens(output))
+
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        permit = await self.limiter.acquire_async(self.limiter.estimate_request_tokens(prompt, kwargs),
+                                                  timeout=self.limiter.max_queue_wait)
+        tokens = []
+        token_stream = self.inner.stream(prompt, **kwargs)
+        try:
+            async for token in token_stream:
+                tokens.append(token)
+                yield token
+        finally:
+            await token_stream.aclose()
+            self.limiter.release(permit, used_tokens=estimate_tokens(prompt) + estimate_tokens("".join(tokens)))
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class LLMGateway:
+    """Registry of per-provider limiters shared by every client in the process."""
+
+    def __init__(self):
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        """Limiter for a provider, created with default limits on first use."""
+        with self._lock:
+            if provider not in self._limiters:
+                self._limiters[provider] = ProviderLimiter(provider)
+            return self._limiters[provider]
+
+    def configure(self, provider: str, **limits) -> ProviderLimiter:
+        """Set limits for a provider (see ProviderLimiter for the accepted keys)."""
+        limiter = self.limiter(provider)
+        limiter.update(**limits)
+        return limiter
+
+    def wrap(self, client, provider: str):
+        """Route a sync or async client through the provider's limiter."""
+        if client is None or isinstance(client, (GatedLLMClient, AsyncGatedLLMClient)):
+            return client
+        if isinstance(client, AsyncBaseLLMClient):
+            return AsyncGatedLLMClient(client, self.limiter(provider))
+        return GatedLLMClient(client, self.limiter(provider))
+
+    def admission(self, provider: str, pending: int = 0) -> AdmissionDecision:
+        return self.limiter(provider).admission(pending)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.get_metrics() for name, limiter in limiters.items()}
+
+
+# Process-wide gateway: limits apply across all FortuneSystem instances
+llm_gateway = LLMGateway()
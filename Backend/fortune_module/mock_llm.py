@@ -0,0 +1,328 @@
+# mock_llm.py
+"""
+Simulated LLM provider for load tests and offline benchmarks.
+
+SimulatedLLMClient answers interpretation prompts with a valid seven-section
+JSON report in the prompt's language (zh, en or jp) and streams it token by
+token on a latency profile: time to first token and tokens per second are
+drawn from normal distributions. Failure modes (prose around the JSON, a
+truncated object, sections too short to pass validation, a hanging request,
+a connection error) are injected at configurable rates. With a seed, a run is
+reproducible. Selected with LLMProvider.MOCK (SystemConfig.mock_config).
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .llm_client import BaseLLMClient, AsyncBaseLLMClient
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    """Latency distribution of a simulated provider (all values in seconds / tokens per second)."""
+    ttft_mean: float
+    ttft_stddev: float
+    tokens_per_second: float
+    tokens_per_second_stddev: float = 0.0
+
+
+LATENCY_PROFILES = {
+    "instant": LatencyProfile(0.0, 0.0, 0.0),  # 0 tokens/sec = no delay between tokens
+    "fast": LatencyProfile(0.2, 0.05, 200.0, 20.0),
+    "openai": LatencyProfile(0.6, 0.2, 60.0, 10.0),
+    "ollama": LatencyProfile(1.5, 0.5, 25.0, 5.0),
+    "slow": LatencyProfile(4.0, 1.5, 8.0, 2.0),
+}
+
+FAILURE_MODES = ("malformed_json", "truncated", "short_fields", "timeout", "error")
+
+# Sleep only when the schedule is this far ahead, so fast profiles do not sleep per token
+_MIN_SLEEP = 0.005
+
+_TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]|[^\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]{1,4}')
+_POEM_PATTERN = re.compile(r'SELECTED FORTUNE POEM from (\S+) \(Poem #(\d+)\)')
+_REPAIR_KEYS_PATTERN = re.compile(r'exactly these keys: ([^\n.]+)')
+
+REPORT_TEMPLATES = {
+    "en": {
+        "LineByLineInterpretation": (
+            "Line 1: The opening image of {temple} poem #{poem_id} describes clouds parting over a mountain path, "
+            "a sign that the confusion around your question is about to lift.\n"
+            "Line 2: The second line speaks of a boat waiting for the tide; the timing matters more than the effort.\n"
+            "Line 3: The third line warns against trusting loud promises and asks you to test each offer quietly.\n"
+            "Line 4: The closing line shows a lantern lit at dusk, meaning help arrives late but arrives reliably."
+        ),
+        "OverallDevelopment": (
+            "The poem points to a slow start followed by clear improvement. Over the coming months the situation "
+            "moves from uncertainty toward a stable footing, provided you do not force decisions too early."
+        ),
+        "PositiveFactors": (
+            "You have supportive people nearby, a realistic sense of your own limits and the ability to learn quickly. "
+            "The poem's rising tide suggests outside conditions are turning in your favour."
+        ),
+        "Challenges": (
+            "Impatience and unreliable advice are the main risks. A tempting shortcut may appear; the poem's warning "
+            "about loud promises applies directly to it."
+        ),
+        "SuggestedActions": (
+            "Write down what a good outcome looks like, verify every commitment in writing and choose one concrete "
+            "action for this month. Revisit the plan at the next new moon."
+        ),
+        "SupplementaryNotes": (
+            "Poems of this temple often reward consistency. Returning to draw again after a month is customary."
+        ),
+        "Conclusion": (
+            "A favourable outcome is likely if you let events ripen. Move steadily and the lantern will be lit."
+        ),
+    },
+    "zh": {
+        "LineByLineInterpretation": (
+            "第一句: {temple}第{poem_id}籤開篇描寫雲開見山路，表示您所問之事的迷霧即將散去，方向逐漸明朗。\n"
+            "第二句: 第二句講舟待潮水，說明時機比努力更重要，不宜急於一時，等待順勢而行。\n"
+            "第三句: 第三句提醒不可輕信誇大的承諾，凡事須親自查證，方能避開陷阱。\n"
+            "第四句: 末句描寫黃昏點燈，意味著貴人雖來得較晚，卻必定可靠，終能照亮前路。"
+        ),
+        "OverallDevelopment": (
+            "此籤顯示事情起步較慢，之後會明顯好轉。未來數月局勢將由不確定走向穩定，只要不在時機未到時強行決定，整體發展順利。"
+        ),
+        "PositiveFactors": (
+            "身邊有願意支持您的人，您也清楚自己的能力與限制，學習速度快。籤中潮水上漲，代表外在環境正在轉向有利於您的方向。"
+        ),
+        "Challenges": (
+            "主要風險在於急躁與不可靠的建議。近期可能出現看似便捷的捷徑，籤詩中對誇大承諾的提醒正是針對此事，務必三思而後行。"
+        ),
+        "SuggestedActions": (
+            "先寫下理想結果的具體樣貌，所有承諾都要以書面確認，並在本月選定一件具體行動執行，下個新月時再檢視計畫。"
+        ),
+        "SupplementaryNotes": (
+            "此廟籤詩向來重視持之以恆，一個月後再來求籤、對照前後籤意也是常見的做法。"
+        ),
+        "Conclusion": (
+            "只要順其自然、讓時機成熟，結果多半圓滿。穩步前行，明燈自會點亮。"
+        ),
+    },
+    "jp": {
+        "LineByLineInterpretation": (
+            "第一句: {temple}の{poem_id}番のおみくじは、くもがはれてやまみちがみえるようすをえがいています。"
+            "あなたのまよいがもうすぐはれるというしるしです。\n"
+            "第二句: ふねがしおをまっているように、いまはがんばるよりもときをまつことがたいせつです。\n"
+            "第三句: おおきなやくそくをかんたんにしんじないように、ひとつずつしずかにたしかめてください。\n"
+            "第四句: ゆうがたにともるあかりのように、たすけはおそくても、かならずとどきます。"
+        ),
+        "OverallDevelopment": (
+            "はじめはゆっくりですが、そのあとははっきりとよくなっていきます。あせってきめなければ、"
+            "これからのすうかげつでじょうきょうはおちついていくでしょう。"
+        ),
+        "PositiveFactors": (
+            "まわりにはささえてくれるひとがいて、あなたはじぶんのちからをよくわかっています。"
+            "しおがみちてくるように、まわりのじょうきょうもあなたにとってよいほうへむかっています。"
+        ),
+        "Challenges": (
+            "いちばんのきけんは、あせりとしんようできないアドバイスです。らくなちかみちがあらわれても、"
+            "おみくじのちゅういをおもいだしてください。"
+        ),
+        "SuggestedActions": (
+            "よいけっかがどんなものかをかきだし、やくそくはかならずしょめんでたしかめましょう。"
+            "こんげつはひとつだけぐたいてきなこうどうをきめてください。"
+        ),
+        "SupplementaryNotes": (
+            "このおてらのおみくじは、つづけることをたいせつにしています。ひとつきごとにひきなおすのもよいでしょう。"
+        ),
+        "Conclusion": (
+            "ときがみちるのをまてば、よいけっかになるでしょう。おちついてすすめば、あかりはかならずともります。"
+        ),
+    },
+}
+
+_SHORT_FIELD_TEXT = {"en": "See above.", "zh": "同上。", "jp": "うえをみてください。"}
+
+
+def detect_prompt_language(prompt: str) -> str:
+    """Language requested by the interpreter's language instruction."""
+    if "日本語で回答" in prompt:
+        return "jp"
+    if "繁體中文" in prompt:
+        return "zh"
+    return "en"
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into token-sized chunks: one CJK character or up to four other characters."""
+    return _TOKEN_PATTERN.findall(text)
+
+
+class SimulatedResponder:
+    """Builds simulated responses and their token timing; shared by the sync and async clients.
+
+    Config keys:
+        profile: Name in LATENCY_PROFILES (default "fast")
+        ttft_mean / ttft_stddev / tokens_per_second / tokens_per_second_stddev: Override the profile
+        failure_rates: Mapping of FAILURE_MODES entries to probabilities
+        timeout_seconds: How long a "timeout" failure hangs before raising TimeoutError
+        seed: Seed for reproducible latencies and failures
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        base = LATENCY_PROFILES[config.get("profile", "fast")]
+        self.profile = LatencyProfile(
+            ttft_mean=config.get("ttft_mean", base.ttft_mean),
+            ttft_stddev=config.get("ttft_stddev", base.ttft_stddev),
+            tokens_per_second=config.get("tokens_per_second", base.tokens_per_second),
+            tokens_per_second_stddev=config.get("tokens_per_second_stddev", base.tokens_per_second_stddev)
+        )
+        self.failure_rates = {mode: float(rate) for mode, rate in (config.get("failure_rates") or {}).items()}
+        unknown = set(self.failure_rates) - set(FAILURE_MODES)
+        if unknown:
+            raise ValueError(f"Unknown failure modes: {sorted(unknown)}")
+        self.timeout_seconds = config.get("timeout_seconds", 120.0)
+        self._rng = random.Random(config.get("seed"))
+        self._rng_lock = threading.Lock()
+
+        # Metrics
+        self.requests = 0
+        self.tokens_emitted = 0
+        self.failures_injected = {mode: 0 for mode in FAILURE_MODES}
+
+    def plan(self, prompt: str) -> Tuple[Optional[str], List[str], float, float]:
+        """Draw one response: returns (failure_mode, tokens, ttft_seconds, seconds_per_token)."""
+        with self._rng_lock:
+            self.requests += 1
+            failure = None
+            roll = self._rng.random()
+            for mode in FAILURE_MODES:
+                rate = self.failure_rates.get(mode, 0.0)
+                if roll < rate:
+                    failure = mode
+                    break
+                roll -= rate
+            ttft = max(0.0, self._rng.gauss(self.profile.ttft_mean, self.profile.ttft_stddev))
+            tps = self.profile.tokens_per_second
+            if tps > 0:
+                tps = max(1.0, self._rng.gauss(tps, self.profile.tokens_per_second_stddev))
+            if failure:
+                self.failures_injected[failure] += 1
+
+        tokens = tokenize(self.render(prompt, failure))
+        return failure, tokens, ttft, (1.0 / tps if tps > 0 else 0.0)
+
+    def render(self, prompt: str, failure: Optional[str] = None) -> str:
+        """Full response text for a prompt, shaped by the failure mode."""
+        language = detect_prompt_language(prompt)
+        match = _POEM_PATTERN.search(prompt)
+        temple, poem_id = (match.group(1), match.group(2)) if match else ("GuanYin100", "1")
+        report = {key: text.format(temple=temple, poem_id=poem_id)
+                  for key, text in REPORT_TEMPLATES[language].items()}
+
+        # Field repair prompts ask for a subset of the sections
+        requested = _REPAIR_KEYS_PATTERN.search(prompt)
+        if requested:
+            keys = re.findall(r'"(\w+)"', requested.group(1))
+            report = {key: report[key] for key in keys if key in report} or report
+
+        if failure == "short_fields":
+            for key in list(report)[-2:]:
+                report[key] = _SHORT_FIELD_TEXT[language]
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if failure == "malformed_json":
+            return "Certainly! Here is the interpretation you asked for:\n" + text
+        if failure == "truncated":
+            return text[:int(len(text) * 0.6)]
+        return text
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "profile": {
+                "ttft_mean": self.profile.ttft_mean,
+                "tokens_per_second": self.profile.tokens_per_second
+            },
+            "requests": self.requests,
+            "tokens_emitted": self.tokens_emitted,
+            "failures_injected": dict(self.failures_injected)
+        }
+
+
+class SimulatedLLMClient(BaseLLMClient):
+    """Sync simulated provider (blocks the calling thread like a real HTTP client)."""
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.responder = SimulatedResponder(config)
+
+    def validate_config(self) -> bool:
+        return True
+
+    def _schedule(self, prompt: str) -> Iterator[Tuple[str, float]]:
+        """Tokens paired with their due time (monotonic seconds)."""
+        failure, tokens, ttft, per_token = self.responder.plan(prompt)
+        start = time.monotonic()
+        if failure == "timeout":
+            time.sleep(self.responder.timeout_seconds)
+            raise TimeoutError("Simulated provider timeout")
+        if failure == "error":
+            time.sleep(ttft)
+            raise ConnectionError("Simulated provider error")
+        for index, token in enumerate(tokens):
+            yield token, start + ttft + index * per_token
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        return self.generate_stream(prompt, **kwargs)
+
+    def generate_stream(self, prompt: str, callback: Optional[Callable[[str], None]] = None, **kwargs) -> str:
+        tokens = []
+        for token, due in self._schedule(prompt):
+            delay = due - time.monotonic()
+            if delay > _MIN_SLEEP:
+                time.sleep(delay)
+            tokens.append(token)
+            self.responder.tokens_emitted += 1
+            if callback:
+                callback(token)
+        return "".join(tokens)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self.responder.get_metrics()
+
+
+class AsyncSimulatedLLMClient(AsyncBaseLLMClient):
+    """Async simulated provider; waits with asyncio.sleep so it is cancellable."""
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.responder = SimulatedResponder(config)
+
+    def validate_config(self) -> bool:
+        return True
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        tokens = []
+        token_stream = self.stream(prompt, **kwargs)
+        try:
+            async for token in token_stream:
+                tokens.append(token)
+        finally:
+            await token_stream.aclose()
+        return "".join(tokens)
+
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        failure, tokens, ttft, per_token = self.responder.plan(prompt)
+        start = time.monotonic()
+        if failure == "timeout":
+            await asyncio.sleep(self.responder.timeout_seconds)
+            raise TimeoutError("Simulated provider timeout")
+        if failure == "error":
+            await asyncio.sleep(ttft)
+            raise ConnectionError("Simulated provider error")
+        for index, token in enumerate(tokens):
+            delay = start + ttft + index * per_token - time.monotonic()
+            if delay > _MIN_SLEEP:
+                await asyncio.sleep(delay)
+            self.responder.tokens_emitted += 1
+            yield token
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self.responder.get_metrics()
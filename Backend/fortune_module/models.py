@@ -7,6 +7,7 @@ from datetime import datetime
 class LLMProvider(Enum):
     OPENAI = "openai"
     OLLAMA = "ollama"
+    MOCK = "mock"  # Simulated provider for load tests (mock_llm.py)
 
 class ChunkType(Enum):
     POEM = "poem"
@@ -0,0 +1,297 @@
+# retry_policy.py
+"""
+Retry policy shared by the interpreter and the service-level JSON retries.
+
+A RetryBudget is created once per fortune request and passed down, so the
+interpreter attempts and the PoemService re-asks draw from one attempt budget
+and one deadline instead of multiplying each other. Backoff is awaited on the
+event loop; only the threaded fallback (no async LLM client) still sleeps, and
+it is bounded by the same deadline.
+
+A budget can also be cancelled (the client went away): no further attempt is
+allowed, the threaded backoff wakes up early and streaming callbacks stop the
+running generation.
+"""
+import asyncio
+import random
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any
+
+
+@dataclass
+class RetryPolicy:
+    """Backoff parameters.
+
+    Args:
+        max_attempts: Attempts allowed per budget (interpreter and service combined)
+        base_delay: Delay before the first retry in seconds
+        max_delay: Upper bound for a single delay
+        multiplier: Exponential growth factor between retries
+        jitter: Fraction of each delay that is randomized (0 disables jitter)
+        deadline_seconds: Default total deadline for a budget (None for no deadline)
+    """
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 8.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    deadline_seconds: Optional[float] = None
+
+    def backoff(self, retry_index: int, rng: Optional[random.Random] = None) -> float:
+        """Delay before retry number `retry_index` (0-based), with jitter applied."""
+        delay = min(self.max_delay, self.base_delay * (self.multiplier ** retry_index))
+        if self.jitter > 0:
+            delay *= 1.0 - self.jitter * (rng or random).random()
+        return max(0.0, delay)
+
+    def new_budget(self, deadline_seconds: Optional[float] = None,
+                   max_attempts: Optional[int] = None) -> 'RetryBudget':
+        """Create a budget for one request."""
+        return RetryBudget(self, deadline_seconds=deadline_seconds, max_attempts=max_attempts)
+
+
+class GenerationCancelled(Exception):
+    """Raised from a streaming callback once the request's budget was cancelled."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class AttemptRecord:
+    """Metrics for one attempt."""
+    stage: str
+    attempt: int
+    started_at: float
+    duration: float = 0.0
+    success: bool = False
+    error: Optional[str] = None
+    # Characters streamed before the attempt was cut short by incremental validation
+    aborted_at_chars: Optional[int] = None
+    # Estimated output tokens avoided by repairing fields instead of regenerating
+    tokens_saved: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "attempt": self.attempt,
+            "duration_ms": round(self.duration * 1000, 1),
+            "success": self.success,
+            "error": self.error,
+            "aborted_at_chars": self.aborted_at_chars,
+            "tokens_saved": self.tokens_saved
+        }
+
+
+class RetryBudget:
+    """Attempt budget and deadline for one request.
+
+    Args:
+        policy: Backoff parameters
+        deadline_seconds: Total time allowed from creation (defaults to the policy's)
+        max_attempts: Total attempts allowed (defaults to the policy's)
+    """
+
+    def __init__(self, policy: RetryPolicy, deadline_seconds: Optional[float] = None,
+                 max_attempts: Optional[int] = None):
+        self.policy = policy
+        self.max_attempts = max_attempts or policy.max_attempts
+        deadline_seconds = deadline_seconds if deadline_seconds is not None else policy.deadline_seconds
+        self.created_at = time.monotonic()
+        self.deadline = self.created_at + deadline_seconds if deadline_seconds is not None else None
+        self.attempts: List[AttemptRecord] = []
+        self.retries = 0
+        self.slept_seconds = 0.0
+        self.exhausted_reason: Optional[str] = None
+        # Stage label for attempts started without an explicit stage
+        self.stage = "interpreter"
+        # Final verdict of the caller's own validation, when it has one
+        self.accepted: Optional[bool] = None
+        # Set from the event loop, read from the worker thread running a sync attempt
+        self._cancelled = threading.Event()
+        self.cancel_reason: Optional[str] = None
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline (None when there is no deadline)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Stop the request: no further attempts, and a running stream aborts on its next token."""
+        if self.cancelled:
+            return
+        self.cancel_reason = reason
+        self.exhausted_reason = "cancelled"
+        self._cancelled.set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise GenerationCancelled(self.cancel_reason or "cancelled")
+
+    def allow_attempt(self) -> bool:
+        """Whether another attempt fits in the budget."""
+        if self.cancelled:
+            self.exhausted_reason = "cancelled"
+            return False
+        if len(self.attempts) >= self.max_attempts:
+            self.exhausted_reason = self.exhausted_reason or "attempts"
+            return False
+        if self.expired:
+            self.exhausted_reason = self.exhausted_reason or "deadline"
+            return False
+        return True
+
+    def begin(self, stage: Optional[str] = None) -> AttemptRecord:
+        """Record the start of an attempt."""
+        record = AttemptRecord(stage=stage or self.stage, attempt=len(self.attempts) + 1, started_at=time.monotonic())
+        self.attempts.append(record)
+        return record
+
+    def end(self, record: AttemptRecord, success: bool, error: Optional[str] = None):
+        """Record the outcome of an attempt."""
+        record.duration = time.monotonic() - record.started_at
+        record.success = success
+        record.error = error
+
+    def abort(self, record: AttemptRecord, reason: str, chars_received: int):
+        """Record an attempt whose stream was cancelled early as invalid."""
+        self.end(record, False, f"Stream aborted: {reason}")
+        record.aborted_at_chars = chars_received
+
+    def reject_last(self, error: str):
+        """Mark the latest attempt as failed by a later, stricter validation."""
+        if self.attempts:
+            self.attempts[-1].success = False
+            self.attempts[-1].error = error
+
+    def next_delay(self) -> Optional[float]:
+        """Delay before the next attempt, or None when no further attempt would fit."""
+        if not self.allow_attempt():
+            return None
+        delay = self.policy.backoff(self.retries)
+        remaining = self.remaining()
+        if remaining is not None and delay >= remaining:
+            # Sleeping would run past the deadline: no time left for the attempt itself
+            self.exhausted_reason = "deadline"
+            return None
+        return delay
+
+    async def wait_before_retry(self) -> bool:
+        """Await the backoff delay. Returns False when the budget is exhausted."""
+        delay = self.next_delay()
+        if delay is None:
+            return False
+        self.logger.info(f"Waiting {delay:.2f}s before retry (remaining={self.remaining()})")
+        self.retries += 1
+        self.slept_seconds += delay
+        await asyncio.sleep(delay)
+        return not self.cancelled
+
+    def wait_before_retry_sync(self) -> bool:
+        """Blocking variant for callers already running in a worker thread."""
+        delay = self.next_delay()
+        if delay is None:
+            return False
+        self.logger.info(f"Waiting {delay:.2f}s before retry (remaining={self.remaining()})")
+        self.retries += 1
+        self.slept_seconds += delay
+        # Wakes up early when the budget is cancelled
+        return not self._cancelled.wait(delay)
+
+    @property
+    def succeeded(self) -> bool:
+        if self.accepted is not None:
+            return self.accepted
+        return any(record.success for record in self.attempts)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "attempts": [record.to_dict() for record in self.attempts],
+            "total_attempts": len(self.attempts),
+            "max_attempts": self.max_attempts,
+            "succeeded": self.succeeded,
+            "elapsed_seconds": round(time.monotonic() - self.created_at, 3),
+            "slept_seconds": round(self.slept_seconds, 3),
+            "exhausted_reason": self.exhausted_reason
+        }
+
+
+class RetryMetrics:
+    """Aggregated counters over finished budgets."""
+
+    def __init__(self):
+        self.requests = 0
+        self.attempts = 0
+        self.failed_attempts = 0
+        self.early_aborts = 0
+        self.early_abort_chars = 0
+        self.repairs = 0
+        self.repairs_succeeded = 0
+        self.repair_tokens_saved = 0
+        self.attempts_by_stage: Dict[str, int] = {}
+        self.succeeded = 0
+        self.exhausted_by_attempts = 0
+        self.exhausted_by_deadline = 0
+        self.cancelled = 0
+        self.slept_seconds = 0.0
+        self.attempt_seconds = 0.0
+
+    def observe(self, budget: RetryBudget):
+        self.requests += 1
+        self.slept_seconds += budget.slept_seconds
+        for record in budget.attempts:
+            self.attempts += 1
+            self.attempt_seconds += record.duration
+            self.attempts_by_stage[record.stage] = self.attempts_by_stage.get(record.stage, 0) + 1
+            if not record.success:
+                self.failed_attempts += 1
+            if record.aborted_at_chars is not None:
+                self.early_aborts += 1
+                self.early_abort_chars += record.aborted_at_chars
+            if record.stage == "repair":
+                self.repairs += 1
+                if record.success:
+                    self.repairs_succeeded += 1
+                    self.repair_tokens_saved += record.tokens_saved or 0
+        if budget.cancelled:
+            self.cancelled += 1
+        elif budget.succeeded:
+            self.succeeded += 1
+        elif budget.exhausted_reason == "deadline":
+            self.exhausted_by_deadline += 1
+        elif budget.exhausted_reason == "attempts":
+            self.exhausted_by_attempts += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "failed_attempts": self.failed_attempts,
+            "early_aborts": self.early_aborts,
+            "avg_chars_before_abort": round(self.early_abort_chars / self.early_aborts) if self.early_aborts else 0,
+            "repairs": self.repairs,
+            "repairs_succeeded": self.repairs_succeeded,
+            "repair_tokens_saved": self.repair_tokens_saved,
+            "attempts_by_stage": dict(self.attempts_by_stage),
+            "avg_attempts_per_request": round(self.attempts / self.requests, 2) if self.requests else 0,
+            "succeeded": self.succeeded,
+            "exhausted_by_attempts": self.exhausted_by_attempts,
+            "exhausted_by_deadline": self.exhausted_by_deadline,
+            "cancelled": self.cancelled,
+            "slept_seconds": round(self.slept_seconds, 3),
+            "avg_attempt_ms": round(self.attempt_seconds / self.attempts * 1000, 1) if self.attempts else 0
+        }
@@ -0,0 +1,191 @@
+# stream_validator.py
+"""
+Incremental validation of a streamed JSON interpretation.
+
+The validator is fed the tokens passed to an LLM client's generate_stream
+callback. It tracks which required keys have started and completed and raises
+StreamAborted as soon as the response can no longer pass the final validation
+(prose instead of JSON, a non-string value, a field that closed too short, the
+object ending with keys missing). Up to `max_field_failures` bad fields are
+tolerated so they can be repaired individually once the stream completes;
+structural failures always abort. The exception propagates out of
+generate_stream, which closes the HTTP stream, so a retry starts immediately
+instead of after the whole 2500-3500 token response.
+"""
+import json
+from typing import Callable, Dict, List, Optional, Set
+
+# Checks a completed top-level field: returns an error message or None
+FieldCheck = Callable[[str, str], Optional[str]]
+
+_WHITESPACE = " \t\r\n"
+
+
+class StreamAborted(Exception):
+    """Raised from the streaming callback when the response is already invalid."""
+
+    def __init__(self, reason: str, chars_received: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.chars_received = chars_received
+
+
+class StreamingJSONValidator:
+    """Single-pass scanner over a flat JSON object of string values.
+
+    Args:
+        required_keys: Keys the final object must contain
+        min_lengths: Minimum stripped length per key, checked when its value closes
+        field_check: Optional extra check for each completed field
+        max_field_failures: Failed or missing fields tolerated before aborting
+    """
+
+    def __init__(self, required_keys: List[str], min_lengths: Optional[Dict[str, int]] = None,
+                 field_check: Optional[FieldCheck] = None, max_field_failures: int = 0):
+        self.required_keys = list(required_keys)
+        self.min_lengths = min_lengths or {}
+        self.field_check = field_check
+        self.max_field_failures = max_field_failures
+        self.failed_fields: Dict[str, str] = {}
+
+        self.started_keys: Set[str] = set()
+        self.completed_keys: Set[str] = set()
+        self.chars_received = 0
+        self.closed = False
+        self.error: Optional[str] = None
+
+        self._state = "start"
+        self._escape = False
+        self._buffer: List[str] = []
+        self._key: Optional[str] = None
+
+    @property
+    def missing_keys(self) -> List[str]:
+        return [key for key in self.required_keys if key not in self.completed_keys]
+
+    def feed(self, chunk: str):
+        """Consume the next streamed chunk. Raises StreamAborted on structural failure."""
+        if self.error is not None:
+            raise StreamAborted(self.error, self.chars_received)
+
+        index = 0
+        length = len(chunk)
+        while index < length:
+            state = self._state
+
+            if state in ("key", "value"):
+                # Fast path: copy string content up to the next quote or backslash
+                index = self._consume_string(chunk, index)
+                continue
+
+            char = chunk[index]
+            index += 1
+            if char in _WHITESPACE:
+                continue
+
+            if state == "start":
+                if char != "{":
+                    self._fail("Response does not start with a JSON object")
+                self._state = "key_or_end"
+            elif state == "key_or_end":
+                if char == "}":
+                    self._close_object()
+                elif char == '"':
+                    self._state = "key"
+                else:
+                    self._fail(f"Expected a key, got {char!r}")
+            elif state == "expect_key":
+                if char != '"':
+                    self._fail(f"Expected a key, got {char!r}")
+                self._state = "key"
+            elif state == "colon":
+                if char != ":":
+                    self._fail(f"Expected ':' after key {self._key!r}")
+                self._state = "expect_value"
+            elif state == "expect_value":
+                if char != '"':
+                    self._fail(f"{self._key}: not a string")
+                self.started_keys.add(self._key)
+                self._state = "value"
+            elif state == "after_value":
+                if char == ",":
+                    self._state = "expect_key"
+                elif char == "}":
+                    self._close_object()
+                else:
+                    self._fail(f"Expected ',' or '}}' after {self._key!r}")
+            else:  # end
+                self._fail("Unexpected content after the JSON object")
+
+        self.chars_received += length
+
+    def _consume_string(self, chunk: str, index: int) -> int:
+        length = len(chunk)
+        while index < length:
+            char = chunk[index]
+            if self._escape:
+                self._buffer.append(char)
+                self._escape = False
+                index += 1
+                continue
+            if char == "\\":
+                self._buffer.append(char)
+                self._escape = True
+                index += 1
+                continue
+            if char == '"':
+                self._finish_string()
+                return index + 1
+            # Copy the run of plain characters in one slice
+            end = index + 1
+            while end < length and chunk[end] not in '"\\':
+                end += 1
+            self._buffer.append(chunk[index:end])
+            index = end
+        return index
+
+    def _finish_string(self):
+        raw = "".join(self._buffer)
+        self._buffer = []
+        try:
+            text = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            self._fail("Invalid string escape")
+
+        if self._state == "key":
+            self._key = text
+            self._state = "colon"
+            return
+
+        # A completed top-level value
+        self._state = "after_value"
+        key = self._key
+        self.completed_keys.add(key)
+        if key not in self.min_lengths and key not in self.required_keys:
+            return
+        stripped = text.strip()
+        min_length = self.min_lengths.get(key, 0)
+        if not stripped:
+            self._field_failed(key, f"{key}: empty or whitespace only")
+        elif len(stripped) < min_length:
+            self._field_failed(key, f"{key}: too short ({len(stripped)} chars, min {min_length})")
+        elif self.field_check is not None:
+            problem = self.field_check(key, text)
+            if problem:
+                self._field_failed(key, problem)
+
+    def _field_failed(self, key: str, reason: str):
+        self.failed_fields[key] = reason
+        if len(self.failed_fields) > self.max_field_failures:
+            self._fail(reason)
+
+    def _close_object(self):
+        self.closed = True
+        self._state = "end"
+        missing = self.missing_keys
+        if missing and len(missing) + len(self.failed_fields) > self.max_field_failures:
+            self._fail(f"Missing required keys: {missing}")
+
+    def _fail(self, reason: str):
+        self.error = reason
+        raise StreamAborted(reason, self.chars_received)
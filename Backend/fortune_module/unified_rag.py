@@ -1,6 +1,6 @@
 # unified_rag.py
 import chromadb
-from typing import List, Optional, Union, Dict, Any
+from typing import List, Optional, Union, Dict, Any, Iterator, Sequence
 from .models import PoemChunk, FAQChunk, RAGResult, ChunkType
 from .config import SystemConfig
 import hashlib
@@ -16,6 +16,9 @@ _client_pool = {}
 _pool_lock = threading.Lock()
 _thread_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="chromadb-")
 
+# Page size for metadata-only collection.get() scans
+METADATA_PAGE_SIZE = 1000
+
 class UnifiedRAGHandler:
     """Repository pattern implementation for unified RAG operations on poems and FAQs."""
 
@@ -30,6 +33,7 @@ class UnifiedRAGHandler:
         self.collection = None
         self._connection_key = f"{self.persist_path}:{self.collection_name}"
         self._lock = threading.Lock()
+        self._embedding_function = None
 
         # Initialize ChromaDB client with connection pooling
         self._initialize_chromadb_with_retry()
@@ -341,31 +345,136 @@ class UnifiedRAGHandler:
                 pass
             return RAGResult(chunks=[], scores=[], query=question)
     
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with ChromaDB's default embedding function (the one the collection uses).
+
+        Blocking (runs the ONNX model); call from a worker thread.
+        """
+        if self._embedding_function is None:
+            from chromadb.utils import embedding_functions
+            self._embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return [[float(value) for value in vector] for vector in self._embedding_function(texts)]
+
+    # ------------------------------------------------------------------
+    # Metadata-only retrieval (filtered get(), no embedding / ANN search)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _build_where(chunk_type: Optional[ChunkType] = None,
+                     temple: Optional[str] = None,
+                     poem_id: Optional[int] = None) -> Optional[Dict]:
+        """Build a ChromaDB where clause from optional equality filters."""
+        conditions = []
+        if chunk_type:
+            conditions.append({"chunk_type": {"$eq": chunk_type.value}})
+        if temple:
+            conditions.append({"temple": {"$eq": temple}})
+        if poem_id is not None:
+            conditions.append({"poem_id": {"$eq": poem_id}})
+
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+    def iter_metadata(self, where: Optional[Dict] = None,
+                      include_documents: bool = False,
+                      include_metadata: bool = True,
+                      page_size: int = METADATA_PAGE_SIZE) -> Iterator[Dict]:
+        """
+        Iterate over stored chunks using paginated filtered get() calls.
+
+        Unlike query(), this never embeds text or touches the HNSW index, so it
+        is the right tool for listings, lookups by id and statistics.
+
+        Args:
+            where: Optional ChromaDB where clause
+            include_documents: Also fetch chunk documents (content)
+            include_metadata: Fetch chunk metadata (disable to fetch ids only)
+            page_size: Number of rows fetched per get() call
+
+        Yields:
+            Dicts with "chunk_id" and, when requested, "metadata" / "content"
+        """
+        include = []
+        if include_metadata:
+            include.append("metadatas")
+        if include_documents:
+            include.append("documents")
+
+        offset = 0
+        while True:
+            page = self.collection.get(
+                where=where,
+                include=include,
+                limit=page_size,
+                offset=offset
+            )
+            ids = page.get("ids") or []
+            metadatas = page.get("metadatas") or []
+            documents = page.get("documents") or []
+
+            for i, doc_id in enumerate(ids):
+                row = {"chunk_id": doc_id}
+                if include_metadata:
+                    row["metadata"] = metadatas[i] if i < len(metadatas) else {}
+                if include_documents:
+                    row["content"] = documents[i] if i < len(documents) else ""
+                yield row
+
+            if len(ids) < page_size:
+                break
+            offset += page_size
+
+    def get_metadata(self, fields: Optional[Sequence[str]] = None,
+                     chunk_type: Optional[ChunkType] = None,
+                     temple: Optional[str] = None,
+                     poem_id: Optional[int] = None) -> List[Dict]:
+        """
+        Fetch metadata for matching chunks, projected to the requested fields.
+
+        Args:
+            fields: Metadata keys to keep (None keeps the full metadata dict)
+            chunk_type: Optional chunk type filter
+            temple: Optional temple filter
+            poem_id: Optional poem ID filter
+
+        Returns:
+            List of dicts containing "chunk_id" plus the requested fields
+        """
+        try:
+            where = self._build_where(chunk_type, temple, poem_id)
+            records = []
+            for row in self.iter_metadata(where=where):
+                metadata = row["metadata"] or {}
+                if fields is None:
+                    record = dict(metadata)
+                else:
+                    record = {field: metadata.get(field) for field in fields}
+                record["chunk_id"] = row["chunk_id"]
+                records.append(record)
+            return records
+
+        except Exception as e:
+            self.logger.error(f"Failed to fetch metadata: {e}")
+            return []
+
     def get_poem_by_temple_and_id(self, temple: str, poem_id: int) -> List[Dict]:
         """Retrieve specific poem chunks by temple and poem ID."""
         try:
-            results = self.collection.query(
-                query_texts=[""],
-                where={
-                    "$and": [
-                        {"chunk_type": {"$eq": ChunkType.POEM.value}},
-                        {"temple": {"$eq": temple}},
-                        {"poem_id": {"$eq": poem_id}}
-                    ]
-                },
-                n_results=100  # Get all chunks for this poem
-            )
-            
+            where = self._build_where(ChunkType.POEM, temple, poem_id)
+
             chunks = []
-            for i, doc_id in enumerate(results['ids'][0]):
-                metadata = results['metadatas'][0][i]
+            for row in self.iter_metadata(where=where, include_documents=True):
+                metadata = row["metadata"]
                 chunks.append({
-                    "chunk_id": doc_id,
+                    "chunk_id": row["chunk_id"],
                     "temple": temple,
                     "poem_id": poem_id,
                     "title": metadata.get("title", ""),
                     "fortune": metadata["fortune"],
-                    "content": results['documents'][0][i],
+                    "content": row["content"],
                     "language": metadata["language"],
                     "chunk_type": ChunkType.POEM.value,
                     "metadata": metadata
@@ -381,39 +490,26 @@ class UnifiedRAGHandler:
     def list_available_poems(self, temple: Optional[str] = None) -> List[Dict]:
         """List available poems with basic metadata."""
         try:
-            # Build where clause properly for ChromaDB
-            if temple:
-                where_clause = {
-                    "$and": [
-                        {"chunk_type": {"$eq": ChunkType.POEM.value}},
-                        {"temple": {"$eq": temple}}
-                    ]
-                }
-            else:
-                where_clause = {"chunk_type": {"$eq": ChunkType.POEM.value}}
-                
-            # Query with high limit to get all poems
-            results = self.collection.query(
-                query_texts=[""],
-                where=where_clause,
-                n_results=10000  # Large number to get all
+            records = self.get_metadata(
+                fields=("temple", "poem_id", "title", "fortune", "language"),
+                chunk_type=ChunkType.POEM,
+                temple=temple
             )
             
             # Group by temple and poem_id to get unique poems
             poem_dict = {}
-            for i, doc_id in enumerate(results['ids'][0]):
-                metadata = results['metadatas'][0][i]
-                temple_name = metadata["temple"]
-                poem_id = metadata["poem_id"]
+            for record in records:
+                temple_name = record["temple"]
+                poem_id = record["poem_id"]
                 
                 key = f"{temple_name}_{poem_id}"
                 if key not in poem_dict:
                     poem_dict[key] = {
                         "temple": temple_name,
                         "poem_id": poem_id,
-                        "title": metadata.get("title", ""),
-                        "fortune": metadata.get("fortune", ""),
-                        "language": metadata.get("language", "")
+                        "title": record.get("title") or "",
+                        "fortune": record.get("fortune") or "",
+                        "language": record.get("language") or ""
                     }
             
             poems = list(poem_dict.values())
@@ -427,18 +523,13 @@ class UnifiedRAGHandler:
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the collection."""
         try:
-            # Get all items to calculate stats
-            all_results = self.collection.query(
-                query_texts=[""],
-                n_results=100000  # Very large number to get all
-            )
-            
-            total_chunks = len(all_results['ids'][0])
+            total_chunks = self.collection.count()
             poem_chunks = 0
             faq_chunks = 0
             temples = set()
             
-            for metadata in all_results['metadatas'][0]:
+            for row in self.iter_metadata():
+                metadata = row["metadata"]
                 if metadata["chunk_type"] == ChunkType.POEM.value:
                     poem_chunks += 1
                     temples.add(metadata.get("temple", "unknown"))
@@ -463,14 +554,12 @@ class UnifiedRAGHandler:
     def delete_chunks_by_temple(self, temple: str) -> bool:
         """Delete all chunks for a specific temple (useful for re-ingestion)."""
         try:
-            # First, find all chunk IDs for this temple
-            results = self.collection.query(
-                query_texts=[""],
-                where={"temple": temple},
-                n_results=10000
-            )
-            
-            chunk_ids = results['ids'][0]
+            # First, find all chunk IDs for this temple (ids only, no payload)
+            chunk_ids = [
+                row["chunk_id"]
+                for row in self.iter_metadata(where=self._build_where(temple=temple),
+                                              include_metadata=False)
+            ]
             if chunk_ids:
                 self.collection.delete(ids=chunk_ids)
                 self.logger.info(f"Deleted {len(chunk_ids)} chunks for temple: {temple}")
@@ -0,0 +1,51 @@
+"""
+Database migration to add request deduplication columns to chat_tasks
+"""
+
+import asyncio
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+
+DEDUPE_COLUMNS = {
+    "request_fingerprint": "VARCHAR(64)",
+    "idempotency_key": "VARCHAR(128)",
+}
+
+
+async def add_chat_task_dedupe_columns():
+    """Add request_fingerprint and idempotency_key (indexed) to chat_tasks"""
+
+    async with engine.begin() as conn:
+        existing = await conn.run_sync(
+            lambda sync_conn: {col["name"] for col in inspect(sync_conn).get_columns("chat_tasks")}
+        )
+        existing_indexes = await conn.run_sync(
+            lambda sync_conn: {index["name"] for index in inspect(sync_conn).get_indexes("chat_tasks")}
+        )
+
+        for column, column_type in DEDUPE_COLUMNS.items():
+            if column in existing:
+                print(f"[SKIP] chat_tasks.{column} already exists")
+            else:
+                await conn.execute(text(f"ALTER TABLE chat_tasks ADD COLUMN {column} {column_type}"))
+                print(f"[OK] Added chat_tasks.{column}")
+
+            index_name = f"ix_chat_tasks_{column}"
+            if index_name in existing_indexes:
+                print(f"[SKIP] {index_name} already exists")
+                continue
+            await conn.execute(text(f"CREATE INDEX {index_name} ON chat_tasks ({column})"))
+            print(f"[OK] Created {index_name}")
+
+
+async def main():
+    """Run migration"""
+    print("Adding deduplication columns to chat_tasks...")
+    await add_chat_task_dedupe_columns()
+    print("Migration completed successfully!")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
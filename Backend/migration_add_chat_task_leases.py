@@ -0,0 +1,43 @@
+"""
+Database migration to add durable queue lease columns to chat_tasks
+"""
+
+import asyncio
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+
+LEASE_COLUMNS = {
+    "claimed_by": "VARCHAR(100)",
+    "lease_expires_at": "TIMESTAMP",
+    "heartbeat_at": "TIMESTAMP",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+async def add_chat_task_lease_columns():
+    """Add claimed_by, lease_expires_at, heartbeat_at and attempts to chat_tasks"""
+
+    async with engine.begin() as conn:
+        existing = await conn.run_sync(
+            lambda sync_conn: {col["name"] for col in inspect(sync_conn).get_columns("chat_tasks")}
+        )
+
+        for column, column_type in LEASE_COLUMNS.items():
+            if column in existing:
+                print(f"[SKIP] chat_tasks.{column} already exists")
+                continue
+            await conn.execute(text(f"ALTER TABLE chat_tasks ADD COLUMN {column} {column_type}"))
+            print(f"[OK] Added chat_tasks.{column}")
+
+
+async def main():
+    """Run migration"""
+    print("Adding lease columns to chat_tasks...")
+    await add_chat_task_lease_columns()
+    print("Migration completed successfully!")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+"""
+Database migration to add the fair scheduling lane to chat_tasks
+"""
+
+import asyncio
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+
+async def add_chat_task_priority_lane():
+    """Add priority_lane to chat_tasks (existing tasks go to the standard lane)"""
+
+    async with engine.begin() as conn:
+        existing = await conn.run_sync(
+            lambda sync_conn: {col["name"] for col in inspect(sync_conn).get_columns("chat_tasks")}
+        )
+
+        if "priority_lane" in existing:
+            print("[SKIP] chat_tasks.priority_lane already exists")
+            return
+        await conn.execute(text(
+            "ALTER TABLE chat_tasks ADD COLUMN priority_lane VARCHAR(20) NOT NULL DEFAULT 'standard'"
+        ))
+        print("[OK] Added chat_tasks.priority_lane")
+
+
+async def main():
+    """Run migration"""
+    print("Adding priority lane to chat_tasks...")
+    await add_chat_task_priority_lane()
+    print("Migration completed successfully!")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""
+Database migration to add the queue indexes to chat_tasks
+"""
+
+import asyncio
+from sqlalchemy import inspect, text
+from app.core.database import engine
+
+
+QUEUE_INDEXES = {
+    "idx_chat_tasks_status_created_at": "status, created_at",
+    "idx_chat_tasks_status_lease_expires_at": "status, lease_expires_at",
+}
+
+
+async def add_chat_task_queue_indexes():
+    """Index chat_tasks for claiming (status, created_at) and the lease reaper (status, lease_expires_at)"""
+
+    async with engine.begin() as conn:
+        existing = await conn.run_sync(
+            lambda sync_conn: {index["name"] for index in inspect(sync_conn).get_indexes("chat_tasks")}
+        )
+
+        for index, columns in QUEUE_INDEXES.items():
+            if index in existing:
+                print(f"[SKIP] Index {index} already exists")
+                continue
+            await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON chat_tasks ({columns})"))
+            print(f"[OK] Created index {index}")
+
+
+async def main():
+    """Run migration"""
+    print("Adding queue indexes to chat_tasks...")
+    await add_chat_task_queue_indexes()
+    print("Migration completed successfully!")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
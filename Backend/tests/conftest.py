@@ -0,0 +1,20 @@
+"""
+Shared test fixtures
+"""
+
+import pytest
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand (set or add to `now`)"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
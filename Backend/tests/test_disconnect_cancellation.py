@@ -0,0 +1,104 @@
+"""
+Tests for cancelling tasks whose SSE clients went away
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.streaming_processor import ProcessingCancelled, SmartStreamingProcessor
+from app.services.subscriber_presence import SubscriberPresence
+
+
+class TestSubscriberPresence:
+    """Test suite for cross-node subscriber tracking"""
+
+    def test_task_detaches_when_the_last_node_loses_its_clients(self, clock):
+        presence = SubscriberPresence(heartbeat_seconds=5.0, clock=clock)
+        # Clients of a task that never had one (e.g. polling) are never reported missing
+        presence.report("polled", "api-1", 0)
+        assert presence.detached_seconds("polled") is None
+
+        presence.report("t1", "api-1", 1)
+        presence.report("t1", "api-2", 2)
+        presence.report("t1", "api-1", 0)
+        assert presence.detached_seconds("t1") is None
+
+        clock.now += 1
+        presence.report("t1", "api-2", 0)
+        clock.now += 4
+        assert presence.detached_seconds("t1") == 4
+
+        # Reconnecting within the grace period resets the clock
+        presence.report("t1", "api-1", 1)
+        assert presence.detached_seconds("t1") is None
+        assert presence.get_metrics()["reattachments"] == 1
+
+    def test_silent_node_expires_after_three_heartbeats(self, clock):
+        presence = SubscriberPresence(heartbeat_seconds=5.0, clock=clock)
+        presence.report("t1", "api-1", 1)
+
+        clock.now += 10
+        presence.report("t1", "api-1", 1)  # Heartbeat
+        clock.now += 15
+        assert presence.detached_seconds("t1") is None
+        clock.now += 5
+        assert presence.detached_seconds("t1") == 5
+
+        presence.forget("t1")
+        assert presence.get_metrics()["tracked_tasks"] == 0
+
+
+class TestProcessingCancellation:
+    """Test suite for propagating a cancellation into the running stage"""
+
+    async def test_cancel_stops_the_operation_and_runs_hooks(self):
+        async def send(task_id, data):
+            pass
+
+        processor = SmartStreamingProcessor("t1", send)
+        reasons = []
+        processor.on_cancel(reasons.append)
+        operation_cancelled = asyncio.Event()
+
+        async def generate():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                operation_cancelled.set()
+                raise
+
+        asyncio.get_running_loop().call_later(0.1, processor.cancel, "no client connected for 30s")
+        with pytest.raises(ProcessingCancelled) as raised:
+            await asyncio.wait_for(
+                processor.adaptive_stream_processing(generate, "LLM", 55, 90, "llm"), timeout=5
+            )
+
+        assert raised.value.stage_name == "LLM"
+        assert operation_cancelled.is_set()
+        assert reasons == ["no client connected for 30s"]
+
+        # Later stages do not start at all
+        with pytest.raises(ProcessingCancelled):
+            await processor.adaptive_stream_processing(generate, "RAG", 15, 50, "rag")
+
+    async def test_operation_honouring_the_hook_does_not_return_its_fallback(self):
+        async def send(task_id, data):
+            pass
+
+        processor = SmartStreamingProcessor("t1", send)
+        stop = asyncio.Event()
+        processor.on_cancel(lambda reason: stop.set())
+
+        async def generate():
+            # Like the interpreter: stop generating and hand back a fallback report
+            await stop.wait()
+            return "technical difficulties"
+
+        asyncio.get_running_loop().call_later(0.1, processor.cancel, "no client connected for 30s")
+        with pytest.raises(ProcessingCancelled) as raised:
+            await asyncio.wait_for(
+                processor.adaptive_stream_processing(generate, "LLM", 55, 90, "llm"), timeout=5
+            )
+
+        assert raised.value.reason == "no client connected for 30s"
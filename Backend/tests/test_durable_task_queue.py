@@ -0,0 +1,161 @@
+"""
+Tests for the durable lease-based task queue (SQLite dialect)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper used by relationships
+import app.models.chat_message  # noqa: F401
+from app.models.base import Base
+from app.models.chat_task import ChatTask, TaskStatus
+from app.services.durable_task_queue import DurableTaskQueue
+
+
+class TestDurableTaskQueue:
+    """Test suite for claiming, heartbeats and lease recovery"""
+
+    @pytest.fixture
+    async def db_session(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with async_session() as session:
+            yield session
+        await engine.dispose()
+
+    async def _add_tasks(self, db, count):
+        tasks = [
+            ChatTask(user_id=1, deity_id="guan_yin", fortune_number=i + 1, question=f"q{i}")
+            for i in range(count)
+        ]
+        for task in tasks:
+            db.add(task)
+            await db.commit()
+        return [task.task_id for task in tasks]
+
+    async def test_claim_is_exclusive_between_workers(self, db_session):
+        task_ids = await self._add_tasks(db_session, 3)
+        first = DurableTaskQueue(worker_id="a")
+        second = DurableTaskQueue(worker_id="b")
+
+        claimed_a = await first.claim(db_session, limit=2)
+        claimed_b = await second.claim(db_session, limit=5)
+
+        assert len(claimed_a) == 2
+        assert len(claimed_b) == 1
+        assert set(claimed_a) | set(claimed_b) == set(task_ids)
+        assert await first.claim(db_session, limit=1) == []
+
+    async def test_expired_lease_is_requeued_then_exhausted(self, db_session):
+        [task_id] = await self._add_tasks(db_session, 1)
+        queue = DurableTaskQueue(worker_id="a", lease_seconds=-1, max_attempts=2)
+
+        assert await queue.claim(db_session) == [task_id]
+        assert await queue.requeue_expired(db_session) == [task_id]
+
+        task = await db_session.get(ChatTask, task_id)
+        await db_session.refresh(task)
+        assert task.status == TaskStatus.QUEUED and task.claimed_by is None
+
+        assert await queue.claim(db_session) == [task_id]
+        assert await queue.requeue_expired(db_session) == []
+        exhausted = await queue.find_exhausted(db_session)
+        assert [t.task_id for t in exhausted] == [task_id]
+
+    async def test_heartbeat_extends_only_own_leases(self, db_session):
+        [task_id] = await self._add_tasks(db_session, 1)
+        owner = DurableTaskQueue(worker_id="a")
+        other = DurableTaskQueue(worker_id="b")
+        await owner.claim(db_session)
+
+        assert await other.heartbeat(db_session, [task_id]) == 0
+        assert await owner.heartbeat(db_session, [task_id]) == 1
+
+        task = await db_session.get(ChatTask, task_id)
+        await db_session.refresh(task)
+        assert task.lease_expires_at > datetime.utcnow() + timedelta(seconds=30)
+
+    async def test_reap_requeues_fails_and_ignores_fresh_tasks(self, db_session):
+        retry_id, exhausted_id, stale_id, fresh_id = await self._add_tasks(db_session, 4)
+        queue = DurableTaskQueue(worker_id="a", lease_seconds=-1, max_attempts=2)
+
+        # Two expired leases: one with an attempt left, one already on its last attempt
+        assert set(await queue.claim(db_session, limit=2)) == {retry_id, exhausted_id}
+        exhausted = await db_session.get(ChatTask, exhausted_id)
+        exhausted.attempts = 2
+        # One unleased task that has been waiting too long
+        stale = await db_session.get(ChatTask, stale_id)
+        stale.created_at = datetime.utcnow() - timedelta(hours=1)
+        await db_session.commit()
+
+        reaped = await queue.reap(db_session, stale_before=datetime.utcnow() - timedelta(minutes=10))
+        await db_session.commit()
+
+        assert reaped.requeued == [retry_id]
+        assert {task.task_id for task in reaped.failed} == {exhausted_id, stale_id}
+        statuses = {}
+        for task_id in (retry_id, exhausted_id, stale_id, fresh_id):
+            task = await db_session.get(ChatTask, task_id)
+            await db_session.refresh(task)
+            statuses[task_id] = task.status
+        assert statuses == {
+            retry_id: TaskStatus.QUEUED,
+            exhausted_id: TaskStatus.FAILED,
+            stale_id: TaskStatus.FAILED,
+            fresh_id: TaskStatus.QUEUED,
+        }
+        assert queue.get_metrics()["total_stale"] == 1
+
+    async def test_claim_ids_skips_taken_tasks_and_counts_in_flight(self, db_session):
+        first_id, second_id, third_id = await self._add_tasks(db_session, 3)
+        queue = DurableTaskQueue(worker_id="a")
+        other = DurableTaskQueue(worker_id="b")
+
+        assert await other.claim_ids(db_session, [second_id]) == [second_id]
+        assert [row[0] for row in await queue.list_claimable(db_session)] == [first_id, third_id]
+        assert await queue.claim_ids(db_session, [third_id, second_id, first_id]) == [third_id, first_id]
+        assert await queue.in_flight_by_user(db_session) == {1: 3}
+
+    async def test_claimable_backlog_respects_the_user_cap_and_counts_workers(self, db_session):
+        task_ids = await self._add_tasks(db_session, 4)  # All from user 1
+        db_session.add(ChatTask(user_id=2, deity_id="guan_yin", fortune_number=9, question="other"))
+        await db_session.commit()
+        queue = DurableTaskQueue(worker_id="a")
+        other = DurableTaskQueue(worker_id="b")
+
+        assert await queue.count_live_workers(db_session) == 1
+        await other.claim_ids(db_session, task_ids[:1])
+
+        # User 1 may have one more task claimed; user 2's task is free
+        assert await queue.count_pending(db_session) == 4
+        assert await queue.count_claimable(db_session, max_in_flight_per_user=2) == 2
+        assert await queue.count_claimable(db_session) == 4
+        assert await queue.count_live_workers(db_session) == 2
+        assert await queue.lease_holders(db_session) == {"b"}
+
+    async def test_requeued_old_task_is_not_failed_as_stale(self, db_session):
+        [task_id] = await self._add_tasks(db_session, 1)
+        queue = DurableTaskQueue(worker_id="a", lease_seconds=-1, max_attempts=3)
+        stale_before = datetime.utcnow() - timedelta(minutes=10)
+
+        # A long-running task whose worker died well after the stale threshold
+        assert await queue.claim(db_session) == [task_id]
+        task = await db_session.get(ChatTask, task_id)
+        task.created_at = datetime.utcnow() - timedelta(hours=1)
+        await db_session.commit()
+
+        assert (await queue.reap(db_session, stale_before=stale_before)).requeued == [task_id]
+        await db_session.commit()
+        second = await queue.reap(db_session, stale_before=stale_before)
+        await db_session.commit()
+
+        assert second.failed == []
+        await db_session.refresh(task)
+        assert task.status == TaskStatus.QUEUED
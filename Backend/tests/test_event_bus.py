@@ -0,0 +1,82 @@
+"""
+Tests for the task event bus backends
+"""
+
+import pytest
+
+from app.services.event_bus import (
+    InProcessEventBus, LocalBroker, LocalBrokerEventBus, create_event_bus
+)
+
+
+class TestEventBus:
+    """Test suite for event bus fan-out"""
+
+    async def test_inprocess_delivers_to_subscribers(self):
+        bus = InProcessEventBus()
+        received = []
+
+        async def handler(task_id, data):
+            received.append((task_id, data["type"]))
+
+        bus.subscribe(handler)
+        await bus.publish("t1", {"type": "progress"})
+
+        assert received == [("t1", "progress")]
+        assert bus.get_metrics()["delivered"] == 1
+
+    async def test_local_broker_fans_out_across_nodes(self):
+        broker = LocalBroker()
+        worker, api_a, api_b = (LocalBrokerEventBus(broker) for _ in range(3))
+        received = {"a": [], "b": []}
+
+        async def on_a(task_id, data):
+            received["a"].append(task_id)
+
+        async def on_b(task_id, data):
+            received["b"].append(task_id)
+
+        api_a.subscribe(on_a)
+        api_b.subscribe(on_b)
+        for bus in (worker, api_a, api_b):
+            await bus.start()
+
+        await worker.publish("t1", {"type": "token"})
+        await worker.publish("t2", {"type": "complete"})
+        await api_a.drain()
+        await api_b.drain()
+
+        assert received == {"a": ["t1", "t2"], "b": ["t1", "t2"]}
+
+        await api_b.stop()
+        await worker.publish("t3", {"type": "progress"})
+        await api_a.drain()
+        assert received["b"] == ["t1", "t2"]
+        assert broker.node_count == 2
+
+        await worker.stop()
+        await api_a.stop()
+
+    async def test_failing_handler_does_not_block_others(self):
+        bus = InProcessEventBus()
+        received = []
+
+        async def broken(task_id, data):
+            raise RuntimeError("client gone")
+
+        async def healthy(task_id, data):
+            received.append(task_id)
+
+        bus.subscribe(broken)
+        bus.subscribe(healthy)
+        await bus.publish("t1", {})
+
+        assert received == ["t1"]
+        assert bus.handler_errors == 1
+
+    def test_factory_rejects_unknown_backend(self):
+        assert create_event_bus("local").backend == "local"
+        with pytest.raises(ValueError):
+            create_event_bus("kafka")
+        with pytest.raises(ValueError):
+            create_event_bus("redis")
@@ -0,0 +1,121 @@
+"""
+Tests for fair scheduling of queued tasks across users
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper used by relationships
+import app.models.chat_message  # noqa: F401
+from app.models.base import Base
+from app.models.transaction import Transaction, TransactionStatus, TransactionType
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.services.fair_scheduler import (
+    FairScheduler, QueuedTask, LANE_PAID, LANE_RETRY, LANE_STANDARD
+)
+
+
+def queued(task_id, user_id, age_seconds=0, lane=LANE_STANDARD, attempts=0):
+    return QueuedTask(
+        task_id=task_id,
+        user_id=user_id,
+        created_at=datetime.utcnow() - timedelta(seconds=age_seconds),
+        lane=lane,
+        attempts=attempts
+    )
+
+
+class TestFairScheduler:
+    """Test suite for lanes, deficit round-robin and per-user caps"""
+
+    def test_heavy_user_does_not_starve_others(self):
+        scheduler = FairScheduler(max_in_flight_per_user=0, max_lane_wait_seconds=0)
+        # User 1 fired 20 questions before users 2 and 3 asked one each
+        waiting = [queued(f"hog-{i}", 1, age_seconds=60 - i) for i in range(20)]
+        waiting += [queued("u2", 2, age_seconds=10), queued("u3", 3, age_seconds=5)]
+
+        picked = scheduler.select(waiting, in_flight={}, limit=3)
+        assert [task.task_id for task in picked] == ["hog-0", "u2", "u3"]
+
+        # The rotation carries over: the next round starts where this one stopped
+        remaining = [task for task in waiting if task not in picked]
+        assert [task.task_id for task in scheduler.select(remaining, {}, limit=2)] == ["hog-1", "hog-2"]
+
+    def test_in_flight_cap_and_priority_lanes(self):
+        scheduler = FairScheduler(max_in_flight_per_user=2, max_lane_wait_seconds=0)
+        waiting = [
+            queued("a1", 1, age_seconds=30),
+            queued("a2", 1, age_seconds=29),
+            queued("paid", 2, lane=LANE_PAID),
+            queued("retry", 3, attempts=1),
+        ]
+
+        picked = scheduler.select(waiting, in_flight={1: 1}, limit=4)
+        # Retries before paid before standard; user 1 only gets the one slot left under the cap
+        assert [task.task_id for task in picked] == ["retry", "paid", "a1"]
+        metrics = scheduler.get_metrics()
+        assert metrics["dispatched_by_lane"] == {LANE_RETRY: 1, LANE_PAID: 1, LANE_STANDARD: 1}
+        assert metrics["capped_skips"] >= 1
+
+    def test_long_wait_promotes_and_positions_follow_dispatch_order(self):
+        scheduler = FairScheduler(max_in_flight_per_user=0, max_lane_wait_seconds=60)
+        waiting = [
+            queued("old", 1, age_seconds=300),
+            queued("paid-1", 2, lane=LANE_PAID, age_seconds=5),
+            queued("paid-2", 2, lane=LANE_PAID, age_seconds=4),
+            queued("new", 3, age_seconds=1),
+        ]
+
+        positions = scheduler.positions(waiting, workers=2, service_seconds=10.0)
+        assert {task_id: p.position for task_id, p in positions.items()} == {
+            "old": 1, "paid-1": 2, "paid-2": 3, "new": 4
+        }
+        assert positions["old"].lane == LANE_RETRY
+        assert [positions[t].estimated_wait_seconds for t in ("old", "paid-1", "paid-2", "new")] == [10.0, 10.0, 20.0, 20.0]
+
+        # Estimating does not consume DRR state
+        assert [task.task_id for task in scheduler.select(waiting, {}, limit=4)] == ["old", "paid-1", "paid-2", "new"]
+
+
+class TestPriorityLane:
+    """Test suite for picking the lane of a new task from the user's deposits"""
+
+    @pytest.fixture
+    async def db_session(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with async_session() as session:
+            yield session
+        await engine.dispose()
+
+    async def _user_with_deposit(self, db, email, txn_id, reference_id):
+        user = User(email=email, password_hash="x")
+        db.add(user)
+        await db.flush()
+        wallet = Wallet(user_id=user.user_id, balance=10)
+        db.add(wallet)
+        await db.flush()
+        db.add(Transaction(
+            txn_id=txn_id, wallet_id=wallet.wallet_id, type=TransactionType.DEPOSIT, amount=10,
+            reference_id=reference_id, status=TransactionStatus.SUCCESS
+        ))
+        await db.commit()
+        return user.user_id
+
+    async def test_deposits_without_a_reference_count_as_purchases(self, db_session):
+        pytest.importorskip("chromadb")  # The task queue service loads the poem service
+        from app.services.task_queue_service import task_queue_service
+
+        buyer = await self._user_with_deposit(db_session, "buyer@example.com", 1, None)
+        bonus_only = await self._user_with_deposit(db_session, "new@example.com", 2, "signup_2")
+
+        assert await task_queue_service._priority_lane(buyer, db_session) == LANE_PAID
+        assert await task_queue_service._priority_lane(bonus_only, db_session) == LANE_STANDARD
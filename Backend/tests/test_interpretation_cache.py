@@ -0,0 +1,52 @@
+"""
+Tests for the semantic interpretation cache
+"""
+
+from app.services.interpretation_cache import SemanticInterpretationCache
+
+REPORT = {"LineByLineInterpretation": "Line 1: ...", "Conclusion": "..."}
+
+
+class TestSemanticInterpretationCache:
+    """Test suite for SemanticInterpretationCache"""
+
+    def test_similar_question_on_same_poem_hits(self):
+        cache = SemanticInterpretationCache(similarity_threshold=0.9)
+        cache.store("GuanYin", 23, "en", "will my career improve", [1.0, 0.1, 0.0], REPORT, 0.8)
+
+        hit = cache.lookup("GuanYin", 23, "en", [0.95, 0.12, 0.01])
+        assert hit is not None
+        assert hit.entry.report == REPORT
+        assert hit.similarity > 0.9
+
+        assert cache.lookup("GuanYin", 23, "en", [0.0, 1.0, 0.0]) is None
+        assert cache.lookup("GuanYin", 24, "en", [1.0, 0.1, 0.0]) is None
+        assert cache.lookup("GuanYin", 23, "zh", [1.0, 0.1, 0.0]) is None
+
+        metrics = cache.get_metrics()
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 3
+        assert metrics["hit_rate_percent"] == 25.0
+
+    def test_expired_entries_are_not_served(self):
+        cache = SemanticInterpretationCache(ttl_seconds=-1)
+        cache.store("Mazu", 1, "zh", "q", [1.0, 0.0], REPORT, 0.8)
+
+        assert cache.lookup("Mazu", 1, "zh", [1.0, 0.0]) is None
+        assert cache.get_metrics()["expirations"] == 1
+        assert cache.get_metrics()["entries"] == 0
+
+    def test_lru_eviction_and_invalidation(self):
+        cache = SemanticInterpretationCache(max_entries=2)
+        cache.store("Mazu", 1, "zh", "a", [1.0, 0.0], REPORT, 0.8)
+        cache.store("Mazu", 2, "zh", "b", [1.0, 0.0], REPORT, 0.8)
+        assert cache.lookup("Mazu", 1, "zh", [1.0, 0.0]) is not None
+        cache.store("Mazu", 3, "zh", "c", [1.0, 0.0], REPORT, 0.8)
+
+        # Poem 2 was least recently used
+        assert cache.lookup("Mazu", 2, "zh", [1.0, 0.0]) is None
+        assert cache.get_metrics()["evictions"] == 1
+
+        assert cache.invalidate("Mazu", 1) == 1
+        assert cache.lookup("Mazu", 1, "zh", [1.0, 0.0]) is None
+        assert cache.lookup("Mazu", 3, "zh", [1.0, 0.0]) is not None
@@ -0,0 +1,158 @@
+"""
+Tests for the fortune module retry budget, stream validation and field repair
+"""
+
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("chromadb")  # Importing fortune_module loads the RAG handler
+
+from fortune_module.field_repair import estimate_tokens, extract_json_object, merge_repaired_fields
+from fortune_module.interpreter import PoemInterpreter
+from fortune_module.mock_llm import AsyncSimulatedLLMClient, SimulatedLLMClient, tokenize
+from fortune_module.retry_policy import GenerationCancelled, RetryMetrics, RetryPolicy
+from fortune_module.stream_validator import StreamAborted, StreamingJSONValidator
+
+
+class TestRetryPolicy:
+    """Test suite for the shared retry budget"""
+
+    def test_backoff_is_capped_and_jittered(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=4.0, jitter=0.5)
+        for retry_index, upper in [(0, 1.0), (1, 2.0), (5, 4.0)]:
+            delay = policy.backoff(retry_index)
+            assert upper * 0.5 <= delay <= upper
+
+    async def test_budget_limits_total_attempts(self):
+        # Attempts from several stages share one budget
+        budget = RetryPolicy(max_attempts=3, base_delay=0.0, jitter=0).new_budget()
+        budget.end(budget.begin(), False, "invalid json")
+        budget.end(budget.begin("service_retry"), False, "missing keys")
+        assert await budget.wait_before_retry()
+        budget.end(budget.begin(), True)
+
+        assert not budget.allow_attempt()
+        assert not await budget.wait_before_retry()
+        assert budget.exhausted_reason == "attempts"
+
+        metrics = RetryMetrics()
+        metrics.observe(budget)
+        assert metrics.get_metrics()["attempts_by_stage"] == {"interpreter": 2, "service_retry": 1}
+        assert metrics.get_metrics()["succeeded"] == 1
+
+    def test_backoff_never_sleeps_past_deadline(self):
+        budget = RetryPolicy(max_attempts=5, base_delay=10.0, jitter=0).new_budget(deadline_seconds=1.0)
+        budget.end(budget.begin(), False, "timeout")
+
+        assert budget.next_delay() is None
+        assert budget.exhausted_reason == "deadline"
+
+    def test_cancel_wakes_backoff_and_stops_streaming(self):
+        budget = RetryPolicy(max_attempts=5, base_delay=5.0, jitter=0).new_budget()
+        budget.end(budget.begin(), False, "invalid json")
+
+        threading.Timer(0.05, budget.cancel, args=("client disconnected",)).start()
+        started = time.monotonic()
+        assert not budget.wait_before_retry_sync()
+        assert time.monotonic() - started < 1.0
+
+        assert not budget.allow_attempt()
+        with pytest.raises(GenerationCancelled) as raised:
+            budget.raise_if_cancelled()
+        assert raised.value.reason == "client disconnected"
+
+        metrics = RetryMetrics()
+        metrics.observe(budget)
+        assert metrics.get_metrics()["cancelled"] == 1
+
+
+class TestStreamValidator:
+    """Test suite for incremental validation of streamed interpretations"""
+
+    def _feed(self, validator, text, size=5):
+        for i in range(0, len(text), size):
+            validator.feed(text[i:i + size])
+
+    def test_valid_stream_passes(self):
+        validator = StreamingJSONValidator(["A", "B"], {"A": 10})
+        self._feed(validator, json.dumps({"A": "Line 1: \"quoted\" text", "B": "done"}))
+        assert validator.closed
+        assert validator.missing_keys == []
+
+    def test_prose_aborts_on_first_token(self):
+        validator = StreamingJSONValidator(["A"])
+        with pytest.raises(StreamAborted):
+            validator.feed("Sure, here is your reading")
+        assert validator.chars_received == 0
+
+    def test_short_field_aborts_when_it_closes(self):
+        # Later fields are still unstreamed when the short one is rejected
+        validator = StreamingJSONValidator(["A", "B"], {"A": 30})
+        with pytest.raises(StreamAborted) as raised:
+            self._feed(validator, '{"A": "too short", "B": "')
+        assert "A: too short" in raised.value.reason
+        assert "B" not in validator.started_keys
+
+    def test_repairable_failures_do_not_abort(self):
+        validator = StreamingJSONValidator(["A", "B", "C"], {"A": 30}, max_field_failures=2)
+        self._feed(validator, '{"A": "too short", "B": "fine"}')
+        assert list(validator.failed_fields) == ["A"]
+        assert validator.missing_keys == ["C"]
+
+
+class TestFieldRepair:
+    """Test suite for field-level repair helpers"""
+
+    def test_merge_only_requested_sections(self):
+        report = {"A": "kept", "B": "bad"}
+        repaired = extract_json_object('Here you go: {"B": "better", "A": "ignored"}')
+        assert merge_repaired_fields(report, repaired, ["B"]) == {"A": "kept", "B": "better"}
+        # Incomplete repairs are rejected
+        assert merge_repaired_fields(report, {"B": " "}, ["B"]) is None
+
+    def test_estimate_tokens_counts_cjk_per_character(self):
+        assert estimate_tokens("天開地闢") == 4
+        assert estimate_tokens("abcdefgh") == 2
+
+
+class TestSimulatedLLM:
+    """Test suite for the simulated streaming provider used for load tests"""
+
+    PROMPT = "SELECTED FORTUNE POEM from Mazu (Poem #12) ... {instruction}"
+
+    def test_reports_pass_validation_in_each_language(self):
+        interpreter = PoemInterpreter.__new__(PoemInterpreter)
+        interpreter.logger = logging.getLogger(__name__)
+        client = SimulatedLLMClient({"profile": "instant"})
+        for instruction, question in [("Respond in English", "Will my career improve?"),
+                                      ("請用繁體中文回答", "我的事業會好轉嗎"),
+                                      ("日本語で回答してください", "仕事はうまくいきますか")]:
+            response = client.generate(self.PROMPT.format(instruction=instruction))
+            valid, _, error = interpreter._validate_interpretation_response(response, question)
+            assert valid, error
+            assert "Mazu" in response
+
+    def test_seeded_failures_are_reproducible(self):
+        config = {"profile": "instant", "seed": 7, "failure_rates": {"short_fields": 0.5}}
+        runs = []
+        for _ in range(2):
+            responder = SimulatedLLMClient(config).responder
+            runs.append([responder.plan("x")[0] for _ in range(10)])
+        assert runs[0] == runs[1]
+        assert responder.get_metrics()["failures_injected"]["short_fields"] == runs[1].count("short_fields")
+        with pytest.raises(ValueError):
+            SimulatedLLMClient({"failure_rates": {"meteor": 1.0}})
+
+    async def test_async_stream_answers_repair_prompts_with_requested_keys(self):
+        client = AsyncSimulatedLLMClient({"profile": "instant"})
+        prompt = 'Return exactly these keys: "Challenges", "Conclusion". No other text'
+
+        tokens = [token async for token in client.stream(prompt)]
+
+        assert tokens == tokenize("".join(tokens))
+        assert set(json.loads("".join(tokens))) == {"Challenges", "Conclusion"}
+        assert client.get_metrics()["tokens_emitted"] == len(tokens)
@@ -0,0 +1,199 @@
+"""
+Tests for the async LLM clients, the provider gateway and hedged routing
+"""
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("chromadb")  # Importing fortune_module loads the RAG handler
+
+from fortune_module.hedged_client import AsyncHedgedLLMClient, HedgedLLMClient
+from fortune_module.llm_client import AsyncBaseLLMClient, BaseLLMClient, LLMClientFactory
+from fortune_module.llm_gateway import LLMGateway, ProviderLimiter, TokenBucket
+from fortune_module.models import LLMProvider
+from fortune_module.stream_validator import StreamAborted
+
+
+class ScriptedAsyncClient(AsyncBaseLLMClient):
+    """Async client answering after a delay, or failing"""
+
+    def __init__(self, text, delay=0.0, fail=False):
+        super().__init__({})
+        self.text, self.delay, self.fail = text, delay, fail
+        self.cancelled = 0
+
+    def validate_config(self):
+        return True
+
+    async def generate(self, prompt, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ConnectionError("provider down")
+        return self.text
+
+
+class ScriptedStreamClient(BaseLLMClient):
+    """Sync client streaming its text word by word after a delay"""
+
+    def __init__(self, text, delay=0.0):
+        super().__init__({})
+        self.text, self.delay = text, delay
+
+    def validate_config(self):
+        return True
+
+    def generate(self, prompt, **kwargs):
+        return self.generate_stream(prompt, **kwargs)
+
+    def generate_stream(self, prompt, callback=None, **kwargs):
+        time.sleep(self.delay)
+        for word in self.text.split():
+            if callback:
+                callback(word)
+        return self.text
+
+
+class TestAsyncLLMClients:
+    """Test suite for the async client factory"""
+
+    async def test_async_mock_client_streams_tokens(self):
+        client = LLMClientFactory.create_async_mock_client("Async response")
+        tokens = []
+
+        result = await client.generate_stream("Test prompt", callback=tokens.append)
+
+        assert "Async response" in result
+        assert len(tokens) > 1
+        assert "".join(tokens).strip() == result.strip()
+
+    async def test_async_ollama_client_creation(self):
+        client = LLMClientFactory.create_async_client(
+            LLMProvider.OLLAMA,
+            base_url="http://localhost:11434",
+            model="llama2",
+            max_connections=4
+        )
+        assert client.validate_config()
+        await client.aclose()
+
+
+class TestLLMGateway:
+    """Test suite for provider concurrency and rate limiting"""
+
+    async def test_concurrency_cap_grants_in_fifo_order(self):
+        limiter = ProviderLimiter("test", max_concurrency=1)
+        granted = []
+
+        async def call(index):
+            permit = await limiter.acquire_async(10)
+            granted.append(index)
+            assert limiter.get_metrics()["in_flight"] == 1
+            await asyncio.sleep(0.01)
+            limiter.release(permit)
+
+        await asyncio.gather(*[call(index) for index in range(4)])
+
+        assert granted == [0, 1, 2, 3]
+        assert limiter.get_metrics()["acquired"] == 4
+
+    def test_buckets_and_admission(self):
+        bucket = TokenBucket(60)
+        bucket.take(60)
+        assert bucket.delay_for(1, bucket.updated) == pytest.approx(1.0, abs=1e-3)
+
+        limiter = ProviderLimiter("test", max_concurrency=2, max_queue=4, expected_call_seconds=10.0)
+        assert limiter.admission(pending=1).admitted
+        decision = limiter.admission(pending=7)
+        assert not decision.admitted
+        assert decision.retry_after == 20
+        assert limiter.get_metrics()["rejected"] == 1
+
+    def test_gated_client_delegates_to_wrapped_client(self):
+        gateway = LLMGateway()
+        client = gateway.wrap(LLMClientFactory.create_mock_client("gated"), "mock")
+        assert "gated" in client.generate("prompt")
+        assert client.mock_response == "gated"
+        assert gateway.wrap(client, "mock") is client
+        metrics = gateway.get_metrics()["mock"]
+        assert (metrics["acquired"], metrics["in_flight"]) == (1, 0)
+
+
+class TestHedgedClient:
+    """Test suite for hedged requests and failover across providers"""
+
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        primary = ScriptedAsyncClient("primary", delay=1.0)
+        client = AsyncHedgedLLMClient(
+            [("ollama", primary), ("openai", ScriptedAsyncClient("secondary"))],
+            default_hedge_delay=0.05
+        )
+
+        assert await client.generate("prompt") == "secondary"
+        await asyncio.sleep(0)
+
+        assert primary.cancelled == 1
+        metrics = client.get_metrics()
+        assert (metrics["hedges_started"], metrics["hedge_wins"]) == (1, 1)
+
+    async def test_open_circuit_fails_over(self):
+        primary = ScriptedAsyncClient("primary", fail=True)
+        client = AsyncHedgedLLMClient(
+            [("ollama", primary), ("openai", ScriptedAsyncClient("secondary"))],
+            failure_threshold=1
+        )
+
+        assert await client.generate("prompt") == "secondary"
+        assert await client.generate("prompt") == "secondary"
+
+        metrics = client.get_metrics()
+        assert metrics["providers"]["ollama"]["circuit"] == "OPEN"
+        assert metrics["providers"]["ollama"]["calls"] == 1
+        assert metrics["failovers"] == 1
+
+    def test_sync_stream_forwards_only_the_winner(self):
+        # The losing stream is stopped and its tokens never reach the callback
+        client = HedgedLLMClient(
+            [("ollama", ScriptedStreamClient("slow words here", delay=0.5)),
+             ("openai", ScriptedStreamClient("fast answer"))],
+            default_hedge_delay=0.05
+        )
+        tokens = []
+        assert client.generate_stream("prompt", callback=tokens.append) == "fast answer"
+        assert tokens == ["fast", "answer"]
+
+    def _reject(self, token):
+        raise StreamAborted("prose instead of JSON", 0)
+
+    def test_sync_callback_errors_leave_the_circuit_closed(self):
+        # The caller rejecting the output says nothing about the provider's health
+        client = HedgedLLMClient(
+            [("ollama", ScriptedStreamClient("Sure, here is your reading")),
+             ("openai", ScriptedStreamClient("fallback"))],
+            failure_threshold=3
+        )
+        for _ in range(3):
+            with pytest.raises(StreamAborted):
+                client.generate_stream("prompt", callback=self._reject)
+
+        primary = client.get_metrics()["providers"]["ollama"]
+        assert (primary["circuit"], primary["failures"], primary["calls"]) == ("CLOSED", 0, 3)
+        assert client.get_metrics()["failovers"] == 0
+
+    async def test_async_callback_errors_leave_the_circuit_closed(self):
+        client = AsyncHedgedLLMClient(
+            [("ollama", ScriptedAsyncClient("Sure, here is your reading")),
+             ("openai", ScriptedAsyncClient("fallback"))],
+            failure_threshold=3
+        )
+        for _ in range(3):
+            with pytest.raises(StreamAborted):
+                await client.generate_stream("prompt", callback=self._reject)
+
+        primary = client.get_metrics()["providers"]["ollama"]
+        assert (primary["circuit"], primary["failures"], primary["calls"]) == ("CLOSED", 0, 3)
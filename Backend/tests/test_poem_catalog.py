@@ -0,0 +1,77 @@
+"""
+Tests for the in-memory poem catalog
+"""
+
+import pytest
+
+from app.services.poem_catalog import PoemCatalog
+
+
+class TestPoemCatalog:
+    """Test suite for PoemCatalog indexing and incremental updates"""
+
+    @pytest.fixture
+    def catalog(self):
+        catalog = PoemCatalog()
+        catalog.load([
+            {"temple": "GuanYin", "poem_id": 1, "title": "A", "fortune": "大吉", "language": "zh"},
+            {"temple": "GuanYin", "poem_id": 1, "title": "A", "fortune": "大吉", "language": "en"},
+            {"temple": "GuanYin", "poem_id": 2, "title": "B", "fortune": "凶", "language": "zh"},
+            {"temple": "Mazu", "poem_id": 1, "title": "C", "fortune": "大吉", "language": "jp"},
+        ])
+        return catalog
+
+    def test_load_merges_chunks_per_poem(self, catalog):
+        assert catalog.is_loaded
+        assert len(catalog) == 3
+        assert catalog.get("GuanYin", 1).languages == {"zh", "en"}
+        assert catalog.temples() == ["GuanYin", "Mazu"]
+
+    def test_secondary_indexes(self, catalog):
+        assert catalog.category_counts() == {"great_fortune": 2, "bad_fortune": 1}
+        assert catalog.category_counts("GuanYin") == {"great_fortune": 1, "bad_fortune": 1}
+        assert [e.key for e in catalog.by_category("great_fortune")] == [("GuanYin", 1), ("Mazu", 1)]
+        assert catalog.languages("GuanYin") == {"zh", "en"}
+
+    def test_upsert_moves_category_index(self, catalog):
+        version = catalog.version
+        catalog.upsert("GuanYin", 2, fortune="中吉")
+
+        assert catalog.version > version
+        assert catalog.get("GuanYin", 2).title == "B"
+        assert "bad_fortune" not in catalog.category_counts()
+        assert catalog.category_counts()["good_fortune"] == 1
+
+    def test_remove_cleans_empty_indexes(self, catalog):
+        assert catalog.remove("Mazu", 1)
+        assert not catalog.remove("Mazu", 1)
+        assert catalog.temples() == ["GuanYin"]
+        assert catalog.list_poems("Mazu") == []
+
+    def test_parse_key(self):
+        assert PoemCatalog.parse_key("GuanYin100_23") == ("GuanYin100", 23)
+        assert PoemCatalog.parse_key("Mazu#7") == ("Mazu", 7)
+        assert PoemCatalog.parse_key("invalid") is None
+
+    def test_find_temple_follows_updates(self, catalog):
+        assert catalog.find_temple(1) == "GuanYin"
+        assert catalog.find_temple(2) == "GuanYin"
+        assert catalog.find_temple(3) is None
+
+        catalog.remove("GuanYin", 1)
+        assert catalog.find_temple(1) == "Mazu"
+        catalog.upsert("Aaa", 2)
+        assert catalog.find_temple(2) == "Aaa"
+        catalog.remove("GuanYin", 2)
+        catalog.remove("Aaa", 2)
+        assert catalog.find_temple(2) is None
+
+    def test_add_allocates_the_next_free_id_per_temple(self, catalog):
+        added = [catalog.add("GuanYin", title=f"New {i}", pending=True) for i in range(3)]
+
+        assert [entry.poem_id for entry in added] == [3, 4, 5]
+        assert catalog.add("Aaa").poem_id == 1
+        assert catalog.get("GuanYin", 4).title == "New 1"
+        # Updates keep the pending state unless told otherwise
+        assert catalog.upsert("GuanYin", 4, title="Edited").pending
+        assert not catalog.upsert("GuanYin", 4, pending=False).pending
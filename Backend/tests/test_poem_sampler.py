@@ -0,0 +1,58 @@
+"""
+Tests for alias-table poem sampling
+"""
+
+import random
+
+from app.services.poem_catalog import PoemCatalog
+from app.utils.poem_sampler import AliasTable, PoemSampler
+
+
+class TestAliasTable:
+    """Test suite for the Vose alias table"""
+
+    def test_draw_frequencies_follow_weights(self):
+        table = AliasTable(["a", "b", "c"], [3.0, 1.0, 0.0], rng=random.Random(7))
+        counts = {"a": 0, "b": 0, "c": 0}
+        for _ in range(20000):
+            counts[table.draw()] += 1
+
+        assert counts["c"] == 0
+        assert 0.72 < counts["a"] / 20000 < 0.78
+
+    def test_sample_without_replacement(self):
+        table = AliasTable(list(range(10)), [1.0] * 9 + [100.0], rng=random.Random(1))
+        for count in (1, 5, 9, 10, 15):
+            drawn = table.sample(count)
+            assert len(drawn) == min(count, 10)
+            assert len(set(drawn)) == len(drawn)
+
+    def test_empty_table(self):
+        assert AliasTable([], []).sample(3) == []
+
+
+class TestPoemSampler:
+    """Test suite for catalog-backed sampling"""
+
+    def test_rebuilds_when_catalog_changes(self):
+        catalog = PoemCatalog()
+        catalog.load([{"temple": "Mazu", "poem_id": 1, "fortune": "大吉"}])
+        sampler = PoemSampler(catalog, rng=random.Random(3))
+
+        assert sampler.draw("Mazu") == [("Mazu", 1)]
+        assert sampler.draw("GuanYin") == []
+
+        catalog.upsert("GuanYin", 5, fortune="平")
+        assert sampler.draw("GuanYin") == [("GuanYin", 5)]
+        assert sorted(sampler.draw(count=2)) == [("GuanYin", 5), ("Mazu", 1)]
+
+    def test_pending_entries_are_never_drawn(self):
+        catalog = PoemCatalog()
+        catalog.load([{"temple": "Mazu", "poem_id": 1, "fortune": "大吉"}])
+        catalog.add("Mazu", fortune="大吉", pending=True)
+        catalog.add("GuanYin", fortune="大吉", pending=True)
+        sampler = PoemSampler(catalog, rng=random.Random(3))
+
+        assert sampler.draw("Mazu", count=5) == [("Mazu", 1)]
+        assert sampler.draw("GuanYin") == []
+        assert sampler.draw(count=5) == [("Mazu", 1)]
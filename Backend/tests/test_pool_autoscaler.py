@@ -0,0 +1,108 @@
+"""
+Tests for the worker pool autoscaler
+"""
+
+import asyncio
+
+from app.models.chat_task import TaskStatus
+from app.services.pool_autoscaler import LoadSignals, PoolAutoscaler
+from app.services.task_worker_pool import TaskWorkerPool
+
+
+class TestPoolAutoscaler:
+    """Test suite for scaling decisions"""
+
+    def _autoscaler(self, clock, **kwargs):
+        options = dict(min_workers=1, max_workers=8, target_wait_seconds=10.0,
+                       scale_down_after=3, cooldown_seconds=30.0, clock=clock)
+        options.update(kwargs)
+        return PoolAutoscaler(**options)
+
+    def test_backlog_grows_pool_up_to_llm_capacity(self, clock):
+        autoscaler = self._autoscaler(clock)
+        # Tasks spend 2s in RAG and 8s in the LLM: 4 LLM slots keep 5 workers busy
+        for _ in range(5):
+            autoscaler.stage_timings.record("rag", 2.0)
+            autoscaler.stage_timings.record("llm", 8.0)
+
+        decision = autoscaler.evaluate(2, LoadSignals(queue_depth=3, busy_workers=2, llm_max_concurrency=4))
+        assert (decision.target, decision.reason) == (5, "backlog")
+
+        # The gateway has callers waiting: more workers would only queue there
+        saturated = LoadSignals(queue_depth=10, busy_workers=5, llm_max_concurrency=8, llm_in_flight=8, llm_waiting=2)
+        assert autoscaler.evaluate(5, saturated).reason == "llm_saturated"
+
+        # The cooldown holds further growth even when the LLM has room again
+        clock.now += 10
+        decision = autoscaler.evaluate(5, LoadSignals(queue_depth=10, busy_workers=5, llm_max_concurrency=16))
+        assert (decision.target, decision.reason) == (5, "cooldown")
+        clock.now += 30
+        assert autoscaler.evaluate(5, LoadSignals(queue_depth=10, busy_workers=5, llm_max_concurrency=16)).target == 8
+
+        metrics = autoscaler.get_metrics()
+        assert (metrics["scale_ups"], metrics["held_by_llm_saturation"], metrics["held_by_cooldown"]) == (2, 1, 1)
+        assert [d["target"] for d in metrics["recent_decisions"]] == [5, 8]
+
+    def test_backlog_is_shared_between_worker_processes(self, clock):
+        autoscaler = self._autoscaler(clock, cooldown_seconds=0)
+
+        alone = autoscaler.evaluate(1, LoadSignals(queue_depth=6, busy_workers=1))
+        shared = autoscaler.evaluate(1, LoadSignals(queue_depth=6, busy_workers=1, worker_nodes=3))
+
+        assert (alone.target, shared.target) == (7, 3)
+
+    def test_scale_down_needs_sustained_low_utilization(self, clock):
+        autoscaler = self._autoscaler(clock, cooldown_seconds=0)
+        idle = LoadSignals(queue_depth=0, busy_workers=1)
+
+        assert autoscaler.evaluate(4, idle).reason == "low_utilization_pending"
+        assert autoscaler.evaluate(4, idle).reason == "low_utilization_pending"
+        # A busy interval resets the streak
+        assert autoscaler.evaluate(4, LoadSignals(queue_depth=0, busy_workers=3)).reason == "steady"
+        for _ in range(2):
+            assert not autoscaler.evaluate(4, idle).changed
+        decision = autoscaler.evaluate(4, idle)
+        assert (decision.target, decision.reason) == (3, "low_utilization")
+
+    def test_stage_timings_follow_status_changes(self, clock):
+        autoscaler = self._autoscaler(clock)
+        timings = autoscaler.stage_timings
+
+        timings.observe("t1", TaskStatus.PROCESSING)
+        timings.observe("t1", TaskStatus.ANALYZING_RAG)
+        clock.now += 1.5
+        timings.observe("t1", TaskStatus.GENERATING_LLM)
+        clock.now += 6.0
+        timings.finish("t1")
+
+        assert (timings.average("rag"), timings.average("llm")) == (1.5, 6.0)
+
+
+class TestTaskWorkerPoolScaling:
+    """Test suite for resizing a running pool"""
+
+    async def test_scale_up_starts_workers_and_scale_down_retires_idle_ones(self):
+        pool = TaskWorkerPool(max_workers=4, min_workers=1, initial_workers=2)
+        pool.idle_poll_seconds = 0.01
+        await pool.start()
+        try:
+            assert len(pool.worker_tasks) == 2
+
+            await pool.scale_to(10)
+            assert pool.target_workers == len(pool.worker_tasks) == 4
+
+            release = asyncio.Event()
+            await pool.submit_task("busy", release.wait)
+            await asyncio.sleep(0.05)
+
+            await pool.scale_to(1)
+            # Idle workers leave on their next loop check; the busy one finishes its task first
+            await asyncio.sleep(0.1)
+            assert list(pool.worker_tasks) == [pool.get_worker_for_task("busy")]
+            assert pool.get_metrics()["pool_status"]["retired_workers"] == 3
+
+            release.set()
+            await asyncio.sleep(0.1)
+            assert len(pool.worker_tasks) == 1 and pool.total_tasks_processed == 1
+        finally:
+            await pool.stop()
@@ -0,0 +1,92 @@
+"""
+Tests for metadata-only retrieval from the RAG collection
+"""
+
+import logging
+
+import pytest
+
+pytest.importorskip("chromadb")  # Importing fortune_module loads the RAG handler
+
+from fortune_module.models import ChunkType
+from fortune_module.unified_rag import UnifiedRAGHandler
+
+
+class FakeCollection:
+    """In-memory stand-in for a ChromaDB collection's get()"""
+
+    def __init__(self, rows):
+        self.rows = rows  # (id, metadata, document)
+        self.calls = []
+
+    def _matches(self, metadata, where):
+        if where is None:
+            return True
+        if "$and" in where:
+            return all(self._matches(metadata, condition) for condition in where["$and"])
+        [(key, condition)] = where.items()
+        return metadata.get(key) == condition["$eq"]
+
+    def get(self, where=None, include=None, limit=None, offset=0):
+        self.calls.append({"where": where, "include": list(include), "limit": limit, "offset": offset})
+        matching = [row for row in self.rows if self._matches(row[1], where)][offset:offset + limit]
+        page = {"ids": [row[0] for row in matching]}
+        if "metadatas" in include:
+            page["metadatas"] = [row[1] for row in matching]
+        if "documents" in include:
+            page["documents"] = [row[2] for row in matching]
+        return page
+
+
+def poem_rows(count, temple="GuanYin"):
+    return [
+        (f"{temple}_{i}", {"chunk_type": "poem", "temple": temple, "poem_id": i, "title": f"Poem {i}"}, f"text {i}")
+        for i in range(1, count + 1)
+    ]
+
+
+class TestMetadataRetrieval:
+    """Test suite for paginated get() over the collection"""
+
+    def _handler(self, rows):
+        handler = UnifiedRAGHandler.__new__(UnifiedRAGHandler)
+        handler.logger = logging.getLogger(__name__)
+        handler.collection = FakeCollection(rows)
+        return handler
+
+    @pytest.mark.parametrize("count", [7, 6, 0])
+    def test_paging_returns_every_row_once_and_stops_on_a_short_page(self, count):
+        handler = self._handler(poem_rows(count))
+
+        rows = list(handler.iter_metadata(page_size=3))
+
+        assert [row["chunk_id"] for row in rows] == [f"GuanYin_{i}" for i in range(1, count + 1)]
+        # An exact multiple of the page size needs one more (empty) page to know it is done
+        assert [call["offset"] for call in handler.collection.calls] == list(range(0, count + 1, 3))
+        assert all(call["limit"] == 3 for call in handler.collection.calls)
+
+    def test_where_clause_combines_filters_with_and(self):
+        assert UnifiedRAGHandler._build_where() is None
+        assert UnifiedRAGHandler._build_where(temple="Mazu") == {"temple": {"$eq": "Mazu"}}
+        assert UnifiedRAGHandler._build_where(ChunkType.POEM, "Mazu", 0) == {"$and": [
+            {"chunk_type": {"$eq": "poem"}},
+            {"temple": {"$eq": "Mazu"}},
+            {"poem_id": {"$eq": 0}},
+        ]}
+
+    def test_include_projection(self):
+        handler = self._handler(poem_rows(2))
+
+        rows = list(handler.iter_metadata(include_documents=True, include_metadata=False))
+
+        assert handler.collection.calls[0]["include"] == ["documents"]
+        assert rows == [{"chunk_id": "GuanYin_1", "content": "text 1"}, {"chunk_id": "GuanYin_2", "content": "text 2"}]
+
+    def test_get_metadata_filters_rows_and_projects_fields(self):
+        handler = self._handler(poem_rows(2) + poem_rows(1, temple="Mazu"))
+
+        records = handler.get_metadata(fields=["poem_id", "missing"], chunk_type=ChunkType.POEM, temple="Mazu")
+
+        assert records == [{"poem_id": 1, "missing": None, "chunk_id": "Mazu_1"}]
+        assert handler.collection.calls[0]["include"] == ["metadatas"]
+        assert len(handler.get_metadata()) == 3
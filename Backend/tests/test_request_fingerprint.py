@@ -0,0 +1,73 @@
+"""
+Tests for request fingerprinting used by task deduplication
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper used by relationships
+import app.models.chat_message  # noqa: F401
+from app.models.base import Base
+from app.models.chat_task import ChatTask
+from app.utils.request_fingerprint import IdempotencyKeyReused, normalize_question, request_fingerprint
+
+
+class TestRequestFingerprint:
+    """Test suite for request_fingerprint"""
+
+    def test_equivalent_questions_share_a_fingerprint(self):
+        base = request_fingerprint(1, "guan_yin", 23, "Will my career improve?", "en")
+
+        assert request_fingerprint(1, "guan_yin", 23, "  will my   CAREER improve ？", "en") == base
+        assert normalize_question("我的事業會好轉嗎？") == normalize_question("我的事業會好轉嗎?")
+        assert len(base) == 64
+
+    def test_any_differing_field_changes_the_fingerprint(self):
+        base = request_fingerprint(1, "guan_yin", 23, "Will my career improve?", "en")
+
+        assert request_fingerprint(2, "guan_yin", 23, "Will my career improve?", "en") != base
+        assert request_fingerprint(1, "mazu", 23, "Will my career improve?", "en") != base
+        assert request_fingerprint(1, "guan_yin", 24, "Will my career improve?", "en") != base
+        assert request_fingerprint(1, "guan_yin", 23, "Will my career improve?", "zh") != base
+        assert request_fingerprint(1, "guan_yin", 23, "Will my health improve?", "en") != base
+
+
+class TestIdempotencyKeyReplay:
+    """Test suite for Idempotency-Key lookups in find_duplicate_task"""
+
+    @pytest.fixture
+    async def db_session(self):
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with async_session() as session:
+            yield session
+        await engine.dispose()
+
+    async def test_replayed_key_must_match_the_request(self, db_session):
+        pytest.importorskip("chromadb")  # The task queue service loads the poem service
+        from app.services.task_queue_service import task_queue_service
+
+        task = ChatTask(
+            user_id=1, deity_id="guan_yin", fortune_number=23, question="Will my career improve?",
+            request_fingerprint=request_fingerprint(1, "guan_yin", 23, "Will my career improve?", "en"),
+            idempotency_key="key-1"
+        )
+        db_session.add(task)
+        await db_session.commit()
+
+        replay = await task_queue_service.find_duplicate_task(
+            1, "guan_yin", 23, "will my career improve", context={"language": "en"},
+            idempotency_key="key-1", db=db_session
+        )
+        assert replay.task_id == task.task_id
+
+        with pytest.raises(IdempotencyKeyReused):
+            await task_queue_service.find_duplicate_task(
+                1, "mazu", 23, "Will my career improve?", context={"language": "en"},
+                idempotency_key="key-1", db=db_session
+            )
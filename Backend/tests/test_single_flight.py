@@ -0,0 +1,57 @@
+"""
+Tests for async single-flight request coalescing
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight"""
+
+    async def test_concurrent_callers_share_one_load(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "poem"
+
+        results = await asyncio.gather(*[flight.do("poem_YueLao_1", load) for _ in range(10)])
+
+        assert results == ["poem"] * 10
+        assert calls == 1
+        assert flight.get_stats() == {"executions": 1, "coalesced": 9, "in_flight": 0}
+
+    async def test_exception_propagates_to_all_callers(self):
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("chromadb down")
+
+        results = await asyncio.gather(*[flight.do("k", load) for _ in range(3)], return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.in_flight == 0
+
+    async def test_cancelled_caller_does_not_cancel_shared_load(self):
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return 42
+
+        first = asyncio.create_task(flight.do("k", load))
+        second = asyncio.create_task(flight.do("k", load))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == 42
+        with pytest.raises(asyncio.CancelledError):
+            await first
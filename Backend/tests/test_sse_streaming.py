@@ -0,0 +1,92 @@
+"""
+Tests for LLM token frame batching and bounded SSE client queues
+"""
+
+import asyncio
+import threading
+
+from app.services.task_event_buffer import format_sse_event, parse_sse_event
+from app.utils.sse_client_queue import SSEClientQueue
+from app.utils.token_frame_aggregator import TokenFrameAggregator
+
+
+class TestTokenFrameAggregator:
+    """Test suite for TokenFrameAggregator"""
+
+    async def test_tokens_from_threads_are_flushed_as_few_frames(self):
+        frames = []
+
+        async def send(frame):
+            frames.append(frame)
+
+        aggregator = TokenFrameAggregator(send, interval_seconds=0.01, window_tokens=3)
+        aggregator.start()
+
+        producer = threading.Thread(target=lambda: [aggregator.add(t) for t in ["a", "b", "c", "d", "e"]])
+        producer.start()
+        producer.join()
+        await aggregator.stop()
+
+        assert "".join(frame["token"] for frame in frames) == "abcde"
+        assert len(frames) < 5
+        assert frames[-1]["partial_text"] == "cde"
+        assert frames[-1]["total_tokens"] == 5
+
+    async def test_flush_without_tokens_sends_nothing(self):
+        frames = []
+
+        async def send(frame):
+            frames.append(frame)
+
+        aggregator = TokenFrameAggregator(send)
+        await aggregator.flush()
+        assert frames == []
+
+
+class TestSSEClientQueue:
+    """Test suite for SSEClientQueue"""
+
+    async def test_unread_partials_are_coalesced(self):
+        queue = SSEClientQueue()
+        await queue.send("status", "status")
+        await queue.send("partial-1", "llm_streaming")
+        await queue.send("partial-2", "llm_streaming")
+
+        assert [await queue.get(), await queue.get()] == ["status", "partial-2"]
+        assert queue.coalesced == 1
+
+    async def test_overflow_folds_partials_but_keeps_critical_frames(self):
+        queue = SSEClientQueue(maxsize=2)
+        await queue.send("partial-1", "llm_streaming")
+        await queue.send("status", "status")
+        await queue.send("partial-2", "llm_streaming")
+        await queue.send("complete", "complete")
+
+        assert queue.qsize() == 3
+        assert queue.dropped == 1
+        assert [await queue.get(), await queue.get(), await queue.get()] == ["status", "partial-2", "complete"]
+
+    async def test_token_deltas_survive_coalescing(self):
+        queue = SSEClientQueue(maxsize=3)
+        sent = []
+        for index, token in enumerate(["天", "開", "地", "闢", "結", "良", "緣"]):
+            sent.append(token)
+            await queue.send(format_sse_event({"type": "llm_streaming", "token": token}, (1, index + 1)), "llm_streaming")
+            if index % 3 == 1:
+                await queue.send(format_sse_event({"type": "status"}, (1, 100 + index)), "status")
+
+        received = []
+        while queue.qsize():
+            event_id, data = parse_sse_event(await queue.get())
+            if data["type"] == "llm_streaming":
+                received.append(data["token"])
+        assert "".join(received) == "".join(sent)
+        assert event_id == (1, 7)  # The folded frame keeps the newest event id
+
+    async def test_get_waits_for_frame(self):
+        queue = SSEClientQueue()
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        await queue.send("complete", "complete")
+
+        assert await asyncio.wait_for(getter, timeout=1) == "complete"
@@ -0,0 +1,95 @@
+"""
+Tests for the SSE replay buffer
+"""
+
+import pytest
+
+from app.services.task_event_buffer import TaskEventBuffer, format_sse_event, parse_event_id, parse_sse_event
+
+
+class TestTaskEventBuffer:
+    """Test suite for Last-Event-ID replay"""
+
+    def _fill(self, buffer, task_id, count, run=1):
+        for seq in range(1, count + 1):
+            buffer.append(task_id, (run, seq), format_sse_event({"type": "status", "progress": seq}, (run, seq)))
+
+    def test_frames_round_trip(self):
+        frame = format_sse_event({"type": "complete", "result": {"response": "ok"}}, (2, 7))
+
+        assert frame.startswith("id: 2-7\ndata: ")
+        assert parse_sse_event(frame) == ((2, 7), {"type": "complete", "result": {"response": "ok"}})
+        assert parse_sse_event("data: not json\n\n") == (None, None)
+        for malformed in (None, "", "7", "2-", "-7", "a-7", "2-7-1"):
+            assert parse_event_id(malformed) is None
+
+    def test_replay_returns_events_after_last_id(self):
+        buffer = TaskEventBuffer()
+        self._fill(buffer, "t1", 5)
+
+        assert [event_id for event_id, _ in buffer.replay("t1", (1, 3))] == [(1, 4), (1, 5)]
+        assert buffer.replay("t1", (1, 5)) == []
+        assert buffer.replay("t1", (1, 0)) is not None
+
+    def test_replay_misses_when_gap_was_evicted(self):
+        buffer = TaskEventBuffer(max_events_per_task=3)
+        self._fill(buffer, "t1", 10)
+
+        assert buffer.replay("t1", (1, 2)) is None
+        assert [seq for (_, seq), _ in buffer.replay("t1", (1, 7))] == [8, 9, 10]
+        assert buffer.replay("unknown", (1, 1)) is None
+        assert buffer.get_metrics()["replay_misses"] == 2
+
+    def test_restarted_publisher_resets_buffer(self):
+        buffer = TaskEventBuffer()
+        self._fill(buffer, "t1", 4)
+        buffer.append("t1", (1, 1), format_sse_event({"type": "status"}, (1, 1)))
+
+        assert buffer.replay("t1", (1, 3)) is None
+        assert buffer.replay("t1", (1, 0)) is not None
+
+    def test_rerun_never_replays_across_runs(self):
+        # The re-run reuses sequence numbers, but the run in the id tells them apart
+        buffer = TaskEventBuffer()
+        self._fill(buffer, "t1", 2)
+        self._fill(buffer, "t1", 6, run=2)
+
+        assert buffer.replay("t1", (1, 2)) is None
+        assert buffer.replay("t1", (3, 0)) is None
+        assert [event_id for event_id, _ in buffer.replay("t1", (2, 4))] == [(2, 5), (2, 6)]
+
+
+class TestTaskEventIds:
+    """Test suite for event ids published by the task queue service"""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        pytest.importorskip("chromadb")  # The task queue service loads the poem service
+        from app.services.task_queue_service import task_queue_service
+
+        class LoopbackBus:
+            async def publish(self, task_id, data):
+                await task_queue_service._on_task_event(task_id, data)
+
+        monkeypatch.setattr(task_queue_service, "event_bus", LoopbackBus())
+        yield task_queue_service
+        task_queue_service.event_buffer.discard("t1")
+
+    async def test_rerun_ids_carry_the_attempt(self, service):
+        service._event_seq["t1"] = (1, 0)
+        for progress in (10, 20, 30):
+            await service.send_sse_event("t1", {"type": "status", "progress": progress})
+        # The lease expired and another worker starts attempt 2
+        service._event_seq["t1"] = (2, 0)
+        await service.send_sse_event("t1", {"type": "status", "progress": 5})
+
+        assert service.event_buffer.replay("t1", (1, 2)) is None
+        assert [event_id for event_id, _ in service.event_buffer.replay("t1", (2, 0))] == [(2, 1)]
+
+    async def test_unsequenced_terminal_event_drops_the_buffer(self, service):
+        service._event_seq["t1"] = (1, 0)
+        await service.send_sse_event("t1", {"type": "status", "progress": 10})
+        await service.send_transient_event("t1", {"type": "error", "error": "interrupted"})
+
+        assert service.event_buffer.replay("t1", (1, 0)) is None
+        assert "t1" not in service._event_seq
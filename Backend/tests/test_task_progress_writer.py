@@ -0,0 +1,90 @@
+"""
+Tests for write-behind task progress checkpoints (SQLite dialect)
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registers every mapper used by relationships
+import app.models.chat_message  # noqa: F401
+from app.models.base import Base
+from app.models.chat_task import ChatTask, TaskStatus
+from app.services.durable_task_queue import DurableTaskQueue
+from app.services.task_progress_writer import TaskProgressWriter
+
+
+class TestTaskProgressWriter:
+    """Test suite for coalesced, batched progress checkpoints"""
+
+    @pytest.fixture
+    async def session_factory(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tasks.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await engine.dispose()
+
+    async def _claimed_tasks(self, session_factory, count, worker_id="a"):
+        async with session_factory() as db:
+            tasks = [
+                ChatTask(user_id=1, deity_id="guan_yin", fortune_number=i + 1, question=f"q{i}")
+                for i in range(count)
+            ]
+            db.add_all(tasks)
+            await db.commit()
+            await DurableTaskQueue(worker_id=worker_id).claim(db, limit=count)
+        return tasks
+
+    async def _row(self, session_factory, task_id):
+        async with session_factory() as db:
+            return await db.get(ChatTask, task_id)
+
+    async def test_steps_are_coalesced_into_one_batched_write(self, session_factory):
+        first, second = await self._claimed_tasks(session_factory, 2)
+        writer = TaskProgressWriter("a", session_factory=session_factory)
+
+        for status, progress in [(TaskStatus.PROCESSING, 10), (TaskStatus.ANALYZING_RAG, 15),
+                                 (TaskStatus.GENERATING_LLM, 55)]:
+            first.update_progress(status, progress, f"status_code:{progress}")
+            writer.record(first)
+        second.update_progress(TaskStatus.PROCESSING, 10, "status_code:10")
+        writer.record(second)
+
+        assert (await self._row(session_factory, first.task_id)).status == TaskStatus.QUEUED
+        assert await writer.flush() == 2
+
+        row = await self._row(session_factory, first.task_id)
+        assert (row.status, row.progress, row.status_message) == (TaskStatus.GENERATING_LLM, 55, "status_code:55")
+        assert row.started_at is not None
+
+        metrics = writer.get_metrics()
+        assert (metrics["flushes"], metrics["coalesced"], metrics["commits_saved"]) == (1, 2, 3)
+        assert await writer.flush() == 0
+
+    async def test_checkpoint_never_overwrites_terminal_or_foreign_tasks(self, session_factory):
+        [finished] = await self._claimed_tasks(session_factory, 1, worker_id="a")
+        [foreign] = await self._claimed_tasks(session_factory, 1, worker_id="b")
+        writer = TaskProgressWriter("a", session_factory=session_factory)
+
+        finished.update_progress(TaskStatus.GENERATING_LLM, 55, "status_code:55")
+        writer.record(finished)
+        foreign.update_progress(TaskStatus.PROCESSING, 10, "status_code:10")
+        writer.record(foreign)
+
+        # The owner commits the result before the checkpoint runs
+        async with session_factory() as db:
+            row = await db.get(ChatTask, finished.task_id)
+            row.set_result("report", confidence=80)
+            await db.commit()
+
+        assert await writer.flush() == 0
+        assert (await self._row(session_factory, finished.task_id)).status == TaskStatus.COMPLETED
+        assert (await self._row(session_factory, foreign.task_id)).status == TaskStatus.QUEUED
+        assert writer.get_metrics()["rows_skipped"] == 2
+
+        # Recording a terminal state drops the pending checkpoint
+        finished.set_error("boom")
+        writer.record(finished)
+        assert writer.pending_count() == 0
@@ -0,0 +1,42 @@
+"""
+Tests for the in-memory task state registry
+"""
+
+from app.services.task_state_registry import TaskStateRegistry
+
+
+class TestTaskStateRegistry:
+    """Test suite for TaskStateRegistry"""
+
+    def test_status_events_are_not_terminal_until_result(self):
+        registry = TaskStateRegistry()
+
+        registry.apply_event("t1", {"type": "status", "status": "processing", "progress": 10, "status_code": 20})
+        registry.apply_event("t1", {"type": "status", "status": "completed", "progress": 100})
+        assert registry.get("t1").is_terminal is False
+
+        registry.apply_event("t1", {"type": "complete", "result": {"response": "ok"}})
+        state = registry.get("t1")
+        assert state.is_terminal
+        assert state.result == {"response": "ok"}
+
+    def test_terminal_state_ignores_late_events(self):
+        registry = TaskStateRegistry()
+
+        registry.apply_event("t1", {"type": "error", "error": "Insufficient coins", "retry_allowed": False})
+        registry.apply_event("t1", {"type": "status", "status": "processing", "progress": 50})
+
+        state = registry.get("t1")
+        assert state.status == "failed"
+        assert state.retry_allowed is False
+        assert registry.apply_event("t1", {"type": "llm_streaming"}) is None
+
+    def test_prune_drops_expired_states(self):
+        registry = TaskStateRegistry(terminal_ttl_seconds=-1, stale_ttl_seconds=3600)
+
+        registry.apply_event("done", {"type": "complete", "result": {}})
+        registry.apply_event("running", {"type": "status", "status": "processing"})
+        registry.prune()
+
+        assert registry.get("done") is None
+        assert registry.get("running") is not None